@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        from .slow_queries import install
+
+        # Record slow queries on every connection, including ones already open
+        connection_created.connect(install, dispatch_uid='core.slow_queries')
+        for connection in connections.all(initialized_only=True):
+            install(connection=connection)
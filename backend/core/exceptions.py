@@ -37,4 +37,10 @@ class PlayerError(GameError):
     """Raised when player-related errors occur."""
     
     def __init__(self, message, details=None):
-        super().__init__(message, 'PLAYER_ERROR', details)
\ No newline at end of file
+        super().__init__(message, 'PLAYER_ERROR', details)
+
+class GameConflictError(GameError):
+    """Raised when a game changed concurrently and the operation could not be committed."""
+    
+    def __init__(self, message, details=None):
+        super().__init__(message, 'GAME_CONFLICT', details)
@@ -0,0 +1,124 @@
+"""
+Management command summarizing sampled move traces.
+
+Reads the JSONL file written by ``core.tracing`` and reports, per stage, how
+many times it ran and its p50/p95/p99/max duration, followed by the slowest
+traces with their stage breakdown and WebSocket deliveries.
+"""
+
+import math
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tracing import load_traces, trace_file
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(q * len(ordered)) - 1)
+    return ordered[index]
+
+
+def delivery_ms(delivery: Dict) -> float:
+    return (delivery.get('queue_ms') or 0) + delivery.get('write_ms', 0)
+
+
+def end_to_end_ms(trace: Dict) -> float:
+    """Server time plus the slowest delivery of the trace."""
+    deliveries = [delivery_ms(d) for d in trace['deliveries']]
+    return trace['duration_ms'] + (max(deliveries) if deliveries else 0)
+
+
+class Command(BaseCommand):
+    help = 'Summarize sampled move traces by stage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='Trace file to read (defaults to TRACE_FILE)',
+        )
+        parser.add_argument(
+            '--name',
+            help='Only include traces with this name (e.g. move)',
+        )
+        parser.add_argument(
+            '--transport',
+            choices=['http', 'ws'],
+            help='Only include traces that entered through this transport',
+        )
+        parser.add_argument(
+            '--slowest',
+            type=int,
+            default=5,
+            help='Number of slowest traces to break down (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['file']) if options['file'] else trace_file()
+        if not path.exists():
+            raise CommandError(f'Trace file {path} does not exist (is TRACE_SAMPLE_RATE above 0?)')
+
+        traces = load_traces(path)
+        if options['name']:
+            traces = [t for t in traces if t['name'] == options['name']]
+        if options['transport']:
+            traces = [t for t in traces if t['attributes'].get('transport') == options['transport']]
+        if not traces:
+            self.stdout.write('No traces found.')
+            return
+
+        stages = defaultdict(list)
+        for trace in traces:
+            stages['total'].append(trace['duration_ms'])
+            stages['end_to_end'].append(end_to_end_ms(trace))
+            for trace_span in trace['spans']:
+                stages[trace_span['name']].append(trace_span['duration_ms'])
+            for delivery in trace['deliveries']:
+                if delivery.get('queue_ms') is not None:
+                    stages['delivery.queue'].append(delivery['queue_ms'])
+                stages['delivery.write'].append(delivery['write_ms'])
+
+        self.stdout.write(f'{len(traces)} traces from {path}\n')
+        self.stdout.write(f"{'stage':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, durations in sorted(stages.items(), key=lambda item: -percentile(item[1], 0.99)):
+            self.stdout.write(
+                f'{name:<28} {len(durations):>7} {percentile(durations, 0.5):>9.2f} '
+                f'{percentile(durations, 0.95):>9.2f} {percentile(durations, 0.99):>9.2f} {max(durations):>9.2f}'
+            )
+
+        slowest = sorted(traces, key=end_to_end_ms, reverse=True)[:options['slowest']]
+        if slowest:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\nSlowest {len(slowest)} traces'))
+        for trace in slowest:
+            attributes = ' '.join(f'{key}={value}' for key, value in sorted(trace['attributes'].items()))
+            self.stdout.write(
+                f"\n{trace['trace_id']} {trace['name']} {end_to_end_ms(trace):.2f} ms "
+                f"(server {trace['duration_ms']:.2f} ms) {attributes}"
+            )
+            for trace_span in trace['spans']:
+                depth = self._depth(trace_span, trace['spans'])
+                self.stdout.write(
+                    f"  {'  ' * depth}{trace_span['name']:<{30 - 2 * depth}} "
+                    f"+{trace_span['start_ms']:>8.2f} {trace_span['duration_ms']:>8.2f} ms"
+                )
+            for delivery in trace['deliveries']:
+                queue = delivery.get('queue_ms')
+                queue = f'{queue:.2f}' if queue is not None else '?'
+                self.stdout.write(
+                    f"  delivered {delivery['event_type']} to user {delivery['user_id']}: "
+                    f"queue {queue} ms, write {delivery['write_ms']:.2f} ms"
+                )
+
+    @staticmethod
+    def _depth(trace_span: Dict, spans: List[Dict]) -> int:
+        # Spans only record their parent's name, which is enough for indentation
+        names = {s['name']: s.get('parent') for s in spans}
+        depth, parent = 0, trace_span.get('parent')
+        while parent is not None and depth < 10:
+            depth += 1
+            parent = names.get(parent)
+        return depth
@@ -0,0 +1,102 @@
+"""
+Management command to list, show and diff saved profiles.
+
+Profiles are captured by ``core.profiling``; see its docstring for how to
+trigger one.
+"""
+
+import pstats
+from pathlib import Path
+from typing import Dict, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import list_profiles, make_profile_token, profile_dir
+
+FunctionKey = Tuple[str, int, str]
+
+
+def function_label(key: FunctionKey) -> str:
+    filename, line, name = key
+    if filename == '~':
+        return name  # Built-in
+    return f'{Path(filename).name}:{line}({name})'
+
+
+def function_times(path: Path) -> Dict[FunctionKey, Tuple[int, float, float]]:
+    """Return {function: (calls, own time, cumulative time)} for a profile."""
+    stats = pstats.Stats(str(path))
+    return {key: (calls, own, cumulative) for key, (_, calls, own, cumulative, _) in stats.stats.items()}
+
+
+class Command(BaseCommand):
+    help = 'List, show and diff profiles saved by the profiling middleware'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        list_parser = subparsers.add_parser('list', help='List saved profiles, newest first')
+        list_parser.add_argument('--limit', type=int, default=20, help='Number of profiles to list (default: 20)')
+
+        show_parser = subparsers.add_parser('show', help='Print the top functions of a profile')
+        show_parser.add_argument('profile', help='Profile id or path')
+        show_parser.add_argument('--limit', type=int, default=30, help='Number of functions (default: 30)')
+        show_parser.add_argument(
+            '--sort', default='cumulative', choices=['cumulative', 'tottime', 'calls'],
+            help='Sort order (default: cumulative)'
+        )
+
+        diff_parser = subparsers.add_parser('diff', help='Compare function times between two profiles')
+        diff_parser.add_argument('before', help='Profile id or path')
+        diff_parser.add_argument('after', help='Profile id or path')
+        diff_parser.add_argument('--limit', type=int, default=30, help='Number of functions (default: 30)')
+
+        subparsers.add_parser('token', help='Print a signed token for the X-Profile-Token header')
+
+    def handle(self, *args, **options):
+        getattr(self, f"handle_{options['action']}")(options)
+
+    def resolve(self, profile: str) -> Path:
+        path = Path(profile)
+        if not path.exists():
+            path = profile_dir() / (profile if profile.endswith('.pstats') else f'{profile}.pstats')
+        if not path.exists():
+            raise CommandError(f'Profile {profile} not found in {profile_dir()}')
+        return path
+
+    def handle_list(self, options):
+        profiles = list_profiles()[:options['limit']]
+        if not profiles:
+            self.stdout.write(f'No profiles in {profile_dir()}.')
+            return
+        for path in profiles:
+            summary = path.with_suffix('.txt')
+            header = summary.read_text().splitlines()[:2] if summary.exists() else []
+            self.stdout.write(f"{path.stem}  {'  '.join(reversed(header))}")
+
+    def handle_show(self, options):
+        stats = pstats.Stats(str(self.resolve(options['profile'])), stream=self.stdout)
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+
+    def handle_diff(self, options):
+        before = function_times(self.resolve(options['before']))
+        after = function_times(self.resolve(options['after']))
+
+        rows = []
+        for key in before.keys() | after.keys():
+            calls_before, own_before, cumulative_before = before.get(key, (0, 0.0, 0.0))
+            calls_after, own_after, cumulative_after = after.get(key, (0, 0.0, 0.0))
+            rows.append((
+                cumulative_after - cumulative_before, own_after - own_before,
+                calls_after - calls_before, key
+            ))
+        rows.sort(key=lambda row: abs(row[0]), reverse=True)
+
+        self.stdout.write(f"{'cumulative Δ ms':>16} {'own Δ ms':>10} {'calls Δ':>8}  function")
+        for cumulative_delta, own_delta, calls_delta, key in rows[:options['limit']]:
+            self.stdout.write(
+                f'{cumulative_delta * 1000:>+16.2f} {own_delta * 1000:>+10.2f} {calls_delta:>+8}  {function_label(key)}'
+            )
+
+    def handle_token(self, options):
+        self.stdout.write(make_profile_token())
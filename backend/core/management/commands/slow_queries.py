@@ -0,0 +1,69 @@
+"""
+Management command summarizing the slow query log.
+
+Groups the queries recorded by ``core.slow_queries`` by fingerprint and
+prints their timings, call sites and (with ``--plans``) EXPLAIN output.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import slow_query_file, summarize_slow_queries
+
+
+class Command(BaseCommand):
+    help = 'Summarize logged slow queries by fingerprint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='Slow query log to read (defaults to SLOW_QUERY_FILE)',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=['total', 'max', 'count', 'recent'],
+            default='total',
+            help='Order of the report (default: total time)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Number of query shapes to show (default: 20)',
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help='Print the recorded EXPLAIN plan of each query',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete the log after reporting',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['file']) if options['file'] else slow_query_file()
+        summary = summarize_slow_queries(path, sort=options['sort'])
+        if not summary:
+            self.stdout.write(f'No slow queries in {path}.')
+            return
+
+        self.stdout.write(f'{len(summary)} query shapes in {path}\n')
+        for group in summary[:options['limit']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{group['count']}x  total {group['total_ms']:.1f} ms  "
+                f"p50 {group['p50_ms']:.1f} ms  max {group['max_ms']:.1f} ms  ({', '.join(group['vendors'])})"
+            ))
+            self.stdout.write(f"  {group['fingerprint'][:500]}")
+            for site, count in group['call_sites'][:3]:
+                self.stdout.write(f'  at {site} ({count}x)')
+            if options['plans']:
+                for line in group['plan'] or ['(no plan recorded)']:
+                    self.stdout.write(f'    {line}')
+            self.stdout.write('')
+
+        if options['clear']:
+            path.unlink()
+            self.stdout.write(self.style.SUCCESS(f'Cleared {path}'))
@@ -0,0 +1,243 @@
+"""
+In-process latency metrics exposed in the Prometheus text format.
+
+Histograms are kept per process with no external dependency and served by
+``core.views.MetricsView`` at ``/metrics``. Each worker process reports its
+own series; a Prometheus server scraping every worker aggregates them, and
+p50/p99 come from ``histogram_quantile`` over the buckets (or
+``Histogram.quantile`` locally).
+
+Instrumented paths:
+
+* every HTTP request, by view (``core.middleware.MetricsMiddleware``),
+  including the number and total time of its database queries
+* every template rendered through the ``InstrumentedDjangoTemplates`` backend
+* every ``notify_game_event`` update type (``web.services``)
+* channel-layer sends and consumer message handling (``web.consumers``)
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets for per-request query counts
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def metrics_enabled() -> bool:
+    """Whether instrumentation records observations."""
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative histogram with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._lock = threading.Lock()
+        # {label values: ([count per bucket], sum, count)}
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def _label_values(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation."""
+        if not metrics_enabled():
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of the block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        """Number of observations recorded for a label set."""
+        with self._lock:
+            series = self._series.get(self._label_values(labels))
+            return series[2] if series else 0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """
+        Estimate a quantile the way Prometheus' ``histogram_quantile`` does.
+
+        Args:
+            q: Quantile between 0 and 1 (0.5 for p50, 0.99 for p99)
+            **labels: Label set to read
+
+        Returns:
+            The estimate, or None when nothing was observed
+        """
+        with self._lock:
+            series = self._series.get(self._label_values(labels))
+            if not series or not series[2]:
+                return None
+            counts, total = list(series[0]), series[2]
+
+        rank = q * total
+        cumulative = 0
+        for index, bound in enumerate(self.buckets):
+            previous = cumulative
+            cumulative += counts[index]
+            if cumulative >= rank:
+                if bound == math.inf:
+                    return self.buckets[-2]
+                lower = self.buckets[index - 1] if index else 0.0
+                if counts[index] == 0:
+                    return bound
+                return lower + (bound - lower) * (rank - previous) / counts[index]
+        return self.buckets[-2]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def expose(self) -> List[str]:
+        """Return the metric in the Prometheus text exposition format."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = sorted((key, list(value[0]), value[1], value[2]) for key, value in self._series.items())
+
+        for key, counts, total_sum, total_count in series:
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = ','.join(labels + [f'le="{_format_value(bound)}"'])
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} {cumulative}')
+            suffix = f'{{{",".join(labels)}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {_format_value(total_sum)}')
+            lines.append(f'{self.name}_count{suffix} {total_count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram registered under ``name``, creating it if needed."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+            return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """Drop every recorded observation (the metrics stay registered)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    'gomoku_http_request_duration_seconds', 'HTTP request latency by view.',
+    ('view', 'method', 'status')
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    'gomoku_http_request_db_queries', 'Database queries per HTTP request by view.',
+    ('view',), buckets=COUNT_BUCKETS
+)
+REQUEST_DB_TIME = registry.histogram(
+    'gomoku_http_request_db_duration_seconds', 'Total database time per HTTP request by view.',
+    ('view',)
+)
+TEMPLATE_RENDER = registry.histogram(
+    'gomoku_template_render_seconds', 'Template render time by template.',
+    ('template',)
+)
+NOTIFICATION_UPDATE = registry.histogram(
+    'gomoku_notification_update_seconds', 'Time to build and send one WebSocket notification update.',
+    ('event', 'update_type')
+)
+CHANNEL_SEND = registry.histogram(
+    'gomoku_channel_send_seconds', 'Channel layer group_send time by event type.',
+    ('event_type',)
+)
+CONSUMER_MESSAGE = registry.histogram(
+    'gomoku_consumer_message_seconds', 'WebSocket consumer handling time by incoming message type.',
+    ('message_type',)
+)
+
+
+class InstrumentedTemplate(Template):
+    """Django template that records its render time."""
+
+    def render(self, context=None, request=None):
+        with TEMPLATE_RENDER.time(template=self.origin.template_name or 'string'):
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    DjangoTemplates backend timing every top-level template render.
+
+    Use as the ``BACKEND`` of a ``TEMPLATES`` entry. Includes are part of the
+    including template's time.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
@@ -0,0 +1,133 @@
+"""
+Request instrumentation middleware.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import REQUEST_DB_QUERIES, REQUEST_DB_TIME, REQUEST_LATENCY, metrics_enabled
+from .profiling import capture, should_profile_request
+from .queries import QueryRecorder, budget_for, budgets_enabled, enforce_budget
+
+
+def view_name(request) -> str:
+    """Name of the view that handled a request, for metric labels."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    view_class = getattr(func, 'view_class', None)
+    if view_class is not None:
+        return view_class.__name__
+    return getattr(func, '__name__', match.view_name or 'unknown')
+
+
+def budget_label(request) -> str:
+    """
+    ``QUERY_BUDGETS`` key for a request.
+
+    A class-based view without a budget of its own uses the budget of its
+    nearest base class that has one, so e.g. ``GamesPanelView`` gets the
+    ``PanelView`` budget.
+    """
+    name = view_name(request)
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    view_class = getattr(getattr(getattr(request, 'resolver_match', None), 'func', None), 'view_class', None)
+    if name in budgets or view_class is None:
+        return name
+    for base in view_class.__mro__[1:]:
+        if base.__name__ in budgets:
+            return base.__name__
+    return name
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` hook counting and timing queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Record latency, query count and query time for every request, by view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_enabled():
+            return self.get_response(request)
+
+        queries = QueryTimer()
+        start = time.perf_counter()
+        status = 500
+        try:
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            view = view_name(request)
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                view=view, method=request.method, status=f'{status // 100}xx'
+            )
+            REQUEST_DB_QUERIES.observe(queries.count, view=view)
+            REQUEST_DB_TIME.observe(queries.duration, view=view)
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests that ask for it (see ``core.profiling``).
+
+    Must come after ``AuthenticationMiddleware`` so ``?profile=1`` can be
+    checked against the user. Profiled responses carry ``X-Profile-Id``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile_request(request):
+            return self.get_response(request)
+
+        with capture(f'{request.method} {request.path}') as current:
+            response = self.get_response(request)
+        if current is not None:
+            response['X-Profile-Id'] = current.profile_id
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Enforce per-view query budgets (see ``core.queries``).
+
+    Active when ``QUERY_BUDGETS_ENABLED`` is set. Views over budget, or
+    running the same query more than ``QUERY_DUPLICATE_THRESHOLD`` times, are
+    logged with their query count, database time and repeated SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not budgets_enabled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        # Reported under the routed view's name, with the budget it inherits
+        enforce_budget(view_name(request), recorder, *budget_for(budget_label(request)))
+        return response
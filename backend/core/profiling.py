@@ -0,0 +1,198 @@
+"""
+On-demand cProfile capture for requests and WebSocket messages.
+
+Profiling is off unless ``PROFILING_ENABLED`` is set. When enabled, a request
+(``core.middleware.ProfilingMiddleware``) or consumer message
+(``profile_consumer_message``) is profiled when any of these holds:
+
+* it carries a valid signed token, in the ``X-Profile-Token`` header for HTTP
+  or a ``"profile"`` field in the WebSocket message (``manage.py profiles
+  token`` prints one)
+* a staff user adds ``?profile=1`` to the URL
+* it is picked by ``PROFILE_SAMPLE_RATE``
+
+Each capture is written to ``PROFILE_DIR`` as ``<id>.pstats`` plus an
+``<id>.txt`` summary of the top ``PROFILE_TOP_N`` functions by cumulative
+time. Only one capture runs per process at a time; requests arriving while
+one is running are served unprofiled. ``manage.py profiles`` lists, shows and
+diffs saved captures.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'core.profiling'
+
+# cProfile cannot nest, so captures are serialized per process
+_capture_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    return getattr(settings, 'PROFILING_ENABLED', False)
+
+
+def profile_dir() -> Path:
+    """Directory profiles are saved to."""
+    return Path(getattr(settings, 'PROFILE_DIR', Path(settings.BASE_DIR) / 'logs' / 'profiles'))
+
+
+def make_profile_token() -> str:
+    """Return a signed token that requests profiling, valid for ``PROFILE_TOKEN_MAX_AGE`` seconds."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_profile_token(token: Optional[str]) -> bool:
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 3600)
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def sampled() -> bool:
+    rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def should_profile_request(request) -> bool:
+    """Whether a request asked for (or was sampled for) profiling."""
+    if not profiling_enabled():
+        return False
+    header = getattr(settings, 'PROFILE_HEADER', 'X-Profile-Token')
+    if valid_profile_token(request.headers.get(header)):
+        return True
+    user = getattr(request, 'user', None)
+    if request.GET.get('profile') == '1' and user is not None and user.is_staff:
+        return True
+    return sampled()
+
+
+def _slug(label: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', label).strip('-')[:60] or 'profile'
+
+
+class Capture:
+    """One profiling run; ``profile_id`` is set once it has been saved."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.profile = cProfile.Profile()
+        self.profile_id: Optional[str] = None
+        self.duration = 0.0
+
+    def save(self) -> Path:
+        """
+        Write the ``.pstats`` file and its top-N summary.
+
+        Returns:
+            Path of the ``.pstats`` file
+        """
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{_slug(self.label)}-{random.getrandbits(24):06x}"
+        path = directory / f'{self.profile_id}.pstats'
+        self.profile.dump_stats(str(path))
+
+        summary = io.StringIO()
+        summary.write(f'{self.label}\n{self.duration * 1000:.1f} ms\n\n')
+        stats = pstats.Stats(str(path), stream=summary)
+        stats.sort_stats('cumulative').print_stats(getattr(settings, 'PROFILE_TOP_N', 30))
+        (directory / f'{self.profile_id}.txt').write_text(summary.getvalue())
+        return path
+
+
+@contextmanager
+def capture(label: str) -> Iterator[Optional[Capture]]:
+    """
+    Profile the block and save the result.
+
+    Args:
+        label: What is being profiled; used in the file name and summary
+
+    Yields:
+        The capture, or None if another capture was already running
+    """
+    if not _capture_lock.acquire(blocking=False):
+        yield None
+        return
+
+    current = Capture(label)
+    start = time.perf_counter()
+    try:
+        current.profile.enable()
+        try:
+            yield current
+        finally:
+            current.profile.disable()
+            current.duration = time.perf_counter() - start
+    finally:
+        _capture_lock.release()
+        current.save()
+
+
+def profile_consumer_message(handler):
+    """
+    Decorate a consumer's ``receive`` to profile selected messages.
+
+    A message is profiled when it carries a signed ``"profile"`` token, when
+    the connected user is staff and sets ``"profile": true``, or when it is
+    sampled. cProfile only sees the event loop thread: other tasks that run
+    while the handler awaits are included, work in ``database_sync_to_async``
+    threads is not (profile the HTTP move endpoint for ``make_move``).
+    """
+    @functools.wraps(handler)
+    async def wrapper(self, text_data=None, *args, **kwargs):
+        label = _consumer_message_label(self, text_data)
+        if label is None:
+            return await handler(self, text_data, *args, **kwargs)
+        with capture(label):
+            return await handler(self, text_data, *args, **kwargs)
+    return wrapper
+
+
+def _consumer_message_label(consumer, text_data) -> Optional[str]:
+    # Return a capture label if the message should be profiled
+    if not profiling_enabled() or not text_data:
+        return None
+    requested = False
+    message_type = 'message'
+    if '"profile"' in text_data:
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            return None
+        message_type = str(data.get('type', message_type))
+        token = data.get('profile')
+        user = getattr(consumer, 'user', None)
+        requested = (
+            (isinstance(token, str) and valid_profile_token(token))
+            or (token is True and user is not None and user.is_staff)
+        )
+    if not requested and not sampled():
+        return None
+    return f'ws {type(consumer).__name__} {message_type}'
+
+
+def list_profiles() -> List[Path]:
+    """Saved ``.pstats`` files, newest first."""
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    return sorted(directory.glob('*.pstats'), key=lambda path: path.stat().st_mtime, reverse=True)
@@ -0,0 +1,209 @@
+"""
+SQL query budgets and N+1 detection.
+
+``QueryRecorder`` is a ``connection.execute_wrapper`` hook that counts
+queries, times them and groups them by fingerprint (the SQL with literals,
+parameters and ``IN`` lists normalized away). The same fingerprint running
+many times in one request is the signature of an N+1 loop.
+
+Budgets are enforced per view by ``core.middleware.QueryBudgetMiddleware``
+and around any other block (consumer message handlers, tests) with
+``query_budget``::
+
+    @query_budget('ws.apply_game_command')
+    def apply_game_command(...): ...
+
+    with query_budget(max_queries=12, max_duplicates=2, strict=True):
+        client.get(url)
+
+Limits come from ``QUERY_BUDGETS`` (``{label: max_queries}`` or
+``{label: {'queries': n, 'duplicates': m}}``), falling back to
+``QUERY_BUDGET_DEFAULT`` and ``QUERY_DUPLICATE_THRESHOLD``. Exceeding a
+budget logs a warning, or raises ``QueryBudgetExceeded`` when strict.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ContextDecorator
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+# Statements that legitimately repeat (transactions and savepoints)
+_CONTROL_STATEMENTS = ('SAVEPOINT', 'RELEASE', 'ROLLBACK', 'BEGIN', 'COMMIT')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block ran more queries, or more repeated queries, than its budget allows."""
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Normalize SQL so queries differing only in their values compare equal.
+
+    Args:
+        sql: SQL as passed to the cursor
+
+    Returns:
+        The SQL with literals and placeholders replaced by ``?`` and ``IN``
+        lists collapsed to ``IN (...)``
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook recording queries by fingerprint."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints: Counter = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            if not sql.lstrip().upper().startswith(_CONTROL_STATEMENTS):
+                self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """Fingerprints run at least ``threshold`` times, most repeated first."""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+
+def budgets_enabled() -> bool:
+    return getattr(settings, 'QUERY_BUDGETS_ENABLED', False)
+
+
+def budget_for(label: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Look up the configured budget for a view or handler.
+
+    Returns:
+        (max_queries, max_duplicates); None means unlimited
+    """
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(label)
+    max_queries = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+    max_duplicates = getattr(settings, 'QUERY_DUPLICATE_THRESHOLD', None)
+    if isinstance(budget, dict):
+        max_queries = budget.get('queries', max_queries)
+        max_duplicates = budget.get('duplicates', max_duplicates)
+    elif budget is not None:
+        max_queries = budget
+    return max_queries, max_duplicates
+
+
+def enforce_budget(label: str, recorder: QueryRecorder, max_queries: Optional[int] = None,
+                   max_duplicates: Optional[int] = None, strict: Optional[bool] = None) -> List[str]:
+    """
+    Check recorded queries against a budget.
+
+    Args:
+        label: View or handler name, used to look up the configured budget
+        recorder: Queries recorded for the block
+        max_queries: Override for the maximum number of queries
+        max_duplicates: Override for how many times one fingerprint may run
+        strict: Raise instead of logging; defaults to ``QUERY_BUDGETS_STRICT``
+
+    Returns:
+        Descriptions of the exceeded limits (empty when within budget)
+
+    Raises:
+        QueryBudgetExceeded: If strict and the budget was exceeded
+    """
+    configured_queries, configured_duplicates = budget_for(label)
+    max_queries = configured_queries if max_queries is None else max_queries
+    max_duplicates = configured_duplicates if max_duplicates is None else max_duplicates
+
+    violations = []
+    if max_queries is not None and recorder.count > max_queries:
+        violations.append(f'{recorder.count} queries (budget {max_queries})')
+    if max_duplicates is not None:
+        for sql, count in recorder.duplicates(max_duplicates + 1):
+            violations.append(f'{count}x (budget {max_duplicates}) {sql[:200]}')
+
+    if violations:
+        message = (
+            f'Query budget exceeded in {label} ({recorder.duration * 1000:.1f} ms in the database): '
+            + '; '.join(violations)
+        )
+        if strict is None:
+            strict = getattr(settings, 'QUERY_BUDGETS_STRICT', False)
+        if strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return violations
+
+
+class query_budget(ContextDecorator):
+    """
+    Record the queries of a block or function and enforce a budget on them.
+
+    Explicit limits and ``strict=True`` always apply; otherwise the block is
+    only instrumented when ``QUERY_BUDGETS_ENABLED`` is set. As a decorator
+    the label defaults to the function's qualified name.
+    """
+
+    def __init__(self, label: Optional[str] = None, max_queries: Optional[int] = None,
+                 max_duplicates: Optional[int] = None, strict: Optional[bool] = None):
+        self.label = label
+        self.max_queries = max_queries
+        self.max_duplicates = max_duplicates
+        self.strict = strict
+        self.recorder: Optional[QueryRecorder] = None
+        self._wrapper = None
+
+    def __call__(self, func):
+        if self.label is None:
+            self.label = func.__qualname__
+        return super().__call__(func)
+
+    def _recreate_cm(self):
+        # A fresh recorder per call keeps decorated functions thread-safe
+        return type(self)(self.label, self.max_queries, self.max_duplicates, self.strict)
+
+    @property
+    def explicit(self) -> bool:
+        return self.strict is True or self.max_queries is not None or self.max_duplicates is not None
+
+    def __enter__(self):
+        if not (self.explicit or budgets_enabled()):
+            return self
+        self.recorder = QueryRecorder()
+        self._wrapper = connection.execute_wrapper(self.recorder)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._wrapper is None:
+            return False
+        self._wrapper.__exit__(exc_type, exc, traceback)
+        self._wrapper = None
+        if exc_type is None:
+            enforce_budget(self.label or 'block', self.recorder, self.max_queries, self.max_duplicates, self.strict)
+        return False
+
+    @property
+    def count(self) -> int:
+        return self.recorder.count if self.recorder is not None else 0
+
+    def duplicates(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        return self.recorder.duplicates(threshold) if self.recorder is not None else []
+
@@ -0,0 +1,223 @@
+"""
+Slow-query capture with EXPLAIN plans.
+
+``SlowQueryLog`` is installed on every database connection as it is created
+(see ``CoreConfig.ready``), so it sees queries from views, consumers and
+management commands alike. Queries slower than ``SLOW_QUERY_THRESHOLD_MS``
+are appended to ``SLOW_QUERY_FILE`` as JSON lines with their fingerprint
+(``core.queries.fingerprint``), duration, database vendor and the project
+call site that issued them.
+
+With ``SLOW_QUERY_EXPLAIN`` set, the first slow occurrence of each
+fingerprint in a process is also explained on the same connection and with
+the same parameters: ``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` (without
+ANALYZE, so nothing is executed twice) on PostgreSQL.
+
+``summarize_slow_queries`` groups the file by fingerprint for the staff page
+(``core.views.SlowQueriesView``) and ``manage.py slow_queries``.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from .queries import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN accepts on both SQLite and PostgreSQL
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+# Frames from these paths are skipped when looking for the call site
+_FRAMEWORK_PATHS = ('site-packages', 'dist-packages', '/django/', '/asgiref/', '/channels/')
+
+_write_lock = threading.Lock()
+
+
+def slow_query_file() -> Path:
+    return Path(getattr(settings, 'SLOW_QUERY_FILE', Path(settings.BASE_DIR) / 'logs' / 'slow_queries.jsonl'))
+
+
+def call_site() -> Optional[str]:
+    """Innermost project frame that led to the current query, as ``path:line in function``."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        filename = frame.filename
+        if filename.startswith(base_dir) and not any(part in filename for part in _FRAMEWORK_PATHS) \
+                and not filename.endswith(('core/slow_queries.py', 'core/queries.py', 'core/middleware.py')):
+            return f'{Path(filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql: str, params) -> Optional[List[str]]:
+    """
+    Return the query plan for a statement, one line per row.
+
+    Args:
+        connection: Connection the statement ran on
+        sql: SQL with placeholders
+        params: Parameters the statement ran with
+
+    Returns:
+        Plan lines, or None if the statement cannot be explained here
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN '
+    else:
+        return None
+    if connection.needs_rollback:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    # SQLite rows are (id, parent, notused, detail); PostgreSQL rows are (line,)
+    return [str(row[-1]) for row in rows]
+
+
+class SlowQueryLog:
+    """``execute_wrapper`` hook writing slow queries (and their plans) to a JSONL file."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._explained = set()
+        self._local = threading.local()
+
+    @property
+    def threshold(self) -> float:
+        """Threshold in seconds."""
+        return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100) / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, 'explaining', False):
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        if duration >= self.threshold and getattr(settings, 'SLOW_QUERY_ENABLED', True):
+            try:
+                self.record(context['connection'], sql, params, many, duration)
+            except Exception as e:
+                logger.warning(f"Could not record slow query: {e}")
+        return result
+
+    def record(self, connection, sql: str, params, many: bool, duration: float) -> Dict[str, Any]:
+        """Append one slow query to the log, explaining it if its fingerprint is new."""
+        key = fingerprint(sql)
+        entry = {
+            'timestamp': time.time(),
+            'fingerprint': key,
+            'sql': sql[:2000],
+            'duration_ms': round(duration * 1000, 3),
+            'vendor': connection.vendor,
+            'alias': connection.alias,
+            'call_site': call_site(),
+        }
+
+        if getattr(settings, 'SLOW_QUERY_EXPLAIN', False) and not many:
+            with self._lock:
+                first = (connection.alias, key) not in self._explained
+                self._explained.add((connection.alias, key))
+            if first:
+                self._local.explaining = True
+                try:
+                    entry['plan'] = explain(connection, sql, params)
+                except Exception as e:
+                    entry['plan_error'] = str(e)
+                finally:
+                    self._local.explaining = False
+
+        line = json.dumps(entry, default=str) + '\n'
+        path = slow_query_file()
+        with _write_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open('a') as handle:
+                handle.write(line)
+        logger.info(f"Slow query ({entry['duration_ms']} ms) at {entry['call_site']}: {key[:200]}")
+        return entry
+
+    def reset(self) -> None:
+        """Forget which fingerprints were explained."""
+        with self._lock:
+            self._explained.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install(sender=None, connection=None, **kwargs) -> None:
+    """``connection_created`` receiver adding the slow query hook to a connection."""
+    # Connections are often opened inside a ``connection.execute_wrapper()``
+    # block (the request middleware's); its exit pops the last wrapper, so
+    # the hook goes under any wrappers already pushed
+    if slow_query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_log)
+
+
+def summarize_slow_queries(path: Optional[Path] = None, sort: str = 'total') -> List[Dict[str, Any]]:
+    """
+    Group logged slow queries by fingerprint.
+
+    Args:
+        path: Log to read (defaults to ``SLOW_QUERY_FILE``)
+        sort: 'total', 'max', 'count' or 'recent'
+
+    Returns:
+        One dict per fingerprint with count, total/p50/max milliseconds, the
+        vendors and call sites seen, and the latest plan
+    """
+    path = Path(path) if path else slow_query_file()
+    groups: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return []
+
+    with path.open() as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            group = groups.setdefault(entry['fingerprint'], {
+                'fingerprint': entry['fingerprint'],
+                'sql': entry['sql'],
+                'durations': [],
+                'call_sites': {},
+                'vendors': set(),
+                'plan': None,
+                'last_seen': 0,
+            })
+            group['durations'].append(entry['duration_ms'])
+            site = entry.get('call_site') or 'unknown'
+            group['call_sites'][site] = group['call_sites'].get(site, 0) + 1
+            group['vendors'].add(entry.get('vendor'))
+            group['last_seen'] = max(group['last_seen'], entry['timestamp'])
+            if entry.get('plan'):
+                group['plan'] = entry['plan']
+
+    summary = []
+    for group in groups.values():
+        durations = sorted(group.pop('durations'))
+        group.update(
+            count=len(durations),
+            total_ms=round(sum(durations), 3),
+            p50_ms=durations[max(0, math.ceil(0.5 * len(durations)) - 1)],
+            max_ms=durations[-1],
+            vendors=sorted(v for v in group['vendors'] if v),
+            call_sites=sorted(group['call_sites'].items(), key=lambda item: -item[1]),
+        )
+        summary.append(group)
+
+    sort_keys = {'total': 'total_ms', 'max': 'max_ms', 'count': 'count', 'recent': 'last_seen'}
+    summary.sort(key=lambda group: group[sort_keys.get(sort, 'total_ms')], reverse=True)
+    return summary
@@ -0,0 +1,246 @@
+"""
+Lightweight end-to-end tracing of moves.
+
+A trace is started where a move enters the server (``GameMoveView.post`` or a
+WebSocket game command) and follows it through the move service, the database
+commit, ``notify_game_event``, every rendered update and every channel-layer
+send. Stages are recorded as nested spans held in context variables, so no
+trace object has to be passed around; code running outside a trace pays for
+one context variable lookup.
+
+Whether a trace is recorded is decided once, when it starts, with probability
+``TRACE_SAMPLE_RATE``. Sampled traces are appended as one JSON line to
+``TRACE_FILE`` when they finish.
+
+The trace ID travels in the ``metadata`` of every WebSocket message sent
+while the trace is active, together with the send time. The consumer that
+delivers the message to the opponent's socket appends a ``delivery`` record
+for the same trace ID, measuring the channel-layer hop and the socket write.
+Delivery records may come from another process; ``manage.py analyze_traces``
+joins them back onto their trace.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('current_trace', default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar('current_span', default=None)
+
+_write_lock = threading.Lock()
+
+
+def sample_rate() -> float:
+    """Fraction of traces that are recorded."""
+    return getattr(settings, 'TRACE_SAMPLE_RATE', 0.0)
+
+
+def trace_file() -> Path:
+    """File sampled traces and delivery records are appended to."""
+    return Path(getattr(settings, 'TRACE_FILE', Path(settings.BASE_DIR) / 'logs' / 'traces.jsonl'))
+
+
+def _append(record: Dict[str, Any]) -> None:
+    path = trace_file()
+    line = json.dumps(record, default=str) + '\n'
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('a') as handle:
+            handle.write(line)
+
+
+class Trace:
+    """Spans recorded for one traced operation."""
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes: Dict[str, Any] = attributes
+        self.spans: List[Dict[str, Any]] = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.finished = False
+
+    def offset_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def add_span(self, name: str, parent: Optional[str], start_ms: float, duration_ms: float,
+                 attributes: Dict[str, Any]) -> None:
+        # Spans from work that outlives the trace (coalesced panel sends) are dropped
+        with self._lock:
+            if not self.finished:
+                self.spans.append({
+                    'name': name,
+                    'parent': parent,
+                    'start_ms': round(start_ms, 3),
+                    'duration_ms': round(duration_ms, 3),
+                    **({'attributes': attributes} if attributes else {})
+                })
+
+    def finish(self, error: Optional[str] = None) -> Dict[str, Any]:
+        duration_ms = self.offset_ms()
+        with self._lock:
+            self.finished = True
+            return {
+                'kind': 'trace',
+                'trace_id': self.trace_id,
+                'name': self.name,
+                'started_at': self.started_at,
+                'duration_ms': round(duration_ms, 3),
+                'attributes': self.attributes,
+                'spans': list(self.spans),
+                **({'error': error} if error else {})
+            }
+
+
+def current_trace() -> Optional[Trace]:
+    """The trace being recorded in this context, if any."""
+    return _current_trace.get()
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Optional[Trace]]:
+    """
+    Record a trace around the block, if it is sampled.
+
+    Nested calls join the trace that is already active instead of starting
+    another one.
+
+    Args:
+        name: Operation being traced ('move', ...)
+        **attributes: Values stored with the trace (game_id, transport, ...)
+
+    Yields:
+        The trace, or None when it was not sampled
+    """
+    if _current_trace.get() is not None:
+        yield _current_trace.get()
+        return
+
+    rate = sample_rate()
+    if rate <= 0 or random.random() >= rate:
+        yield None
+        return
+
+    trace = Trace(name, **attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    error = None
+    try:
+        yield trace
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _append(trace.finish(error))
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """Record the block as a stage of the active trace; a no-op outside one."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    start_ms = trace.offset_ms()
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        trace.add_span(name, parent, start_ms, trace.offset_ms() - start_ms, attributes)
+
+
+def annotate(**attributes) -> None:
+    """Add attributes to the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+def trace_metadata(metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Return WebSocket message metadata carrying the active trace ID.
+
+    Args:
+        metadata: Metadata of the outgoing message, left unchanged
+
+    Returns:
+        A copy with ``trace_id`` and ``trace_sent_at`` (epoch milliseconds)
+        added, or ``metadata`` itself outside a trace
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return metadata
+    return {**(metadata or {}), 'trace_id': trace.trace_id, 'trace_sent_at': time.time() * 1000}
+
+
+def record_delivery(metadata: Optional[Dict[str, Any]], event_type: str, user_id: Optional[int],
+                    write_ms: float) -> None:
+    """
+    Record that a traced WebSocket message reached a client socket.
+
+    Args:
+        metadata: Metadata of the delivered message; ignored without a trace ID
+        event_type: Type of the delivered message
+        user_id: Recipient
+        write_ms: Time spent writing the message to the socket
+    """
+    if not metadata or 'trace_id' not in metadata:
+        return
+    sent_at = metadata.get('trace_sent_at')
+    _append({
+        'kind': 'delivery',
+        'trace_id': metadata['trace_id'],
+        'event_type': event_type,
+        'user_id': user_id,
+        # Channel layer hop; assumes the sending and delivering hosts share a clock
+        'queue_ms': round(time.time() * 1000 - write_ms - sent_at, 3) if sent_at else None,
+        'write_ms': round(write_ms, 3),
+    })
+
+
+def load_traces(path: Path) -> List[Dict[str, Any]]:
+    """
+    Read a trace file, attaching delivery records to their traces.
+
+    Returns:
+        Trace records in file order, each with a ``deliveries`` list
+    """
+    traces: Dict[str, Dict[str, Any]] = {}
+    deliveries: Dict[str, List[Dict[str, Any]]] = {}
+    with Path(path).open() as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('kind') == 'delivery':
+                deliveries.setdefault(record['trace_id'], []).append(record)
+            elif record.get('kind') == 'trace':
+                traces[record['trace_id']] = record
+
+    for trace_id, record in traces.items():
+        record['deliveries'] = deliveries.get(trace_id, [])
+    return list(traces.values())
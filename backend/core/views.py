@@ -1 +1,47 @@
-# Core views module - currently no views needed
+"""
+Core views: operational endpoints.
+"""
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseForbidden
+from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from .metrics import registry
+from .slow_queries import summarize_slow_queries
+
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint.
+
+    Served to staff users and to clients in ``METRICS_ALLOWED_IPS`` (the
+    scraper), so latency data is not public.
+    """
+
+    def get(self, request):
+        allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+        if request.META.get('REMOTE_ADDR') not in allowed_ips and not request.user.is_staff:
+            return HttpResponseForbidden('Metrics are not available from this address')
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class SlowQueriesView(View):
+    """Staff page listing logged slow queries by fingerprint, with their plans."""
+
+    SORTS = ('total', 'max', 'count', 'recent')
+
+    def get(self, request):
+        sort = request.GET.get('sort', 'total')
+        if sort not in self.SORTS:
+            sort = 'total'
+        return render(request, 'core/slow_queries.html', {
+            'queries': summarize_slow_queries(sort=sort)[:100],
+            'sort': sort,
+            'sorts': self.SORTS,
+            'threshold_ms': getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100),
+            'explain_enabled': getattr(settings, 'SLOW_QUERY_EXPLAIN', False),
+        })
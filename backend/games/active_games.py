@@ -0,0 +1,228 @@
+"""
+In-process store for hot active games.
+
+Every request on an active game used to re-fetch the ``Game`` row, decode the
+whole ``board_state`` JSON and re-resolve both players and the ruleset. The
+active game store keeps that decoded state in memory between requests, keyed
+by ``(game_id, move_count)``. A lookup only costs a narrow query for the current
+``move_count`` and ``version``; when they match the stored entry, callers get a
+private copy of the decoded game without any JSON decoding or relationship
+loading.
+
+Entries are updated in place after a successful commit, evicted when a game
+finishes, when the row is saved outside the game services, or after an idle
+timeout.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .models import Game, GameStatus
+
+
+class ActiveGameEntry:
+    """Decoded state of one active game at a specific move count."""
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.key = (str(game.pk), game.move_count)
+        self.last_access = time.monotonic()
+        self._groups: Optional[List[Dict[str, Any]]] = None
+
+    def get_groups(self) -> List[Dict[str, Any]]:
+        """
+        Get the stone groups of a Go board, computed once per entry.
+
+        Returns:
+            List of dicts with 'color', 'stones' and 'liberties' for each group
+        """
+        if self._groups is None:
+            self._groups = compute_groups(self.game.board_state.get('board') or [])
+        return self._groups
+
+
+def compute_groups(board: List[List[Optional[str]]]) -> List[Dict[str, Any]]:
+    """Flood-fill a board into connected groups with their liberties."""
+    size = len(board)
+    seen = set()
+    groups = []
+
+    for row in range(size):
+        for col in range(size):
+            color = board[row][col]
+            if color is None or (row, col) in seen:
+                continue
+
+            stones = set()
+            liberties = set()
+            to_visit = [(row, col)]
+            while to_visit:
+                r, c = to_visit.pop()
+                if (r, c) in stones:
+                    continue
+                stones.add((r, c))
+                for dr, dc in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr < size and 0 <= nc < size:
+                        neighbour = board[nr][nc]
+                        if neighbour is None:
+                            liberties.add((nr, nc))
+                        elif neighbour == color and (nr, nc) not in stones:
+                            to_visit.append((nr, nc))
+
+            seen |= stones
+            groups.append({'color': color, 'stones': stones, 'liberties': liberties})
+
+    return groups
+
+
+def copy_game(game: Game) -> Game:
+    """
+    Copy a game so the caller can mutate it without touching the stored entry.
+
+    Players and ruleset are shared (read-only); the board and the mutable
+    parts of ``board_state`` are copied.
+    """
+    game_copy = copy.copy(game)
+    board_state = dict(game.board_state or {})
+    for key, value in board_state.items():
+        if key == 'board' and value:
+            board_state[key] = [list(row) for row in value]
+        elif isinstance(value, (dict, list)):
+            board_state[key] = copy.deepcopy(value)
+    game_copy.board_state = board_state
+    return game_copy
+
+
+class ActiveGameStore:
+    """Bounded in-process store of decoded active games."""
+
+    def __init__(self, max_entries: Optional[int] = None, idle_timeout: Optional[float] = None):
+        self._max_entries = max_entries
+        self._idle_timeout = idle_timeout
+        self._entries: 'OrderedDict[str, ActiveGameEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, 'ACTIVE_GAME_STORE_MAX_ENTRIES', 1000)
+
+    @property
+    def idle_timeout(self) -> float:
+        if self._idle_timeout is not None:
+            return self._idle_timeout
+        return getattr(settings, 'ACTIVE_GAME_STORE_IDLE_TIMEOUT', 900)
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'ACTIVE_GAME_STORE_ENABLED', True)
+
+    def load_game(self, game_id) -> Game:
+        """
+        Get a private copy of a game, served from memory when it is current.
+
+        Args:
+            game_id: Primary key of the game
+
+        Returns:
+            Game instance with players and ruleset already resolved
+
+        Raises:
+            Game.DoesNotExist: If no game with this id exists
+        """
+        if not self.enabled:
+            return self._fetch(game_id)
+
+        current = Game.objects.filter(pk=game_id).values_list('move_count', 'status', 'version').first()
+        if current is None:
+            raise Game.DoesNotExist(f"Game {game_id} does not exist")
+
+        move_count, status, version = current
+        entry = self._get_entry((str(game_id), move_count))
+        if entry is not None and status == GameStatus.ACTIVE and entry.game.version == version:
+            self.hits += 1
+            return copy_game(entry.game)
+
+        self.misses += 1
+        game = self._fetch(game_id)
+        self.put(game)
+        return game
+
+    def get_entry(self, game_id, move_count: int) -> Optional[ActiveGameEntry]:
+        """Get the stored entry for a game at a move count, if present."""
+        return self._get_entry((str(game_id), move_count))
+
+    def put(self, game: Game) -> None:
+        """
+        Store the committed state of a game.
+
+        Finished or abandoned games are evicted instead of stored.
+        """
+        if not self.enabled:
+            return
+        if game.status != GameStatus.ACTIVE or not game.board_state:
+            self.evict(game.pk)
+            return
+
+        entry = ActiveGameEntry(copy_game(game))
+        with self._lock:
+            self._entries[entry.key[0]] = entry
+            self._entries.move_to_end(entry.key[0])
+            self._sweep_locked()
+
+    def evict(self, game_id) -> None:
+        """Remove a game from the store."""
+        with self._lock:
+            self._entries.pop(str(game_id), None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored games."""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def _get_entry(self, key: Tuple[str, int]) -> Optional[ActiveGameEntry]:
+        with self._lock:
+            self._sweep_locked()
+            entry = self._entries.get(key[0])
+            if entry is None or entry.key != key:
+                return None
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(key[0])
+            return entry
+
+    def _sweep_locked(self) -> None:
+        """Drop idle entries (oldest first) and enforce the size bound."""
+        deadline = time.monotonic() - self.idle_timeout
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.last_access >= deadline and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _fetch(game_id) -> Game:
+        return Game.objects.select_related(
+            'black_player', 'white_player', 'winner'
+        ).prefetch_related('ruleset').get(pk=game_id)
+
+
+# Process-wide store used by the game services and web views
+active_game_store = ActiveGameStore()
+
+
+def evict_saved_game(sender, instance, **kwargs):
+    """post_save/post_delete receiver keeping the store coherent with direct saves."""
+    active_game_store.evict(instance.pk)
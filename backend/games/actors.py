@@ -0,0 +1,320 @@
+"""
+Per-game single-writer actors for move processing.
+
+With ``GAME_MOVE_ACTORS`` enabled, every active game gets one asyncio task and
+queue in this process. The actor owns the game's authoritative in-memory state
+and applies commands (moves, passes) strictly in arrival order, so requests for
+the same game never race each other and no row lock is taken.
+
+Persistence is write-behind with group commit: after applying the command at
+the head of the queue the actor drains whatever else is already queued (up to
+``GAME_ACTOR_BATCH_SIZE``), then writes the whole batch with a single
+``persist_moves`` call (one compare-and-swap on ``Game.version`` plus one bulk
+insert). Callers are answered once their batch is durable. If the commit
+conflicts (a write from another process, a resignation through the ORM) the
+actor reloads the game and replays the batch against fresh state.
+
+The actors run on a private event loop in a background thread, so both sync
+views (``submit_move``) and async consumers (``submit_move_async``) can use
+them. Database work runs in worker threads via ``database_sync_to_async``.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from core.exceptions import GameConflictError, GameError, InvalidMoveError
+from .active_games import active_game_store, copy_game
+from .board_cache import board_cache
+from .concurrency import persist_moves
+from .models import Game, GameMove, GameStatus
+
+logger = logging.getLogger(__name__)
+
+
+def actors_enabled() -> bool:
+    """Whether move processing is routed through the per-game actors."""
+    return getattr(settings, 'GAME_MOVE_ACTORS', False)
+
+
+class MoveCommand:
+    """A move or pass waiting in a game actor's queue."""
+
+    def __init__(self, kind: str, player_id: int, row: int = -1, col: int = -1):
+        self.kind = kind
+        self.player_id = player_id
+        self.row = row
+        self.col = col
+        self.future: Optional[asyncio.Future] = None
+
+    def apply(self, service, game: Game) -> GameMove:
+        """Apply the command to the in-memory game and return the unsaved move."""
+        if self.kind == 'pass':
+            apply_pass = getattr(service, 'apply_pass', None)
+            if apply_pass is None:
+                raise InvalidMoveError("Pass moves are only allowed in Go games")
+            return apply_pass(game, self.player_id)
+        return service.apply_move(game, self.player_id, self.row, self.col)
+
+
+class GameActor:
+    """Single writer for one game: a queue plus the task draining it."""
+
+    def __init__(self, runtime: 'ActorRuntime', game_id: str):
+        self.runtime = runtime
+        self.game_id = game_id
+        self.queue: 'asyncio.Queue[MoveCommand]' = asyncio.Queue()
+        self.game: Optional[Game] = None
+        self.task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.moves = 0
+
+    async def run(self) -> None:
+        idle_timeout = getattr(settings, 'GAME_ACTOR_IDLE_TIMEOUT', 300)
+        batch_size = max(1, getattr(settings, 'GAME_ACTOR_BATCH_SIZE', 32))
+
+        try:
+            while True:
+                try:
+                    command = await asyncio.wait_for(self.queue.get(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                batch = [command]
+                while len(batch) < batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+
+                await self.process(batch)
+
+                # Stopping involves no await, so nothing can be enqueued to a
+                # stopped actor; later commands start a fresh one
+                if self.game is not None and self.game.status != GameStatus.ACTIVE and self.queue.empty():
+                    break
+        except asyncio.CancelledError:
+            while not self.queue.empty():
+                command = self.queue.get_nowait()
+                if not command.future.done():
+                    command.future.set_exception(GameError("Move processing is shutting down"))
+            raise
+        finally:
+            self.runtime.remove(self)
+
+    async def process(self, batch: List[MoveCommand]) -> None:
+        try:
+            results = await database_sync_to_async(self.apply_batch, thread_sensitive=False)(batch)
+        except Exception as e:
+            # Unexpected failure: drop the in-memory state and any positions
+            # cached from it, and fail the whole batch
+            logger.error(f"Game actor {self.game_id} failed to process a batch: {e}")
+            if self.game is not None:
+                board_cache.invalidate_game(self.game)
+            self.game = None
+            results = [e] * len(batch)
+
+        for command, result in zip(batch, results):
+            if command.future.done():
+                continue
+            if isinstance(result, Exception):
+                command.future.set_exception(result)
+            else:
+                command.future.set_result(result)
+
+    def apply_batch(self, batch: List[MoveCommand]) -> List[Any]:
+        """Apply a batch to the owned game and commit it (runs in a worker thread)."""
+        max_attempts = max(1, getattr(settings, 'GAME_COMMIT_MAX_ATTEMPTS', 5))
+
+        for attempt in range(1, max_attempts + 1):
+            if self.game is None:
+                self.game = active_game_store.load_game(self.game_id)
+
+            game = self.game
+            results: List[Any] = []
+            moves: List[GameMove] = []
+            positions = []
+            service = game.get_service()
+
+            for command in batch:
+                # Make the position before this move available to history
+                # lookups (Go ko checks) although it is not persisted yet; it
+                # stays in this process until the batch commits
+                board = game.board_state.get('board') or []
+                board_cache.set_local(game, game.move_count, board)
+                positions.append((game.move_count, [list(row) for row in board]))
+                try:
+                    move = command.apply(service, game)
+                except GameError as e:
+                    results.append(e)
+                else:
+                    moves.append(move)
+                    results.append(move)
+
+            if not moves:
+                return results
+
+            try:
+                with transaction.atomic():
+                    persist_moves(game, moves)
+            except GameConflictError:
+                logger.debug(f"Game actor {self.game_id} lost a commit race (attempt {attempt}/{max_attempts})")
+                board_cache.invalidate_game(game)
+                self.game = None
+                continue
+
+            board_cache.set_many(game, positions)
+
+            # Callers get a snapshot; the owned game keeps changing
+            snapshot = copy_game(game)
+            for move in moves:
+                move.game = snapshot
+
+            self.batches += 1
+            self.moves += len(moves)
+            self.runtime.record_batch(len(moves))
+            return results
+
+        conflict = GameConflictError(
+            "The game changed while your move was being processed, please try again",
+            details={'game_id': self.game_id, 'attempts': max_attempts}
+        )
+        return [conflict] * len(batch)
+
+
+class ActorRuntime:
+    """Background event loop hosting the game actors of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._actors: Dict[str, GameActor] = {}
+        self._stats = {'batches': 0, 'moves': 0, 'max_batch': 0}
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run_loop, args=(self._loop, ready),
+                    name='game-actors', daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def submit(self, game_id, command: MoveCommand, timeout: Optional[float] = None) -> GameMove:
+        """Enqueue a command from synchronous code and wait for its result."""
+        future = asyncio.run_coroutine_threadsafe(self._enqueue(str(game_id), command), self.loop)
+        try:
+            return future.result(timeout or getattr(settings, 'GAME_ACTOR_SUBMIT_TIMEOUT', 10))
+        except concurrent.futures.TimeoutError:
+            raise GameConflictError(
+                "The move is taking too long to process, please refresh the game",
+                details={'game_id': str(game_id)}
+            )
+
+    async def submit_async(self, game_id, command: MoveCommand) -> GameMove:
+        """Enqueue a command from another event loop and await its result."""
+        future = asyncio.run_coroutine_threadsafe(self._enqueue(str(game_id), command), self.loop)
+        return await asyncio.wrap_future(future)
+
+    async def _enqueue(self, game_id: str, command: MoveCommand) -> GameMove:
+        command.future = asyncio.get_running_loop().create_future()
+        self.requeue(game_id, command)
+        return await command.future
+
+    def requeue(self, game_id: str, command: MoveCommand) -> None:
+        """Put a command on its game's queue, starting the actor if needed (loop thread only)."""
+        actor = self._actors.get(game_id)
+        if actor is None:
+            actor = GameActor(self, game_id)
+            self._actors[game_id] = actor
+            actor.task = asyncio.get_running_loop().create_task(actor.run())
+        actor.queue.put_nowait(command)
+
+    def remove(self, actor: GameActor) -> None:
+        if self._actors.get(actor.game_id) is actor:
+            del self._actors[actor.game_id]
+
+    def record_batch(self, size: int) -> None:
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['moves'] += size
+            self._stats['max_batch'] = max(self._stats['max_batch'], size)
+
+    def stats(self) -> Dict[str, int]:
+        """Return batch counters and the number of running actors."""
+        with self._lock:
+            return dict(self._stats, actors=len(self._actors))
+
+    def shutdown(self, timeout: float = 5) -> None:
+        """Stop every actor and the event loop thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+            self._stats = {'batches': 0, 'moves': 0, 'max_batch': 0}
+        if loop is None:
+            return
+
+        async def cancel_actors():
+            for actor in list(self._actors.values()):
+                actor.task.cancel()
+            await asyncio.gather(*(a.task for a in self._actors.values()), return_exceptions=True)
+            self._actors.clear()
+
+        asyncio.run_coroutine_threadsafe(cancel_actors(), loop).result(timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+
+
+# Process-wide runtime
+actor_runtime = ActorRuntime()
+
+
+def submit_move(game: Game, player_id: int, row: int, col: int) -> GameMove:
+    """
+    Make a move, through the game's actor when actors are enabled.
+
+    Args:
+        game: The game instance
+        player_id: ID of the player making the move
+        row: Row coordinate (0-based)
+        col: Column coordinate (0-based)
+
+    Returns:
+        The persisted GameMove; ``move.game`` is the updated game
+    """
+    if not actors_enabled():
+        return game.get_service().make_move(game, player_id, row, col)
+    return actor_runtime.submit(game.pk, MoveCommand('move', player_id, row, col))
+
+
+def submit_pass(game: Game, player_id: int) -> GameMove:
+    """Pass the turn in a Go game, through the game's actor when actors are enabled."""
+    if not actors_enabled():
+        return game.get_service().pass_turn(game, player_id)
+    return actor_runtime.submit(game.pk, MoveCommand('pass', player_id))
+
+
+async def submit_move_async(game_id, player_id: int, row: int, col: int) -> GameMove:
+    """Async variant of ``submit_move`` for consumers; requires actors to be enabled."""
+    return await actor_runtime.submit_async(game_id, MoveCommand('move', player_id, row, col))
+
+
+async def submit_pass_async(game_id, player_id: int) -> GameMove:
+    """Async variant of ``submit_pass`` for consumers; requires actors to be enabled."""
+    return await actor_runtime.submit_async(game_id, MoveCommand('pass', player_id))
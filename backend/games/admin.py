@@ -3,9 +3,10 @@ Django admin configuration for game models.
 """
 
 from django.contrib import admin
+from django.db.models import F
 from django.utils.html import format_html
 from .models import (
-    GomokuRuleSet, GoRuleSet, Game, GameMove, PlayerSession,
+    GomokuRuleSet, GoRuleSet, Game, GameMove, GameAnalysis, MoveAnnotation, PlayerSession,
     GameEvent, Challenge
 )
 
@@ -159,7 +160,8 @@ class GameAdmin(admin.ModelAdmin):
     
     def abandon_games(self, request, queryset):
         """Abandon selected active games."""
-        count = queryset.filter(status='ACTIVE').update(status='ABANDONED')
+        # Bump the version so an in-flight move commit cannot reactivate the game
+        count = queryset.filter(status='ACTIVE').update(status='ABANDONED', version=F('version') + 1)
         self.message_user(request, f"Abandoned {count} games.")
     abandon_games.short_description = "Abandon selected games"
 
@@ -187,6 +189,41 @@ class GameMoveAdmin(admin.ModelAdmin):
     position.short_description = 'Position'
 
 
+@admin.register(GameAnalysis)
+class GameAnalysisAdmin(admin.ModelAdmin):
+    """Admin interface for GameAnalysis model."""
+    
+    list_display = [
+        'game_short', 'forced_win_move', 'forced_win_player', 'forced_win_kind',
+        'positions_searched', 'unknown_positions', 'analyzed_at'
+    ]
+    list_filter = ['forced_win_kind', 'forced_win_player', 'analyzed_at']
+    search_fields = ['game__id']
+    readonly_fields = ['analyzed_at']
+    
+    def game_short(self, obj):
+        """Display shortened game UUID."""
+        return str(obj.game_id)[:8] + '...'
+    game_short.short_description = 'Game'
+
+
+@admin.register(MoveAnnotation)
+class MoveAnnotationAdmin(admin.ModelAdmin):
+    """Admin interface for MoveAnnotation model."""
+    
+    list_display = [
+        'game_short', 'move_number', 'player_color', 'row', 'col', 'threat',
+        'missed_win', 'missed_block', 'captures', 'liberties'
+    ]
+    list_filter = ['player_color', 'threat', 'missed_win', 'missed_block']
+    search_fields = ['game__id']
+    
+    def game_short(self, obj):
+        """Display shortened game UUID."""
+        return str(obj.game_id)[:8] + '...'
+    game_short.short_description = 'Game'
+
+
 @admin.register(PlayerSession)
 class PlayerSessionAdmin(admin.ModelAdmin):
     """Admin interface for PlayerSession model."""
@@ -0,0 +1,255 @@
+"""
+Forced-win analysis of Gomoku games.
+
+``analyze_game`` replays a finished game's moves through the threat-space
+solver (``games.gomoku_solver``) and stores the first move after which the
+side to move had a forced win in ``GameAnalysis``. ``analyze_position``
+solves a single position of a game, for the analysis endpoint, in the
+compute pool (``games.compute``).
+
+Moves are read with one ``values_list`` query and replayed on the solver's
+own board, never through the game services. ``manage.py
+analyze_forced_wins`` runs ``analyze_game`` over finished games in batches.
+
+With ``ANALYSIS_ON_FINISH`` set, a game that finishes is scanned by
+``analysis_scheduler`` instead: as background work in the compute pool, in
+``COMPUTE_SLICE_MS`` slices that give way to bot moves and validation, and
+stored from a thread of this process when the scan is done.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.db.models import QuerySet
+
+from core.exceptions import GameStateError
+from . import gomoku_solver
+from .compute import PRIORITY_BACKGROUND, PRIORITY_NORMAL, compute_pool, compute_timeout, compute_workers
+from .models import Game, GameAnalysis, GameMove, GameStatus, GameType, GomokuRuleSet, Player
+
+logger = logging.getLogger(__name__)
+
+
+def gomoku_games() -> QuerySet:
+    """Games played with a Gomoku ruleset."""
+    return Game.objects.filter(ruleset_content_type=ContentType.objects.get_for_model(GomokuRuleSet))
+
+
+def game_moves(game: Game, up_to: Optional[int] = None) -> List[Tuple[int, int, str]]:
+    """``(row, col, color)`` of a game's moves in order, up to move ``up_to``."""
+    moves = GameMove.objects.filter(game=game, row__gte=0).order_by('move_number')
+    if up_to is not None:
+        moves = moves.filter(move_number__lte=up_to)
+    return list(moves.values_list('row', 'col', 'player_color'))
+
+
+def _check_gomoku(game: Game) -> None:
+    if game.ruleset.game_type != GameType.GOMOKU:
+        raise GameStateError(
+            "Forced-win analysis is only available for Gomoku games",
+            details={'game_type': game.ruleset.game_type}
+        )
+
+
+def _check_finished(game: Game) -> None:
+    _check_gomoku(game)
+    if game.status != GameStatus.FINISHED:
+        raise GameStateError("Only finished games can be analysed", details={'status': game.status})
+
+
+def _scan_time_ms() -> float:
+    return getattr(settings, 'ANALYSIS_SCAN_TIME_MS', gomoku_solver.SCAN_TIME_BUDGET_MS)
+
+
+def _store(game_id, scan: gomoku_solver.ForcedWinScan) -> GameAnalysis:
+    result = scan.result
+    analysis, _ = GameAnalysis.objects.update_or_create(
+        game_id=game_id,
+        defaults={
+            'forced_win_move': scan.move_number,
+            'forced_win_player': result.color if result else '',
+            'forced_win_kind': result.kind if result else '',
+            'forced_win_sequence': result.to_dict()['sequence'] if result else [],
+            'positions_searched': scan.positions,
+            'unknown_positions': scan.unknown_positions,
+            'nodes': scan.nodes,
+            'elapsed_ms': round(scan.elapsed_ms, 2),
+        },
+    )
+    return analysis
+
+
+def analyze_position(game: Game, move_number: Optional[int] = None,
+                     time_budget_ms: Optional[float] = None) -> gomoku_solver.SolverResult:
+    """
+    Look for a forced win for the side to move after ``move_number``.
+
+    Args:
+        game: A Gomoku game
+        move_number: Moves played in the position (default: all of them)
+        time_budget_ms: Solver time (default: ``ANALYSIS_SOLVER_TIME_MS``)
+
+    Returns:
+        SolverResult for the side to move
+
+    Raises:
+        GameStateError: If the game is not a Gomoku game
+        ComputeError: If the compute pool could not run the search in time
+    """
+    _check_gomoku(game)
+    if time_budget_ms is None:
+        time_budget_ms = getattr(settings, 'ANALYSIS_SOLVER_TIME_MS', gomoku_solver.DEFAULT_TIME_BUDGET_MS)
+    moves = game_moves(game, move_number)
+    size = game.ruleset.board_size
+    color = Player.WHITE if moves and moves[-1][2] == Player.BLACK else Player.BLACK
+    return compute_pool.run(
+        'analyze', priority=PRIORITY_NORMAL, timeout=time_budget_ms / 1000 + compute_timeout(), game=str(game.pk),
+        board=gomoku_solver.board_from_moves(moves, size), size=size, color=color,
+        allow_overlines=game.ruleset.allow_overlines, time_budget_ms=time_budget_ms,
+    )
+
+
+def analyze_game(game: Game, time_budget_ms: Optional[float] = None,
+                 max_nodes: int = gomoku_solver.SCAN_MAX_NODES,
+                 max_depth: int = gomoku_solver.DEFAULT_MAX_DEPTH) -> GameAnalysis:
+    """
+    Find where a forced win first appeared in a finished game and store it.
+
+    Args:
+        game: A finished Gomoku game
+        time_budget_ms: Solver time per position (default: ``ANALYSIS_SCAN_TIME_MS``)
+        max_nodes: Solver nodes per position
+        max_depth: Most attacker moves in a winning line
+
+    Returns:
+        The saved GameAnalysis (created or replaced)
+
+    Raises:
+        GameStateError: If the game is not a finished Gomoku game
+    """
+    _check_finished(game)
+    if time_budget_ms is None:
+        time_budget_ms = _scan_time_ms()
+
+    scan = gomoku_solver.find_first_forced_win(
+        game_moves(game), game.ruleset.board_size, game.ruleset.allow_overlines,
+        max_depth=max_depth, max_nodes=max_nodes, time_budget_ms=time_budget_ms,
+    )
+    return _store(game.pk, scan)
+
+
+class AnalysisScheduler:
+    """Queues background forced-win scans of finished games and stores the results."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._storers: Optional[ThreadPoolExecutor] = None
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def game_committed(self, sender, instance: Game, **kwargs) -> None:
+        """
+        Queue a scan once a finished Gomoku game without an analysis commits.
+
+        Receiver for ``game_committed`` and ``post_save`` on ``Game``.
+        """
+        if not getattr(settings, 'ANALYSIS_ON_FINISH', True) or instance.status != GameStatus.FINISHED:
+            return
+        if instance.ruleset_content_type_id != ContentType.objects.get_for_model(GomokuRuleSet).id:
+            return
+        game_id = str(instance.pk)
+        with self._lock:
+            if game_id in self._pending:
+                return
+            self._pending.add(game_id)
+        transaction.on_commit(partial(self._schedule_new, game_id))
+
+    def _schedule_new(self, game_id: str) -> None:
+        try:
+            if GameAnalysis.objects.filter(game_id=game_id).exists():
+                self._done(game_id)
+                return
+            self.schedule(Game.objects.get(pk=game_id), pending=True)
+        except Exception as e:
+            logger.error(f"Could not queue analysis of game {game_id}: {e}")
+            self._done(game_id)
+
+    def schedule(self, game: Game, pending: bool = False) -> Future:
+        """
+        Scan a finished game in the background; the analysis is stored when done.
+
+        Args:
+            game: A finished Gomoku game
+            pending: The game is already marked pending by ``game_committed``
+
+        Returns:
+            The compute pool's future for the scan
+
+        Raises:
+            GameStateError: If the game is not a finished Gomoku game
+        """
+        _check_finished(game)
+        game_id = str(game.pk)
+        if not pending:
+            with self._lock:
+                self._pending.add(game_id)
+        future = compute_pool.submit(
+            'scan_game', PRIORITY_BACKGROUND, game=game_id,
+            moves=game_moves(game), size=game.ruleset.board_size,
+            allow_overlines=game.ruleset.allow_overlines, time_budget_ms=_scan_time_ms(),
+            slice_ms=getattr(settings, 'COMPUTE_SLICE_MS', 100),
+        )
+        future.add_done_callback(partial(self._scanned, game_id))
+        return future
+
+    def _scanned(self, game_id: str, future: Future) -> None:
+        if not compute_workers():
+            self._store(game_id, future)
+        else:
+            # Done callbacks run on the pool's thread; store from our own
+            self._get_storers().submit(self._store, game_id, future)
+
+    def _store(self, game_id: str, future: Future) -> None:
+        try:
+            scan = future.result()
+            if compute_workers():
+                close_old_connections()
+            _store(game_id, scan)
+            logger.info(f"Analysed game {game_id}: {scan.to_dict()} "
+                        f"(waited {future.wait_seconds * 1000:.0f}ms, {future.slices} slices)")
+        except Exception as e:
+            logger.error(f"Analysis of game {game_id} failed: {e}")
+        finally:
+            if compute_workers():
+                close_old_connections()
+            self._done(game_id)
+
+    def _done(self, game_id: str) -> None:
+        with self._lock:
+            self._pending.discard(game_id)
+
+    def _get_storers(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._storers is None:
+                self._storers = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analysis')
+            return self._storers
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the thread storing finished scans."""
+        with self._lock:
+            storers, self._storers = self._storers, None
+            self._pending.clear()
+        if storers is not None:
+            storers.shutdown(wait=wait)
+
+
+analysis_scheduler = AnalysisScheduler()
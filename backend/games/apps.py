@@ -4,3 +4,34 @@ from django.apps import AppConfig
 class GamesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'games'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.models.signals import post_delete, post_save
+        from .active_games import evict_saved_game
+        from .analysis import analysis_scheduler
+        from .board_cache import invalidate_deleted_game
+        from .bots import bot_scheduler, bot_users
+        from .concurrency import game_committed
+        from .models import Game
+
+        post_delete.connect(invalidate_deleted_game, sender=Game,
+                            dispatch_uid='games.board_cache.invalidate_deleted_game')
+        post_save.connect(evict_saved_game, sender=Game,
+                          dispatch_uid='games.active_games.evict_saved_game')
+        post_delete.connect(evict_saved_game, sender=Game,
+                            dispatch_uid='games.active_games.evict_deleted_game')
+
+        # Computer opponents (games.bots) reply once a bot's turn is committed
+        game_committed.connect(bot_scheduler.game_committed, sender=Game,
+                               dispatch_uid='games.bots.game_committed')
+        post_save.connect(bot_scheduler.game_committed, sender=Game,
+                          dispatch_uid='games.bots.game_saved')
+        post_save.connect(bot_users.user_saved, sender=settings.AUTH_USER_MODEL,
+                          dispatch_uid='games.bots.user_saved')
+
+        # Finished Gomoku games are analysed in the background (games.analysis)
+        game_committed.connect(analysis_scheduler.game_committed, sender=Game,
+                               dispatch_uid='games.analysis.game_committed')
+        post_save.connect(analysis_scheduler.game_committed, sender=Game,
+                          dispatch_uid='games.analysis.game_saved')
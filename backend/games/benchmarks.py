@@ -0,0 +1,439 @@
+"""
+Engine microbenchmarks replayed over a corpus of generated games.
+
+A corpus is a list of Gomoku and Go games (move sequences) generated from a
+seed on every standard board size, so two runs with the same seed and corpus
+size measure exactly the same work. Corpora can be saved to and loaded from
+JSON to pin them across engine changes.
+
+Each benchmark prepares its calls up front (for example one ``check_win``
+call per stone of every Gomoku game) and then times only the calls. Results
+are reported per operation and board size as calls per second, from the
+fastest of the timed rounds, plus the peak memory a single call allocates
+(measured with ``tracemalloc`` in a separate, untimed pass).
+
+The ``playout`` benchmark times the Go bot's random playouts
+(``games.go_ai.playout``) from a position a third of the way into each Go
+game, so playouts per second are tracked per board size like the engine
+calls.
+
+``manage.py benchmark_engine`` runs the suite; see its help for the JSON
+output and comparison options.
+"""
+
+import copy
+import json
+import random
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import go_ai
+from .models import Game, GameMove, GameStatus, GameType, GomokuRuleSet, GoRuleSet, Player
+
+BOARD_SIZES = (9, 13, 15, 19, 25)
+CORPUS_VERSION = 1
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+NEIGHBOURS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+Board = List[List[Optional[str]]]
+Move = Tuple[int, int, str]
+
+# Calls per operation measured individually for peak memory
+MEMORY_SAMPLE_CALLS = 50
+# Empty points checked by the is_ko_violation benchmark per game
+KO_SAMPLE_POINTS = 40
+# Go bot playouts per game in the playout benchmark
+PLAYOUTS_PER_GAME = 10
+
+
+class CorpusGame:
+    """A generated game and the board after each of its moves."""
+
+    def __init__(self, game_type: str, board_size: int, moves: List[Move]):
+        self.game_type = game_type
+        self.board_size = board_size
+        self.moves = moves
+        self.boards = replay(game_type, board_size, moves)
+
+    @property
+    def final_board(self) -> Board:
+        return self.boards[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'game_type': self.game_type, 'board_size': self.board_size, 'moves': [list(m) for m in self.moves]}
+
+
+def _empty_board(size: int) -> Board:
+    return [[None] * size for _ in range(size)]
+
+
+def _opponent(color: str) -> str:
+    return Player.WHITE.value if color == Player.BLACK.value else Player.BLACK.value
+
+
+def _group_and_liberties(board: Board, row: int, col: int):
+    size = len(board)
+    color = board[row][col]
+    group, liberties, stack = {(row, col)}, set(), [(row, col)]
+    while stack:
+        r, c = stack.pop()
+        for dr, dc in NEIGHBOURS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < size and 0 <= nc < size:
+                cell = board[nr][nc]
+                if cell is None:
+                    liberties.add((nr, nc))
+                elif cell == color and (nr, nc) not in group:
+                    group.add((nr, nc))
+                    stack.append((nr, nc))
+    return group, liberties
+
+
+def _place_go_stone(board: Board, row: int, col: int, color: str) -> bool:
+    """Play a Go move in place; returns False (board untouched) for suicide."""
+    size = len(board)
+    board[row][col] = color
+    captured = []
+    for dr, dc in NEIGHBOURS:
+        nr, nc = row + dr, col + dc
+        if 0 <= nr < size and 0 <= nc < size and board[nr][nc] == _opponent(color):
+            group, liberties = _group_and_liberties(board, nr, nc)
+            if not liberties:
+                captured.append(group)
+    for group in captured:
+        for r, c in group:
+            board[r][c] = None
+    if not captured and not _group_and_liberties(board, row, col)[1]:
+        board[row][col] = None
+        return False
+    return True
+
+
+def _five_in_row(board: Board, row: int, col: int) -> bool:
+    size, color = len(board), board[row][col]
+    for dr, dc in DIRECTIONS:
+        total = 1
+        for sign in (1, -1):
+            r, c = row + sign * dr, col + sign * dc
+            while 0 <= r < size and 0 <= c < size and board[r][c] == color:
+                total += 1
+                r += sign * dr
+                c += sign * dc
+        if total >= 5:
+            return True
+    return False
+
+
+def replay(game_type: str, board_size: int, moves: Sequence[Move]) -> List[Board]:
+    """Return the board after each move (index 0 is the empty board)."""
+    board = _empty_board(board_size)
+    boards = [copy.deepcopy(board)]
+    for row, col, color in moves:
+        if game_type == GameType.GO:
+            _place_go_stone(board, row, col, color)
+        else:
+            board[row][col] = color
+        boards.append(copy.deepcopy(board))
+    return boards
+
+
+def generate_gomoku_game(board_size: int, rng: random.Random) -> CorpusGame:
+    """Random game played mostly next to existing stones, until five in a row or half the board."""
+    board = _empty_board(board_size)
+    moves: List[Move] = []
+    color = Player.BLACK.value
+    center = board_size // 2
+    while len(moves) < board_size * board_size // 2:
+        if not moves:
+            row, col = center, center
+        else:
+            anchor_row, anchor_col, _ = rng.choice(moves[-6:])
+            row = min(board_size - 1, max(0, anchor_row + rng.randint(-2, 2)))
+            col = min(board_size - 1, max(0, anchor_col + rng.randint(-2, 2)))
+            if board[row][col] is not None:
+                empty = [(r, c) for r in range(board_size) for c in range(board_size) if board[r][c] is None]
+                row, col = rng.choice(empty)
+        board[row][col] = color
+        moves.append((row, col, color))
+        if _five_in_row(board, row, col):
+            break
+        color = _opponent(color)
+    return CorpusGame(GameType.GOMOKU, board_size, moves)
+
+
+def generate_go_game(board_size: int, rng: random.Random) -> CorpusGame:
+    """Random legal Go game (no suicide, no immediate repetition) filling about 60% of the board."""
+    board = _empty_board(board_size)
+    previous = None
+    moves: List[Move] = []
+    color = Player.BLACK.value
+    target = int(board_size * board_size * 0.6)
+    attempts = 0
+    while len(moves) < target and attempts < target * 20:
+        attempts += 1
+        row, col = rng.randrange(board_size), rng.randrange(board_size)
+        if board[row][col] is not None:
+            continue
+        candidate = copy.deepcopy(board)
+        if not _place_go_stone(candidate, row, col, color) or candidate == previous:
+            continue
+        previous, board = board, candidate
+        moves.append((row, col, color))
+        color = _opponent(color)
+    return CorpusGame(GameType.GO, board_size, moves)
+
+
+def build_corpus(sizes: Iterable[int] = BOARD_SIZES, games_per_size: int = 3, seed: int = 0) -> List[CorpusGame]:
+    """Generate ``games_per_size`` Gomoku and Go games on every board size."""
+    rng = random.Random(seed)
+    corpus = []
+    for size in sizes:
+        for _ in range(games_per_size):
+            corpus.append(generate_gomoku_game(size, rng))
+            corpus.append(generate_go_game(size, rng))
+    return corpus
+
+
+def save_corpus(corpus: List[CorpusGame], path: Path) -> None:
+    Path(path).write_text(json.dumps({'version': CORPUS_VERSION, 'games': [g.to_dict() for g in corpus]}))
+
+
+def load_corpus(path: Path) -> List[CorpusGame]:
+    data = json.loads(Path(path).read_text())
+    if data.get('version') != CORPUS_VERSION:
+        raise ValueError(f"Unsupported corpus version {data.get('version')}")
+    return [
+        CorpusGame(g['game_type'], g['board_size'], [tuple(m) for m in g['moves']])
+        for g in data['games']
+    ]
+
+
+class GameFixture:
+    """A corpus game saved as a Game with its moves, positioned after its last move."""
+
+    def __init__(self, corpus_game: CorpusGame, game: Game):
+        self.corpus_game = corpus_game
+        self.game = game
+        self.service = game.get_service()
+
+
+def create_fixtures(corpus: List[CorpusGame], black_player, white_player) -> List[GameFixture]:
+    """
+    Save every corpus game with its moves so DB-backed operations can run.
+
+    Meant to run inside a transaction that is rolled back afterwards.
+    """
+    rulesets = {}
+    fixtures = []
+    for corpus_game in corpus:
+        key = (corpus_game.game_type, corpus_game.board_size)
+        if key not in rulesets:
+            model = GoRuleSet if corpus_game.game_type == GameType.GO else GomokuRuleSet
+            rulesets[key] = model.objects.create(
+                name=f'Benchmark {corpus_game.game_type} {corpus_game.board_size}',
+                board_size=corpus_game.board_size
+            )
+
+        move_count = len(corpus_game.moves)
+        game = Game(
+            black_player=black_player,
+            white_player=white_player,
+            ruleset=rulesets[key],
+            status=GameStatus.ACTIVE,
+            move_count=move_count,
+            current_player=Player.WHITE if move_count % 2 else Player.BLACK,
+        )
+        game.initialize_board()
+        game.board_state['board'] = copy.deepcopy(corpus_game.final_board)
+        game.board_state['move_count'] = move_count
+        game.save()
+        GameMove.objects.bulk_create([
+            GameMove(
+                game=game,
+                player=black_player if color == Player.BLACK.value else white_player,
+                move_number=number,
+                row=row,
+                col=col,
+                player_color=color,
+            )
+            for number, (row, col, color) in enumerate(corpus_game.moves, start=1)
+        ])
+        fixtures.append(GameFixture(corpus_game, game))
+    return fixtures
+
+
+def _reconstruct_cold(service, game: Game, move_number: int):
+    from .board_cache import board_cache
+
+    board_cache.invalidate_game(game)
+    return service.reconstruct_board_state_at_move(game, move_number)
+
+
+def _empty_points(board: Board, limit: int, rng: random.Random) -> List[Tuple[int, int]]:
+    points = [(r, c) for r, row in enumerate(board) for c, cell in enumerate(row) if cell is None]
+    rng.shuffle(points)
+    return points[:limit]
+
+
+def _playout(board: go_ai.GoBoard, komi: float, seed: int) -> int:
+    return go_ai.playout(board.copy(), komi, random.Random(seed))
+
+
+def prepare_calls(operation: str, fixture: GameFixture) -> List[Callable[[], Any]]:
+    """
+    Build the calls one benchmark makes for one game.
+
+    Args:
+        operation: Name of the engine function (see ``OPERATIONS``)
+        fixture: Saved corpus game
+
+    Returns:
+        Zero-argument callables, timed together
+    """
+    corpus_game, game, service = fixture.corpus_game, fixture.game, fixture.service
+    size = corpus_game.board_size
+    final_board = game.board_state['board']
+    moves = corpus_game.moves
+
+    if operation == 'check_win':
+        return [partial(service.check_win, game, row, col) for row, col, _ in moves]
+    if operation == 'count_stones_in_direction':
+        return [
+            partial(service.count_stones_in_direction, final_board, size, row, col, direction, color)
+            for row, col, color in moves for direction in DIRECTIONS
+        ]
+    if operation == 'get_valid_moves':
+        return [partial(service.get_valid_moves, game)]
+    if operation == 'check_captures':
+        calls = []
+        for index, (row, col, color) in enumerate(moves):
+            placed = copy.deepcopy(corpus_game.boards[index])
+            placed[row][col] = color
+            calls.append(partial(service.check_captures, placed, row, col, color))
+        return calls
+    if operation == 'check_suicide_rule':
+        return [
+            partial(service.check_suicide_rule, corpus_game.boards[index], row, col, color)
+            for index, (row, col, color) in enumerate(moves)
+        ]
+    if operation == 'is_ko_violation':
+        rng = random.Random(len(moves))
+        return [
+            partial(service.is_ko_violation, game, row, col, game.current_player)
+            for row, col in _empty_points(final_board, KO_SAMPLE_POINTS, rng)
+        ]
+    if operation == 'reconstruct_board_state_at_move':
+        return [partial(_reconstruct_cold, service, game, len(moves))]
+    if operation == 'playout':
+        index = len(moves) // 3
+        color = Player.WHITE if index % 2 else Player.BLACK
+        start = go_ai.GoBoard.from_rows(corpus_game.boards[index], color)
+        # Seeded per call, so every round plays the same playouts
+        return [partial(_playout, start, game.ruleset.komi, seed) for seed in range(PLAYOUTS_PER_GAME)]
+    raise ValueError(f'Unknown operation {operation}')
+
+
+# Operations benchmarked for each game type
+OPERATIONS = {
+    GameType.GOMOKU: ('check_win', 'count_stones_in_direction', 'get_valid_moves'),
+    GameType.GO: (
+        'check_captures', 'check_suicide_rule', 'is_ko_violation',
+        'get_valid_moves', 'reconstruct_board_state_at_move', 'playout'
+    ),
+}
+
+
+def _time_calls(calls: List[Callable[[], Any]]) -> float:
+    start = time.perf_counter()
+    for call in calls:
+        call()
+    return time.perf_counter() - start
+
+
+def _peak_bytes_per_call(calls: List[Callable[[], Any]]) -> float:
+    sample = calls[:MEMORY_SAMPLE_CALLS]
+    peaks = []
+    tracemalloc.start()
+    try:
+        for call in sample:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) if peaks else 0.0
+
+
+def run_benchmarks(fixtures: List[GameFixture], repeat: int = 3, measure_memory: bool = True,
+                   operations: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Time every engine operation on every board size.
+
+    Args:
+        fixtures: Saved corpus games (see ``create_fixtures``)
+        repeat: Timed rounds per benchmark; the fastest is reported
+        measure_memory: Also measure the peak allocation of single calls
+        operations: Restrict the run to these operation names
+
+    Returns:
+        One result per (game type, operation, board size) with ``calls``,
+        ``ops_per_sec``, ``mean_us`` and ``peak_bytes_per_call``
+    """
+    selected = set(operations) if operations else None
+    groups: Dict[Tuple[str, str, int], List[Callable[[], Any]]] = {}
+    for fixture in fixtures:
+        game_type = fixture.corpus_game.game_type
+        for operation in OPERATIONS[game_type]:
+            if selected is not None and operation not in selected:
+                continue
+            key = (str(game_type), operation, fixture.corpus_game.board_size)
+            groups.setdefault(key, []).extend(prepare_calls(operation, fixture))
+
+    results = []
+    for (game_type, operation, board_size), calls in sorted(groups.items()):
+        if not calls:
+            continue
+        _time_calls(calls)  # Warm up caches and lazy lookups
+        best = min(_time_calls(calls) for _ in range(max(1, repeat)))
+        results.append({
+            'game_type': game_type,
+            'operation': operation,
+            'board_size': board_size,
+            'calls': len(calls),
+            'ops_per_sec': round(len(calls) / best, 1) if best > 0 else None,
+            'mean_us': round(best / len(calls) * 1e6, 3),
+            'peak_bytes_per_call': round(_peak_bytes_per_call(calls), 1) if measure_memory else None,
+        })
+    return results
+
+
+def result_key(result: Dict[str, Any]) -> Tuple[str, str, int]:
+    return result['game_type'], result['operation'], result['board_size']
+
+
+def compare_results(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compare two runs.
+
+    Returns:
+        One row per benchmark present in both runs with the ops/sec change in
+        percent (positive is faster)
+    """
+    previous = {result_key(result): result for result in baseline}
+    rows = []
+    for result in current:
+        before = previous.get(result_key(result))
+        if not before or not before.get('ops_per_sec') or not result.get('ops_per_sec'):
+            continue
+        rows.append({
+            **{key: result[key] for key in ('game_type', 'operation', 'board_size')},
+            'baseline_ops_per_sec': before['ops_per_sec'],
+            'ops_per_sec': result['ops_per_sec'],
+            'change_pct': round((result['ops_per_sec'] / before['ops_per_sec'] - 1) * 100, 1),
+        })
+    return rows
@@ -0,0 +1,191 @@
+"""
+Two-tier cache for reconstructed board states.
+
+Board positions reconstructed from move history never change once the move
+exists, so entries are keyed by game id and move number and are only served for
+move numbers up to the game's current ``move_count``. A bounded in-process LRU
+sits in front of a shared Django cache alias (Redis in multi-worker
+deployments) so that every worker can reuse reconstructions made by the others
+without the local tier growing without limit.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+Board = List[List[Optional[str]]]
+
+
+class BoardStateCache:
+    """
+    Board state cache with a bounded local LRU in front of a shared cache.
+
+    Boards are stored locally as tuples of tuples so cached entries cannot be
+    mutated by callers; every read hands out a fresh list-of-lists copy.
+    """
+
+    KEY_PREFIX = 'board'
+
+    def __init__(self, max_local_entries: Optional[int] = None,
+                 cache_alias: Optional[str] = None, timeout: Optional[int] = None):
+        self._max_local_entries = max_local_entries
+        self._cache_alias = cache_alias
+        self._timeout = timeout
+        self._local: 'OrderedDict[str, Tuple[Tuple[Optional[str], ...], ...]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    # Configuration is read lazily so settings overrides apply in tests
+
+    @property
+    def max_local_entries(self) -> int:
+        if self._max_local_entries is not None:
+            return self._max_local_entries
+        return getattr(settings, 'GAME_BOARD_CACHE_LOCAL_MAX_ENTRIES', 2048)
+
+    @property
+    def timeout(self) -> int:
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, 'GAME_BOARD_CACHE_TIMEOUT', 600)
+
+    @property
+    def shared(self):
+        """The shared (cross-process) cache backend."""
+        alias = self._cache_alias or getattr(settings, 'GAME_BOARD_CACHE_ALIAS', 'default')
+        if alias not in settings.CACHES:
+            alias = 'default'
+        return caches[alias]
+
+    def make_key(self, game_id, move_number: int) -> str:
+        """Build the cache key for a game's board at a given move number."""
+        return f"{self.KEY_PREFIX}:{game_id}:{move_number}"
+
+    def get(self, game, move_number: int) -> Optional[Board]:
+        """
+        Get the cached board for a game at a move number.
+
+        Checks the local LRU first and falls back to the shared cache, promoting
+        shared hits into the local tier.
+
+        Args:
+            game: The game instance (its ``move_count`` bounds valid entries)
+            move_number: Move number of the requested position (0 = empty board)
+
+        Returns:
+            A fresh copy of the board, or None on a miss
+        """
+        if move_number < 0 or move_number > game.move_count:
+            return None
+
+        key = self.make_key(game.id, move_number)
+        board = self._get_local(key)
+        if board is not None:
+            self.local_hits += 1
+            return board
+
+        board = self.shared.get(key)
+        if board is not None:
+            self.shared_hits += 1
+            self._set_local(key, board)
+            return [list(row) for row in board]
+
+        self.misses += 1
+        return None
+
+    def get_local(self, game, move_number: int) -> Optional[Board]:
+        """Get a board from the local tier only, without touching the shared cache."""
+        if move_number < 0 or move_number > game.move_count:
+            return None
+        board = self._get_local(self.make_key(game.id, move_number))
+        if board is not None:
+            self.local_hits += 1
+        return board
+
+    def set_local(self, game, move_number: int, board: Board) -> None:
+        """Store a board in the local tier only, e.g. a position not committed yet."""
+        if 0 <= move_number <= game.move_count:
+            self._set_local(self.make_key(game.id, move_number), board)
+
+    def set(self, game, move_number: int, board: Board) -> None:
+        """Store a board in both tiers."""
+        self.set_many(game, [(move_number, board)])
+
+    def set_many(self, game, boards: Iterable[Tuple[int, Board]]) -> None:
+        """
+        Store several positions of the same game in both tiers.
+
+        Args:
+            game: The game instance
+            boards: Iterable of (move_number, board) pairs
+        """
+        shared_entries = {}
+        for move_number, board in boards:
+            if move_number < 0 or move_number > game.move_count:
+                continue
+            key = self.make_key(game.id, move_number)
+            frozen = self._set_local(key, board)
+            shared_entries[key] = frozen
+
+        if shared_entries:
+            self.shared.set_many(shared_entries, timeout=self.timeout)
+
+    def invalidate_game(self, game) -> None:
+        """Drop every cached position for a game from both tiers."""
+        prefix = f"{self.KEY_PREFIX}:{game.id}:"
+        with self._lock:
+            for key in [k for k in self._local if k.startswith(prefix)]:
+                del self._local[key]
+
+        keys = [self.make_key(game.id, n) for n in range(game.move_count + 1)]
+        self.shared.delete_many(keys)
+
+    def clear_local(self) -> None:
+        """Empty the local tier (the shared cache is left untouched)."""
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current local tier size."""
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'local_entries': len(self._local),
+            'local_max_entries': self.max_local_entries,
+        }
+
+    def reset_stats(self) -> None:
+        """Reset hit/miss counters."""
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _get_local(self, key: str) -> Optional[Board]:
+        with self._lock:
+            frozen = self._local.get(key)
+            if frozen is None:
+                return None
+            self._local.move_to_end(key)
+        return [list(row) for row in frozen]
+
+    def _set_local(self, key: str, board) -> Tuple[Tuple[Optional[str], ...], ...]:
+        frozen = tuple(tuple(row) for row in board)
+        with self._lock:
+            self._local[key] = frozen
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+        return frozen
+
+
+# Process-wide instance used by the game services and notification service
+board_cache = BoardStateCache()
+
+
+def invalidate_deleted_game(sender, instance, **kwargs):
+    """post_delete receiver that drops cached positions of a deleted game."""
+    board_cache.invalidate_game(instance)
@@ -0,0 +1,285 @@
+"""
+Computer opponents.
+
+A bot is a ``User`` with ``is_bot`` set (``manage.py createbot``). Whenever a
+committed game is waiting for a bot's move, the bot's search is run and the
+move it picks is played through the game service like any other move, then
+announced to both players over WebSocket.
+
+The search is CPU-bound, so it runs in the compute pool (``games.compute``)
+and never on an ASGI worker or request thread. Searches are queued behind
+move validation and ahead of analysis, share the workers fairly between
+games, and must be played within ``BOT_MOVE_DEADLINE_MS`` of being queued:
+a search that waited gets a shorter time budget rather than arriving late.
+A game's searches go to the same worker when it is free, so the engines'
+per-process caches (the Gomoku transposition table, the Go search tree)
+carry over from one move of a game to the next. Only a copy of the board
+goes to the worker; the move is played from a small thread pool in this
+process once the search returns, and only if the game has not moved on in
+the meantime. If the move is rejected the engine's alternatives are tried
+in order, and a Go bot with nothing else left passes. With
+``COMPUTE_WORKERS = 0`` searches run inline after the commit, which is what
+the tests use.
+
+Searches are deduplicated per ``(game, move_count)``: a game saved twice in
+one turn does not start two searches.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+
+from core.exceptions import GameError, InvalidMoveError
+from .active_games import active_game_store
+from .compute import PRIORITY_BOT, compute_pool, compute_workers
+from .models import Game, GameStatus, GameType, Player
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Search entry point per game type, run in the worker processes
+ENGINES: Dict[str, str] = {
+    GameType.GOMOKU: 'games.gomoku_ai.choose_move',
+    GameType.GO: 'games.go_ai.choose_move',
+}
+
+# Seconds the set of bot user ids is cached in each process
+BOT_USER_CACHE_TIMEOUT = 60
+
+
+def bot_move_deadline() -> float:
+    """Seconds from queueing a bot search to playing its move."""
+    return getattr(settings, 'BOT_MOVE_DEADLINE_MS', 3000) / 1000
+
+
+class BotUserCache:
+    """Ids of bot users, refreshed every ``BOT_USER_CACHE_TIMEOUT`` seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Optional[Set[int]] = None
+        self._loaded_at = 0.0
+
+    def get(self) -> Set[int]:
+        with self._lock:
+            if self._ids is None or time.monotonic() - self._loaded_at > BOT_USER_CACHE_TIMEOUT:
+                self._ids = set(User.objects.filter(is_bot=True).values_list('id', flat=True))
+                self._loaded_at = time.monotonic()
+            return self._ids
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._ids = None
+
+    def user_saved(self, sender, instance, created=False, **kwargs) -> None:
+        """``post_save`` receiver for users: new users and bots refresh the ids."""
+        if created or instance.is_bot:
+            self.invalidate()
+
+
+bot_users = BotUserCache()
+
+
+def run_engine(engine: str, **snapshot):
+    """Run a search engine on a board snapshot (in a worker process)."""
+    module_name, function_name = engine.rsplit('.', 1)
+    module = __import__(module_name, fromlist=[function_name])
+    return getattr(module, function_name)(**snapshot)
+
+
+class BotMoveScheduler:
+    """Runs bot searches in the compute pool and plays their moves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Set[Tuple[str, int]] = set()
+        self._appliers: Optional[ThreadPoolExecutor] = None
+        self._inline = threading.local()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def game_committed(self, sender, instance: Game, **kwargs) -> None:
+        """
+        Schedule the bot's move if a committed game is waiting for one.
+
+        Receiver for ``game_committed`` and ``post_save`` on ``Game``. The
+        search is started once the surrounding transaction commits.
+        """
+        if instance.status != GameStatus.ACTIVE or not instance.board_state:
+            return
+        player_id = instance.black_player_id if instance.current_player == Player.BLACK else instance.white_player_id
+        if player_id not in bot_users.get():
+            return
+        game_type = instance.ruleset.game_type
+        if game_type not in ENGINES:
+            return
+
+        key = (str(instance.pk), instance.move_count)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        snapshot = self.snapshot(instance)
+        transaction.on_commit(partial(self.submit, key, player_id, ENGINES[game_type], snapshot))
+
+    @staticmethod
+    def snapshot(game: Game) -> Dict[str, Any]:
+        """The engine arguments for the position ``game`` is in."""
+        state = game.board_state
+        snapshot = {
+            'board': [list(row) for row in state['board']],
+            'size': game.ruleset.board_size,
+            'color': game.current_player,
+            'time_budget_ms': getattr(settings, 'BOT_MOVE_TIME_MS', 1000),
+        }
+        if game.ruleset.game_type == GameType.GOMOKU:
+            snapshot['allow_overlines'] = game.ruleset.allow_overlines
+        elif game.ruleset.game_type == GameType.GO:
+            snapshot.update(
+                komi=game.ruleset.komi,
+                ko_position=state.get('ko_position'),
+                last_move=state.get('last_move'),
+                consecutive_passes=state.get('consecutive_passes', 0),
+                playouts=getattr(settings, 'BOT_PLAYOUTS', 0),
+                game_id=str(game.pk),
+            )
+        return snapshot
+
+    def submit(self, key: Tuple[str, int], bot_id: int, engine: str, snapshot: Dict[str, Any]) -> None:
+        """Start a search, in the pool or inline."""
+        if not compute_workers():
+            self._run_inline(partial(self._search_and_apply, key, bot_id, engine, snapshot))
+            return
+        try:
+            future = compute_pool.submit(
+                'bot_move', PRIORITY_BOT, timeout=bot_move_deadline(), game=key[0],
+                budget_arg='time_budget_ms', engine=engine, **snapshot,
+            )
+        except Exception as e:
+            logger.error(f"Could not start bot search for game {key[0]}: {e}")
+            self._done(key)
+            return
+        future.add_done_callback(
+            lambda done: self._get_appliers().submit(self._apply_future, key, bot_id, done)
+        )
+
+    def _run_inline(self, job: Callable[[], None]) -> None:
+        # A bot move can commit another bot's turn; queue it instead of
+        # recursing through game_committed
+        queue = getattr(self._inline, 'queue', None)
+        if queue is not None:
+            queue.append(job)
+            return
+        self._inline.queue = queue = deque([job])
+        try:
+            while queue:
+                queue.popleft()()
+        finally:
+            self._inline.queue = None
+
+    def _search_and_apply(self, key, bot_id: int, engine: str, snapshot: Dict[str, Any]) -> None:
+        try:
+            result = run_engine(engine, **snapshot)
+        except Exception as e:
+            logger.error(f"Bot search failed for game {key[0]}: {e}")
+            self._done(key)
+            return
+        self.apply(key, bot_id, result)
+
+    def _apply_future(self, key, bot_id: int, future) -> None:
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Bot search failed for game {key[0]}: {e}")
+            self._done(key)
+            return
+        close_old_connections()
+        try:
+            self.apply(key, bot_id, result)
+        finally:
+            close_old_connections()
+
+    def apply(self, key: Tuple[str, int], bot_id: int, result) -> None:
+        """
+        Play a search result if the game is still where the search started.
+
+        The chosen move is tried first, then the result's ``alternatives``;
+        in Go a pass is the last resort. A row and col of -1 is a pass.
+        """
+        from web.services import WebSocketNotificationService
+
+        game_id, move_count = key
+        move = None
+        try:
+            game = active_game_store.load_game(game_id)
+            if game.status != GameStatus.ACTIVE or game.move_count != move_count:
+                logger.info(f"Dropping bot move for game {game_id}: the game moved on")
+                return
+            service = game.get_service()
+            candidates = [(result.row, result.col)] + list(getattr(result, 'alternatives', ()))
+            if game.ruleset.game_type == GameType.GO and (-1, -1) not in candidates:
+                candidates.append((-1, -1))
+            for row, col in candidates:
+                try:
+                    if (row, col) == (-1, -1):
+                        move = service.pass_turn(game, bot_id)
+                    else:
+                        move = service.make_move(game, bot_id, row, col)
+                    break
+                except InvalidMoveError as e:
+                    logger.warning(f"Bot move ({row}, {col}) rejected in game {game_id}: {e}")
+        except Game.DoesNotExist:
+            logger.info(f"Dropping bot move for game {game_id}: the game was deleted")
+            return
+        except GameError as e:
+            logger.warning(f"Bot move rejected in game {game_id}: {e}")
+            return
+        finally:
+            self._done(key)
+        if move is None:
+            return
+
+        logger.info(f"Bot {bot_id} played ({move.row}, {move.col}) in game {game_id}: {result.to_dict()}")
+        try:
+            WebSocketNotificationService.notify_game_event(
+                event_type='game_move_made',
+                game=move.game,
+                triggering_user=move.player,
+                request=None,
+            )
+        except Exception as e:
+            logger.error(f"WebSocket notification failed for bot move in game {game_id}: {e}")
+
+    def _done(self, key: Tuple[str, int]) -> None:
+        with self._lock:
+            self._pending.discard(key)
+
+    def _get_appliers(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._appliers is None:
+                self._appliers = ThreadPoolExecutor(max_workers=max(1, compute_workers()),
+                                                    thread_name_prefix='bot-moves')
+            return self._appliers
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the threads applying searched moves."""
+        with self._lock:
+            appliers, self._appliers = self._appliers, None
+            self._pending.clear()
+        if appliers is not None:
+            appliers.shutdown(wait=wait)
+
+
+bot_scheduler = BotMoveScheduler()
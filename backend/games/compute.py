@@ -0,0 +1,543 @@
+"""
+Engine worker pool and fair-share scheduler for CPU-bound game logic.
+
+Position analysis, bot searches and background game analysis are pure
+functions of a board that take up to seconds, so they run in
+``COMPUTE_WORKERS`` worker processes instead of on request threads and the
+``database_sync_to_async`` threads that also do the database work. The
+workers are the CPU budget every engine task shares.
+
+Go move validation (suicide and ko), legal-move generation and scoring are
+defined here too (``validate_go_move``, ``go_legal_moves``, ``go_score``) but
+the game services call them inline: they take well under a millisecond, and
+validation runs inside the move's transaction, where waiting for a worker
+would hold the database write lock. They remain registered tasks.
+
+Callers go through ``compute_pool``::
+
+    violation = compute_pool.run('validate', board=board, row=3, col=4, color='BLACK')
+
+Tasks are named in ``TASKS`` and take plain data (boards as nested lists)
+and return plain data, so nothing but the arguments and the result crosses
+the process boundary; the database reads stay with the caller. Workers are
+started with ``spawn``, set up Django once and import the engine modules
+before their first task.
+
+Scheduling. Tasks wait in this process and are handed to a worker only when
+one is free. The next task is picked by:
+
+1. priority (``PRIORITY_*``; validation before bot moves before analysis),
+2. urgency: a task whose deadline is closer than its own time budget,
+3. fair share: the game that used the least worker time recently (decaying
+   with a half-life of ``FAIR_SHARE_HALF_LIFE`` seconds), so one big game's
+   moves or analysis do not crowd out everyone else's,
+4. earliest deadline, then submission order.
+
+A task with a deadline (``timeout``) that has not started by then fails with
+``ComputeTimeout`` without running. A task with a time budget argument
+(``budget_arg``, e.g. a bot search's ``time_budget_ms``) is never dropped;
+its budget is cut to the time left before its deadline, so a bot move that
+waited still arrives on time. Tasks of a game go to the same worker when it
+is free, which keeps the engines' per-process caches warm.
+
+Ranking only orders the queue, so ``COMPUTE_INTERACTIVE_WORKERS`` (default
+1) more workers are kept for ``PRIORITY_INTERACTIVE`` tasks: they run there
+when every other worker is busy with searches or analysis, and nothing else
+ever does.
+
+A running task cannot be interrupted, so long background work is sliced: a
+task returning ``Resume`` is queued again with the arguments it returned
+and competes for a worker like a new task, which preempts it at the end of
+each slice for anything more urgent. The wait and run time of every job,
+over all its slices, are on its ``ComputeFuture`` and recorded in
+``core.metrics``, with the queue depth.
+
+With ``COMPUTE_WORKERS = 0`` tasks run inline in the calling thread, which
+is what the tests use.
+"""
+
+import importlib
+import itertools
+import logging
+import math
+import multiprocessing
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import django
+from django.conf import settings
+
+from core.metrics import COUNT_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+
+Board = List[List[Optional[str]]]
+
+# Task name -> function, run in the worker processes
+TASKS: Dict[str, str] = {
+    'validate': 'games.compute.validate_go_move',
+    'legal_moves': 'games.compute.go_legal_moves',
+    'score': 'games.compute.go_score',
+    'analyze': 'games.gomoku_solver.solve',
+    'scan_game': 'games.compute.scan_game',
+    'bot_move': 'games.bots.run_engine',
+}
+
+# Imported by each worker as it starts, so no task pays for the import
+PRELOAD_MODULES = ('games.game_services', 'games.go_ai', 'games.gomoku_ai', 'games.gomoku_solver', 'games.bots')
+
+# Task priorities; lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BOT = 2
+PRIORITY_NORMAL = 5
+PRIORITY_BACKGROUND = 10
+
+# Seconds over which a game's recent worker time halves
+FAIR_SHARE_HALF_LIFE = 10.0
+# Budgeted tasks keep this much of their deadline for returning the result,
+# and get at least MIN_BUDGET_MS however late they start
+DEADLINE_MARGIN_MS = 50
+MIN_BUDGET_MS = 50
+
+COMPUTE_QUEUE_DEPTH = registry.histogram(
+    'gomoku_compute_queue_depth', 'Engine tasks waiting for a compute worker when a task is queued.',
+    ('task',), buckets=COUNT_BUCKETS
+)
+COMPUTE_QUEUE_WAIT = registry.histogram(
+    'gomoku_compute_queue_wait_seconds', 'Time engine jobs waited for a compute worker, over all their slices.',
+    ('task',)
+)
+COMPUTE_RUN = registry.histogram(
+    'gomoku_compute_run_seconds', 'Engine job run time in compute workers, over all their slices.',
+    ('task', 'status')
+)
+
+
+class ComputeError(Exception):
+    """Raised when an engine task could not be run in the pool."""
+
+
+class ComputeTimeout(ComputeError):
+    """Raised when an engine task did not finish before its timeout."""
+
+
+def compute_workers() -> int:
+    """Worker processes running engine tasks (0 runs them inline)."""
+    return max(0, getattr(settings, 'COMPUTE_WORKERS', 2))
+
+
+def interactive_workers() -> int:
+    """Extra worker processes kept for ``PRIORITY_INTERACTIVE`` tasks (none when tasks run inline)."""
+    if not compute_workers():
+        return 0
+    return max(0, getattr(settings, 'COMPUTE_INTERACTIVE_WORKERS', 1))
+
+
+def compute_timeout() -> float:
+    """Default seconds a caller waits for an engine task."""
+    return getattr(settings, 'COMPUTE_TIMEOUT_MS', 2000) / 1000
+
+
+class Resume:
+    """Returned by a sliced task: run me again later with these arguments changed."""
+
+    __slots__ = ('kwargs',)
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+def validate_go_move(board: Board, row: int, col: int, color: str,
+                     previous_board: Optional[Board] = None) -> Optional[str]:
+    """
+    Check a Go move on an empty point against the suicide and ko rules.
+
+    Args:
+        board: Current board (not modified)
+        row: Row coordinate (0-based)
+        col: Column coordinate (0-based)
+        color: Colour of the stone played
+        previous_board: Board before the opponent's last move, for ko
+
+    Returns:
+        'suicide', 'ko', or None if the move is legal
+    """
+    from .game_services import GoGameService
+
+    service = GoGameService()
+    if service.check_suicide_rule(board, row, col, color):
+        return 'suicide'
+    if previous_board is not None:
+        after = [list(line) for line in board]
+        after[row][col] = color
+        captures = service.check_captures(after, row, col, color)
+        if captures['total_captured'] > 0:
+            service.remove_captured_stones(after, captures['captured_groups'])
+        if service.boards_equal(after, previous_board):
+            return 'ko'
+    return None
+
+
+def go_legal_moves(board: Board, color: str, previous_board: Optional[Board] = None) -> List[Tuple[int, int]]:
+    """Empty points ``color`` may play on (passing is always legal and not listed)."""
+    return [
+        (row, col)
+        for row, line in enumerate(board)
+        for col, stone in enumerate(line)
+        if stone is None and validate_go_move(board, row, col, color, previous_board) is None
+    ]
+
+
+def go_score(board: Board, komi: float) -> float:
+    """Area score of a Go position: Black's points less White's and komi (positive: Black leads)."""
+    from .go_ai import GoBoard
+
+    return GoBoard.from_rows(board, 'BLACK').score(komi)
+
+
+def scan_game(moves: List[Tuple[int, int, str]], size: int, slice_ms: Optional[float] = None, **options):
+    """
+    Look for a game's first forced win, ``slice_ms`` of positions at a time.
+
+    Returns:
+        The finished ``ForcedWinScan``, or ``Resume`` with the scan so far
+    """
+    from .gomoku_solver import find_first_forced_win
+
+    scan = find_first_forced_win(moves, size, slice_ms=slice_ms, **options)
+    if not scan.complete:
+        return Resume(scan=scan)
+    return scan
+
+
+@lru_cache(maxsize=None)
+def resolve(function: str) -> Callable[..., Any]:
+    """The function at a dotted path."""
+    module_name, function_name = function.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def execute(function: str, kwargs: Dict[str, Any]) -> Tuple[Any, float]:
+    """Run a task function (in a worker process) and return its result and run time in seconds."""
+    start = time.perf_counter()
+    result = resolve(function)(**kwargs)
+    return result, time.perf_counter() - start
+
+
+def _start_worker() -> None:
+    django.setup()
+    for module_name in PRELOAD_MODULES:
+        importlib.import_module(module_name)
+
+
+class ComputeFuture(Future):
+    """Future of an engine job, with the job's wait and run times once it is done."""
+
+    def __init__(self):
+        super().__init__()
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.slices = 0
+
+
+class ComputeJob:
+    """A queued task and the future its caller waits on."""
+
+    __slots__ = ('task', 'kwargs', 'priority', 'game', 'deadline', 'budget_arg', 'budget_ms', 'order',
+                 'generation', 'queued_at', 'future')
+
+    def __init__(self, task: str, kwargs: Dict[str, Any], priority: int, game: Optional[str],
+                 deadline: Optional[float], budget_arg: Optional[str], order: int, generation: int):
+        self.task = task
+        self.kwargs = kwargs
+        self.priority = priority
+        self.game = game
+        self.deadline = deadline
+        self.budget_arg = budget_arg
+        self.budget_ms = kwargs[budget_arg] if budget_arg else 0
+        self.order = order
+        self.generation = generation
+        self.queued_at = time.monotonic()
+        self.future = ComputeFuture()
+
+
+class ComputePool:
+    """Schedules engine tasks on the worker processes by priority, deadline and fair share."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: List[ComputeJob] = []
+        self._order = itertools.count()
+        self._workers: List[Optional[ProcessPoolExecutor]] = []
+        self._busy: Set[int] = set()
+        # {game: (recent worker seconds, when last charged)}
+        self._usage: Dict[str, Tuple[float, float]] = {}
+        self._counts = {'completed': 0, 'failed': 0, 'timed_out': 0, 'late': 0}
+        # Bumped by shutdown, so slices of jobs from before it are not queued again
+        self._generation = 0
+
+    def submit(self, task: str, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None,
+               game: Optional[str] = None, budget_arg: Optional[str] = None, **kwargs) -> ComputeFuture:
+        """
+        Queue a task.
+
+        Args:
+            task: Name in ``TASKS``
+            priority: Lower runs first
+            timeout: Seconds from now the task must be done by
+            game: Game the work is for, for fair sharing and worker affinity
+            budget_arg: Argument holding the task's time budget in ms, cut
+                to the time left when it starts late instead of dropping it
+            **kwargs: The task's arguments (plain data)
+
+        Returns:
+            ComputeFuture with the task's result
+
+        Raises:
+            ValueError: If the task is unknown
+        """
+        if task not in TASKS:
+            raise ValueError(f"Unknown compute task: {task}")
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        job = ComputeJob(task, kwargs, priority, game, deadline, budget_arg, next(self._order), self._generation)
+
+        if not compute_workers():
+            self._run_inline(job)
+            return job.future
+
+        with self._lock:
+            COMPUTE_QUEUE_DEPTH.observe(len(self._queue), task=task)
+            self._queue.append(job)
+        self._dispatch()
+        return job.future
+
+    def run(self, task: str, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None,
+            inline_fallback: bool = False, **kwargs) -> Any:
+        """
+        Run a task and wait for its result.
+
+        Args:
+            task: Name in ``TASKS``
+            priority: Lower runs first
+            timeout: Seconds to wait (default: ``COMPUTE_TIMEOUT_MS``)
+            inline_fallback: Run the task in this thread if the pool fails or
+                times out, for callers that must have an answer
+            **kwargs: The task's arguments, and ``game`` / ``budget_arg`` as for ``submit``
+
+        Returns:
+            The task's result
+
+        Raises:
+            ComputeTimeout: If the task did not finish in time
+            ComputeError: If the worker process died
+        """
+        if timeout is None:
+            timeout = compute_timeout()
+        future = self.submit(task, priority, timeout, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                with self._lock:
+                    self._counts['timed_out'] += 1
+            error: ComputeError = ComputeTimeout(f"Compute task {task} did not finish in {timeout:.1f}s")
+        except ComputeError as e:
+            error = e
+        if not inline_fallback:
+            raise error
+        logger.warning(f"{error}; running it inline")
+        kwargs.pop('game', None)
+        kwargs.pop('budget_arg', None)
+        return execute(TASKS[task], kwargs)[0]
+
+    def usage(self, game: str) -> float:
+        """Worker seconds ``game`` used recently, decayed by ``FAIR_SHARE_HALF_LIFE``."""
+        with self._lock:
+            return self._decayed_usage(game, time.monotonic())
+
+    def stats(self) -> Dict[str, int]:
+        """Workers, queued and running tasks, and jobs finished so far by outcome."""
+        with self._lock:
+            return dict(self._counts, workers=compute_workers(), interactive_workers=interactive_workers(),
+                        queued=len(self._queue), running=len(self._busy))
+
+    def _run_inline(self, job: ComputeJob) -> None:
+        future = job.future
+        future.set_running_or_notify_cancel()
+        try:
+            while True:
+                result, seconds = execute(TASKS[job.task], job.kwargs)
+                future.run_seconds += seconds
+                future.slices += 1
+                if not isinstance(result, Resume):
+                    break
+                job.kwargs.update(result.kwargs)
+        except Exception as e:
+            self._failed(job, e)
+        else:
+            self._completed(job, result)
+
+    def _decayed_usage(self, game: Optional[str], now: float) -> float:
+        if game is None or game not in self._usage:
+            return 0.0
+        seconds, charged_at = self._usage[game]
+        return seconds * 0.5 ** ((now - charged_at) / FAIR_SHARE_HALF_LIFE)
+
+    def _charge(self, game: Optional[str], seconds: float, now: float) -> None:
+        if game is None:
+            return
+        self._usage[game] = (self._decayed_usage(game, now) + seconds, now)
+        if len(self._usage) > 1000:
+            # Forget games whose share has decayed to nothing
+            for stale in [key for key in self._usage if self._decayed_usage(key, now) < 1e-3]:
+                del self._usage[stale]
+
+    def _rank(self, job: ComputeJob, now: float):
+        deadline = job.deadline if job.deadline is not None else math.inf
+        urgent = deadline - now <= (job.budget_ms + DEADLINE_MARGIN_MS) / 1000
+        return job.priority, not urgent, self._decayed_usage(job.game, now), deadline, job.order
+
+    def _dispatch(self) -> None:
+        # Hand queued tasks to free workers; tasks wait here rather than in
+        # the executors, so the ranking decides what runs next. Workers past
+        # COMPUTE_WORKERS only take interactive tasks, so those never wait
+        # for a running search
+        started = []
+        with self._lock:
+            now = time.monotonic()
+            shared = compute_workers()
+            while self._queue:
+                idle = [index for index in range(shared) if index not in self._busy]
+                reserved = [index for index in range(shared, shared + interactive_workers())
+                            if index not in self._busy]
+                candidates = self._queue
+                if not idle:
+                    candidates = [queued for queued in self._queue if queued.priority <= PRIORITY_INTERACTIVE]
+                    if not reserved or not candidates:
+                        break
+                job = min(candidates, key=lambda queued: self._rank(queued, now))
+                self._queue.remove(job)
+                if not job.future.slices and not job.future.set_running_or_notify_cancel():
+                    continue
+                if job.deadline is not None and now > job.deadline and job.budget_arg is None:
+                    self._counts['timed_out'] += 1
+                    job.future.set_exception(ComputeTimeout(f"Compute task {job.task} missed its deadline"))
+                    continue
+                if job.budget_arg is not None and job.deadline is not None:
+                    left_ms = (job.deadline - now) * 1000 - DEADLINE_MARGIN_MS
+                    job.kwargs[job.budget_arg] = max(MIN_BUDGET_MS, min(job.budget_ms, left_ms))
+                job.future.wait_seconds += now - job.queued_at
+
+                home = zlib.crc32(job.game.encode()) % shared if job.game else None
+                worker = home if home in idle else (idle or reserved)[0]
+                self._busy.add(worker)
+                started.append((worker, job))
+        for worker, job in started:
+            try:
+                done = self._get_worker(worker).submit(execute, TASKS[job.task], job.kwargs)
+            except Exception as e:
+                logger.error(f"Could not start compute task {job.task}: {e}")
+                self._reset_worker(worker)
+                self._finished(worker, job, None, ComputeError(str(e)))
+                continue
+            done.add_done_callback(lambda done, worker=worker, job=job: self._finished(worker, job, done))
+
+    def _finished(self, worker: int, job: ComputeJob, done: Optional[Future],
+                  error: Optional[BaseException] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._busy.discard(worker)
+        if done is not None:
+            try:
+                result, seconds = done.result()
+            except BrokenProcessPool as e:
+                logger.error(f"Compute worker died running {job.task}: {e}")
+                self._reset_worker(worker)
+                error = ComputeError(f"Compute worker died running {job.task}")
+            except Exception as e:
+                error = e
+            else:
+                job.future.run_seconds += seconds
+                job.future.slices += 1
+                with self._lock:
+                    self._charge(job.game, seconds, now)
+                    resumed = isinstance(result, Resume) and job.generation == self._generation
+                    if resumed:
+                        # Back in the queue; anything ranked higher goes first
+                        job.kwargs.update(result.kwargs)
+                        job.queued_at = now
+                        self._queue.append(job)
+                if isinstance(result, Resume) and not resumed:
+                    error = ComputeError("The compute pool was shut down")
+                elif not resumed:
+                    self._completed(job, result)
+        if error is not None:
+            self._failed(job, error)
+        self._dispatch()
+
+    def _completed(self, job: ComputeJob, result: Any) -> None:
+        future = job.future
+        late = job.deadline is not None and time.monotonic() > job.deadline
+        COMPUTE_QUEUE_WAIT.observe(future.wait_seconds, task=job.task)
+        COMPUTE_RUN.observe(future.run_seconds, task=job.task, status='late' if late else 'ok')
+        with self._lock:
+            self._counts['completed'] += 1
+            if late:
+                self._counts['late'] += 1
+        logger.debug(f"Compute job {job.task} for game {job.game}: waited {future.wait_seconds * 1000:.1f}ms, "
+                     f"ran {future.run_seconds * 1000:.1f}ms in {future.slices} slices")
+        future.set_result(result)
+
+    def _failed(self, job: ComputeJob, error: BaseException) -> None:
+        COMPUTE_QUEUE_WAIT.observe(job.future.wait_seconds, task=job.task)
+        COMPUTE_RUN.observe(job.future.run_seconds, task=job.task, status='error')
+        with self._lock:
+            self._counts['failed'] += 1
+        job.future.set_exception(error)
+
+    def _get_worker(self, index: int) -> ProcessPoolExecutor:
+        # One single-process executor per worker, so tasks can be placed on
+        # a particular worker
+        with self._lock:
+            if len(self._workers) <= index:
+                self._workers.extend([None] * (index + 1 - len(self._workers)))
+            if self._workers[index] is None:
+                # spawn, not fork: the parent may be a threaded ASGI server
+                self._workers[index] = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_start_worker,
+                )
+            return self._workers[index]
+
+    def _reset_worker(self, index: int) -> None:
+        with self._lock:
+            worker = self._workers[index] if index < len(self._workers) else None
+            if worker is not None:
+                self._workers[index] = None
+        if worker is not None:
+            worker.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Drop queued tasks and stop the worker processes."""
+        with self._lock:
+            queued, self._queue = self._queue, []
+            workers, self._workers = self._workers, []
+            self._busy.clear()
+            self._usage.clear()
+            self._generation += 1
+        for job in queued:
+            if not job.future.cancel():
+                job.future.set_exception(ComputeError("The compute pool was shut down"))
+        for worker in workers:
+            if worker is not None:
+                worker.shutdown(wait=wait, cancel_futures=True)
+
+
+compute_pool = ComputePool()
@@ -0,0 +1,149 @@
+"""
+Optimistic concurrency for game state commits.
+
+Move processing no longer holds a row lock (``select_for_update`` is a no-op on
+SQLite and holds the lock across validation on PostgreSQL). Instead every write
+is a compare-and-swap on ``Game.version``::
+
+    UPDATE games SET ..., version = v + 1 WHERE id = ? AND version = v
+
+If another writer committed first the update matches no rows, the attempt is
+rolled back and the whole operation is retried against fresh state, up to
+``GAME_COMMIT_MAX_ATTEMPTS`` times.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.exceptions import GameConflictError
+from core.tracing import annotate, span
+from .active_games import active_game_store
+from .models import Game, GameMove, GameStatus
+
+logger = logging.getLogger(__name__)
+
+# Fields written by a move commit (``version`` and ``updated_at`` are always set)
+GAME_STATE_FIELDS = ('board_state', 'move_count', 'current_player', 'status', 'winner', 'finished_at')
+
+
+class CommitStats:
+    """Process-wide counters for optimistic commits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def reset(self) -> None:
+        self.counts = {'commits': 0, 'conflicts': 0, 'failures': 0}
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+commit_stats = CommitStats()
+
+# Sent with ``instance=game`` after a commit made by ``persist_moves``. Moves are
+# written with a queryset update, so ``post_save`` is not sent for them.
+game_committed = Signal()
+
+
+def commit_game_state(game: Game, fields: Iterable[str] = GAME_STATE_FIELDS) -> None:
+    """
+    Write a game's state if nobody else has committed since it was loaded.
+
+    Args:
+        game: Game instance whose ``version`` is the version it was loaded at
+        fields: Model fields to write
+
+    Raises:
+        GameConflictError: If the stored version no longer matches
+    """
+    expected_version = game.version
+    now = timezone.now()
+    values = {name: getattr(game, name) for name in fields}
+
+    updated = Game.objects.filter(pk=game.pk, version=expected_version).update(
+        version=expected_version + 1, updated_at=now, **values
+    )
+    if not updated:
+        commit_stats.record('conflicts')
+        raise GameConflictError(
+            "Game was modified concurrently",
+            details={'game_id': str(game.pk), 'expected_version': expected_version}
+        )
+
+    game.version = expected_version + 1
+    game.updated_at = now
+    commit_stats.record('commits')
+
+
+def persist_moves(game: Game, moves: List[GameMove]) -> None:
+    """
+    Commit a game's state together with the moves that produced it.
+
+    Must run inside a transaction. The game row is written with
+    ``commit_game_state`` first, so a conflict aborts before any move row is
+    inserted. Player statistics are updated if the game finished, and the
+    active game store is refreshed once the transaction commits.
+
+    Args:
+        game: Game after the moves were applied in memory
+        moves: Unsaved GameMove instances, in move order
+
+    Raises:
+        GameConflictError: If the game was modified concurrently
+    """
+    with span('db.commit', moves=len(moves)):
+        commit_game_state(game)
+        GameMove.objects.bulk_create(moves)
+        if game.status != GameStatus.ACTIVE:
+            game.update_player_stats()
+    transaction.on_commit(lambda: active_game_store.put(game))
+    game_committed.send(sender=Game, instance=game)
+
+
+def run_optimistic(game_id, operation: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a load-validate-commit operation, retrying when it loses a race.
+
+    Each attempt runs in its own atomic block (a savepoint when nested), so a
+    conflicting attempt leaves nothing behind. The operation must reload the
+    game itself on every call.
+
+    Args:
+        game_id: Primary key of the game, passed as the first argument to ``operation``
+        operation: Callable performing one attempt and calling ``commit_game_state``
+        *args, **kwargs: Extra arguments for ``operation``
+
+    Returns:
+        Whatever the successful attempt returned
+
+    Raises:
+        GameConflictError: If every attempt conflicted
+    """
+    max_attempts = max(1, getattr(settings, 'GAME_COMMIT_MAX_ATTEMPTS', 5))
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with transaction.atomic():
+                return operation(game_id, *args, **kwargs)
+        except GameConflictError:
+            annotate(commit_conflicts=attempt)
+            logger.debug(f"Commit conflict on game {game_id} (attempt {attempt}/{max_attempts})")
+
+    commit_stats.record('failures')
+    raise GameConflictError(
+        "The game changed while your move was being processed, please try again",
+        details={'game_id': str(game_id), 'attempts': max_attempts}
+    )
@@ -6,7 +6,6 @@ Uses the interface and registry system for better extensibility.
 """
 
 from typing import List, Tuple, Optional, Set, Dict
-from django.db import transaction
 import copy
 
 from core.exceptions import InvalidMoveError, GameStateError, PlayerError
@@ -14,6 +13,61 @@ from .models import Game, GameMove, GameStatus, Player
 from .interfaces import BaseGameService, GameServiceRegistry
 from .validators import MoveValidatorFactory
 from .state_managers import StateManagerFactory
+from .board_cache import board_cache
+from .compute import go_legal_moves, go_score
+from .active_games import active_game_store
+from .concurrency import GAME_STATE_FIELDS, persist_moves, run_optimistic
+
+
+def commit_resignation(game: Game, player_id: int) -> None:
+    """
+    Resign a game through the optimistic commit path.
+
+    The resignation is checked against freshly loaded state and written with
+    the ``Game.version`` compare-and-swap, so it never overwrites a move
+    committed concurrently. ``game`` is updated to the committed state.
+
+    Args:
+        game: The game (updated in place)
+        player_id: ID of the resigning player
+
+    Raises:
+        GameStateError: If the game is not active
+        PlayerError: If the user is not a player in this game
+    """
+    finished = run_optimistic(game.pk, _resign, player_id)
+    for field in GAME_STATE_FIELDS + ('version', 'updated_at'):
+        setattr(game, field, getattr(finished, field))
+
+
+def _resign(game_id, player_id: int) -> Game:
+    """Single optimistic attempt at a resignation."""
+    game = active_game_store.load_game(game_id)
+    if game.status != GameStatus.ACTIVE:
+        raise GameStateError(
+            f"Can only resign from active games, current status: {game.status}",
+            details={'current_status': game.status, 'game_id': str(game.id)}
+        )
+    
+    # Determine winner (the other player)
+    if player_id == game.black_player_id:
+        winner = game.white_player
+    elif player_id == game.white_player_id:
+        winner = game.black_player
+    else:
+        raise PlayerError(
+            "You are not a player in this game",
+            details={
+                'player_id': player_id,
+                'black_player_id': game.black_player_id,
+                'white_player_id': game.white_player_id,
+                'game_id': str(game.id)
+            }
+        )
+    
+    game.mark_finished(winner=winner)
+    persist_moves(game, [])
+    return game
 
 
 class GomokuGameService(BaseGameService):
@@ -24,12 +78,32 @@ class GomokuGameService(BaseGameService):
         validator = MoveValidatorFactory.get_validator('GOMOKU')
         validator.validate_move(game, player_id, row, col)
     
-    @transaction.atomic
     def make_move(self, game: Game, player_id: int, row: int, col: int) -> GameMove:
-        """Make a move in a Gomoku game."""
-        # Refresh game from database with lock to prevent race conditions
-        game = Game.objects.select_for_update().get(pk=game.pk)
+        """Make a move in a Gomoku game, retrying if another move commits first."""
+        return run_optimistic(game.pk, self._make_move, player_id, row, col)
+    
+    def _make_move(self, game_id, player_id: int, row: int, col: int) -> GameMove:
+        """Single optimistic attempt at a Gomoku move."""
+        # Decoded state is reused from the active game store when it is still
+        # current; the version it was loaded at guards the commit
+        game = active_game_store.load_game(game_id)
+        move = self.apply_move(game, player_id, row, col)
+        persist_moves(game, [move])
+        return move
+    
+    def apply_move(self, game: Game, player_id: int, row: int, col: int) -> GameMove:
+        """
+        Validate a Gomoku move and apply it to the in-memory game.
         
+        Args:
+            game: The game instance (mutated, not saved)
+            player_id: ID of the player making the move
+            row: Row coordinate (0-based)
+            col: Column coordinate (0-based)
+            
+        Returns:
+            The unsaved GameMove; persist it with games.concurrency.persist_moves
+        """
         # Validate the move
         self.validate_move(game, player_id, row, col)
         
@@ -44,29 +118,25 @@ class GomokuGameService(BaseGameService):
         # Update board state using the modular state manager
         state_manager = StateManagerFactory.get_manager('GOMOKU')
         state_manager.update_board_state(game, row, col, player_color)
-        
-        # Create the move
         game.move_count += 1
-        move = GameMove.objects.create(
-            game=game,
-            player=player,
-            move_number=game.move_count,
-            row=row,
-            col=col,
-            player_color=player_color
-        )
         
         # Check for win
-        if self.check_win(game, row, col):
-            move.is_winning_move = True
-            move.save()
-            game.finish_game(winner=player)
+        is_winning_move = self.check_win(game, row, col)
+        if is_winning_move:
+            game.mark_finished(winner=player)
         else:
             # Switch turns
             game.current_player = Player.WHITE if game.current_player == Player.BLACK else Player.BLACK
-            game.save()
         
-        return move
+        return GameMove(
+            game=game,
+            player=player,
+            move_number=game.move_count,
+            row=row,
+            col=col,
+            player_color=player_color,
+            is_winning_move=is_winning_move
+        )
     
     def check_win(self, game: Game, last_row: int, last_col: int) -> bool:
         """Check for Gomoku win condition (5 in a row)."""
@@ -199,30 +269,8 @@ class GomokuGameService(BaseGameService):
         return valid_moves
     
     def resign_game(self, game: Game, player_id: int) -> None:
-        """Handle Gomoku game resignation."""
-        if game.status != GameStatus.ACTIVE:
-            raise GameStateError(
-                f"Can only resign from active games, current status: {game.status}",
-                details={'current_status': game.status, 'game_id': str(game.id)}
-            )
-        
-        # Determine winner (the other player)
-        if player_id == game.black_player_id:
-            winner = game.white_player
-        elif player_id == game.white_player_id:
-            winner = game.black_player
-        else:
-            raise PlayerError(
-                "You are not a player in this game",
-                details={
-                    'player_id': player_id,
-                    'black_player_id': game.black_player_id,
-                    'white_player_id': game.white_player_id,
-                    'game_id': str(game.id)
-                }
-            )
-        
-        game.finish_game(winner=winner)
+        """Handle Gomoku game resignation, retrying if a move commits first."""
+        commit_resignation(game, player_id)
 
 
 class GoGameService(BaseGameService):
@@ -233,12 +281,32 @@ class GoGameService(BaseGameService):
         validator = MoveValidatorFactory.get_validator('GO')
         validator.validate_move(game, player_id, row, col)
     
-    @transaction.atomic
     def make_move(self, game: Game, player_id: int, row: int, col: int) -> GameMove:
-        """Make a move in a Go game."""
-        # Refresh game from database with lock to prevent race conditions
-        game = Game.objects.select_for_update().get(pk=game.pk)
+        """Make a move in a Go game, retrying if another move commits first."""
+        return run_optimistic(game.pk, self._make_move, player_id, row, col)
+    
+    def _make_move(self, game_id, player_id: int, row: int, col: int) -> GameMove:
+        """Single optimistic attempt at a Go move."""
+        # Decoded state is reused from the active game store when it is still
+        # current; the version it was loaded at guards the commit
+        game = active_game_store.load_game(game_id)
+        move = self.apply_move(game, player_id, row, col)
+        persist_moves(game, [move])
+        return move
+    
+    def apply_move(self, game: Game, player_id: int, row: int, col: int) -> GameMove:
+        """
+        Validate a Go move and apply it, with captures, to the in-memory game.
         
+        Args:
+            game: The game instance (mutated, not saved)
+            player_id: ID of the player making the move
+            row: Row coordinate (0-based), -1 for a pass
+            col: Column coordinate (0-based), -1 for a pass
+            
+        Returns:
+            The unsaved GameMove; persist it with games.concurrency.persist_moves
+        """
         # Validate the move
         self.validate_move(game, player_id, row, col)
         
@@ -324,9 +392,13 @@ class GoGameService(BaseGameService):
         if ko_position:
             game.board_state['ko_position'] = ko_position
         
-        # Create the move
+        # Go games don't end immediately on move placement (unlike Gomoku)
+        # They end when both players pass consecutively or resign
+        # Switch turns
         game.move_count += 1
-        move = GameMove.objects.create(
+        game.current_player = Player.WHITE if game.current_player == Player.BLACK else Player.BLACK
+        
+        return GameMove(
             game=game,
             player=player,
             move_number=game.move_count,
@@ -334,16 +406,6 @@ class GoGameService(BaseGameService):
             col=col,
             player_color=player_color
         )
-        
-        # Go games don't end immediately on move placement (unlike Gomoku)
-        # They end when both players pass consecutively or resign
-        # Switch turns
-        game.current_player = Player.WHITE if game.current_player == Player.BLACK else Player.BLACK
-        
-        # Save the game with updated board state
-        game.save()
-        
-        return move
     
     def check_win(self, game: Game, last_row: int, last_col: int) -> bool:
         """Check for Go win condition (territory scoring)."""
@@ -363,65 +425,59 @@ class GoGameService(BaseGameService):
             game.initialize_board()
             board = game.board_state['board']
         
-        valid_moves = []
-        board_size = game.ruleset.board_size
-        
         # Get current player color for validation
         if game.current_player == Player.BLACK:
             player_color = Player.BLACK
         else:
             player_color = Player.WHITE
         
-        for row in range(board_size):
-            for col in range(board_size):
-                # Position must be empty
-                if board[row][col] is not None:
-                    continue
-                    
-                # Check for Ko violation using new board history system
-                if self.is_ko_violation(game, row, col, player_color):
-                    continue
-                
-                # Check for suicide rule violation
-                if self.check_suicide_rule(board, row, col, player_color):
-                    continue
-                
-                valid_moves.append((row, col))
+        # Suicide and ko checks run inline on the engine board (one pass over
+        # the empty points, cheaper than queueing behind engine work); the
+        # board before the opponent's last move (for ko) is read once here
+        previous_board = self.get_board_state_moves_back(game, 1) if game.move_count >= 1 else None
+        valid_moves = go_legal_moves(board, player_color, previous_board)
         
         # Always add pass move as valid
         valid_moves.append((-1, -1))
         
         return valid_moves
     
-    def resign_game(self, game: Game, player_id: int) -> None:
-        """Handle Go game resignation."""
-        if game.status != GameStatus.ACTIVE:
-            raise GameStateError(
-                f"Can only resign from active games, current status: {game.status}",
-                details={'current_status': game.status, 'game_id': str(game.id)}
-            )
+    def score(self, game: Game) -> float:
+        """
+        Area score of the current position.
         
-        # Determine winner (the other player)
-        if player_id == game.black_player_id:
-            winner = game.white_player
-        elif player_id == game.white_player_id:
-            winner = game.black_player
-        else:
-            raise PlayerError(
-                "You are not a player in this game",
-                details={
-                    'player_id': player_id,
-                    'black_player_id': game.black_player_id,
-                    'white_player_id': game.white_player_id,
-                    'game_id': str(game.id)
-                }
-            )
+        Computed inline rather than in the compute pool: it takes well under
+        a millisecond, so queueing it behind a bot search or analysis would
+        only add latency.
         
-        game.finish_game(winner=winner)
+        Returns:
+            Black's stones and surrounded points less White's and komi;
+            positive when Black leads
+        """
+        return go_score(game.board_state['board'], game.ruleset.komi)
+    
+    def resign_game(self, game: Game, player_id: int) -> None:
+        """Handle Go game resignation, retrying if a move commits first."""
+        commit_resignation(game, player_id)
     
-    @transaction.atomic
     def pass_turn(self, game: Game, player_id: int) -> GameMove:
-        """Handle a pass move in Go."""
+        """Handle a pass move in Go, retrying if another move commits first."""
+        return run_optimistic(game.pk, self._pass_turn, player_id)
+    
+    def _pass_turn(self, game_id, player_id: int) -> GameMove:
+        """Single optimistic attempt at a pass."""
+        game = active_game_store.load_game(game_id)
+        move = self.apply_pass(game, player_id)
+        persist_moves(game, [move])
+        return move
+    
+    def apply_pass(self, game: Game, player_id: int) -> GameMove:
+        """
+        Validate a pass and apply it to the in-memory game.
+        
+        Returns:
+            The unsaved pass GameMove (row and col are -1)
+        """
         # Validate it's the correct player's turn
         if game.current_player == Player.BLACK:
             expected_player_id = game.black_player_id
@@ -451,28 +507,26 @@ class GoGameService(BaseGameService):
         consecutive_passes = game.board_state.get('consecutive_passes', 0) + 1
         game.board_state['consecutive_passes'] = consecutive_passes
         
-        # Create pass move (using -1, -1 to indicate pass)
         game.move_count += 1
-        move = GameMove.objects.create(
-            game=game,
-            player=player,
-            move_number=game.move_count,
-            row=-1,  # Special value for pass
-            col=-1,  # Special value for pass
-            player_color=player_color
-        )
         
         # Check if game ends (both players passed)
         if consecutive_passes >= 2:
             # TODO: Calculate territory score to determine winner
             # For now, just end the game without a winner (draw)
-            game.finish_game(winner=None)  # This will be a draw
+            game.mark_finished(winner=None)  # This will be a draw
         else:
             # Switch turns
             game.current_player = Player.WHITE if game.current_player == Player.BLACK else Player.BLACK
-            game.save()
         
-        return move
+        # Pass move (using -1, -1 to indicate pass)
+        return GameMove(
+            game=game,
+            player=player,
+            move_number=game.move_count,
+            row=-1,  # Special value for pass
+            col=-1,  # Special value for pass
+            player_color=player_color
+        )
     
     def find_group(self, board: List[List], row: int, col: int) -> Set[Tuple[int, int]]:
         """Find all stones connected to the stone at (row, col) using flood-fill."""
@@ -622,66 +676,76 @@ class GoGameService(BaseGameService):
     
     def reconstruct_board_state_at_move(self, game: Game, target_move_number: int) -> Optional[List[List]]:
         """
-        Recursively reconstruct board state at a specific move number.
+        Reconstruct board state at a specific move number.
         Uses formula: state at move n = state at move n-1 + move n
-        
+
+        Positions are read from and written to the two-tier board cache. On a
+        miss, replay starts from the nearest position in the local cache tier
+        (or the empty board) and the missing moves are loaded in a single query.
+
         Args:
             game: The game instance
             target_move_number: Move number to reconstruct board state for (0 = empty board)
-        
+
         Returns:
             Board state at the specified move, or None if invalid move number
         """
-        from django.core.cache import cache
-        from django.conf import settings
-        
         # Validate target move number
         if target_move_number < 0 or target_move_number > game.move_count:
             return None
-        
+
         # Check cache first
-        cache_key = f"game_{game.id}_move_{target_move_number}"
-        cached_board = cache.get(cache_key)
+        cached_board = board_cache.get(game, target_move_number)
         if cached_board is not None:
             return cached_board
-        
+
+        # Find the closest earlier position already held locally
+        start_move_number = target_move_number - 1
+        board = None
+        while start_move_number >= 0:
+            board = board_cache.get_local(game, start_move_number)
+            if board is not None:
+                break
+            start_move_number -= 1
+
         # Base case: move 0 is empty board
-        if target_move_number == 0:
+        if board is None:
             board_size = game.ruleset.board_size
             board = [[None for _ in range(board_size)] for _ in range(board_size)]
-            cache.set(cache_key, copy.deepcopy(board), 
-                     timeout=getattr(settings, 'GAME_BOARD_CACHE_TIMEOUT', 600))
-            return board
-        
-        # Recursive case: get board at move n-1, then apply move n
-        previous_board = self.reconstruct_board_state_at_move(game, target_move_number - 1)
-        if previous_board is None:
-            return None
-        
-        # Copy the previous board state
-        board = copy.deepcopy(previous_board)
-        
-        # Get the move at target_move_number
-        try:
-            current_move = game.moves.get(move_number=target_move_number)
-        except game.moves.model.DoesNotExist:
+            start_move_number = 0
+
+        reconstructed = [(start_move_number, copy.deepcopy(board))]
+        moves = game.moves.filter(
+            move_number__gt=start_move_number,
+            move_number__lte=target_move_number
+        ).order_by('move_number').values_list('move_number', 'row', 'col', 'player_color')
+
+        expected_move_number = start_move_number + 1
+        for move_number, row, col, player_color in moves:
+            if move_number != expected_move_number:
+                # Gap in move history - cannot reconstruct reliably
+                return None
+
+            # Apply the move to the board
+            # Skip pass moves (row=-1, col=-1)
+            if row != -1 and col != -1:
+                # Place stone on board
+                board[row][col] = player_color
+
+                # Apply captures that would have occurred
+                capture_result = self.check_captures(board, row, col, player_color)
+                if capture_result['total_captured'] > 0:
+                    self.remove_captured_stones(board, capture_result['captured_groups'])
+
+            reconstructed.append((move_number, copy.deepcopy(board)))
+            expected_move_number += 1
+
+        if expected_move_number != target_move_number + 1:
             return None
-        
-        # Apply the current move to the board
-        # Skip pass moves (row=-1, col=-1)
-        if current_move.row != -1 and current_move.col != -1:
-            # Place stone on board
-            board[current_move.row][current_move.col] = current_move.player_color
-            
-            # Apply captures that would have occurred
-            capture_result = self.check_captures(board, current_move.row, current_move.col, current_move.player_color)
-            if capture_result['total_captured'] > 0:
-                self.remove_captured_stones(board, capture_result['captured_groups'])
-        
-        # Cache the reconstructed board state
-        cache.set(cache_key, copy.deepcopy(board), 
-                 timeout=getattr(settings, 'GAME_BOARD_CACHE_TIMEOUT', 600))
-        
+
+        # Cache every reconstructed position
+        board_cache.set_many(game, reconstructed)
+
         return board
     
     def get_board_state_moves_back(self, game: Game, moves_back: int) -> Optional[List[List]]:
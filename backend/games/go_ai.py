@@ -0,0 +1,580 @@
+"""
+Go computer opponent: Monte Carlo tree search with light playouts.
+
+Like ``games.gomoku_ai`` the search works on a copy of the board, without the
+database, so it can run in a bot worker process (see ``games.bots``).
+
+The board is a flat list with a one-point border around it (``GoBoard``), so
+neighbours are fixed offsets and no bounds checks are needed. Playouts play
+until neither side has a move left, with a light policy: capture a group the
+opponent's last move left in atari if there is one, otherwise play a random
+legal move that does not fill one of the player's own eyes. Finished
+playouts are scored by area (stones plus surrounded empty points) with komi.
+
+The tree is plain UCT: every node is expanded one move at a time in random
+order, children are selected by UCB1 on their win rate, and the most visited
+root move is played. A search stops at the time budget or after a number of
+playouts, whichever comes first. After the opponent passes, the bot passes
+straight away if the board as it stands already wins on area.
+
+Trees are kept per game in the worker process. When the same game comes back
+two moves later the subtree under the bot's move and the opponent's reply
+becomes the new root, so its playouts are not lost. ``games.bots`` sends all
+searches of a game to the same worker process for this.
+"""
+
+import math
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .models import Player
+
+Board = List[List[Optional[str]]]
+
+EMPTY, BLACK, WHITE, BORDER = 0, 1, 2, 3
+COLORS = {Player.BLACK: BLACK, Player.WHITE: WHITE}
+COLOR_NAMES = {BLACK: Player.BLACK, WHITE: Player.WHITE}
+PASS = -1
+
+# Exploration constant of UCB1
+UCT_EXPLORATION = 0.9
+# Playout moves per board point before a playout is cut off and scored
+PLAYOUT_MOVE_LIMIT = 3
+DEFAULT_TIME_BUDGET_MS = 1000
+# Games whose trees are kept, and the nodes kept per tree, per process
+TREE_CACHE_GAMES = 32
+MAX_TREE_NODES = 200_000
+# Alternatives returned after the chosen move, in case it is rejected
+ALTERNATIVES = 4
+
+
+class GoBoard:
+    """
+    A Go position on a flat array with a border.
+
+    Point ``(row, col)`` is index ``(row + 1) * (size + 2) + col + 1``.
+    ``ko`` is the point the side to move may not play (or ``PASS``).
+
+    Stones are kept in chains (``head`` names a chain's first stone, ``next``
+    links its stones in a ring) with pseudo-liberties: the number of
+    (stone, empty neighbour) pairs, and the sum and sum of squares of those
+    empty points. A chain is captured when the count reaches zero and is in
+    atari exactly when all its pseudo-liberties are the same point, i.e.
+    ``count * squares == total ** 2``; then that point is ``total // count``.
+    Moves therefore never flood-fill a chain except to remove it.
+    """
+
+    __slots__ = ('size', 'width', 'cells', 'head', 'next', 'stones', 'libs', 'lib_sum', 'lib_squares',
+                 'to_move', 'ko', 'passes', 'empties', 'last_move')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.width = width = size + 2
+        points = width * width
+        self.cells = [BORDER] * points
+        self.head = list(range(points))
+        self.next = list(range(points))
+        self.stones = [0] * points
+        self.libs = [0] * points
+        self.lib_sum = [0] * points
+        self.lib_squares = [0] * points
+        self.empties: List[int] = []
+        for row in range(size):
+            for col in range(size):
+                point = self.point(row, col)
+                self.cells[point] = EMPTY
+                self.empties.append(point)
+        self.to_move = BLACK
+        self.ko = PASS
+        self.passes = 0
+        self.last_move = PASS
+
+    @classmethod
+    def from_rows(cls, board: Board, color: str, ko_point: Optional[Tuple[int, int]] = None,
+                  passes: int = 0, last_move: Optional[Tuple[int, int]] = None) -> 'GoBoard':
+        """Build a position from ``board_state['board']`` with ``color`` to move."""
+        position = cls(len(board))
+        for row, cells in enumerate(board):
+            for col, stone in enumerate(cells):
+                if stone is not None:
+                    point = position.point(row, col)
+                    position.empties.remove(point)
+                    position._add_stone(point, COLORS[stone])
+        position.to_move = COLORS[color]
+        position.passes = passes
+        if ko_point is not None:
+            position.ko = position.point(*ko_point)
+        if last_move is not None:
+            position.last_move = position.point(*last_move)
+        return position
+
+    def point(self, row: int, col: int) -> int:
+        return (row + 1) * self.width + col + 1
+
+    def coordinates(self, point: int) -> Tuple[int, int]:
+        if point == PASS:
+            return (-1, -1)
+        row, col = divmod(point, self.width)
+        return (row - 1, col - 1)
+
+    def copy(self) -> 'GoBoard':
+        other = GoBoard.__new__(GoBoard)
+        other.size = self.size
+        other.width = self.width
+        other.cells = self.cells[:]
+        other.head = self.head[:]
+        other.next = self.next[:]
+        other.stones = self.stones[:]
+        other.libs = self.libs[:]
+        other.lib_sum = self.lib_sum[:]
+        other.lib_squares = self.lib_squares[:]
+        other.empties = self.empties[:]
+        other.to_move = self.to_move
+        other.ko = self.ko
+        other.passes = self.passes
+        other.last_move = self.last_move
+        return other
+
+    def key(self) -> Tuple:
+        """Everything that decides the legal moves and the outcome from here."""
+        return (tuple(self.cells), self.to_move, self.ko, self.passes)
+
+    def neighbours(self, point: int) -> Tuple[int, int, int, int]:
+        return (point - self.width, point - 1, point + 1, point + self.width)
+
+    def chain(self, point: int) -> List[int]:
+        """The stones of the chain at ``point``."""
+        stones, stone = [point], self.next[point]
+        while stone != point:
+            stones.append(stone)
+            stone = self.next[stone]
+        return stones
+
+    def atari_point(self, point: int) -> int:
+        """The only liberty of the chain at ``point``, or ``PASS`` if it has more (or none)."""
+        head = self.head[point]
+        count = self.libs[head]
+        if count and count * self.lib_squares[head] == self.lib_sum[head] ** 2:
+            return self.lib_sum[head] // count
+        return PASS
+
+    def is_eye(self, point: int, color: int) -> bool:
+        """Whether an empty point is an eye of ``color`` (filling it only hurts)."""
+        cells, width = self.cells, self.width
+        for n in (point - width, point - 1, point + 1, point + width):
+            if cells[n] != color and cells[n] != BORDER:
+                return False
+        opponent = 3 - color
+        bad = at_edge = 0
+        for d in (point - width - 1, point - width + 1, point + width - 1, point + width + 1):
+            cell = cells[d]
+            if cell == BORDER:
+                at_edge = 1
+            elif cell == opponent:
+                bad += 1
+        return bad + at_edge < 2
+
+    def is_legal(self, point: int, color: int) -> bool:
+        """Whether ``color`` may play ``point``: empty, not the ko point and not suicide."""
+        cells = self.cells
+        if cells[point] != EMPTY or point == self.ko:
+            return False
+        width = self.width
+        for n in (point - width, point - 1, point + 1, point + width):
+            cell = cells[n]
+            if cell == EMPTY:
+                return True
+            if cell == BORDER:
+                continue
+            in_atari_here = self.atari_point(n) == point
+            if cell == color and not in_atari_here:
+                return True  # Joins a chain that keeps another liberty
+            if cell != color and in_atari_here:
+                return True  # Captures
+        return False
+
+    def _add_liberty(self, head: int, point: int, sign: int) -> None:
+        self.libs[head] += sign
+        self.lib_sum[head] += sign * point
+        self.lib_squares[head] += sign * point * point
+
+    def _add_stone(self, point: int, color: int) -> None:
+        """Put a stone down and update chains and liberties (no captures)."""
+        cells, head, width = self.cells, self.head, self.width
+        cells[point] = color
+        head[point] = self.next[point] = point
+        self.stones[point] = 1
+        self.libs[point] = self.lib_sum[point] = self.lib_squares[point] = 0
+        for n in (point - width, point - 1, point + 1, point + width):
+            cell = cells[n]
+            if cell == EMPTY:
+                self._add_liberty(point, n, 1)
+            elif cell != BORDER:
+                self._add_liberty(head[n], point, -1)
+        for n in (point - width, point - 1, point + 1, point + width):
+            if cells[n] == color and head[n] != head[point]:
+                self._merge(head[n], head[point])
+
+    def _merge(self, first: int, second: int) -> None:
+        if self.stones[first] < self.stones[second]:
+            first, second = second, first
+        # Relabel the smaller chain and splice the rings
+        head, nxt = self.head, self.next
+        stone = second
+        while True:
+            head[stone] = first
+            stone = nxt[stone]
+            if stone == second:
+                break
+        nxt[first], nxt[second] = nxt[second], nxt[first]
+        self.stones[first] += self.stones[second]
+        self.libs[first] += self.libs[second]
+        self.lib_sum[first] += self.lib_sum[second]
+        self.lib_squares[first] += self.lib_squares[second]
+
+    def _remove_chain(self, point: int) -> List[int]:
+        cells, head, width = self.cells, self.head, self.width
+        stones = self.chain(point)
+        for stone in stones:
+            cells[stone] = EMPTY
+        for stone in stones:
+            head[stone] = self.next[stone] = stone
+            for n in (stone - width, stone - 1, stone + 1, stone + width):
+                cell = cells[n]
+                if cell != EMPTY and cell != BORDER:
+                    self._add_liberty(head[n], stone, 1)
+        self.empties.extend(stones)
+        return stones
+
+    def play(self, point: int) -> None:
+        """Play a legal move (or ``PASS``) for the side to move."""
+        color = self.to_move
+        self.to_move = 3 - color
+        self.last_move = point
+        self.ko = PASS
+        if point == PASS:
+            self.passes += 1
+            return
+        self.passes = 0
+        self.empties.remove(point)
+        self._add_stone(point, color)
+
+        cells, head, width = self.cells, self.head, self.width
+        opponent = 3 - color
+        captured: List[int] = []
+        for n in (point - width, point - 1, point + 1, point + width):
+            if cells[n] == opponent and self.libs[head[n]] == 0:
+                captured.extend(self._remove_chain(n))
+
+        # A lone stone left in atari where it just captured one stone is a ko
+        if len(captured) == 1 and self.stones[head[point]] == 1 and self.atari_point(point) == captured[0]:
+            self.ko = captured[0]
+
+    def moves(self, include_eyes: bool = False) -> List[int]:
+        """Legal moves of the side to move (without eye-filling ones unless asked)."""
+        color = self.to_move
+        return [
+            point for point in self.empties
+            if self.is_legal(point, color) and (include_eyes or not self.is_eye(point, color))
+        ]
+
+    def score(self, komi: float) -> float:
+        """Area score, black minus white minus komi; an empty region counts for the one colour bordering it."""
+        cells, width = self.cells, self.width
+        black = white = 0
+        seen = set()
+        for point in range(width + 1, width * (self.size + 1) - 1):
+            cell = cells[point]
+            if cell == BLACK:
+                black += 1
+            elif cell == WHITE:
+                white += 1
+            elif cell == EMPTY and point not in seen:
+                # Flood the empty region and note the colours around it
+                region, borders, stack = 0, 0, [point]
+                seen.add(point)
+                while stack:
+                    empty = stack.pop()
+                    region += 1
+                    for n in (empty - width, empty - 1, empty + 1, empty + width):
+                        if cells[n] == EMPTY:
+                            if n not in seen:
+                                seen.add(n)
+                                stack.append(n)
+                        elif cells[n] != BORDER:
+                            borders |= cells[n]
+                if borders == BLACK:
+                    black += region
+                elif borders == WHITE:
+                    white += region
+        return black - white - komi
+
+
+def capture_move(board: GoBoard) -> int:
+    """A point capturing a chain next to the opponent's last move, if one is in atari."""
+    last = board.last_move
+    if last == PASS:
+        return PASS
+    cells = board.cells
+    opponent = 3 - board.to_move
+    for n in (last,) + board.neighbours(last):
+        if cells[n] == opponent:
+            liberty = board.atari_point(n)
+            if liberty != PASS and board.is_legal(liberty, board.to_move):
+                return liberty
+    return PASS
+
+
+def playout(board: GoBoard, komi: float, rng: random.Random) -> int:
+    """
+    Play a position out with the light policy and return the winning colour.
+
+    Args:
+        board: Position to play out (modified)
+        komi: Points added to white's score
+        rng: Source of randomness
+
+    Returns:
+        BLACK or WHITE
+    """
+    limit = board.size * board.size * PLAYOUT_MOVE_LIMIT
+    moves = 0
+    while board.passes < 2 and moves < limit:
+        moves += 1
+        move = capture_move(board)
+        if move == PASS:
+            color = board.to_move
+            empties = board.empties
+            count = len(empties)
+            if count:
+                # Scan from a random start for the first sensible move
+                start = rng.randrange(count)
+                for index in range(count):
+                    point = empties[(start + index) % count]
+                    if board.is_legal(point, color) and not board.is_eye(point, color):
+                        move = point
+                        break
+        board.play(move)
+    return BLACK if board.score(komi) > 0 else WHITE
+
+
+class Node:
+    """A position in the search tree, reached by ``move``."""
+
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins', 'player')
+
+    def __init__(self, move: int, parent: Optional['Node'], player: int, untried: Optional[List[int]] = None):
+        self.move = move
+        self.parent = parent
+        self.player = player  # Colour that played ``move``
+        self.children: List['Node'] = []
+        self.untried = untried  # Generated when the node is first selected through
+        self.visits = 0
+        self.wins = 0
+
+    def select(self) -> 'Node':
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.wins / child.visits + UCT_EXPLORATION * math.sqrt(log_visits / child.visits),
+        )
+
+    def count(self) -> int:
+        total, stack = 0, [self]
+        while stack:
+            node = stack.pop()
+            total += 1
+            stack.extend(node.children)
+        return total
+
+
+def candidate_moves(board: GoBoard) -> List[int]:
+    """Moves searched from a position: sensible moves, or a pass when there are none."""
+    if board.passes >= 2:
+        return []
+    moves = board.moves()
+    # Passing is only worth searching when it would end the game
+    if not moves or board.passes == 1:
+        moves.append(PASS)
+    return moves
+
+
+class GoSearchResult:
+    """The chosen move, alternatives to it and statistics of the search."""
+
+    def __init__(self, row: int, col: int, win_rate: float, playouts: int, reused_playouts: int,
+                 tree_nodes: int, elapsed_ms: float, alternatives: Sequence[Tuple[int, int]] = ()):
+        self.row = row
+        self.col = col
+        self.win_rate = win_rate
+        self.playouts = playouts
+        self.reused_playouts = reused_playouts
+        self.tree_nodes = tree_nodes
+        self.elapsed_ms = elapsed_ms
+        self.alternatives = list(alternatives)
+
+    @property
+    def is_pass(self) -> bool:
+        return self.row == -1 and self.col == -1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'row': self.row,
+            'col': self.col,
+            'win_rate': round(self.win_rate, 3),
+            'playouts': self.playouts,
+            'reused_playouts': self.reused_playouts,
+            'tree_nodes': self.tree_nodes,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+            'playouts_per_sec': round(self.playouts / (self.elapsed_ms / 1000), 1) if self.elapsed_ms else None,
+        }
+
+    def __repr__(self):
+        return f'GoSearchResult({self.row}, {self.col}, win_rate={self.win_rate:.3f}, playouts={self.playouts})'
+
+
+class SearchTree:
+    """A search tree and the position at its root."""
+
+    def __init__(self, board: GoBoard, root: Optional[Node] = None):
+        self.board = board
+        self.root = root or Node(PASS, None, 3 - board.to_move, candidate_moves(board))
+        self.root.parent = None
+
+    def descend(self, board: GoBoard) -> Optional['SearchTree']:
+        """
+        The subtree for ``board`` if it is two moves below the root.
+
+        Returns:
+            A tree rooted at the matching grandchild, or None
+        """
+        target = board.key()
+        for child in self.root.children:
+            after_child = self.board.copy()
+            after_child.play(child.move)
+            for grandchild in child.children:
+                after = after_child.copy()
+                after.play(grandchild.move)
+                if after.key() == target:
+                    return SearchTree(after, grandchild)
+        return None
+
+    def search(self, komi: float, time_budget_ms: float, max_playouts: int, rng: random.Random) -> int:
+        """Run playouts from the root until the budget is spent; returns how many ran."""
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        root = self.root
+        playouts = 0
+        nodes = root.count()
+        while True:
+            if max_playouts and playouts >= max_playouts:
+                break
+            if time.perf_counter() >= deadline:
+                break
+            board = self.board.copy()
+            node = root
+            # Selection
+            while True:
+                if node.untried is None:
+                    node.untried = candidate_moves(board)
+                if node.untried or not node.children:
+                    break
+                node = node.select()
+                board.play(node.move)
+            # Expansion
+            if node.untried and nodes < MAX_TREE_NODES:
+                move = node.untried.pop(rng.randrange(len(node.untried)))
+                player = board.to_move
+                board.play(move)
+                child = Node(move, node, player)
+                node.children.append(child)
+                node = child
+                nodes += 1
+            # Simulation and backpropagation
+            winner = playout(board, komi, rng)
+            while node is not None:
+                node.visits += 1
+                if winner == node.player:
+                    node.wins += 1
+                node = node.parent
+            playouts += 1
+        return playouts
+
+
+# (game id, colour) -> SearchTree, most recently used last
+_trees: 'OrderedDict[Tuple[str, str], SearchTree]' = OrderedDict()
+
+
+def choose_move(board: Board, size: int, color: str, komi: float = 6.5,
+                ko_position: Optional[Sequence[int]] = None, last_move: Optional[Dict[str, Any]] = None,
+                consecutive_passes: int = 0, time_budget_ms: float = DEFAULT_TIME_BUDGET_MS,
+                playouts: int = 0, game_id: Optional[str] = None, seed: Optional[int] = None) -> GoSearchResult:
+    """
+    Choose a Go move for ``color``.
+
+    Args:
+        board: Board as stored in ``board_state['board']`` (not modified)
+        size: Board size
+        color: Colour to move, 'BLACK' or 'WHITE'
+        komi: Points added to white's score
+        ko_position: ``board_state['ko_position']``; only used if the last
+            move really took a ko there
+        last_move: ``board_state['last_move']``
+        consecutive_passes: ``board_state['consecutive_passes']``
+        time_budget_ms: Time after which the search stops
+        playouts: Playouts after which the search stops (0: no limit)
+        game_id: Key under which the tree is kept for the next move
+        seed: Seed for the search, for reproducible moves
+
+    Returns:
+        GoSearchResult; ``row`` and ``col`` are -1 for a pass
+    """
+    start = time.perf_counter()
+    last_point = None
+    # A pass (even one recorded without updating last_move) clears the ko
+    if last_move and not last_move.get('pass') and not consecutive_passes:
+        last_point = (last_move['row'], last_move['col'])
+    position = GoBoard.from_rows(board, color, passes=consecutive_passes, last_move=last_point)
+    if ko_position and last_point is not None:
+        ko = position.point(*ko_position)
+        stone = position.point(*last_point)
+        if position.stones[position.head[stone]] == 1 and position.atari_point(stone) == ko:
+            position.ko = ko
+
+    if consecutive_passes == 1:
+        margin = position.score(komi)
+        if margin > 0 if position.to_move == BLACK else margin < 0:
+            return GoSearchResult(-1, -1, 1.0, 0, 0, 0, (time.perf_counter() - start) * 1000)
+
+    # Keyed by colour too, so a bot playing both sides keeps two trees
+    tree_key = None if game_id is None else (str(game_id), color)
+    tree = None
+    if tree_key in _trees:
+        tree = _trees.pop(tree_key).descend(position)
+    if tree is None:
+        tree = SearchTree(position)
+    reused = tree.root.visits
+
+    rng = random.Random(seed)
+    count = tree.search(komi, time_budget_ms, playouts, rng)
+
+    ranked = sorted(tree.root.children, key=lambda child: (child.visits, child.wins), reverse=True)
+    if tree_key is not None and ranked:
+        _trees[tree_key] = tree
+        while len(_trees) > TREE_CACHE_GAMES:
+            _trees.popitem(last=False)
+
+    if not ranked:
+        return GoSearchResult(-1, -1, 0.0, count, reused, 1, (time.perf_counter() - start) * 1000)
+    best = ranked[0]
+    row, col = position.coordinates(best.move)
+    return GoSearchResult(
+        row, col,
+        win_rate=best.wins / best.visits if best.visits else 0.0,
+        playouts=count,
+        reused_playouts=reused,
+        tree_nodes=tree.root.count(),
+        elapsed_ms=(time.perf_counter() - start) * 1000,
+        alternatives=[position.coordinates(child.move) for child in ranked[1:ALTERNATIVES + 1]],
+    )
@@ -0,0 +1,558 @@
+"""
+Gomoku computer opponent: threat-based alpha-beta search.
+
+The search runs on a plain copy of the board and knows nothing about the
+database, so it can run in a worker process (see ``games.bots``).
+
+Evaluation reuses ``GomokuGameService.count_stones_in_direction``. For an
+empty point and a colour, the consecutive, gapped and potential counts on
+both sides of each of the four lines classify what a stone there would make
+on that line: a five, an open or closed four (including split fours such as
+``XX_X``), an open or closed three, and so on, or nothing when the line has
+no room left for five. The four line shapes combine into the point's threat
+value; two fours, or a four and an open three, score as a winning double
+threat.
+
+Shapes are cached per point, line and colour. Placing a stone only
+re-classifies the empty points within five cells of it on its four lines,
+and a shape depends only on those five cells either side of the point, so
+classifications are memoised by them: scoring every candidate at every node
+is a table lookup, and the counts only run for line patterns not seen before.
+
+The search is iterative-deepening negamax with alpha-beta pruning over
+candidate moves within two cells of an existing stone, ordered by threat
+value (attack plus blocking value) after the transposition table's best
+move, and narrowed to the strongest few at each node. Positions are hashed
+with Zobrist keys, updated incrementally as stones are placed and removed.
+Immediate wins are played and forced blocks are the only moves searched.
+The deepest fully searched iteration within the time budget decides the
+move.
+"""
+
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .game_services import GomokuGameService
+from .models import Player
+
+Board = List[List[Optional[str]]]
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Line shapes a stone on an empty point would make, weakest first
+NONE, ONE, TWO, OPEN_TWO, THREE, OPEN_THREE, FOUR, OPEN_FOUR, FIVE = range(9)
+
+SHAPE_SCORES = {
+    NONE: 0,
+    ONE: 10,
+    TWO: 50,
+    OPEN_TWO: 400,
+    THREE: 1_000,
+    OPEN_THREE: 8_000,
+    FOUR: 10_000,
+    OPEN_FOUR: 1_000_000,
+    FIVE: 10_000_000,
+}
+DOUBLE_FOUR_SCORE = 500_000  # Two fours, or a four and an open three
+DOUBLE_THREE_SCORE = 100_000
+
+WIN_SCORE = 100_000_000
+# Scores above this are wins (or losses) found by the search
+WIN_THRESHOLD = WIN_SCORE - 1_000
+
+# Candidates are empty points within this many cells of a stone
+NEIGHBOURHOOD = 2
+# Strongest candidates searched at the root and at inner nodes
+ROOT_BRANCHING = 16
+BRANCHING = 9
+# Blocking an opponent's threat is worth this share of making the same threat
+DEFENCE_WEIGHT = 0.8
+
+# Nodes between checks of the time budget
+TIME_CHECK_INTERVAL = 16
+DEFAULT_TIME_BUDGET_MS = 1000
+DEFAULT_MAX_DEPTH = 10
+# Transposition table entries kept per board size before it is cleared
+TT_MAX_ENTRIES = 500_000
+
+EXACT, LOWER, UPPER = range(3)
+
+# Cells either side of a point that decide its line shapes
+LINE_REACH = 5
+EMPTY, EDGE = '.', '#'
+CELL_CODES = {None: EMPTY, Player.BLACK: 'b', Player.WHITE: 'w'}
+SHAPE_MEMO_MAX_ENTRIES = 200_000
+
+count_stones_in_direction = GomokuGameService.count_stones_in_direction
+
+
+def _combine(shapes: Tuple[int, int, int, int]) -> int:
+    score = sum(SHAPE_SCORES[shape] for shape in shapes)
+    fours = sum(1 for shape in shapes if shape >= FOUR)
+    open_threes = sum(1 for shape in shapes if shape == OPEN_THREE)
+    if FIVE not in shapes and OPEN_FOUR not in shapes:
+        if fours >= 2 or (fours and open_threes):
+            score += DOUBLE_FOUR_SCORE
+        elif open_threes >= 2:
+            score += DOUBLE_THREE_SCORE
+    return score
+
+
+# Threat value of every combination of four line shapes, indexed by
+# ((s0 * 9 + s1) * 9 + s2) * 9 + s3
+POINT_SCORES = [
+    _combine((a, b, c, d)) for a in range(9) for b in range(9) for c in range(9) for d in range(9)
+]
+
+
+def line_shape(board: Board, size: int, row: int, col: int, direction: Tuple[int, int],
+               color: str, allow_overlines: bool) -> int:
+    """
+    Classify the line a stone of ``color`` on the empty point would make.
+
+    Args:
+        board: Board as stored in ``board_state['board']``
+        size: Board size
+        row, col: An empty point
+        direction: One of ``DIRECTIONS``
+        color: 'BLACK' or 'WHITE'
+        allow_overlines: Whether six or more in a row wins
+
+    Returns:
+        One of the shape constants (``NONE`` ... ``FIVE``)
+    """
+    dr, dc = direction
+    ahead, ahead_gapped, ahead_room = count_stones_in_direction(board, size, row, col, direction, color)
+    behind, behind_gapped, behind_room = count_stones_in_direction(board, size, row, col, (-dr, -dc), color)
+
+    run = 1 + ahead + behind
+    if run >= 5:
+        return FIVE if run == 5 or allow_overlines else NONE
+    if 1 + ahead_room + behind_room < 5:
+        return NONE  # No room for five on this line
+
+    # An end is open when the point after the run is empty
+    open_ends = (ahead_room > ahead) + (behind_room > behind)
+    # Stones a single further move could join to this run (one gap, on one side)
+    split = 1 + max(ahead_gapped + behind, ahead + behind_gapped)
+
+    if run == 4:
+        return OPEN_FOUR if open_ends == 2 else FOUR
+    if split >= 4:
+        return FOUR
+    if run == 3:
+        return OPEN_THREE if open_ends == 2 else THREE
+    if split == 3:
+        return OPEN_THREE if open_ends == 2 else THREE
+    if run == 2:
+        return OPEN_TWO if open_ends == 2 else TWO
+    return ONE
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is spent."""
+
+
+class SearchResult:
+    """The chosen move and statistics of the search that found it."""
+
+    def __init__(self, row: int, col: int, score: int = 0, depth: int = 0, nodes: int = 0,
+                 tt_hits: int = 0, elapsed_ms: float = 0.0, reason: str = 'search'):
+        self.row = row
+        self.col = col
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.tt_hits = tt_hits
+        self.elapsed_ms = elapsed_ms
+        self.reason = reason
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'row': self.row,
+            'col': self.col,
+            'score': self.score,
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'tt_hits': self.tt_hits,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+            'reason': self.reason,
+        }
+
+    def __repr__(self):
+        return f'SearchResult({self.row}, {self.col}, score={self.score}, depth={self.depth}, nodes={self.nodes})'
+
+
+class TranspositionTable:
+    """Zobrist keys for one board size and the search results hashed by them."""
+
+    def __init__(self, size: int, max_entries: int = TT_MAX_ENTRIES):
+        rng = random.Random(size)
+        self.size = size
+        self.keys = [[rng.getrandbits(64) for _ in range(size * size)] for _ in range(2)]
+        self.max_entries = max_entries
+        # hash -> (depth, flag, value, best point)
+        self.entries: Dict[int, Tuple[int, int, int, int]] = {}
+
+    def hash_board(self, board: Board) -> int:
+        value = 0
+        for row in range(self.size):
+            for col in range(self.size):
+                stone = board[row][col]
+                if stone is not None:
+                    value ^= self.keys[stone != Player.BLACK][row * self.size + col]
+        return value
+
+    def get(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        return self.entries.get(key)
+
+    def store(self, key: int, depth: int, flag: int, value: int, best: int) -> None:
+        existing = self.entries.get(key)
+        if existing is not None and existing[0] > depth:
+            return  # Keep the deeper result
+        if existing is None and len(self.entries) >= self.max_entries:
+            self.entries.clear()
+        self.entries[key] = (depth, flag, value, best)
+
+
+# Transposition tables live for the whole process, so a bot's next move
+# starts from what it learned on the previous one
+_tables: Dict[Tuple[int, bool], TranspositionTable] = {}
+
+
+# Line shape by the cells around a point and the colour to play there, per
+# overline rule
+_shape_memos: Dict[bool, Dict[str, int]] = {}
+
+
+def get_table(size: int, allow_overlines: bool) -> TranspositionTable:
+    """The process-wide transposition table for a board size and overline rule."""
+    key = (size, allow_overlines)
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = TranspositionTable(size)
+    return table
+
+
+class Position:
+    """
+    A board being searched, with cached line shapes and candidate points.
+
+    Points are numbered ``row * size + col``. Colour indexes are 0 for black
+    and 1 for white.
+    """
+
+    def __init__(self, board: Board, size: int, allow_overlines: bool, table: TranspositionTable):
+        self.size = size
+        self.allow_overlines = allow_overlines
+        self.board = [list(row) for row in board]
+        self.keys = table.keys
+        self.hash = table.hash_board(self.board)
+        points = size * size
+        # Stones within NEIGHBOURHOOD cells of each point
+        self.nearby = [0] * points
+        # shapes[color][point * 4 + direction]
+        self.shapes = [[NONE] * (points * 4), [NONE] * (points * 4)]
+        self.shape_memo = _shape_memos.setdefault(allow_overlines, {})
+        self.stones = 0
+        self.history: List[Tuple[int, list]] = []
+
+        for row in range(size):
+            for col in range(size):
+                if self.board[row][col] is not None:
+                    self.stones += 1
+                    self._mark_nearby(row, col, 1)
+        for row in range(size):
+            for col in range(size):
+                if self.board[row][col] is None:
+                    for direction, (dr, dc) in enumerate(DIRECTIONS):
+                        line = self._line(row, col, dr, dc)
+                        self._update_shape(row, col, direction, line[5:16], None)
+
+    def _mark_nearby(self, row: int, col: int, delta: int) -> None:
+        size = self.size
+        for r in range(max(0, row - NEIGHBOURHOOD), min(size, row + NEIGHBOURHOOD + 1)):
+            base = r * size
+            for c in range(max(0, col - NEIGHBOURHOOD), min(size, col + NEIGHBOURHOOD + 1)):
+                self.nearby[base + c] += delta
+
+    def _line(self, row: int, col: int, dr: int, dc: int) -> str:
+        """The cells from ten before to ten after a point on a line, as a string."""
+        size = self.size
+        board = self.board
+        cells = []
+        for offset in range(-LINE_REACH * 2, LINE_REACH * 2 + 1):
+            r, c = row + offset * dr, col + offset * dc
+            cells.append(CELL_CODES[board[r][c]] if 0 <= r < size and 0 <= c < size else EDGE)
+        return ''.join(cells)
+
+    def _update_shape(self, row: int, col: int, direction: int, window: str,
+                      changed: Optional[list]) -> None:
+        index = (row * self.size + col) * 4 + direction
+        for color_index, color in enumerate((Player.BLACK, Player.WHITE)):
+            # A point's shape only depends on the five cells either side of it
+            key = window + CELL_CODES[color]
+            shape = self.shape_memo.get(key)
+            if shape is None:
+                if len(self.shape_memo) >= SHAPE_MEMO_MAX_ENTRIES:
+                    self.shape_memo.clear()
+                shape = self.shape_memo[key] = line_shape(
+                    self.board, self.size, row, col, DIRECTIONS[direction], color, self.allow_overlines
+                )
+            shapes = self.shapes[color_index]
+            if shapes[index] != shape:
+                if changed is not None:
+                    changed.append((color_index, index, shapes[index]))
+                shapes[index] = shape
+
+    def point_score(self, point: int, color_index: int) -> int:
+        s = self.shapes[color_index]
+        base = point * 4
+        return POINT_SCORES[((s[base] * 9 + s[base + 1]) * 9 + s[base + 2]) * 9 + s[base + 3]]
+
+    def makes_five(self, point: int, color_index: int) -> bool:
+        base = point * 4
+        return FIVE in self.shapes[color_index][base:base + 4]
+
+    def candidates(self) -> List[int]:
+        """Empty points near a stone (the centre on an empty board)."""
+        if not self.stones:
+            return [(self.size // 2) * self.size + self.size // 2]
+        board = self.board
+        size = self.size
+        return [
+            point for point, near in enumerate(self.nearby)
+            if near and board[point // size][point % size] is None
+        ]
+
+    def place(self, point: int, color_index: int) -> None:
+        row, col = divmod(point, self.size)
+        self.board[row][col] = Player.WHITE if color_index else Player.BLACK
+        self.hash ^= self.keys[color_index][point]
+        self.stones += 1
+        self._mark_nearby(row, col, 1)
+
+        # Only empty points on the stone's four lines, up to five cells away,
+        # can see a different shape
+        changed: list = []
+        for direction, (dr, dc) in enumerate(DIRECTIONS):
+            line = self._line(row, col, dr, dc)
+            for offset in range(-LINE_REACH, LINE_REACH + 1):
+                # line[LINE_REACH * 2] is the new stone
+                if line[offset + LINE_REACH * 2] == EMPTY:
+                    start = offset + LINE_REACH
+                    self._update_shape(row + offset * dr, col + offset * dc, direction,
+                                       line[start:start + LINE_REACH * 2 + 1], changed)
+        self.history.append((point, changed))
+
+    def undo(self) -> None:
+        point, changed = self.history.pop()
+        row, col = divmod(point, self.size)
+        color_index = self.board[row][col] != Player.BLACK
+        self.board[row][col] = None
+        self.hash ^= self.keys[color_index][point]
+        self.stones -= 1
+        self._mark_nearby(row, col, -1)
+        for shape_color, index, shape in reversed(changed):
+            self.shapes[shape_color][index] = shape
+
+
+class GomokuSearch:
+    """Iterative-deepening alpha-beta search from one position."""
+
+    def __init__(self, board: Board, size: int, color: str, allow_overlines: bool = False,
+                 time_budget_ms: float = DEFAULT_TIME_BUDGET_MS, max_depth: int = DEFAULT_MAX_DEPTH,
+                 table: Optional[TranspositionTable] = None):
+        self.table = table or get_table(size, allow_overlines)
+        self.position = Position(board, size, allow_overlines, self.table)
+        self.color_index = 0 if color == Player.BLACK else 1
+        self.time_budget = time_budget_ms / 1000
+        self.max_depth = max(1, max_depth)
+        self.nodes = 0
+        self.tt_hits = 0
+        self.deadline = 0.0
+
+    def choose_move(self) -> SearchResult:
+        """Search until the time budget or maximum depth and return the best move."""
+        start = time.perf_counter()
+        self.deadline = start + self.time_budget
+        position = self.position
+        me = self.color_index
+
+        def result(point, score=0, depth=0, reason='search'):
+            row, col = divmod(point, position.size)
+            return SearchResult(row, col, score, depth, self.nodes, self.tt_hits,
+                                (time.perf_counter() - start) * 1000, reason)
+
+        candidates = position.candidates()
+        if not candidates:
+            raise ValueError("No empty point left to play")
+        if not position.stones:
+            return result(candidates[0], reason='opening')
+
+        forced = self.forced_moves(candidates, me)
+        if forced is not None and len(forced) == 1:
+            reason = 'win' if position.makes_five(forced[0], me) else 'block'
+            return result(forced[0], WIN_SCORE if reason == 'win' else 0, reason=reason)
+
+        ordered = self.order(forced or candidates, me, None)[:ROOT_BRANCHING]
+        best_point, best_score, depth_done = ordered[0], 0, 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, point = self.search_root(ordered, depth, me)
+            except SearchTimeout:
+                break
+            best_point, best_score, depth_done = point, score, depth
+            # Search the previous best first at the next depth
+            ordered.remove(point)
+            ordered.insert(0, point)
+            if abs(score) >= WIN_THRESHOLD:
+                break
+            if time.perf_counter() >= self.deadline:
+                break
+        return result(best_point, best_score, depth_done)
+
+    def check_time(self) -> None:
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def forced_moves(self, candidates: List[int], color_index: int) -> Optional[List[int]]:
+        """The winning point, else the points blocking the opponent's five, else None."""
+        position = self.position
+        blocks = []
+        for point in candidates:
+            if position.makes_five(point, color_index):
+                return [point]
+            if position.makes_five(point, 1 - color_index):
+                blocks.append(point)
+        return blocks or None
+
+    def order(self, candidates: List[int], color_index: int, first: Optional[int]) -> List[int]:
+        position = self.position
+        opponent = 1 - color_index
+        scored = sorted(
+            candidates,
+            key=lambda point: position.point_score(point, color_index)
+            + DEFENCE_WEIGHT * position.point_score(point, opponent),
+            reverse=True,
+        )
+        if first is not None and first in scored:
+            scored.remove(first)
+            scored.insert(0, first)
+        return scored
+
+    def evaluate(self, candidates: List[int], color_index: int) -> int:
+        """Static value for the side to move: its threats against the opponent's."""
+        position = self.position
+        opponent = 1 - color_index
+        best_mine = best_theirs = total_mine = total_theirs = 0
+        for point in candidates:
+            mine = position.point_score(point, color_index)
+            theirs = position.point_score(point, opponent)
+            total_mine += mine
+            total_theirs += theirs
+            if mine > best_mine:
+                best_mine = mine
+            if theirs > best_theirs:
+                best_theirs = theirs
+        # The side to move gets to make its best threat first
+        return best_mine - best_theirs // 2 + (total_mine - total_theirs) // 8
+
+    def search_root(self, ordered: List[int], depth: int, me: int) -> Tuple[int, int]:
+        position = self.position
+        alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        best_point, best_score = ordered[0], -WIN_SCORE - 1
+        for point in ordered:
+            position.place(point, me)
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, 1 - me, 1)
+            finally:
+                position.undo()
+            if score > best_score:
+                best_point, best_score = point, score
+            if score > alpha:
+                alpha = score
+        self.table.store(position.hash, depth, EXACT, best_score, best_point)
+        return best_score, best_point
+
+    def negamax(self, depth: int, alpha: int, beta: int, color_index: int, ply: int) -> int:
+        self.check_time()
+        position = self.position
+        original_alpha = alpha
+
+        entry = self.table.get(position.hash)
+        tt_move = None
+        if entry is not None:
+            entry_depth, flag, value, tt_move = entry
+            if entry_depth >= depth:
+                self.tt_hits += 1
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value > alpha:
+                    alpha = value
+                elif flag == UPPER and value < beta:
+                    beta = value
+                if alpha >= beta:
+                    return value
+
+        candidates = position.candidates()
+        if not candidates:
+            return 0  # Board full: draw
+
+        forced = self.forced_moves(candidates, color_index)
+        if forced is not None and position.makes_five(forced[0], color_index):
+            return WIN_SCORE - ply
+        if forced is not None and len(forced) > 1:
+            return -(WIN_SCORE - ply - 1)  # Two fives to block: lost
+
+        if depth <= 0:
+            return self.evaluate(candidates, color_index)
+
+        moves = forced or self.order(candidates, color_index, tt_move)[:BRANCHING]
+        best_score, best_point = -WIN_SCORE - 1, moves[0]
+        for point in moves:
+            position.place(point, color_index)
+            try:
+                score = -self.negamax(depth - 1, -beta, -alpha, 1 - color_index, ply + 1)
+            finally:
+                position.undo()
+            if score > best_score:
+                best_score, best_point = score, point
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(position.hash, depth, flag, best_score, best_point)
+        return best_score
+
+
+def choose_move(board: Board, size: int, color: str, allow_overlines: bool = False,
+                time_budget_ms: float = DEFAULT_TIME_BUDGET_MS,
+                max_depth: int = DEFAULT_MAX_DEPTH) -> SearchResult:
+    """
+    Choose a Gomoku move for ``color``.
+
+    Args:
+        board: Board as stored in ``board_state['board']`` (not modified)
+        size: Board size
+        color: Colour to move, 'BLACK' or 'WHITE'
+        allow_overlines: Whether six or more in a row wins (the ruleset's setting)
+        time_budget_ms: Time after which no new search iteration is finished
+        max_depth: Deepest iteration to search
+
+    Returns:
+        SearchResult with the move and search statistics
+
+    Raises:
+        ValueError: If the board has no empty point
+    """
+    return GomokuSearch(board, size, color, allow_overlines, time_budget_ms, max_depth).choose_move()
@@ -0,0 +1,412 @@
+"""
+Gomoku forced-win solver: threat-space search for VCF and VCT.
+
+A VCF (victory by continuous fours) is a sequence of fours, each forcing the
+one reply that blocks it, ending in a five or in a four the opponent cannot
+block (an open four or two fours at once). A VCT (victory by continuous
+threats) may also use open threes, which the opponent has to answer before
+they become open fours.
+
+The solver only looks at threat moves, so it searches far deeper than the
+bot's alpha-beta search within the same budget. It works on
+``games.gomoku_ai.Position``, whose cached line shapes tell which points
+make a five, a four or an open three for either colour without scanning the
+board:
+
+* The attacker tries its fours (and in VCT its open threes), strongest
+  first. If the opponent has a four, the attacker must block it, and the
+  block only continues the attack if it is a threat itself or the
+  attacker still has an open three on the board.
+* A four has one defence, the point completing it. An open three can be
+  answered on any point of its lines where the attacker would make a four,
+  or by a counter-four from the defender anywhere on the board. The attack
+  only succeeds if every defence loses.
+
+Results are kept in a hash table keyed by the position's Zobrist hash, so
+transpositions (the same stones reached in another order) are solved once.
+The search deepens one attacker move at a time, so the shortest win is
+found first, and stops at the node or time budget: the result is then
+``unknown`` rather than ``none``.
+
+``find_first_forced_win`` replays a game on one ``Position`` and solves each
+position for the side to move, reporting the first move after which a
+forced win existed.
+"""
+
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .gomoku_ai import DIRECTIONS, FIVE, FOUR, LINE_REACH, OPEN_FOUR, OPEN_THREE, Board, Position, SearchTimeout, \
+    TranspositionTable
+from .models import Player
+
+VCF, VCT = 'VCF', 'VCT'
+WIN, NO_WIN, UNKNOWN = 'win', 'none', 'unknown'
+
+# Attacker moves in the longest sequence searched
+DEFAULT_MAX_DEPTH = 12
+DEFAULT_MAX_NODES = 50_000
+# Budgets per position when a whole game is scanned
+SCAN_MAX_NODES = 5_000
+SCAN_TIME_BUDGET_MS = 100
+DEFAULT_TIME_BUDGET_MS = 1000
+# Nodes between checks of the time budget
+TIME_CHECK_INTERVAL = 64
+# Solved positions kept per solver before the table is cleared
+TABLE_MAX_ENTRIES = 200_000
+
+# Matches the shape codes of open threes and better in ``bytes(shapes)``
+THREAT_SHAPES = re.compile(bytes(range(OPEN_THREE, FIVE + 1)).join([b'[', b']']))
+
+COLOR_INDEXES = {Player.BLACK: 0, Player.WHITE: 1}
+COLOR_NAMES = (Player.BLACK, Player.WHITE)
+
+
+class SolverResult:
+    """Whether the side to move has a forced win, the winning line and search statistics."""
+
+    def __init__(self, color: str, status: str, kind: Optional[str] = None,
+                 sequence: Sequence[Tuple[int, int, str]] = (), nodes: int = 0, elapsed_ms: float = 0.0):
+        self.color = color
+        self.status = status
+        self.kind = kind
+        self.sequence = list(sequence)
+        self.nodes = nodes
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def is_win(self) -> bool:
+        return self.status == WIN
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'color': str(self.color),
+            'status': self.status,
+            'kind': self.kind,
+            'sequence': [[row, col, str(color)] for row, col, color in self.sequence],
+            'nodes': self.nodes,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+        }
+
+    def __repr__(self):
+        return f'SolverResult({self.color}, {self.status}, kind={self.kind}, moves={len(self.sequence)})'
+
+
+class Threats:
+    """Points where one colour would make a five, a four or an open three."""
+
+    __slots__ = ('fives', 'fours', 'threes', 'open_four')
+
+    def __init__(self, position: Position, color_index: int):
+        shapes = position.shapes[color_index]
+        board, size = position.board, position.size
+        self.fives: List[int] = []
+        self.fours: List[int] = []
+        self.threes: List[int] = []
+        self.open_four = False  # Whether some point makes an open four
+        # Scanned as bytes, so only the few threat points are visited in Python;
+        # shapes of occupied points are stale, so those are skipped
+        hot = sorted({match.start() >> 2 for match in THREAT_SHAPES.finditer(bytes(shapes))})
+        for point in hot:
+            if board[point // size][point % size] is not None:
+                continue
+            base = point * 4
+            best = max(shapes[base], shapes[base + 1], shapes[base + 2], shapes[base + 3])
+            if best == FIVE:
+                self.fives.append(point)
+            elif best >= FOUR:
+                self.fours.append(point)
+                if best == OPEN_FOUR:
+                    self.open_four = True
+            elif best == OPEN_THREE:
+                self.threes.append(point)
+
+
+class ThreatSolver:
+    """Depth-first threat-space search on one position, with a table of solved positions."""
+
+    def __init__(self, position: Position, max_nodes: int = DEFAULT_MAX_NODES,
+                 time_budget_ms: float = DEFAULT_TIME_BUDGET_MS):
+        self.position = position
+        self.max_nodes = max_nodes
+        self.time_budget = time_budget_ms / 1000
+        self.nodes = 0
+        self.deadline = 0.0
+        # (hash, attacker, kind) -> winning line, or the depth that failed
+        self.table: Dict[Tuple[int, int, str, int], object] = {}
+
+    def solve(self, color: str, kinds: Sequence[str] = (VCF, VCT),
+              max_depth: int = DEFAULT_MAX_DEPTH) -> SolverResult:
+        """
+        Look for a forced win for ``color``, which is to move.
+
+        Args:
+            color: 'BLACK' or 'WHITE'
+            kinds: Searches to try in order; VCF is cheaper and tried first
+            max_depth: Most attacker moves in a winning line
+
+        Returns:
+            SolverResult; ``sequence`` alternates attacker and defender moves
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self.deadline = start + self.time_budget
+        attacker = COLOR_INDEXES[color]
+        status = NO_WIN
+        try:
+            for kind in kinds:
+                for depth in range(1, max_depth + 1):
+                    line = self.attack(attacker, kind, depth)
+                    if line is not None:
+                        return self.result(color, WIN, kind, line, start)
+        except SearchTimeout:
+            status = UNKNOWN
+        return self.result(color, status, None, [], start)
+
+    def result(self, color: str, status: str, kind: Optional[str], line: List[int], start: float) -> SolverResult:
+        size = self.position.size
+        sequence = [
+            (point // size, point % size, COLOR_NAMES[(COLOR_INDEXES[color] + index) % 2])
+            for index, point in enumerate(line)
+        ]
+        return SolverResult(color, status, kind, sequence, self.nodes, (time.perf_counter() - start) * 1000)
+
+    def check_budget(self) -> None:
+        self.nodes += 1
+        if self.nodes > self.max_nodes or (
+                self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() >= self.deadline):
+            raise SearchTimeout()
+
+    def attack(self, attacker: int, kind: str, depth: int) -> Optional[List[int]]:
+        """The attacker to move: a winning line starting with its move, or None."""
+        self.check_budget()
+        position = self.position
+        mine = Threats(position, attacker)
+        if mine.fives:
+            return [mine.fives[0]]
+        if depth <= 0:
+            return None
+
+        key = (position.hash, attacker, kind)
+        known = self.table.get(key)
+        if isinstance(known, list):
+            return known
+        if known is not None and known >= depth:
+            return None
+
+        theirs = Threats(position, 1 - attacker)
+        if theirs.fives:
+            # The defender's four has to be blocked first
+            if len(theirs.fives) > 1:
+                moves = []
+            else:
+                moves = theirs.fives
+        else:
+            moves = sorted(mine.fours, key=lambda point: position.point_score(point, attacker), reverse=True)
+            if kind == VCT:
+                moves += sorted(mine.threes, key=lambda point: position.point_score(point, attacker),
+                                reverse=True)
+
+        shapes = position.shapes[attacker]
+        line = None
+        for move in moves:
+            base = move * 4
+            makes_four = max(shapes[base], shapes[base + 1], shapes[base + 2], shapes[base + 3]) >= FOUR
+            position.place(move, attacker)
+            try:
+                if theirs.fives and not makes_four:
+                    # A plain block only keeps the attack going if an open three is left
+                    line = self.defend(attacker, kind, depth - 1, None) if kind == VCT else None
+                else:
+                    line = self.defend(attacker, kind, depth - 1, move)
+            finally:
+                position.undo()
+            if line is not None:
+                line = [move] + line
+                break
+
+        if line is not None:
+            self._store(key, line)
+        else:
+            self._store(key, depth)
+        return line
+
+    def defend(self, attacker: int, kind: str, depth: int, threat: Optional[int]) -> Optional[List[int]]:
+        """
+        The defender to move after the attacker's threat at ``threat``.
+
+        With no ``threat`` point (the attacker's last move was a block), any
+        open three of the attacker's on the board is the threat.
+
+        Returns:
+            The longest winning line over all defences, starting with the
+            defence, or None if some defence holds
+        """
+        self.check_budget()
+        position = self.position
+        defender = 1 - attacker
+        theirs = Threats(position, defender)
+        if theirs.fives:
+            return None  # The defender completes a five
+        mine = Threats(position, attacker)
+        if len(mine.fives) > 1:
+            return mine.fives[:2]  # Two points to block; the attacker plays the other
+        if mine.fives:
+            defences = mine.fives
+        elif kind == VCT and threat is not None and self._is_open_three(threat, attacker):
+            defences = self._three_defences(threat, attacker) + theirs.fours
+        elif kind == VCT and threat is None and mine.open_four:
+            defences = mine.fours + theirs.fours
+        else:
+            return None
+
+        best: Optional[List[int]] = None
+        for defence in dict.fromkeys(defences):
+            position.place(defence, defender)
+            try:
+                line = self.attack(attacker, kind, depth)
+            finally:
+                position.undo()
+            if line is None:
+                return None
+            if best is None or len(line) + 1 > len(best):
+                best = [defence] + line
+        return best
+
+    def _line_points(self, point: int):
+        """(point, direction) for the empty points within reach on the four lines through ``point``."""
+        size = self.position.size
+        board = self.position.board
+        row, col = divmod(point, size)
+        for direction, (dr, dc) in enumerate(DIRECTIONS):
+            for offset in range(-LINE_REACH, LINE_REACH + 1):
+                r, c = row + offset * dr, col + offset * dc
+                if offset and 0 <= r < size and 0 <= c < size and board[r][c] is None:
+                    yield r * size + c, direction
+
+    def _is_open_three(self, threat: int, attacker: int) -> bool:
+        """Whether the stone at ``threat`` is part of a line that can become an open four."""
+        shapes = self.position.shapes[attacker]
+        return any(shapes[point * 4 + direction] == OPEN_FOUR for point, direction in self._line_points(threat))
+
+    def _three_defences(self, threat: int, attacker: int) -> List[int]:
+        """Points on the three's lines where the attacker would make a four."""
+        shapes = self.position.shapes[attacker]
+        return [point for point, direction in self._line_points(threat) if shapes[point * 4 + direction] >= FOUR]
+
+    def _store(self, key, value) -> None:
+        if len(self.table) >= TABLE_MAX_ENTRIES:
+            self.table.clear()
+        self.table[key] = value
+
+
+def solve(board: Board, size: int, color: str, allow_overlines: bool = False, kinds: Sequence[str] = (VCF, VCT),
+          max_depth: int = DEFAULT_MAX_DEPTH, max_nodes: int = DEFAULT_MAX_NODES,
+          time_budget_ms: float = DEFAULT_TIME_BUDGET_MS) -> SolverResult:
+    """
+    Look for a forced win for ``color`` in a Gomoku position.
+
+    Args:
+        board: Board as stored in ``board_state['board']`` (not modified)
+        size: Board size
+        color: Colour to move, 'BLACK' or 'WHITE'
+        allow_overlines: Whether six or more in a row wins (the ruleset's setting)
+        kinds: Searches to try in order, ``VCF`` and/or ``VCT``
+        max_depth: Most attacker moves in a winning line
+        max_nodes: Node budget, over all searches
+        time_budget_ms: Time budget, over all searches
+
+    Returns:
+        SolverResult with status ``win``, ``none`` or ``unknown`` (budget spent)
+    """
+    position = Position(board, size, allow_overlines, TranspositionTable(size))
+    return ThreatSolver(position, max_nodes, time_budget_ms).solve(color, kinds, max_depth)
+
+
+def board_from_moves(moves: Sequence[Tuple[int, int, str]], size: int) -> Board:
+    """The board after ``(row, col, color)`` moves (Gomoku has no captures)."""
+    board: Board = [[None] * size for _ in range(size)]
+    for row, col, color in moves:
+        board[row][col] = color
+    return board
+
+
+class ForcedWinScan:
+    """The first forced win found while replaying a game, and what finding it cost."""
+
+    def __init__(self):
+        self.move_number: Optional[int] = None
+        self.result: Optional[SolverResult] = None
+        self.positions = 0
+        self.unknown_positions = 0
+        self.nodes = 0
+        self.elapsed_ms = 0.0
+        # Moves whose positions were solved, and whether the scan reached the end
+        self.scanned = 0
+        self.complete = False
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'move_number': self.move_number,
+            'result': self.result.to_dict() if self.result else None,
+            'positions': self.positions,
+            'unknown_positions': self.unknown_positions,
+            'nodes': self.nodes,
+            'elapsed_ms': round(self.elapsed_ms, 2),
+        }
+
+
+def find_first_forced_win(moves: Sequence[Tuple[int, int, str]], size: int, allow_overlines: bool = False,
+                          kinds: Sequence[str] = (VCF, VCT), max_depth: int = DEFAULT_MAX_DEPTH,
+                          max_nodes: int = SCAN_MAX_NODES, time_budget_ms: float = SCAN_TIME_BUDGET_MS,
+                          scan: Optional[ForcedWinScan] = None,
+                          slice_ms: Optional[float] = None) -> ForcedWinScan:
+    """
+    Replay a game and find the first move after which the side to move had a forced win.
+
+    Args:
+        moves: ``(row, col, color)`` in order (passes are not allowed)
+        size: Board size
+        allow_overlines: The ruleset's overline setting
+        kinds: Searches to try for each position
+        max_depth: Most attacker moves in a winning line
+        max_nodes: Node budget per position
+        time_budget_ms: Time budget per position
+        scan: An unfinished scan to continue; its positions are not solved again
+        slice_ms: Stop after this long and return the unfinished scan, to be
+            continued later (default: scan to the end)
+
+    Returns:
+        ForcedWinScan; ``move_number`` is None when no forced win was found,
+        ``complete`` is False when the slice ran out first
+    """
+    start = time.perf_counter()
+    scan = scan or ForcedWinScan()
+    resumed_at = scan.scanned
+    position = Position(board_from_moves((), size), size, allow_overlines, TranspositionTable(size))
+    solver = ThreatSolver(position, max_nodes, time_budget_ms)
+    for number, (row, col, color) in enumerate(moves, start=1):
+        color_index = COLOR_INDEXES[color]
+        point = row * size + col
+        game_over = position.makes_five(point, color_index)
+        position.place(point, color_index)
+        if game_over:
+            break
+        if number <= scan.scanned:
+            continue
+        if slice_ms is not None and scan.scanned > resumed_at and (time.perf_counter() - start) * 1000 >= slice_ms:
+            return scan
+        result = solver.solve(COLOR_NAMES[1 - color_index], kinds, max_depth)
+        scan.scanned = number
+        scan.positions += 1
+        scan.nodes += result.nodes
+        scan.elapsed_ms += result.elapsed_ms
+        if result.status == UNKNOWN:
+            scan.unknown_positions += 1
+        if result.is_win:
+            scan.move_number = number
+            scan.result = result
+            break
+    scan.complete = True
+    return scan
@@ -0,0 +1,92 @@
+"""
+Management command finding where forced wins first appeared in finished Gomoku games.
+
+Each finished Gomoku game without a ``GameAnalysis`` is replayed through the
+VCF/VCT solver (see ``games.analysis``) and annotated with the first move
+after which the side to move had a forced win. Run it after games finish,
+for example from cron::
+
+    manage.py analyze_forced_wins --limit 500
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games import gomoku_solver
+from games.analysis import analyze_game, gomoku_games
+from games.models import GameStatus
+
+
+class Command(BaseCommand):
+    help = 'Annotate finished Gomoku games with the move where a forced win first appeared'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Analyse at most this many games',
+        )
+        parser.add_argument(
+            '--reanalyze',
+            action='store_true',
+            help='Also analyse games that already have an analysis',
+        )
+        parser.add_argument(
+            '--time-ms',
+            type=float,
+            help='Solver time per position (default: ANALYSIS_SCAN_TIME_MS)',
+        )
+        parser.add_argument(
+            '--max-nodes',
+            type=int,
+            default=gomoku_solver.SCAN_MAX_NODES,
+            help=f'Solver nodes per position (default: {gomoku_solver.SCAN_MAX_NODES})',
+        )
+        parser.add_argument(
+            '--max-depth',
+            type=int,
+            default=gomoku_solver.DEFAULT_MAX_DEPTH,
+            help=f'Most attacker moves in a winning line (default: {gomoku_solver.DEFAULT_MAX_DEPTH})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Games fetched per query (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        if options['max_nodes'] < 1 or options['max_depth'] < 1:
+            raise CommandError('--max-nodes and --max-depth must be positive')
+
+        games = gomoku_games().filter(status=GameStatus.FINISHED).order_by('finished_at')
+        if not options['reanalyze']:
+            games = games.filter(analysis__isnull=True)
+        if options['limit']:
+            games = games[:options['limit']]
+
+        start = time.perf_counter()
+        analysed = forced = unknown = 0
+        for game in games.prefetch_related('ruleset').iterator(chunk_size=options['batch_size']):
+            analysis = analyze_game(
+                game,
+                time_budget_ms=options['time_ms'],
+                max_nodes=options['max_nodes'],
+                max_depth=options['max_depth'],
+            )
+            analysed += 1
+            unknown += analysis.unknown_positions
+            if analysis.forced_win_move is not None:
+                forced += 1
+                self.stdout.write(
+                    f"  {game.pk}: {analysis.forced_win_player} {analysis.forced_win_kind} "
+                    f"after move {analysis.forced_win_move}"
+                )
+        elapsed = time.perf_counter() - start
+
+        rate = analysed / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Analysed {analysed} games in {elapsed:.1f}s ({rate:.1f} games/sec): '
+            f'{forced} with a forced win, {unknown} positions out of budget'
+        ))
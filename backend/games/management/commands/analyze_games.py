@@ -0,0 +1,99 @@
+"""
+Management command annotating the moves of finished games for post-game review.
+
+Each finished game is replayed once on the engines' boards (see
+``games.review``) and every move gets a ``MoveAnnotation``: threats made or
+missed in Gomoku, captures and liberties in Go. Replays run in a process
+pool and annotations are written with ``bulk_create``. With ``--checkpoint``
+the run can be interrupted and continued, and a run from cron only reviews
+the games that finished since the last one::
+
+    manage.py analyze_games --workers 8 --checkpoint /var/lib/gomoku/review.json
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from games.models import GameType
+from games.review import Checkpoint, review_games
+
+
+class Command(BaseCommand):
+    help = 'Annotate the moves of finished games with per-move review metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Replay processes; 0 replays in this process (default: 4)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Games read, replayed and written together (default: 200)',
+        )
+        parser.add_argument(
+            '--bulk-size',
+            type=int,
+            default=1000,
+            help='Annotations per bulk insert (default: 1000)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Review at most this many games',
+        )
+        parser.add_argument(
+            '--game-type',
+            choices=GameType.values,
+            help='Only review games of this type',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='JSON file to continue from and record progress in',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint and review every finished game again',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 0:
+            raise CommandError('--workers cannot be negative')
+        if options['batch_size'] < 1 or options['bulk_size'] < 1:
+            raise CommandError('--batch-size and --bulk-size must be positive')
+
+        if options['restart']:
+            checkpoint = Checkpoint(options['checkpoint'])
+        else:
+            checkpoint = Checkpoint.load(options['checkpoint'])
+            if checkpoint.game_id:
+                self.stdout.write(
+                    f"Continuing after game {checkpoint.game_id} ({checkpoint.games} games reviewed so far)"
+                )
+
+        summary = review_games(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            game_type=options['game_type'],
+            checkpoint=checkpoint,
+            bulk_size=options['bulk_size'],
+        )
+
+        for game_type, totals in summary['game_types'].items():
+            length = totals['length']
+            self.stdout.write(
+                f"  {game_type}: {length['games']} games, length mean {length['mean']} / median {length['median']} "
+                f"/ max {length['max']}; {totals.get('threats', 0)} threat moves, "
+                f"{totals.get('missed_wins', 0)} missed wins, {totals.get('missed_blocks', 0)} missed blocks, "
+                f"{totals.get('captures', 0)} captures, {totals.get('ataris', 0)} ataris, "
+                f"{totals.get('passes', 0)} passes"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Reviewed {summary['games']} games in {summary['elapsed_s']:.1f}s "
+            f"({summary['games_per_s']:.1f} games/sec): {summary['annotations']} moves annotated, "
+            f"{summary['failed']} games could not be replayed"
+        ))
@@ -0,0 +1,168 @@
+"""
+Management command running the engine microbenchmarks.
+
+Replays a seeded corpus of Gomoku and Go games (see ``games.benchmarks``)
+through the engine functions on every board size and reports calls per
+second and peak bytes allocated per call. The games are saved inside a
+transaction that is always rolled back, so nothing is left in the database.
+
+Typical use around an engine change::
+
+    manage.py benchmark_engine --corpus corpus.json --output before.json
+    # ... change the engine ...
+    manage.py benchmark_engine --corpus corpus.json --compare before.json
+"""
+
+import json
+import platform
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from games.benchmarks import (
+    BOARD_SIZES, OPERATIONS, build_corpus, compare_results, create_fixtures,
+    load_corpus, run_benchmarks, save_corpus
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the game engines over a replayed corpus of generated games'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            choices=BOARD_SIZES,
+            default=list(BOARD_SIZES),
+            help='Board sizes to benchmark (default: all)',
+        )
+        parser.add_argument(
+            '--games',
+            type=int,
+            default=3,
+            help='Games of each type generated per board size (default: 3)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the generated corpus (default: 0)',
+        )
+        parser.add_argument(
+            '--corpus',
+            help='Corpus file to replay; generated and written there if it does not exist',
+        )
+        parser.add_argument(
+            '--operations',
+            nargs='+',
+            choices=sorted({op for ops in OPERATIONS.values() for op in ops}),
+            help='Only run these operations',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed rounds per benchmark, the fastest is reported (default: 5)',
+        )
+        parser.add_argument(
+            '--no-memory',
+            action='store_true',
+            help='Skip the allocation measurements',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON results of an earlier run to compare against',
+        )
+
+    def handle(self, *args, **options):
+        corpus_path = Path(options['corpus']) if options['corpus'] else None
+        if corpus_path and corpus_path.exists():
+            try:
+                corpus = load_corpus(corpus_path)
+            except (ValueError, KeyError) as e:
+                raise CommandError(f'Invalid corpus {corpus_path}: {e}')
+            corpus = [game for game in corpus if game.board_size in options['sizes']]
+        else:
+            corpus = build_corpus(options['sizes'], options['games'], options['seed'])
+            if corpus_path:
+                save_corpus(corpus, corpus_path)
+                self.stdout.write(f'Wrote corpus of {len(corpus)} games to {corpus_path}')
+
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+
+        with transaction.atomic():
+            black = User.objects.create_user(username='benchmark-black')
+            white = User.objects.create_user(username='benchmark-white')
+            fixtures = create_fixtures(corpus, black, white)
+            results = run_benchmarks(
+                fixtures,
+                repeat=options['repeat'],
+                measure_memory=not options['no_memory'],
+                operations=options['operations'],
+            )
+            transaction.set_rollback(True)
+
+        report = {
+            'meta': {
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'corpus': str(corpus_path) if corpus_path else None,
+                'seed': options['seed'],
+                'games': len(corpus),
+                'moves': sum(len(game.moves) for game in corpus),
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+
+        self.write_table(results)
+        if baseline is not None:
+            self.write_comparison(compare_results(baseline, results))
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    def write_table(self, results):
+        self.stdout.write(f"{'game':<7} {'operation':<32} {'size':>4} {'calls':>7} {'ops/sec':>12} {'mean us':>10} {'peak B':>9}")
+        for result in results:
+            peak = result['peak_bytes_per_call']
+            self.stdout.write(
+                f"{result['game_type']:<7} {result['operation']:<32} {result['board_size']:>4} "
+                f"{result['calls']:>7} {result['ops_per_sec'] or 0:>12,.0f} {result['mean_us']:>10.2f} "
+                f"{'-' if peak is None else f'{peak:,.0f}':>9}"
+            )
+
+    def write_comparison(self, rows):
+        self.stdout.write('')
+        if not rows:
+            self.stdout.write('No benchmarks in common with the baseline.')
+            return
+        self.stdout.write(self.style.MIGRATE_HEADING('Change against baseline (ops/sec)'))
+        for row in rows:
+            line = (
+                f"{row['game_type']:<7} {row['operation']:<32} {row['board_size']:>4} "
+                f"{row['baseline_ops_per_sec']:>12,.0f} -> {row['ops_per_sec']:>12,.0f}  {row['change_pct']:+.1f}%"
+            )
+            if row['change_pct'] <= -10:
+                line = self.style.ERROR(line)
+            elif row['change_pct'] >= 10:
+                line = self.style.SUCCESS(line)
+            self.stdout.write(line)
@@ -0,0 +1,132 @@
+"""
+Management command seeding a production-sized synthetic data set.
+
+Generates users, friendships, challenges, games and moves in batches with
+``bulk_create`` (see ``games.seeding``). The same ``--seed`` and ``--end``
+always produce the same rows::
+
+    manage.py seed_scale_data --users 200000 --games 500000 --challenges 100000
+
+Generated users share the ``--prefix`` username prefix; ``--delete`` removes
+them, and everything that belongs to them, again.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from games.seeding import ScaleSeeder
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Seed a realistic-scale synthetic data set for database benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=10000,
+            help='Users to create (default: 10000)',
+        )
+        parser.add_argument(
+            '--games',
+            type=int,
+            default=20000,
+            help='Games to create, with their moves (default: 20000)',
+        )
+        parser.add_argument(
+            '--challenges',
+            type=int,
+            default=5000,
+            help='Challenges to create (default: 5000)',
+        )
+        parser.add_argument(
+            '--mean-friends',
+            type=float,
+            default=8,
+            help='Mean friend count of the power-law friend graph (default: 8)',
+        )
+        parser.add_argument(
+            '--gomoku-share',
+            type=float,
+            default=0.7,
+            help='Fraction of games that are Gomoku, the rest are Go (default: 0.7)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Length of the period the data is spread over (default: 365)',
+        )
+        parser.add_argument(
+            '--end',
+            help='End of the period as an ISO date (default: now); fix it for identical timestamps',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per bulk insert and transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed (default: 0)',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='seed-',
+            help="Username prefix of the generated users (default: 'seed-')",
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete previously seeded users (and their games) instead of seeding',
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['delete']:
+            deleted, by_model = User.objects.filter(username__startswith=prefix).delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} rows: {by_model}'))
+            return
+
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Users prefixed '{prefix}' already exist; use --delete or another --prefix")
+        if options['users'] < 2:
+            raise CommandError('At least two users are needed')
+
+        end = None
+        if options['end']:
+            try:
+                end = datetime.fromisoformat(options['end'])
+            except ValueError:
+                raise CommandError(f"Invalid --end date: {options['end']}")
+            if end.tzinfo is None:
+                end = end.replace(tzinfo=dt_timezone.utc)
+
+        seeder = ScaleSeeder(
+            users=options['users'],
+            games=options['games'],
+            challenges=options['challenges'],
+            mean_friends=options['mean_friends'],
+            gomoku_share=options['gomoku_share'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            prefix=prefix,
+            end=end,
+            progress=lambda message: self.stdout.write(f'  {message}'),
+        )
+        counts = seeder.run()
+
+        rows = sum(count for name, count in counts.items() if name != 'seconds')
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {rows:,} rows in {counts['seconds']}s "
+            f"({rows / max(counts['seconds'], 0.1):,.0f} rows/s): "
+            + ', '.join(f'{count:,} {name}' for name, count in counts.items() if name != 'seconds')
+        ))
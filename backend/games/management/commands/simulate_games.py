@@ -0,0 +1,181 @@
+"""
+Management command load-testing the move pipeline with self-play.
+
+Creates synthetic users and games, then plays the games to the end
+concurrently through the service layer (see ``games.simulation``) and
+reports moves per second, per-move latency percentiles, query counts and
+lock waits. Run it against SQLite and PostgreSQL before a release::
+
+    manage.py simulate_games --users 50 --games 2000 --workers 8 --output sim.json
+"""
+
+import json
+import uuid
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from games.models import Game, GameType
+from games.simulation import create_games, create_users, run_simulation
+
+User = get_user_model()
+
+DEFAULT_BOARD_SIZES = {GameType.GOMOKU: 15, GameType.GO: 9}
+
+
+class Command(BaseCommand):
+    help = 'Play synthetic games concurrently through the service layer and report move throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=20,
+            help='Synthetic users to create (default: 20)',
+        )
+        parser.add_argument(
+            '--games',
+            type=int,
+            default=100,
+            help='Games to play (default: 100)',
+        )
+        parser.add_argument(
+            '--game-type',
+            choices=['gomoku', 'go', 'mixed'],
+            default='mixed',
+            help='Type of the games; mixed alternates Gomoku and Go (default: mixed)',
+        )
+        parser.add_argument(
+            '--gomoku-size',
+            type=int,
+            choices=[9, 13, 15, 19, 25],
+            default=DEFAULT_BOARD_SIZES[GameType.GOMOKU],
+            help='Board size of Gomoku games (default: 15)',
+        )
+        parser.add_argument(
+            '--go-size',
+            type=int,
+            choices=[9, 13, 15, 19, 25],
+            default=DEFAULT_BOARD_SIZES[GameType.GO],
+            help='Board size of Go games (default: 9)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Games played at the same time (default: 4)',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['threads', 'processes'],
+            default='threads',
+            help='Run workers as threads or forked processes (default: threads)',
+        )
+        parser.add_argument(
+            '--strategy',
+            choices=['random', 'heuristic'],
+            default='random',
+            help='How moves are chosen (default: random)',
+        )
+        parser.add_argument(
+            '--max-moves',
+            type=int,
+            help='End games after this many moves (default: one per board point)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed for pairings and move choice, for reproducible runs',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete the synthetic users and their games afterwards',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the report as JSON to this file',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('At least two users are needed')
+        if options['games'] < 1:
+            raise CommandError('At least one game is needed')
+
+        game_types = {
+            'gomoku': [GameType.GOMOKU],
+            'go': [GameType.GO],
+            'mixed': [GameType.GOMOKU, GameType.GO],
+        }[options['game_type']]
+        board_sizes = {GameType.GOMOKU: options['gomoku_size'], GameType.GO: options['go_size']}
+
+        prefix = f'sim-{uuid.uuid4().hex[:8]}-'
+        users = create_users(options['users'], prefix)
+        game_ids = create_games(users, options['games'], game_types, board_sizes, seed=options['seed'])
+        self.stdout.write(
+            f"Playing {len(game_ids)} games between {len(users)} users "
+            f"with {options['workers']} {options['mode']} ({options['strategy']} moves)..."
+        )
+
+        try:
+            report = run_simulation(
+                game_ids,
+                workers=options['workers'],
+                mode=options['mode'],
+                strategy=options['strategy'],
+                max_moves=options['max_moves'],
+                seed=options['seed'],
+            )
+        finally:
+            if options['cleanup']:
+                Game.objects.filter(pk__in=game_ids).delete()
+                User.objects.filter(username__startswith=prefix).delete()
+
+        report['users'] = len(users)
+        report['games'] = len(game_ids)
+        report['game_types'] = [str(game_type) for game_type in game_types]
+        report['board_sizes'] = {str(game_type): board_sizes[game_type] for game_type in game_types}
+        self.write_report(report)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Wrote report to {options['output']}"))
+
+    def write_report(self, report):
+        latency = report['latency_ms']
+        locks = report['lock_waits']
+
+        def ms(value):
+            return '-' if value is None else f'{value:.2f}'
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{report['games_finished']}/{report['games']} games, {report['moves']} moves "
+            f"in {report['elapsed_s']:.1f}s on {report['vendor']} ({report['mode']}, {report['workers']} workers)"
+        ))
+        self.stdout.write(f"  moves/sec         {report['moves_per_sec'] or 0:,.1f}")
+        self.stdout.write(
+            f"  latency ms        p50 {ms(latency['p50'])}  p95 {ms(latency['p95'])}  "
+            f"p99 {ms(latency['p99'])}  max {ms(latency['max'])}"
+        )
+        self.stdout.write(
+            f"  queries           {report['queries']:,} ({report['queries_per_move'] or 0:.1f} per move, "
+            f"{report['db_ms']:,.0f} ms in the database)"
+        )
+        self.stdout.write(
+            f"  lock waits        total {locks['total_ms']:,.1f} ms  p95 {ms(locks['p95_ms'])}  max {ms(locks['max_ms'])}"
+        )
+        self.stdout.write(
+            f"  conflicts         {locks['conflicts']} retried, {locks['commit_failures']} failed, "
+            f"{locks['lock_errors']} lock timeouts"
+        )
+        self.stdout.write(f"  rejected moves    {report['rejected_moves']}")
+        if 'pg_locks' in locks:
+            self.stdout.write(
+                f"  pg_locks waiting  max {locks['pg_locks']['max_waiting']}  "
+                f"mean {locks['pg_locks']['mean_waiting']} ({locks['pg_locks']['samples']} samples)"
+            )
+        if report['errors']:
+            errors = ', '.join(f'{name} {count}' for name, count in sorted(report['errors'].items()))
+            self.stdout.write(self.style.WARNING(f'  errors            {errors}'))
@@ -2,7 +2,7 @@
 Game models for the Gomoku system.
 
 This module defines all game-related models including RuleSet, Game, GameMove,
-PlayerSession, GameEvent, and Challenge models.
+GameAnalysis, PlayerSession, GameEvent, and Challenge models.
 """
 
 import uuid
@@ -242,6 +242,11 @@ class Game(models.Model):
         help_text="Number of moves made"
     )
     
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Optimistic concurrency version, bumped on every write"
+    )
+    
     started_at = models.DateTimeField(
         null=True,
         blank=True,
@@ -276,6 +281,14 @@ class Game(models.Model):
         game_type = self.ruleset.get_game_type_display()
         return f"{game_type} Game {self.id}: {self.black_player} vs {self.white_player}"
     
+    def save(self, *args, **kwargs):
+        """Save the game, bumping ``version`` so concurrent optimistic commits conflict."""
+        self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'version' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['version']
+        super().save(*args, **kwargs)
+    
     def initialize_board(self):
         """Initialize board using the appropriate state manager."""
         from .state_managers import StateManagerFactory
@@ -295,15 +308,21 @@ class Game(models.Model):
     
     def finish_game(self, winner=None):
         """Finish the game with optional winner."""
+        self.mark_finished(winner)
+        self.save()
+        self.update_player_stats()
+    
+    def mark_finished(self, winner=None):
+        """Set the finished state in memory without saving."""
         self.status = GameStatus.FINISHED
         self.finished_at = timezone.now()
         self.winner = winner
-        self.save()
-        
-        # Update player statistics
-        if winner:
-            winner.update_game_stats(won=True)
-            loser = self.white_player if winner == self.black_player else self.black_player
+    
+    def update_player_stats(self):
+        """Record the result of a finished game in both players' statistics."""
+        if self.winner:
+            self.winner.update_game_stats(won=True)
+            loser = self.white_player if self.winner == self.black_player else self.black_player
             loser.update_game_stats(won=False)
     
     def get_current_player_user(self):
@@ -402,6 +421,168 @@ class GameMove(models.Model):
         return f"Move {self.move_number} in {self.game_id}: ({self.row}, {self.col})"
 
 
+class GameAnalysis(models.Model):
+    """
+    GameAnalysis model storing the forced-win analysis of a finished game.
+    
+    Written by games.analysis: the first move after which the side to move
+    had a forced win (VCF or VCT), and the winning line the solver found.
+    """
+    
+    game = models.OneToOneField(
+        Game,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='analysis',
+        help_text="Analysed game"
+    )
+    
+    forced_win_move = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Move after which the side to move first had a forced win"
+    )
+    
+    forced_win_player = models.CharField(
+        max_length=5,
+        choices=Player.choices,
+        blank=True,
+        help_text="Color that had the forced win"
+    )
+    
+    forced_win_kind = models.CharField(
+        max_length=3,
+        blank=True,
+        help_text="VCF (continuous fours) or VCT (continuous threats)"
+    )
+    
+    forced_win_sequence = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Winning line as [row, col, color] moves"
+    )
+    
+    positions_searched = models.PositiveIntegerField(
+        default=0,
+        help_text="Positions the solver searched"
+    )
+    
+    unknown_positions = models.PositiveIntegerField(
+        default=0,
+        help_text="Positions whose search ran out of budget"
+    )
+    
+    nodes = models.PositiveIntegerField(
+        default=0,
+        help_text="Solver nodes over all positions"
+    )
+    
+    elapsed_ms = models.FloatField(
+        default=0,
+        help_text="Solver time over all positions"
+    )
+    
+    analyzed_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True
+    )
+    
+    class Meta:
+        db_table = 'game_analyses'
+        verbose_name = 'Game Analysis'
+        verbose_name_plural = 'Game Analyses'
+        ordering = ['-analyzed_at']
+    
+    def __str__(self):
+        if self.forced_win_move is None:
+            return f"Analysis of {self.game_id}: no forced win"
+        return f"Analysis of {self.game_id}: {self.forced_win_player} {self.forced_win_kind} after move {self.forced_win_move}"
+
+
+class MoveAnnotation(models.Model):
+    """
+    MoveAnnotation model storing post-game review metrics of one move.
+    
+    Written in bulk by games.review (``manage.py analyze_games``) from a
+    single replay of the finished game: the threats a Gomoku move made or
+    missed, and the captures and liberties of a Go move.
+    """
+    
+    game = models.ForeignKey(
+        Game,
+        on_delete=models.CASCADE,
+        related_name='annotations',
+        help_text="Game this move belongs to"
+    )
+    
+    move_number = models.PositiveIntegerField(
+        help_text="Sequential move number"
+    )
+    
+    player_color = models.CharField(
+        max_length=5,
+        choices=Player.choices,
+        help_text="Color of the player making the move"
+    )
+    
+    row = models.IntegerField(
+        help_text="Row position (0-based), -1 for pass move"
+    )
+    
+    col = models.IntegerField(
+        help_text="Column position (0-based), -1 for pass move"
+    )
+    
+    threat = models.CharField(
+        max_length=10,
+        blank=True,
+        help_text="Strongest line the move made (Gomoku): five, open_four, four or open_three"
+    )
+    
+    threats_created = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Lines on which the move made an open three or better (Gomoku)"
+    )
+    
+    missed_win = models.BooleanField(
+        default=False,
+        help_text="The player could have made five and did not (Gomoku)"
+    )
+    
+    missed_block = models.BooleanField(
+        default=False,
+        help_text="The opponent could make five next and the move did not stop it (Gomoku)"
+    )
+    
+    captures = models.PositiveIntegerField(
+        default=0,
+        help_text="Opponent stones the move captured (Go)"
+    )
+    
+    liberties = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Liberties of the chain the move joined (Go, none for a pass)"
+    )
+    
+    ataris = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Opponent chains the move left in atari (Go)"
+    )
+    
+    class Meta:
+        db_table = 'move_annotations'
+        verbose_name = 'Move Annotation'
+        verbose_name_plural = 'Move Annotations'
+        ordering = ['game', 'move_number']
+        unique_together = [
+            ['game', 'move_number']
+        ]
+    
+    def __str__(self):
+        return f"Annotation of move {self.move_number} in {self.game_id}"
+
+
 class SessionStatus(models.TextChoices):
     """Enumeration of session statuses."""
     ONLINE = 'ONLINE', 'Online'
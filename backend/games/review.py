@@ -0,0 +1,373 @@
+"""
+Post-game review: per-move metrics of finished games, computed in bulk.
+
+``review_games`` streams finished games in ``(finished_at, id)`` order, reads
+the moves of each batch of games with one ``values_list`` query and replays
+every game once on the engines' own boards, never through the game services:
+
+* Gomoku on ``games.gomoku_ai.Position``, whose cached line shapes give the
+  line each move made (``threat``, ``threats_created``), and with
+  ``games.gomoku_solver.Threats``, whether the player had a five and did not
+  play it (``missed_win``) or let the opponent keep a five (``missed_block``).
+* Go on ``games.go_ai.GoBoard``: stones captured, liberties of the chain the
+  move joined and opponent chains left in atari.
+
+Replays are plain data in, plain data out, so batches are farmed out to a
+process pool (started with ``spawn``, like the compute workers) while this
+process reads the next batches and writes the finished ones with
+``bulk_create``. A batch replaces the annotations of its games in one
+transaction, so running it twice is harmless.
+
+With a checkpoint file the cursor of the last written batch is saved after
+each batch, and the next run carries on from there: an interrupted run
+loses at most the batches in flight, and a run from cron only reviews games
+that finished since the last one. ``manage.py analyze_games`` is the
+command line.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .compute import _start_worker
+from .models import Game, GameMove, GameStatus, GameType, GomokuRuleSet, GoRuleSet, MoveAnnotation
+
+logger = logging.getLogger(__name__)
+
+# Order of the values in an annotation tuple; the MoveAnnotation fields
+FIELDS = (
+    'move_number', 'player_color', 'row', 'col', 'threat', 'threats_created', 'missed_win', 'missed_block',
+    'captures', 'liberties', 'ataris',
+)
+
+# Batches handed to the pool per worker, so workers never wait for the reader
+BATCHES_PER_WORKER = 2
+
+Moves = Sequence[Tuple[int, int, int, str]]
+
+
+def annotate_gomoku(moves: Moves, size: int, allow_overlines: bool = False) -> List[tuple]:
+    """
+    Replay a Gomoku game and annotate each move.
+
+    Args:
+        moves: ``(move_number, row, col, color)`` in order
+        size: Board size
+        allow_overlines: The ruleset's overline setting
+
+    Returns:
+        An annotation tuple (see ``FIELDS``) per move
+    """
+    from .gomoku_ai import OPEN_THREE, Position, get_table
+    from .gomoku_solver import COLOR_INDEXES, Threats
+
+    threat_names = dict(zip(range(OPEN_THREE, OPEN_THREE + 4), ('open_three', 'four', 'open_four', 'five')))
+    position = Position([[None] * size for _ in range(size)], size, allow_overlines, get_table(size, allow_overlines))
+    annotations = []
+    for number, row, col, color in moves:
+        if row < 0:
+            annotations.append((number, color, row, col, '', 0, False, False, 0, None, 0))
+            continue
+        me = COLOR_INDEXES[color]
+        point = row * size + col
+        # The shapes of the empty point are the lines a stone there makes
+        shapes = position.shapes[me][point * 4:point * 4 + 4]
+        best = max(shapes)
+        own_fives = Threats(position, me).fives
+        their_fives = Threats(position, 1 - me).fives
+        annotations.append((
+            number, color, row, col,
+            threat_names.get(best, ''),
+            sum(1 for shape in shapes if shape >= OPEN_THREE),
+            bool(own_fives) and point not in own_fives,
+            bool(their_fives) and point not in their_fives and point not in own_fives,
+            0, None, 0,
+        ))
+        position.place(point, me)
+    return annotations
+
+
+def annotate_go(moves: Moves, size: int) -> List[tuple]:
+    """
+    Replay a Go game and annotate each move.
+
+    Args:
+        moves: ``(move_number, row, col, color)`` in order, passes as ``(-1, -1)``
+        size: Board size
+
+    Returns:
+        An annotation tuple (see ``FIELDS``) per move
+    """
+    from .go_ai import COLORS, PASS, GoBoard
+
+    board = GoBoard(size)
+    annotations = []
+    for number, row, col, color in moves:
+        board.to_move = COLORS[color]
+        if row < 0:
+            board.play(PASS)
+            annotations.append((number, color, row, col, '', 0, False, False, 0, None, 0))
+            continue
+        point = board.point(row, col)
+        empties = len(board.empties)
+        board.play(point)
+        cells, width = board.cells, board.width
+        liberties = {
+            n for stone in board.chain(point)
+            for n in (stone - width, stone - 1, stone + 1, stone + width) if cells[n] == 0
+        }
+        opponent = 3 - COLORS[color]
+        in_atari = {
+            board.head[n] for n in board.neighbours(point)
+            if cells[n] == opponent and board.atari_point(n) != PASS
+        }
+        annotations.append((
+            number, color, row, col, '', 0, False, False,
+            # One point filled, the captured stones freed
+            len(board.empties) - empties + 1, len(liberties), len(in_atari),
+        ))
+    return annotations
+
+
+def annotate_games(games: List[Tuple[str, str, int, bool, Moves]]) -> List[Tuple[str, Optional[List[tuple]]]]:
+    """
+    Worker entry point: replay a batch of games.
+
+    Args:
+        games: ``(game_id, game_type, board_size, allow_overlines, moves)``
+
+    Returns:
+        ``(game_id, annotations)`` per game; annotations are None when the
+        stored moves could not be replayed
+    """
+    results = []
+    for game_id, game_type, size, allow_overlines, moves in games:
+        try:
+            if game_type == GameType.GO:
+                annotations = annotate_go(moves, size)
+            else:
+                annotations = annotate_gomoku(moves, size, allow_overlines)
+        except Exception as e:
+            logger.warning(f"Could not replay game {game_id}: {e}")
+            annotations = None
+        results.append((game_id, annotations))
+    return results
+
+
+class Checkpoint:
+    """Cursor of the last reviewed game and the run totals, kept in a JSON file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.finished_at = None
+        self.game_id: Optional[str] = None
+        self.games = 0
+        self.annotations = 0
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'Checkpoint':
+        """The checkpoint in ``path``, or a fresh one if there is no such file."""
+        checkpoint = cls(path)
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            checkpoint.finished_at = parse_datetime(data['finished_at'])
+            checkpoint.game_id = data['game_id']
+            checkpoint.games = data.get('games', 0)
+            checkpoint.annotations = data.get('annotations', 0)
+        return checkpoint
+
+    def advance(self, finished_at, game_id: str, games: int, annotations: int) -> None:
+        """Move the cursor past a written batch and save it."""
+        self.finished_at = finished_at
+        self.game_id = game_id
+        self.games += games
+        self.annotations += annotations
+        if not self.path:
+            return
+        # Written aside and renamed, so a crash never leaves half a file
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({
+                'finished_at': finished_at.isoformat(),
+                'game_id': game_id,
+                'games': self.games,
+                'annotations': self.annotations,
+            }, f)
+        os.replace(temporary, self.path)
+
+    def remaining(self, games):
+        """Restrict a ``(finished_at, id)``-ordered queryset to the games after the cursor."""
+        if self.game_id is None:
+            return games
+        return games.filter(
+            Q(finished_at__gt=self.finished_at) | Q(finished_at=self.finished_at, id__gt=self.game_id)
+        )
+
+
+class ReviewStats:
+    """Totals of a review run, with game lengths per game type."""
+
+    def __init__(self):
+        self.games = 0
+        self.failed = 0
+        self.annotations = 0
+        self.lengths: Dict[str, Counter] = {}
+        self.counts: Dict[str, Counter] = {}
+
+    def add(self, game_type: str, annotations: List[tuple]) -> None:
+        self.games += 1
+        self.annotations += len(annotations)
+        self.lengths.setdefault(game_type, Counter())[len(annotations)] += 1
+        counts = self.counts.setdefault(game_type, Counter())
+        for values in annotations:
+            if values[2] < 0:
+                counts['passes'] += 1
+            counts['threats'] += values[5] > 0
+            counts['missed_wins'] += values[6]
+            counts['missed_blocks'] += values[7]
+            counts['captures'] += values[8]
+            counts['ataris'] += values[10]
+
+    @staticmethod
+    def _length_stats(lengths: Counter) -> Dict[str, Any]:
+        games = sum(lengths.values())
+        ordered = sorted(lengths.elements())
+        return {
+            'games': games,
+            'mean': round(sum(length * count for length, count in lengths.items()) / games, 1),
+            'median': ordered[games // 2],
+            'min': ordered[0],
+            'max': ordered[-1],
+        }
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            'games': self.games,
+            'failed': self.failed,
+            'annotations': self.annotations,
+            'elapsed_s': round(elapsed, 2),
+            'games_per_s': round(self.games / elapsed, 1) if elapsed > 0 else 0.0,
+            'game_types': {
+                game_type: {'length': self._length_stats(lengths), **self.counts[game_type]}
+                for game_type, lengths in sorted(self.lengths.items())
+            },
+        }
+
+
+def _rulesets() -> Dict[Tuple[int, int], Tuple[str, int, bool]]:
+    """``(content type id, ruleset id)`` -> ``(game type, board size, allow_overlines)`` for every ruleset."""
+    rulesets = {}
+    gomoku_type = ContentType.objects.get_for_model(GomokuRuleSet).id
+    for ruleset_id, size, allow_overlines in GomokuRuleSet.objects.values_list('id', 'board_size', 'allow_overlines'):
+        rulesets[(gomoku_type, ruleset_id)] = (GameType.GOMOKU, size, allow_overlines)
+    go_type = ContentType.objects.get_for_model(GoRuleSet).id
+    for ruleset_id, size in GoRuleSet.objects.values_list('id', 'board_size'):
+        rulesets[(go_type, ruleset_id)] = (GameType.GO, size, False)
+    return rulesets
+
+
+def _batches(games, batch_size: int) -> Iterator[Tuple[list, Any, str]]:
+    """Batches of games to replay with their moves, and the cursor of each batch's last game."""
+    rulesets = _rulesets()
+    rows = games.values_list('id', 'finished_at', 'ruleset_content_type_id', 'ruleset_object_id')
+    batch: list = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield _with_moves(batch, rulesets), batch[-1][1], str(batch[-1][0])
+            batch = []
+    if batch:
+        yield _with_moves(batch, rulesets), batch[-1][1], str(batch[-1][0])
+
+
+def _with_moves(rows: list, rulesets) -> List[Tuple[str, str, int, bool, list]]:
+    moves: Dict[Any, list] = {row[0]: [] for row in rows}
+    stored = GameMove.objects.filter(game_id__in=list(moves)).order_by('game_id', 'move_number')
+    for game_id, number, row, col, color in stored.values_list('game_id', 'move_number', 'row', 'col', 'player_color'):
+        moves[game_id].append((number, row, col, color))
+    return [
+        (str(game_id), *rulesets[(content_type, ruleset_id)], moves[game_id])
+        for game_id, _, content_type, ruleset_id in rows
+    ]
+
+
+def _write(batch: list, results: List[Tuple[str, Optional[List[tuple]]]], stats: ReviewStats,
+           bulk_size: int) -> int:
+    """Replace the annotations of a batch's games; returns the number written."""
+    game_types = {game[0]: game[1] for game in batch}
+    annotations = []
+    for game_id, values in results:
+        if values is None:
+            stats.failed += 1
+            continue
+        stats.add(game_types[game_id], values)
+        annotations.extend(MoveAnnotation(game_id=game_id, **dict(zip(FIELDS, row))) for row in values)
+    with transaction.atomic():
+        MoveAnnotation.objects.filter(game_id__in=list(game_types)).delete()
+        MoveAnnotation.objects.bulk_create(annotations, batch_size=bulk_size)
+    return len(annotations)
+
+
+def review_games(workers: int = 4, batch_size: int = 200, limit: Optional[int] = None,
+                 game_type: Optional[str] = None, checkpoint: Optional[Checkpoint] = None,
+                 bulk_size: int = 1000) -> Dict[str, Any]:
+    """
+    Annotate the moves of finished games.
+
+    Args:
+        workers: Replay processes; 0 replays in this process
+        batch_size: Games read, replayed and written together
+        limit: Review at most this many games
+        game_type: Only review games of this ``GameType``
+        checkpoint: Where to start and to record progress (default: from the
+            first finished game, without recording)
+        bulk_size: Annotations per INSERT
+
+    Returns:
+        ``ReviewStats.summary`` of the run: games, failures, annotations,
+        games per second and, per game type, length stats and metric totals
+    """
+    checkpoint = checkpoint or Checkpoint()
+    games = Game.objects.filter(status=GameStatus.FINISHED, finished_at__isnull=False)
+    if game_type:
+        model = GoRuleSet if game_type == GameType.GO else GomokuRuleSet
+        games = games.filter(ruleset_content_type=ContentType.objects.get_for_model(model))
+    games = checkpoint.remaining(games).order_by('finished_at', 'id')
+    if limit:
+        games = games[:limit]
+
+    stats = ReviewStats()
+    start = time.perf_counter()
+
+    def written(batch, results, finished_at, game_id):
+        count = _write(batch, results, stats, bulk_size)
+        checkpoint.advance(finished_at, game_id, len(batch), count)
+
+    if not workers:
+        for batch, finished_at, game_id in _batches(games, batch_size):
+            written(batch, annotate_games(batch), finished_at, game_id)
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_start_worker) as pool:
+            # Written in order, so the checkpoint never passes a batch still in flight
+            in_flight: deque = deque()
+            for batch, finished_at, game_id in _batches(games, batch_size):
+                in_flight.append((batch, pool.submit(annotate_games, batch), finished_at, game_id))
+                if len(in_flight) >= workers * BATCHES_PER_WORKER:
+                    batch, future, finished_at, game_id = in_flight.popleft()
+                    written(batch, future.result(), finished_at, game_id)
+            while in_flight:
+                batch, future, finished_at, game_id = in_flight.popleft()
+                written(batch, future.result(), finished_at, game_id)
+    return stats.summary(time.perf_counter() - start)
@@ -0,0 +1,403 @@
+"""
+Bulk synthetic data for realistic-scale database benchmarks.
+
+``ScaleSeeder`` generates users, friendships, challenges, games and their
+moves with ``bulk_create`` in batches, from a single seeded random generator,
+so the same options always produce the same rows. Distributions are shaped
+after a live site rather than uniform:
+
+* friend counts follow a power law (configuration model over Pareto degrees),
+* player activity is Pareto-weighted, giving a long tail of game histories
+  where a few users have played thousands of games and most only a handful,
+* game creation times lean towards the recent end of the seeded period, and
+  recent games are more likely to still be active.
+
+Timestamps (``created_at``, ``updated_at``, ``date_joined``...) are written
+explicitly by switching off ``auto_now``/``auto_now_add`` while seeding.
+Moves are distinct random points, so positions are realistic in size and
+shape but not played out with Go captures; they are meant for query, index
+and admin benchmarks, not for engine tests.
+
+``manage.py seed_scale_data`` is the command-line entry point.
+"""
+
+import bisect
+import copy
+import math
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from web.models import Friendship, FriendshipStatus
+from .models import (
+    Challenge, ChallengeStatus, Game, GameMove, GameStatus, GameType, GomokuRuleSet, GoRuleSet, Player
+)
+from .simulation import get_ruleset
+from .state_managers import StateManagerFactory
+
+User = get_user_model()
+
+# Status mixes, as (value, weight)
+FRIENDSHIP_STATUSES = (
+    (FriendshipStatus.ACCEPTED, 85), (FriendshipStatus.PENDING, 10),
+    (FriendshipStatus.REJECTED, 3), (FriendshipStatus.BLOCKED, 2),
+)
+CHALLENGE_STATUSES = (
+    (ChallengeStatus.ACCEPTED, 50), (ChallengeStatus.REJECTED, 20), (ChallengeStatus.PENDING, 15),
+    (ChallengeStatus.EXPIRED, 10), (ChallengeStatus.CANCELLED, 5),
+)
+# Shape of the Pareto distributions (lower is a heavier tail)
+FRIEND_DEGREE_ALPHA = 2.0
+ACTIVITY_ALPHA = 1.2
+# Share of games played against a friend when the player has any
+FRIEND_GAME_SHARE = 0.7
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let ``bulk_create`` write the given values of ``auto_now``/``auto_now_add`` fields."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ScaleSeeder:
+    """
+    Generates a production-sized data set.
+
+    Args:
+        users: Users to create
+        games: Games to create (moves are generated for each)
+        challenges: Challenges to create
+        mean_friends: Target mean friend count
+        gomoku_share: Fraction of games that are Gomoku, the rest are Go
+        days: Length of the seeded period, ending at ``end``
+        batch_size: Rows per ``bulk_create`` batch and per transaction
+        seed: Seed of the random generator
+        prefix: Username prefix of the generated users
+        end: End of the seeded period (default: now); fix it for identical timestamps
+        progress: Optional callable receiving progress messages
+    """
+
+    def __init__(self, users: int = 1000, games: int = 2000, challenges: int = 500, mean_friends: float = 8,
+                 gomoku_share: float = 0.7, days: int = 365, batch_size: int = 5000, seed: int = 0,
+                 prefix: str = 'seed-', end: Optional[datetime] = None,
+                 progress: Optional[Callable[[str], None]] = None):
+        self.user_count = users
+        self.game_count = games
+        self.challenge_count = challenges
+        self.mean_friends = mean_friends
+        self.gomoku_share = gomoku_share
+        self.days = days
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.end = end or datetime.now(dt_timezone.utc).replace(microsecond=0)
+        self.start = self.end - timedelta(days=days)
+        self.progress = progress or (lambda message: None)
+        self.rng = random.Random(seed)
+
+        self.user_ids: List[int] = []
+        self.friendships: List[tuple] = []
+        self.friends: Dict[int, List[int]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def run(self) -> Dict[str, int]:
+        """Create everything; returns the number of rows created per model."""
+        started = time.perf_counter()
+        with explicit_timestamps(User, Friendship, Challenge, Game, GameMove):
+            rulesets = self.rulesets()
+            self.user_ids = self.allocate_user_ids()
+            self.plan_friendships()
+            weights = [self.rng.paretovariate(ACTIVITY_ALPHA) for _ in range(self.user_count)]
+            plan, stats = self.plan_games(weights, rulesets)
+            self.create_users(stats)
+            self.create_friendships()
+            self.create_games(plan, rulesets)
+            self.create_challenges(rulesets)
+        self.reset_sequences()
+        self.counts['seconds'] = round(time.perf_counter() - started, 1)
+        return self.counts
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def moment(self, recent_bias: bool = True) -> datetime:
+        """A time in the seeded period; with ``recent_bias`` later times are more likely."""
+        fraction = 1 - self.rng.random() ** 2 if recent_bias else self.rng.random()
+        return self.start + timedelta(seconds=int(fraction * self.days * 86400))
+
+    def rulesets(self) -> Dict[str, list]:
+        """Existing rulesets per game type, creating standard ones when there are none."""
+        rulesets = {
+            GameType.GOMOKU: list(GomokuRuleSet.objects.order_by('id')) or [get_ruleset(GameType.GOMOKU, 15)],
+            GameType.GO: list(GoRuleSet.objects.order_by('id')) or [get_ruleset(GameType.GO, 19), get_ruleset(GameType.GO, 9)],
+        }
+        self.content_types = {
+            game_type: ContentType.objects.get_for_model(items[0]) for game_type, items in rulesets.items()
+        }
+        self.board_templates = {}
+        for game_type, items in rulesets.items():
+            manager = StateManagerFactory.get_manager(game_type)
+            for ruleset in items:
+                self.board_templates[(game_type, ruleset.id)] = manager.initialize_board(Game(ruleset=ruleset))
+        return rulesets
+
+    def plan_games(self, weights: List[float], rulesets: Dict[str, list]):
+        """
+        Decide players, outcome and length of every game before any row is written.
+
+        Args:
+            weights: Activity weight of each user
+            rulesets: Rulesets per game type
+
+        Returns:
+            (plan, stats): one tuple per game and per-user (played, won) counts
+        """
+        cumulative = list(accumulate(weights))
+        total = cumulative[-1]
+        stats = [[0, 0] for _ in range(self.user_count)]
+        plan = []
+        for _ in range(self.game_count):
+            black = bisect.bisect_left(cumulative, self.rng.random() * total)
+            friends = self.friends.get(black)
+            if friends and self.rng.random() < FRIEND_GAME_SHARE:
+                white = self.rng.choice(friends)
+            else:
+                white = black
+                while white == black:
+                    white = bisect.bisect_left(cumulative, self.rng.random() * total)
+            if self.rng.random() < 0.5:
+                black, white = white, black
+
+            game_type = GameType.GOMOKU if self.rng.random() < self.gomoku_share else GameType.GO
+            ruleset = self.rng.choice(rulesets[game_type])
+            cells = ruleset.board_size * ruleset.board_size
+            created = self.moment()
+            age_days = (self.end - created).total_seconds() / 86400
+            roll = self.rng.random()
+            if roll < (0.5 if age_days < 1 else 0.02):
+                status = GameStatus.ACTIVE
+            elif roll < (0.55 if age_days < 1 else 0.05):
+                status = GameStatus.ABANDONED
+            else:
+                status = GameStatus.FINISHED
+
+            if game_type == GameType.GOMOKU:
+                moves = int(self.rng.lognormvariate(math.log(25), 0.5))
+            else:
+                moves = int(cells * self.rng.uniform(0.3, 0.8))
+            if status != GameStatus.FINISHED:
+                moves = int(moves * self.rng.random())
+            elif game_type == GameType.GOMOKU:
+                moves = max(moves, 9)
+            moves = max(1, min(moves, cells))
+
+            # Gomoku is won by the last move; Go by either player, or drawn
+            winner = None
+            if status == GameStatus.FINISHED:
+                if game_type == GameType.GOMOKU:
+                    winner = black if moves % 2 else white
+                elif self.rng.random() < 0.95:
+                    winner = self.rng.choice((black, white))
+                if winner is not None:
+                    stats[black][0] += 1
+                    stats[white][0] += 1
+                    stats[winner][1] += 1
+            plan.append((game_type, ruleset, black, white, status, created, moves, winner))
+        return plan, stats
+
+    def allocate_user_ids(self) -> List[int]:
+        """Explicit primary keys, so games can be planned before users are inserted."""
+        first = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        return list(range(first, first + self.user_count))
+
+    def plan_friendships(self) -> None:
+        """Pair users by power-law degrees; accepted pairs are also kept as ``self.friends``."""
+        scale = self.mean_friends * (FRIEND_DEGREE_ALPHA - 1) / FRIEND_DEGREE_ALPHA
+        cap = max(0, self.user_count - 1)
+        stubs = []
+        for index in range(self.user_count):
+            stubs.extend([index] * min(cap, int(scale * self.rng.paretovariate(FRIEND_DEGREE_ALPHA))))
+        self.rng.shuffle(stubs)
+
+        statuses, status_weights = zip(*FRIENDSHIP_STATUSES)
+        seen = set()
+        self.friendships = []
+        for a, b in zip(stubs[::2], stubs[1::2]):
+            if a == b or (a, b) in seen or (b, a) in seen:
+                continue
+            seen.add((a, b))
+            status = self.rng.choices(statuses, status_weights)[0]
+            self.friendships.append((a, b, status))
+            if status == FriendshipStatus.ACCEPTED:
+                self.friends.setdefault(a, []).append(b)
+                self.friends.setdefault(b, []).append(a)
+
+    def batches(self, items: list):
+        for offset in range(0, len(items), self.batch_size):
+            yield items[offset:offset + self.batch_size]
+
+    def bulk_insert(self, model, objects: list) -> None:
+        for batch in self.batches(objects):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(objects)
+
+    def create_users(self, stats) -> None:
+        password = make_password(None)
+        users = []
+        for index, user_id in enumerate(self.user_ids):
+            joined = self.start - timedelta(seconds=self.rng.randrange(365 * 86400))
+            played, won = stats[index]
+            users.append(User(
+                id=user_id,
+                username=f'{self.prefix}{index}',
+                password=password,
+                display_name=f'Player {index}',
+                date_joined=joined,
+                last_login=self.moment() if played else None,
+                games_played=played,
+                games_won=won,
+            ))
+        self.bulk_insert(User, users)
+        self.progress(f'{len(users)} users')
+
+    def create_friendships(self) -> None:
+        friendships = []
+        for a, b, status in self.friendships:
+            created = self.moment(recent_bias=False)
+            friendships.append(Friendship(
+                requester_id=self.user_ids[a],
+                addressee_id=self.user_ids[b],
+                status=status,
+                created_at=created,
+                updated_at=created if status == FriendshipStatus.PENDING else created + timedelta(hours=self.rng.randrange(1, 72)),
+            ))
+        self.bulk_insert(Friendship, friendships)
+        self.progress(f'{len(friendships)} friendships')
+
+    def create_games(self, plan, rulesets) -> None:
+        """Insert games and their moves a batch of games at a time."""
+        created_moves = 0
+        for batch in self.batches(plan):
+            games, moves = [], []
+            for game_type, ruleset, black, white, status, created, move_total, winner in batch:
+                game, game_moves = self.build_game(game_type, ruleset, black, white, status, created, move_total, winner)
+                games.append(game)
+                moves.extend(game_moves)
+            with transaction.atomic():
+                Game.objects.bulk_create(games, batch_size=self.batch_size)
+                GameMove.objects.bulk_create(moves, batch_size=self.batch_size)
+            created_moves += len(moves)
+            self.counts['Game'] = self.counts.get('Game', 0) + len(games)
+            self.progress(f"{self.counts['Game']} games, {created_moves} moves")
+        self.counts['GameMove'] = created_moves
+
+    def build_game(self, game_type, ruleset, black, white, status, created, move_total, winner):
+        size = ruleset.board_size
+        board_state = copy.deepcopy(self.board_templates[(game_type, ruleset.id)])
+        board = board_state['board']
+        game = Game(
+            id=self.uuid(),
+            black_player_id=self.user_ids[black],
+            white_player_id=self.user_ids[white],
+            ruleset_content_type=self.content_types[game_type],
+            ruleset_object_id=ruleset.id,
+            status=status,
+            move_count=move_total,
+            version=move_total,
+            created_at=created,
+            started_at=created,
+        )
+
+        moves = []
+        moment = created
+        for number, point in enumerate(self.rng.sample(range(size * size), move_total), start=1):
+            row, col = divmod(point, size)
+            color = Player.BLACK if number % 2 else Player.WHITE
+            moment += timedelta(seconds=self.rng.randrange(2, 60))
+            board[row][col] = color.value
+            moves.append(GameMove(
+                game_id=game.id,
+                player_id=game.black_player_id if color == Player.BLACK else game.white_player_id,
+                move_number=number,
+                row=row,
+                col=col,
+                player_color=color,
+                is_winning_move=game_type == GameType.GOMOKU and winner is not None and number == move_total,
+                created_at=moment,
+            ))
+
+        last_color = Player.BLACK if move_total % 2 else Player.WHITE
+        board_state.update(
+            move_count=move_total,
+            last_move={'row': moves[-1].row, 'col': moves[-1].col, 'player': last_color.value},
+            game_over=status != GameStatus.ACTIVE,
+        )
+        game.board_state = board_state
+        game.current_player = Player.WHITE if last_color == Player.BLACK else Player.BLACK
+        game.updated_at = moment
+        if status != GameStatus.ACTIVE:
+            game.finished_at = moment
+        if winner is not None:
+            game.winner_id = self.user_ids[winner]
+        return game, moves
+
+    def create_challenges(self, rulesets) -> None:
+        statuses, status_weights = zip(*CHALLENGE_STATUSES)
+        accepted = [(a, b) for a, b, status in self.friendships if status == FriendshipStatus.ACCEPTED]
+        challenges = []
+        for _ in range(self.challenge_count):
+            if accepted:
+                challenger, challenged = self.rng.choice(accepted)
+            else:
+                challenger, challenged = self.rng.sample(range(self.user_count), 2)
+            if self.rng.random() < 0.5:
+                challenger, challenged = challenged, challenger
+            game_type = GameType.GOMOKU if self.rng.random() < self.gomoku_share else GameType.GO
+            status = self.rng.choices(statuses, status_weights)[0]
+            created = self.moment()
+            responded = None
+            if status in (ChallengeStatus.ACCEPTED, ChallengeStatus.REJECTED, ChallengeStatus.CANCELLED):
+                responded = created + timedelta(seconds=self.rng.randrange(5, 300))
+            challenges.append(Challenge(
+                id=self.uuid(),
+                challenger_id=self.user_ids[challenger],
+                challenged_id=self.user_ids[challenged],
+                status=status,
+                ruleset_content_type=self.content_types[game_type],
+                ruleset_object_id=self.rng.choice(rulesets[game_type]).id,
+                created_at=created,
+                expires_at=created + timedelta(minutes=5),
+                responded_at=responded,
+            ))
+        self.bulk_insert(Challenge, challenges)
+        self.progress(f'{len(challenges)} challenges')
+
+    def reset_sequences(self) -> None:
+        """Move auto-increment sequences past the explicit user IDs (a no-op on SQLite)."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Friendship, GameMove])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
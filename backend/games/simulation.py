@@ -0,0 +1,462 @@
+"""
+Headless self-play load generator.
+
+Plays complete games between synthetic users through the real service layer
+(``GameServiceFactory.get_service(...).make_move``), so every move goes through
+validation, the optimistic commit in ``games.concurrency`` and the active game
+store exactly as it does for a request. Games are spread over a pool of
+threads or forked processes, each with its own database connection.
+
+For every move the simulation records its latency and the queries it ran.
+Lock waits are measured as:
+
+* the time taken to open each move's transaction. With the project's SQLite
+  settings (``transaction_mode: IMMEDIATE``) this is the wait for the
+  database write lock; on PostgreSQL it is close to zero,
+* optimistic commit conflicts and failures (``commit_stats``),
+* on PostgreSQL, the number of ungranted locks in ``pg_locks``, sampled in
+  the background while the simulation runs.
+
+``manage.py simulate_games`` is the command-line entry point.
+"""
+
+import logging
+import math
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import OperationalError, connection, connections, transaction
+
+from core.exceptions import GameError, InvalidMoveError
+from core.queries import QueryRecorder
+from .concurrency import commit_stats
+from .game_services import GameServiceFactory, GomokuGameService
+from .models import Game, GameStatus, GameType, GomokuRuleSet, GoRuleSet, Player
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+NEIGHBOURS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+# Rejected (illegal) Go moves tried in a row before the player passes instead
+MAX_REJECTIONS = 10
+# Retries of a move that failed because the database stayed locked
+MAX_LOCK_RETRIES = 5
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class SimulationStats:
+    """Counters for one worker, mergeable across threads and processes."""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.lock_waits_ms: List[float] = []
+        self.games_finished = 0
+        self.moves = 0
+        self.passes = 0
+        self.resignations = 0
+        self.rejected_moves = 0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.lock_errors = 0
+        self.conflicts = 0
+        self.commit_failures = 0
+        self.errors: Counter = Counter()
+
+    def merge(self, other: 'SimulationStats') -> None:
+        self.latencies_ms.extend(other.latencies_ms)
+        self.lock_waits_ms.extend(other.lock_waits_ms)
+        for name in ('games_finished', 'moves', 'passes', 'resignations', 'rejected_moves', 'queries', 'db_ms',
+                     'lock_errors', 'conflicts', 'commit_failures'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.errors.update(other.errors)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """
+        Aggregate the run.
+
+        Args:
+            elapsed: Wall-clock duration of the run in seconds
+
+        Returns:
+            Throughput, latency percentiles (ms), query counts and lock waits
+        """
+        def rounded(value):
+            return None if value is None else round(value, 3)
+
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'games_finished': self.games_finished,
+            'moves': self.moves,
+            'passes': self.passes,
+            'resignations': self.resignations,
+            'rejected_moves': self.rejected_moves,
+            'moves_per_sec': round(self.moves / elapsed, 1) if elapsed > 0 else None,
+            'latency_ms': {
+                'mean': rounded(sum(self.latencies_ms) / len(self.latencies_ms)) if self.latencies_ms else None,
+                'p50': rounded(percentile(self.latencies_ms, 0.50)),
+                'p95': rounded(percentile(self.latencies_ms, 0.95)),
+                'p99': rounded(percentile(self.latencies_ms, 0.99)),
+                'max': rounded(max(self.latencies_ms)) if self.latencies_ms else None,
+            },
+            'queries': self.queries,
+            'queries_per_move': round(self.queries / self.moves, 2) if self.moves else None,
+            'db_ms': round(self.db_ms, 3),
+            'lock_waits': {
+                'total_ms': round(sum(self.lock_waits_ms), 3),
+                'p95_ms': rounded(percentile(self.lock_waits_ms, 0.95)),
+                'max_ms': rounded(max(self.lock_waits_ms)) if self.lock_waits_ms else None,
+                'lock_errors': self.lock_errors,
+                'conflicts': self.conflicts,
+                'commit_failures': self.commit_failures,
+            },
+            'errors': dict(self.errors),
+        }
+
+
+class MoveChooser:
+    """Picks the next move for a game; ``strategy`` is 'random' or 'heuristic'."""
+
+    def __init__(self, strategy: str = 'random', seed: Optional[int] = None):
+        self.strategy = strategy
+        self.rng = random.Random(seed)
+
+    def choose(self, game: Game, rejected=()) -> Tuple[int, int]:
+        """
+        Args:
+            game: Game positioned before the move
+            rejected: Points already refused by the engine this turn
+
+        Returns:
+            (row, col), or (-1, -1) to pass when no move is left (Go only)
+        """
+        board = game.board_state['board']
+        color = str(game.current_player)
+        empty = [
+            (r, c) for r, row in enumerate(board) for c, cell in enumerate(row)
+            if cell is None and (r, c) not in rejected
+        ]
+        if game.is_go:
+            empty = [point for point in empty if not self._is_own_eye(board, point, color)]
+        if not empty:
+            return -1, -1
+        if self.strategy == 'heuristic':
+            if game.is_go:
+                return self._go_heuristic(board, empty, color)
+            return self._gomoku_heuristic(board, empty, color)
+        return self.rng.choice(empty)
+
+    @staticmethod
+    def _is_own_eye(board, point, color) -> bool:
+        size = len(board)
+        row, col = point
+        return all(
+            board[row + dr][col + dc] == color
+            for dr, dc in NEIGHBOURS if 0 <= row + dr < size and 0 <= col + dc < size
+        )
+
+    def _gomoku_heuristic(self, board, empty, color) -> Tuple[int, int]:
+        """Longest own line, or the opponent's if it is longer; only next to existing stones."""
+        size = len(board)
+        opponent = Player.WHITE if color == Player.BLACK else Player.BLACK
+        near = [
+            (r, c) for r, c in empty
+            if any(board[r + dr][c + dc] for dr in (-2, -1, 0, 1, 2) for dc in (-2, -1, 0, 1, 2)
+                   if 0 <= r + dr < size and 0 <= c + dc < size)
+        ]
+        if not near:
+            return size // 2, size // 2
+
+        def line(point, stone):
+            row, col = point
+            return max(
+                GomokuGameService.count_stones_in_direction(board, size, row, col, (dr, dc), stone)[0]
+                + GomokuGameService.count_stones_in_direction(board, size, row, col, (-dr, -dc), stone)[0]
+                for dr, dc in DIRECTIONS
+            )
+
+        scored = [(max(line(point, color) + 0.5, line(point, opponent)), point) for point in near]
+        best = max(score for score, _ in scored)
+        return self.rng.choice([point for score, point in scored if score == best])
+
+    def _go_heuristic(self, board, empty, color) -> Tuple[int, int]:
+        """Capture an opponent group in atari if possible, otherwise play randomly."""
+        service = GameServiceFactory.get_service(GameType.GO)
+        size = len(board)
+        opponent = Player.WHITE if color == Player.BLACK else Player.BLACK
+        captures = []
+        for row, col in empty:
+            for dr, dc in NEIGHBOURS:
+                r, c = row + dr, col + dc
+                if 0 <= r < size and 0 <= c < size and board[r][c] == opponent:
+                    group = service.find_group(board, r, c)
+                    if service.get_group_liberties(board, group) == {(row, col)}:
+                        captures.append((len(group), (row, col)))
+        if captures:
+            return max(captures)[1]
+        return self.rng.choice(empty)
+
+
+def create_users(count: int, prefix: str) -> List:
+    """Create ``count`` synthetic users named ``<prefix><n>`` without usable passwords."""
+    users = []
+    for number in range(count):
+        user = User(username=f'{prefix}{number}')
+        user.set_unusable_password()
+        users.append(user)
+    User.objects.bulk_create(users)
+    return list(User.objects.filter(username__startswith=prefix).order_by('id'))
+
+
+def get_ruleset(game_type: str, board_size: int):
+    """Ruleset used by simulated games of a type and size, created on first use."""
+    model = GoRuleSet if game_type == GameType.GO else GomokuRuleSet
+    ruleset, _ = model.objects.get_or_create(
+        name=f'Simulation {GameType(game_type).label} {board_size}x{board_size}',
+        defaults={'board_size': board_size, 'description': 'Created by the simulate_games command'},
+    )
+    return ruleset
+
+
+def create_games(users: Sequence, count: int, game_types: Sequence[str],
+                 board_sizes: Dict[str, int], seed: Optional[int] = None) -> List:
+    """
+    Create active games between random pairs of users.
+
+    Args:
+        users: At least two users
+        count: Number of games
+        game_types: Game types to alternate between
+        board_sizes: Board size per game type
+        seed: Seed for the pairing
+
+    Returns:
+        Primary keys of the created games
+    """
+    rng = random.Random(seed)
+    rulesets = {game_type: get_ruleset(game_type, board_sizes[game_type]) for game_type in game_types}
+    content_types = {game_type: ContentType.objects.get_for_model(ruleset) for game_type, ruleset in rulesets.items()}
+
+    game_ids = []
+    for number in range(count):
+        game_type = game_types[number % len(game_types)]
+        black, white = rng.sample(list(users), 2)
+        game = Game(
+            black_player=black,
+            white_player=white,
+            ruleset_content_type=content_types[game_type],
+            ruleset_object_id=rulesets[game_type].id,
+            status=GameStatus.ACTIVE,
+        )
+        game.initialize_board()
+        game.save()
+        game_ids.append(game.pk)
+    return game_ids
+
+
+class GamePlayer:
+    """Plays games to the end on the current thread's connection, recording stats."""
+
+    def __init__(self, strategy: str = 'random', max_moves: Optional[int] = None, seed: Optional[int] = None):
+        self.chooser = MoveChooser(strategy, seed)
+        self.max_moves = max_moves
+        self.stats = SimulationStats()
+        self.recorder = QueryRecorder()
+
+    def play(self, game_ids: Sequence) -> SimulationStats:
+        with connection.execute_wrapper(self.recorder):
+            for game_id in game_ids:
+                try:
+                    self.play_game(game_id)
+                except Exception as e:
+                    logger.warning(f"Simulated game {game_id} failed: {e}")
+                    self.stats.errors[type(e).__name__] += 1
+        self.stats.queries = self.recorder.count
+        self.stats.db_ms = self.recorder.duration * 1000
+        return self.stats
+
+    def play_game(self, game_id) -> None:
+        game = Game.objects.select_related('black_player', 'white_player').get(pk=game_id)
+        service = game.get_service()
+        board_size = game.ruleset.board_size
+        max_moves = self.max_moves or board_size * board_size
+        rejected = set()
+
+        while game.status == GameStatus.ACTIVE and game.move_count < max_moves:
+            player_id = game.black_player_id if game.current_player == Player.BLACK else game.white_player_id
+            row, col = self.chooser.choose(game, rejected)
+            if row == -1 and not game.is_go:
+                break
+            try:
+                if row == -1:
+                    move = self.timed(service.pass_turn, game, player_id)
+                    self.stats.passes += 1
+                else:
+                    move = self.timed(service.make_move, game, player_id, row, col)
+            except InvalidMoveError:
+                self.stats.rejected_moves += 1
+                rejected.add((row, col))
+                if len(rejected) >= MAX_REJECTIONS:
+                    game = self.timed(service.pass_turn, game, player_id).game
+                    self.stats.passes += 1
+                    rejected.clear()
+                continue
+            rejected.clear()
+            game = move.game
+
+        if game.status == GameStatus.ACTIVE:
+            # Out of moves: Go ends with two passes, Gomoku with a resignation
+            if game.is_go:
+                while game.status == GameStatus.ACTIVE:
+                    player_id = game.black_player_id if game.current_player == Player.BLACK else game.white_player_id
+                    game = self.timed(service.pass_turn, game, player_id).game
+                    self.stats.passes += 1
+            else:
+                player_id = game.black_player_id if game.current_player == Player.BLACK else game.white_player_id
+                with transaction.atomic():
+                    service.resign_game(game, player_id)
+                self.stats.resignations += 1
+        self.stats.games_finished += 1
+
+    def timed(self, operation, *args):
+        """Run one move in its own transaction, recording latency and the wait to open it."""
+        for attempt in range(MAX_LOCK_RETRIES):
+            start = time.perf_counter()
+            try:
+                # With SQLite's IMMEDIATE transaction mode, entering the block
+                # waits for the database write lock
+                with transaction.atomic():
+                    opened = time.perf_counter()
+                    result = operation(*args)
+            except OperationalError as e:
+                if 'locked' not in str(e).lower():
+                    raise
+                self.stats.lock_errors += 1
+                self.stats.lock_waits_ms.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.05 * (attempt + 1))
+                continue
+            self.stats.lock_waits_ms.append((opened - start) * 1000)
+            self.stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+            self.stats.moves += 1
+            return result
+        raise GameError("Database stayed locked", details={'attempts': MAX_LOCK_RETRIES})
+
+
+def _play_chunk(game_ids: Sequence, strategy: str, max_moves: Optional[int], seed: Optional[int],
+                count_commits: bool = False) -> SimulationStats:
+    """Worker entry point: play games on a connection of its own and close it afterwards."""
+    before = commit_stats.snapshot()
+    try:
+        stats = GamePlayer(strategy, max_moves, seed).play(game_ids)
+    finally:
+        connection.close()
+    if count_commits:
+        # Only meaningful in a process of its own, the counters are process-wide
+        after = commit_stats.snapshot()
+        stats.conflicts = after['conflicts'] - before['conflicts']
+        stats.commit_failures = after['failures'] - before['failures']
+    return stats
+
+
+class LockSampler(threading.Thread):
+    """Samples ungranted PostgreSQL locks while the simulation runs."""
+
+    def __init__(self, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self._stop_event.wait(self.interval):
+                    cursor.execute('SELECT count(*) FROM pg_locks WHERE NOT granted')
+                    self.samples.append(cursor.fetchone()[0])
+        except Exception as e:
+            logger.warning(f"Lock sampling stopped: {e}")
+        finally:
+            connection.close()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop_event.set()
+        self.join()
+        return {
+            'samples': len(self.samples),
+            'max_waiting': max(self.samples) if self.samples else 0,
+            'mean_waiting': round(sum(self.samples) / len(self.samples), 2) if self.samples else 0,
+        }
+
+
+def run_simulation(game_ids: Sequence, workers: int = 4, mode: str = 'threads', strategy: str = 'random',
+                   max_moves: Optional[int] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Play games concurrently and summarize the run.
+
+    Args:
+        game_ids: Games to play, split round-robin over the workers
+        workers: Number of threads or processes; 1 plays on the calling thread
+        mode: 'threads' or 'processes' (forked, so not usable with an in-memory database)
+        strategy: Move choice, 'random' or 'heuristic'
+        max_moves: Moves after which a game is ended (default: one per board point)
+        seed: Base seed for move choice; worker ``n`` uses ``seed + n``
+
+    Returns:
+        ``SimulationStats.summary`` of all workers, plus ``pg_locks`` samples on PostgreSQL
+    """
+    workers = max(1, min(workers, len(game_ids) or 1))
+    chunks = [list(game_ids[n::workers]) for n in range(workers)]
+    seeds = [None if seed is None else seed + n for n in range(workers)]
+
+    sampler = LockSampler() if connection.vendor == 'postgresql' else None
+    if sampler:
+        sampler.start()
+
+    commits_before = commit_stats.snapshot()
+    start = time.perf_counter()
+    if workers == 1:
+        results = [GamePlayer(strategy, max_moves, seeds[0]).play(chunks[0])]
+    elif mode == 'processes':
+        # Children must not share the parent's connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            results = list(pool.map(
+                _play_chunk, chunks, [strategy] * workers, [max_moves] * workers, seeds, [True] * workers
+            ))
+    else:
+        with ThreadPoolExecutor(workers, thread_name_prefix='simulate') as pool:
+            results = list(pool.map(_play_chunk, chunks, [strategy] * workers, [max_moves] * workers, seeds))
+    elapsed = time.perf_counter() - start
+
+    total = SimulationStats()
+    for stats in results:
+        total.merge(stats)
+    if mode != 'processes' or workers == 1:
+        commits_after = commit_stats.snapshot()
+        total.conflicts = commits_after['conflicts'] - commits_before['conflicts']
+        total.commit_failures = commits_after['failures'] - commits_before['failures']
+    summary = total.summary(elapsed)
+    summary['workers'] = workers
+    summary['mode'] = 'inline' if workers == 1 else mode
+    summary['strategy'] = strategy
+    summary['vendor'] = connection.vendor
+    if sampler:
+        summary['lock_waits']['pg_locks'] = sampler.stop()
+    return summary
@@ -33,6 +33,9 @@ class BaseStateManager(ABC):
         """
         Update the board state after a move.
         
+        Only the in-memory game is changed; the caller commits it (see
+        games.concurrency.commit_game_state).
+        
         Args:
             game: The game instance
             row: Row coordinate of the move
@@ -72,9 +75,6 @@ class GomokuStateManager(BaseStateManager):
         # Update game state
         game.board_state['last_move'] = {'row': row, 'col': col, 'player': player.value}
         game.board_state['move_count'] = game.board_state.get('move_count', 0) + 1
-        
-        # Mark the game instance as needing to be saved
-        game.save()
 
 
 class GoStateManager(BaseStateManager):
@@ -116,9 +116,6 @@ class GoStateManager(BaseStateManager):
         
         # Update move count
         game.board_state['move_count'] = game.board_state.get('move_count', 0) + 1
-        
-        # Save the game instance
-        game.save()
     
     def check_captures(self, game: Game, row: int, col: int, player: Player) -> int:
         """
@@ -9,6 +9,7 @@ easier to test validation logic and add new game types.
 from abc import ABC, abstractmethod
 from typing import Tuple, List
 from core.exceptions import InvalidMoveError, GameStateError, PlayerError
+from .compute import validate_go_move
 from .models import Game, GameStatus, Player
 
 
@@ -122,26 +123,31 @@ class GoMoveValidator(BaseMoveValidator):
                 details={'row': row, 'col': col, 'occupied_by': board[row][col]}
             )
         
-        # Check suicide rule - prevent moves that would result in immediate capture
-        # of the player's own stones unless they capture opponent stones first
-        service = game.get_service()
-        if hasattr(service, 'check_suicide_rule'):
-            current_player = game.get_current_player_user()
-            player_color = 'BLACK' if current_player == game.black_player else 'WHITE'
-            
-            if service.check_suicide_rule(board, row, col, player_color):
-                raise InvalidMoveError(
-                    f"Move at ({row}, {col}) would be suicide - it would capture your own stones without capturing opponent stones",
-                    details={'row': row, 'col': col, 'player_color': player_color}
-                )
-        
-        # Check Ko rule - prevent immediate recapture that would restore previous board position
-        if hasattr(service, 'is_ko_violation'):
-            if service.is_ko_violation(game, row, col, player_color):
-                raise InvalidMoveError(
-                    f"Ko rule violation: cannot immediately recapture at ({row}, {col}) to restore previous board position",
-                    details={'row': row, 'col': col, 'player_color': player_color}
-                )
+        # Suicide and ko are checked on the engine board; the check is far
+        # cheaper than a trip through the compute pool, and this runs inside
+        # the move's transaction, so it stays inline. Only the board one move
+        # back (for ko) is read here
+        current_player = game.get_current_player_user()
+        player_color = 'BLACK' if current_player == game.black_player else 'WHITE'
+        previous_board = None
+        if game.move_count >= 1:
+            previous_board = game.get_service().get_board_state_moves_back(game, 1)
+        
+        violation = validate_go_move(board, row, col, player_color, previous_board)
+        
+        # Suicide - a move that leaves its own chain without liberties and captures nothing
+        if violation == 'suicide':
+            raise InvalidMoveError(
+                f"Move at ({row}, {col}) would be suicide - it would capture your own stones without capturing opponent stones",
+                details={'row': row, 'col': col, 'player_color': player_color}
+            )
+        
+        # Ko rule - prevent immediate recapture that would restore previous board position
+        if violation == 'ko':
+            raise InvalidMoveError(
+                f"Ko rule violation: cannot immediately recapture at ({row}, {col}) to restore previous board position",
+                details={'row': row, 'col': col, 'player_color': player_color}
+            )
 
 
 class ChessMoveValidator(BaseMoveValidator):
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+
+import django
 from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -74,11 +76,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',  # First, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',  # Opt-in, see PROFILING_ENABLED
+    'core.middleware.QueryBudgetMiddleware',  # Opt-in, see QUERY_BUDGETS_ENABLED
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_grip.GripMiddleware',
@@ -88,7 +93,8 @@ ROOT_URLCONF = 'gomoku.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that records render times (core.metrics)
+        'BACKEND': 'core.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -114,12 +120,20 @@ WSGI_APPLICATION = 'gomoku.wsgi.application'
 # Use SQLite for development by default, PostgreSQL for production
 USE_SQLITE = config('USE_SQLITE', default=True, cast=bool)
 
+SQLITE_OPTIONS = {'timeout': 20}
+if django.VERSION >= (5, 1):
+    # Take the write lock at BEGIN so concurrent move commits wait instead
+    # of failing with "database is locked" (the option is new in Django 5.1;
+    # older versions rely on the timeout alone)
+    SQLITE_OPTIONS['transaction_mode'] = 'IMMEDIATE'
+
 if USE_SQLITE:
     # SQLite configuration for easy development setup
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': SQLITE_OPTIONS,
         }
     }
 else:
@@ -181,8 +195,148 @@ CACHES = {
     }
 }
 
+# Shared cache for reconstructed board states. Uses Redis when REDIS_URL is set so
+# every worker process reuses the same reconstructions; otherwise falls back to a
+# process-local memory cache.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES['game_boards'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'gomoku',
+        'TIMEOUT': 600,
+    }
+else:
+    CACHES['game_boards'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gomoku-game-boards',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        }
+    }
+
+# Per-user panel version counters (web.versions); shared between workers and
+# never expired, since a lost counter forces clients to refetch
+if REDIS_URL:
+    CACHES['panel_versions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'gomoku',
+        'TIMEOUT': None,
+    }
+else:
+    CACHES['panel_versions'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gomoku-panel-versions',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        }
+    }
+
 # Game-specific cache timeouts
 GAME_BOARD_CACHE_TIMEOUT = 600  # 10 minutes for board state reconstruction
+GAME_BOARD_CACHE_ALIAS = 'game_boards'
+GAME_BOARD_CACHE_LOCAL_MAX_ENTRIES = 2048  # Per-process LRU in front of the shared cache
+
+# In-process store of decoded active games (games.active_games)
+ACTIVE_GAME_STORE_ENABLED = True
+ACTIVE_GAME_STORE_MAX_ENTRIES = 1000
+ACTIVE_GAME_STORE_IDLE_TIMEOUT = 900  # Seconds before an idle game is evicted
+
+# Optimistic move commits (games.concurrency): attempts before a conflict error
+GAME_COMMIT_MAX_ATTEMPTS = 5
+
+# Per-game single-writer actors (games.actors); off by default
+GAME_MOVE_ACTORS = config('GAME_MOVE_ACTORS', default=False, cast=bool)
+GAME_ACTOR_BATCH_SIZE = 32  # Moves written per group commit
+GAME_ACTOR_IDLE_TIMEOUT = 300  # Seconds before an idle actor stops
+GAME_ACTOR_SUBMIT_TIMEOUT = 10  # Seconds a request waits for its move to commit
+
+# Computer opponents (games.bots): the search time per move, how long after
+# its turn a bot's move must be played (a search that waited for a compute
+# worker gets less time) and, for Go, the playouts after which a search stops
+# early (0: time only). Searches run in the compute pool below
+BOT_MOVE_TIME_MS = config('BOT_MOVE_TIME_MS', default=1000, cast=int)
+BOT_MOVE_DEADLINE_MS = config('BOT_MOVE_DEADLINE_MS', default=3000, cast=int)
+BOT_PLAYOUTS = config('BOT_PLAYOUTS', default=0, cast=int)
+
+# Engine worker pool (games.compute): worker processes shared by Go
+# validation, legal moves, scoring, bot searches and analysis (0 runs them
+# inline), extra workers that only run interactive tasks so they never wait
+# for a search, how long a caller waits for a task before giving up or
+# running it itself, and how long a background analysis job runs before it
+# yields its worker to queued work
+COMPUTE_WORKERS = config('COMPUTE_WORKERS', default=2, cast=int)
+COMPUTE_INTERACTIVE_WORKERS = config('COMPUTE_INTERACTIVE_WORKERS', default=1, cast=int)
+COMPUTE_TIMEOUT_MS = config('COMPUTE_TIMEOUT_MS', default=2000, cast=int)
+COMPUTE_SLICE_MS = config('COMPUTE_SLICE_MS', default=100, cast=int)
+
+# Gomoku forced-win analysis (games.analysis): solver time for one position
+# asked for through the analysis endpoint, and per position when a finished
+# game is scanned for its first forced win
+ANALYSIS_SOLVER_TIME_MS = config('ANALYSIS_SOLVER_TIME_MS', default=500, cast=int)
+ANALYSIS_SCAN_TIME_MS = config('ANALYSIS_SCAN_TIME_MS', default=100, cast=int)
+# Queue that scan as background work in the compute pool when a game finishes
+ANALYSIS_ON_FINISH = config('ANALYSIS_ON_FINISH', default=True, cast=bool)
+
+# WebSocket notifications (web.services): per-user window in which repeated
+# games/friends panel updates are merged into one render
+NOTIFICATION_PANEL_COALESCE_MS = 75
+
+# How games/friends panel changes reach clients: 'render' pushes the rendered
+# panel HTML, 'invalidate' pushes only {"invalidate": panel, "version": N} and
+# visible panels refetch themselves with a conditional GET
+NOTIFICATION_PUSH_MODE = config('NOTIFICATION_PUSH_MODE', default='render')
+PANEL_VERSION_CACHE_ALIAS = 'panel_versions'
+
+# Rendered games/friends panel HTML (web.fragments), keyed by data version
+PANEL_FRAGMENT_CACHE_ALIAS = 'default'
+PANEL_FRAGMENT_CACHE_TIMEOUT = 300
+
+# Latency histograms served at /metrics (core.metrics)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+
+# End-to-end move traces (core.tracing): fraction of moves traced, and the
+# JSONL file read by `manage.py analyze_traces`
+TRACE_SAMPLE_RATE = config('TRACE_SAMPLE_RATE', default=0.0, cast=float)
+TRACE_FILE = config('TRACE_FILE', default=str(BASE_DIR / 'logs' / 'traces.jsonl'))
+
+# On-demand cProfile captures (core.profiling), triggered by a signed
+# X-Profile-Token header, ?profile=1 for staff, or PROFILE_SAMPLE_RATE
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILE_SAMPLE_RATE = config('PROFILE_SAMPLE_RATE', default=0.0, cast=float)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'logs' / 'profiles'))
+PROFILE_TOP_N = 30  # Functions listed in each capture's summary
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_TOKEN_MAX_AGE = 3600  # Seconds a `manage.py profiles token` token stays valid
+
+# Per-view and per-handler SQL query budgets (core.queries). Over-budget
+# views and handlers, and any query repeated more than
+# QUERY_DUPLICATE_THRESHOLD times (N+1), are logged as warnings
+QUERY_BUDGETS_ENABLED = config('QUERY_BUDGETS_ENABLED', default=DEBUG, cast=bool)
+QUERY_BUDGETS_STRICT = False  # Raise QueryBudgetExceeded instead of logging
+QUERY_BUDGET_DEFAULT = 30
+QUERY_DUPLICATE_THRESHOLD = 5
+QUERY_BUDGETS = {
+    'DashboardView': 30,
+    'GameMoveView': 40,  # Includes rendering and sending both players' updates
+    'PanelView': 15,  # Also GamesPanelView and FriendsPanelView, through the class MRO
+    'ws.apply_game_command': 20,
+    'ws.notify_game_command': 30,
+}
+
+# Slow query log (core.slow_queries): queries over the threshold are appended
+# to SLOW_QUERY_FILE; with SLOW_QUERY_EXPLAIN the first occurrence of each
+# query shape also records its plan. See /slow-queries/ and
+# `manage.py slow_queries`
+SLOW_QUERY_ENABLED = config('SLOW_QUERY_ENABLED', default=True, cast=bool)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float)
+SLOW_QUERY_EXPLAIN = config('SLOW_QUERY_EXPLAIN', default=False, cast=bool)
+SLOW_QUERY_FILE = config('SLOW_QUERY_FILE', default=str(BASE_DIR / 'logs' / 'slow_queries.jsonl'))
 
 
 # Static files (CSS, JavaScript, Images)
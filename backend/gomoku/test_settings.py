@@ -15,9 +15,7 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'test_db.sqlite3',  # Use file-based DB but with proper test isolation
-        'OPTIONS': {
-            'timeout': 20,
-        },
+        'OPTIONS': SQLITE_OPTIONS,
     }
 }
 
@@ -33,9 +31,33 @@ PASSWORD_HASHERS = [
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    'game_boards': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+    # Version counters only ever increase, so sharing them between tests is safe
+    'panel_versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-panel-versions',
+        'TIMEOUT': None,
+    },
 }
 
+# Send panel updates synchronously so tests can assert on them
+NOTIFICATION_PANEL_COALESCE_MS = 0
+
+# Search bot moves quickly
+BOT_MOVE_TIME_MS = 50
+BOT_PLAYOUTS = 200
+
+# Run engine tasks, bot searches included, inline; tests that want finished
+# games analysed ask for it
+COMPUTE_WORKERS = 0
+ANALYSIS_ON_FINISH = False
+
+# Tests that need the slow query log enable it with their own file
+SLOW_QUERY_ENABLED = False
+
 # Ensure DEBUG is off for tests unless explicitly set
 DEBUG = False
 
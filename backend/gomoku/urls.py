@@ -19,8 +19,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import MetricsView, SlowQueriesView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', MetricsView.as_view(), name='metrics'),  # Prometheus scrape endpoint
+    path('slow-queries/', SlowQueriesView.as_view(), name='slow_queries'),  # Staff only
     path('', include('web.urls')),  # Root goes to web interface
 ]
 
@@ -105,6 +105,37 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // Conditional GETs: remember the ETag of the content swapped into each
+    // target and revalidate with If-None-Match; a 304 keeps what is shown
+    document.addEventListener('htmx:configRequest', function(event) {
+        const target = event.detail.target;
+        if (event.detail.verb === 'get' && target && target.dataset.etag &&
+            target.dataset.etagPath === event.detail.path) {
+            event.detail.headers['If-None-Match'] = target.dataset.etag;
+        }
+    });
+    
+    document.addEventListener('htmx:beforeSwap', function(event) {
+        const xhr = event.detail.xhr;
+        const target = event.detail.target;
+        if (xhr.status === 304) {
+            event.detail.shouldSwap = false;
+            return;
+        }
+        if (!target) {
+            return;
+        }
+        
+        const etag = xhr.getResponseHeader('ETag');
+        if (etag && event.detail.requestConfig.verb === 'get') {
+            target.dataset.etag = etag;
+            target.dataset.etagPath = event.detail.requestConfig.path;
+        } else {
+            delete target.dataset.etag;
+            delete target.dataset.etagPath;
+        }
+    });
+    
     // Loading indicators for form submissions
     document.addEventListener('htmx:beforeRequest', function(event) {
         const element = event.target;
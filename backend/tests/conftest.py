@@ -8,4 +8,21 @@ import pytest
 @pytest.fixture(scope="session")
 def django_db_setup():
     """Configure test database - let Django handle this automatically."""
-    pass
\ No newline at end of file
+    pass
+
+@pytest.fixture
+def query_budget():
+    """
+    Fail the test when a block exceeds its SQL query budget.
+
+    Usage::
+
+        with query_budget(max_queries=12, max_duplicates=2):
+            client.get(url)
+    """
+    from core.queries import query_budget as budget
+
+    def make_budget(max_queries=None, max_duplicates=None, label='test'):
+        return budget(label, max_queries=max_queries, max_duplicates=max_duplicates, strict=True)
+
+    return make_budget
@@ -0,0 +1,137 @@
+"""
+pytest tests for the in-process active game store.
+"""
+
+import time
+
+import pytest
+
+from games.active_games import ActiveGameStore, active_game_store
+from games.game_services import GomokuGameService, GoGameService
+from games.models import Game, GameStatus, Player
+from tests.factories import UserFactory, GoRuleSetFactory, RuleSetFactory, GameFactory
+
+
+@pytest.mark.django_db
+class TestActiveGameStore:
+    """Test cases for ActiveGameStore population, updates and eviction."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up an active Gomoku game and a clean store."""
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.ruleset = RuleSetFactory(board_size=15)
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=self.ruleset,
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+        self.service = GomokuGameService()
+        active_game_store.clear()
+        yield
+        active_game_store.clear()
+
+    def test_first_load_populates_store(self):
+        """Test the first load misses and the second is served from memory."""
+        store = ActiveGameStore()
+        store.load_game(self.game.pk)
+        game = store.load_game(self.game.pk)
+
+        assert store.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+        assert game.black_player == self.black_player
+        assert game.ruleset == self.ruleset
+
+    def test_loaded_games_are_private_copies(self):
+        """Test mutating a loaded game does not change the stored entry."""
+        store = ActiveGameStore()
+        store.load_game(self.game.pk)
+        game = store.load_game(self.game.pk)
+        game.board_state['board'][0][0] = Player.BLACK
+
+        assert store.load_game(self.game.pk).board_state['board'][0][0] is None
+
+    def test_store_updated_after_commit(self, django_capture_on_commit_callbacks):
+        """Test a committed move replaces the entry at the new move count."""
+        with django_capture_on_commit_callbacks(execute=True):
+            self.service.make_move(self.game, self.black_player.id, 7, 7)
+
+        entry = active_game_store.get_entry(self.game.pk, 1)
+        assert entry is not None
+        assert entry.game.board_state['board'][7][7] == Player.BLACK
+        assert active_game_store.get_entry(self.game.pk, 0) is None
+
+    def test_back_to_back_moves_hit_store(self, django_capture_on_commit_callbacks):
+        """Test consecutive moves reuse the decoded game instead of refetching it."""
+        with django_capture_on_commit_callbacks(execute=True):
+            self.service.make_move(self.game, self.black_player.id, 7, 7)
+        hits_before = active_game_store.stats()['hits']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            move = self.service.make_move(self.game, self.white_player.id, 7, 8)
+
+        assert active_game_store.stats()['hits'] == hits_before + 1
+        assert move.game.board_state['board'][7][7] == Player.BLACK
+        assert move.game.board_state['board'][7][8] == Player.WHITE
+
+    def test_direct_save_evicts_entry(self):
+        """Test saving the row outside the services evicts the stale entry."""
+        active_game_store.load_game(self.game.pk)
+        self.game.board_state['board'][0][0] = Player.WHITE
+        self.game.save()
+
+        assert active_game_store.get_entry(self.game.pk, 0) is None
+        assert active_game_store.load_game(self.game.pk).board_state['board'][0][0] == Player.WHITE
+
+    def test_finished_game_is_evicted(self):
+        """Test finished games are not kept in the store."""
+        active_game_store.load_game(self.game.pk)
+        self.game.finish_game(winner=self.black_player)
+
+        active_game_store.put(Game.objects.get(pk=self.game.pk))
+        assert active_game_store.stats()['entries'] == 0
+
+    def test_idle_entries_expire(self):
+        """Test entries idle past the timeout are swept."""
+        store = ActiveGameStore(idle_timeout=0.01)
+        store.load_game(self.game.pk)
+        time.sleep(0.02)
+
+        assert store.get_entry(self.game.pk, 0) is None
+        assert store.stats()['entries'] == 0
+
+    def test_store_is_bounded(self):
+        """Test the least recently used game is evicted past the size bound."""
+        store = ActiveGameStore(max_entries=1)
+        other = GameFactory(ruleset=self.ruleset, status=GameStatus.ACTIVE)
+        other.initialize_board()
+        other.save()
+
+        store.load_game(self.game.pk)
+        store.load_game(other.pk)
+
+        assert store.get_entry(self.game.pk, 0) is None
+        assert store.get_entry(other.pk, 0) is not None
+
+    def test_go_groups_computed_once(self, django_capture_on_commit_callbacks):
+        """Test Go group data is cached on the entry."""
+        go_game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=GoRuleSetFactory(board_size=9),
+            status=GameStatus.ACTIVE
+        )
+        go_game.initialize_board()
+        go_game.save()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            GoGameService().make_move(go_game, self.black_player.id, 4, 4)
+
+        entry = active_game_store.get_entry(go_game.pk, 1)
+        groups = entry.get_groups()
+        assert groups is entry.get_groups()
+        assert groups[0]['stones'] == {(4, 4)}
+        assert len(groups[0]['liberties']) == 4
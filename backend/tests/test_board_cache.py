@@ -0,0 +1,113 @@
+"""
+pytest tests for the two-tier board state cache.
+"""
+
+import pytest
+from django.test import override_settings
+
+from games.board_cache import BoardStateCache, board_cache
+from games.game_services import GoGameService
+from games.models import GameStatus, Player
+from tests.factories import UserFactory, GoRuleSetFactory, GameFactory
+
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+    'game_boards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-game-boards',
+    },
+}
+
+
+@pytest.mark.django_db
+class TestBoardStateCache:
+    """Test cases for BoardStateCache tiers, bounds and counters."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up a Go game with a couple of moves."""
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.ruleset = GoRuleSetFactory(board_size=9)
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=self.ruleset,
+            status=GameStatus.ACTIVE
+        )
+        self.service = GoGameService()
+        self.empty_board = [[None] * 9 for _ in range(9)]
+
+    def test_local_tier_is_bounded(self):
+        """Test the local LRU evicts the least recently used entries."""
+        cache = BoardStateCache(max_local_entries=2)
+        self.game.move_count = 3
+        for move_number in range(3):
+            cache.set(self.game, move_number, self.empty_board)
+
+        assert cache.stats()['local_entries'] == 2
+        assert cache.get_local(self.game, 0) is None
+        assert cache.get_local(self.game, 2) is not None
+
+    def test_entries_beyond_move_count_are_ignored(self):
+        """Test positions after the game's move_count are never served."""
+        cache = BoardStateCache()
+        self.game.move_count = 1
+        cache.set(self.game, 1, self.empty_board)
+        self.game.move_count = 0
+
+        assert cache.get(self.game, 1) is None
+
+    def test_returned_boards_are_copies(self):
+        """Test callers cannot mutate cached entries."""
+        cache = BoardStateCache()
+        cache.set(self.game, 0, self.empty_board)
+
+        board = cache.get(self.game, 0)
+        board[0][0] = Player.BLACK
+
+        assert cache.get(self.game, 0)[0][0] is None
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_shared_tier_hit_is_promoted(self):
+        """Test a shared hit in a fresh process-local tier counts and promotes."""
+        writer = BoardStateCache()
+        writer.set(self.game, 0, self.empty_board)
+
+        reader = BoardStateCache()
+        assert reader.get(self.game, 0) == self.empty_board
+        assert reader.get(self.game, 0) == self.empty_board
+
+        stats = reader.stats()
+        assert stats['shared_hits'] == 1
+        assert stats['local_hits'] == 1
+        assert stats['misses'] == 0
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_invalidate_game_clears_both_tiers(self):
+        """Test invalidation removes local and shared entries."""
+        cache = BoardStateCache()
+        cache.set(self.game, 0, self.empty_board)
+        cache.invalidate_game(self.game)
+
+        assert cache.get(self.game, 0) is None
+        assert cache.stats()['misses'] == 1
+
+    def test_reconstruction_goes_through_cache(self):
+        """Test Go reconstruction populates and then hits the shared instance."""
+        self.service.make_move(self.game, self.black_player.id, 4, 4)
+        self.service.make_move(self.game, self.white_player.id, 4, 5)
+        self.game.refresh_from_db()
+
+        board = self.service.reconstruct_board_state_at_move(self.game, 2)
+        assert board[4][4] == Player.BLACK
+        assert board[4][5] == Player.WHITE
+
+        hits_before = board_cache.stats()['local_hits']
+        again = self.service.reconstruct_board_state_at_move(self.game, 1)
+        assert again[4][4] == Player.BLACK
+        assert again[4][5] is None
+        assert board_cache.stats()['local_hits'] == hits_before + 1
@@ -410,13 +410,13 @@ class TestChallengeGameIntegration:
             HTTP_HX_REQUEST='true'
         )
         
-        # Should succeed
-        assert response.status_code == 200
+        # Should succeed with a bare acknowledgement; the board update is pushed over the WebSocket
+        assert response.status_code == 204
+        assert response.content == b''
         
-        # The response should show the move was made (stone placed)
-        response_content = response.content.decode()
-        assert 'stone-black' in response_content
-        assert 'Intersection 0, 0 - BLACK stone' in response_content
+        # The move was made (stone placed)
+        game.refresh_from_db()
+        assert game.board_state['board'][0][0] == 'BLACK'
         
         # After black's move, it should be white's turn
         # Login as white player to verify they can see HTMX attributes for their turn
@@ -0,0 +1,259 @@
+"""
+pytest tests for the engine worker pool and the Go checks it runs.
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from django.test import override_settings
+
+from core.exceptions import InvalidMoveError
+from games import compute
+from games.compute import (
+    MIN_BUDGET_MS, PRIORITY_BACKGROUND, PRIORITY_BOT, PRIORITY_INTERACTIVE, ComputeTimeout, Resume, compute_pool,
+    go_legal_moves, go_score, validate_go_move,
+)
+from games.models import GameMove
+from tests.factories import GameFactory, GoRuleSetFactory, UserFactory
+
+
+def slow_task(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def sliced_task(slices, seconds):
+    time.sleep(seconds)
+    if slices > 1:
+        return Resume(slices=slices - 1)
+    return 'done'
+
+
+def budget_task(budget_ms):
+    return budget_ms
+
+
+def empty_board(size=9):
+    return [[None] * size for _ in range(size)]
+
+
+class TestGoTasks:
+    """Test cases for the pure Go tasks."""
+
+    def test_suicide_is_rejected_unless_it_captures(self):
+        """Test a move into a point without liberties is suicide only when it captures nothing."""
+        board = empty_board()
+        board[0][1] = board[1][0] = 'WHITE'
+
+        assert validate_go_move(board, 0, 0, 'BLACK') == 'suicide'
+        assert validate_go_move(board, 0, 0, 'WHITE') is None
+
+        board[0][2] = board[1][1] = board[2][0] = 'BLACK'
+        assert validate_go_move(board, 0, 0, 'BLACK') is None
+        assert board[0][0] is None
+
+    def test_recapture_restoring_the_previous_board_is_ko(self):
+        """Test retaking a ko at once repeats the board before the opponent's capture."""
+        board = empty_board()
+        for row, col in [(3, 4), (4, 3), (5, 4)]:
+            board[row][col] = 'BLACK'
+        for row, col in [(3, 5), (5, 5), (4, 6), (4, 4)]:
+            board[row][col] = 'WHITE'
+        previous_board = [list(line) for line in board]
+        # Black takes the white stone at (4, 4) by playing (4, 5)
+        board[4][5] = 'BLACK'
+        board[4][4] = None
+
+        assert validate_go_move(board, 4, 4, 'WHITE', previous_board) == 'ko'
+        assert validate_go_move(board, 4, 4, 'WHITE') is None
+        assert (4, 4) not in go_legal_moves(board, 'WHITE', previous_board)
+        assert (4, 4) in go_legal_moves(board, 'WHITE')
+
+    def test_score_counts_area_and_komi(self):
+        """Test a wall splitting the board gives the walled side its area."""
+        board = empty_board(5)
+        for row in range(5):
+            board[row][2] = 'BLACK'
+
+        assert go_score(board, 6.5) == 25 - 6.5
+
+
+@pytest.mark.django_db
+class TestComputeClients:
+    """Test cases for game services going through the pool."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Create two players and a 9x9 Go game."""
+        self.black = UserFactory()
+        self.white = UserFactory()
+        self.game = GameFactory(black_player=self.black, white_player=self.white,
+                                ruleset=GoRuleSetFactory(board_size=9))
+        self.service = self.game.get_service()
+
+    def test_quick_checks_never_wait_for_the_pool(self):
+        """Test validation, legal moves and scoring run inline, not behind engine work."""
+        board = self.game.board_state['board']
+        board[0][1] = board[1][0] = 'WHITE'
+
+        with patch.object(compute_pool, 'submit', side_effect=AssertionError('queued')) as submit:
+            with pytest.raises(InvalidMoveError, match='suicide'):
+                self.service.validate_move(self.game, self.black.id, 0, 0)
+            self.service.get_valid_moves(self.game)
+            self.service.score(self.game)
+
+        assert not submit.called
+
+    def test_legal_moves_and_score(self):
+        """Test legal moves leave out suicide points and keep the pass."""
+        board = self.game.board_state['board']
+        board[0][1] = board[1][0] = 'WHITE'
+
+        moves = self.service.get_valid_moves(self.game)
+
+        assert (0, 0) not in moves
+        assert (-1, -1) in moves
+        assert len(moves) == 81 - 3 + 1
+        # Only White has stones, so every point is White's
+        assert self.service.score(self.game) == -81 - self.game.ruleset.komi
+
+    def test_ko_uses_the_stored_history(self):
+        """Test the board before the opponent's last move comes from the move history."""
+        for number, (row, col, color) in enumerate([(3, 4, 'BLACK'), (4, 4, 'WHITE'), (4, 3, 'BLACK'),
+                                                     (3, 5, 'WHITE'), (5, 4, 'BLACK'), (5, 5, 'WHITE'),
+                                                     (0, 0, 'BLACK'), (4, 6, 'WHITE')], start=1):
+            self.service.make_move(self.game, self.black.id if color == 'BLACK' else self.white.id, row, col)
+        self.service.make_move(self.game, self.black.id, 4, 5)
+        self.game.refresh_from_db()
+        assert GameMove.objects.filter(game=self.game).count() == 9
+
+        with pytest.raises(InvalidMoveError, match='Ko rule'):
+            self.service.validate_move(self.game, self.white.id, 4, 4)
+        assert (4, 4) not in self.service.get_valid_moves(self.game)
+
+
+class TestComputePool:
+    """Test cases for the worker processes, priorities and timeouts."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Run one worker process, with a slow task for keeping it busy."""
+        with override_settings(COMPUTE_WORKERS=1, COMPUTE_INTERACTIVE_WORKERS=0), \
+                patch.dict(compute.TASKS, {'sleep': 'tests.test_compute.slow_task',
+                                           'sliced': 'tests.test_compute.sliced_task',
+                                           'budget': 'tests.test_compute.budget_task'}):
+            yield
+            compute_pool.shutdown()
+
+    def test_tasks_run_in_priority_order(self):
+        """Test an interactive task queued after background work runs first."""
+        compute_pool.run('sleep', timeout=60, seconds=0)
+        finished = []
+        lock = threading.Lock()
+
+        def record(name):
+            def done(future):
+                with lock:
+                    finished.append(name)
+            return done
+
+        busy = compute_pool.submit('sleep', seconds=0.5)
+        background = compute_pool.submit('score', PRIORITY_BACKGROUND, board=empty_board(5), komi=0.5)
+        background.add_done_callback(record('background'))
+        interactive = compute_pool.submit('validate', PRIORITY_INTERACTIVE, board=empty_board(5), row=0, col=0,
+                                          color='BLACK')
+        interactive.add_done_callback(record('interactive'))
+        assert compute_pool.stats()['queued'] == 2
+
+        assert interactive.result(timeout=30) is None
+        assert background.result(timeout=30) == -0.5
+        busy.result(timeout=30)
+        assert finished == ['interactive', 'background']
+        assert compute.COMPUTE_QUEUE_WAIT.count(task='validate') >= 1
+        assert compute_pool.stats()['running'] == 0
+
+    @override_settings(COMPUTE_INTERACTIVE_WORKERS=1)
+    def test_interactive_tasks_do_not_wait_for_busy_workers(self):
+        """Test a validation submitted while every shared worker is busy runs on the reserved one."""
+        warmups = [compute_pool.submit('sleep', seconds=0.2) for _ in range(2)]
+        for warmup in warmups:
+            warmup.result(timeout=60)
+
+        search = compute_pool.submit('sleep', PRIORITY_BOT, seconds=1)
+        analysis = compute_pool.submit('sleep', PRIORITY_BACKGROUND, seconds=0)
+        started = time.monotonic()
+        assert compute_pool.run('validate', PRIORITY_INTERACTIVE, timeout=5, board=empty_board(5), row=0, col=0,
+                                color='BLACK') is None
+
+        assert time.monotonic() - started < 0.5
+        assert not search.done()
+        assert compute_pool.stats()['queued'] == 1
+        assert analysis.result(timeout=30) == 0
+        assert search.result(timeout=30) == 1
+
+    def test_task_waiting_past_its_timeout_is_dropped(self):
+        """Test a task that cannot start in time times out without running."""
+        compute_pool.run('sleep', timeout=60, seconds=0)
+        compute_pool.submit('sleep', seconds=0.5)
+        start = time.monotonic()
+
+        with pytest.raises(ComputeTimeout):
+            compute_pool.run('score', board=empty_board(5), komi=0.5, timeout=0.05)
+
+        assert time.monotonic() - start < 0.4
+        assert compute_pool.stats()['timed_out'] == 1
+        # Callers that must have an answer compute it themselves
+        assert compute_pool.run('score', board=empty_board(5), komi=0.5, timeout=0.05, inline_fallback=True) == -0.5
+
+    def test_unknown_tasks_are_rejected(self):
+        """Test only registered tasks can be submitted."""
+        with pytest.raises(ValueError):
+            compute_pool.submit('os.system', command='true')
+
+    def test_background_work_yields_between_slices(self):
+        """Test a bot move queued during sliced background work runs before the next slice."""
+        compute_pool.run('sleep', timeout=60, seconds=0)
+        background = compute_pool.submit('sliced', PRIORITY_BACKGROUND, game='analysed', slices=4, seconds=0.1)
+        time.sleep(0.05)
+        start = time.monotonic()
+
+        move = compute_pool.run('sleep', PRIORITY_BOT, timeout=30, game='live', seconds=0)
+
+        assert move == 0
+        assert time.monotonic() - start < 0.3
+        assert not background.done()
+        assert background.result(timeout=30) == 'done'
+        assert background.slices == 4
+        assert background.run_seconds >= 0.4
+        assert background.wait_seconds > 0
+
+    def test_games_share_the_workers_fairly(self):
+        """Test a game that used little worker time goes before one that used a lot."""
+        compute_pool.run('sleep', timeout=60, game='big', seconds=0.3)
+        assert compute_pool.usage('big') > 0.25
+        finished = []
+        compute_pool.submit('sleep', game='other', seconds=0.2)
+
+        big = compute_pool.submit('sleep', game='big', seconds=0)
+        big.add_done_callback(lambda future: finished.append('big'))
+        small = compute_pool.submit('sleep', game='small', seconds=0)
+        small.add_done_callback(lambda future: finished.append('small'))
+
+        big.result(timeout=30)
+        small.result(timeout=30)
+        assert finished == ['small', 'big']
+
+    def test_late_budgeted_tasks_get_what_is_left_of_their_deadline(self):
+        """Test a search that waited has its time budget cut to still finish on time."""
+        compute_pool.run('sleep', timeout=60, seconds=0)
+        compute_pool.submit('sleep', seconds=0.3)
+
+        budget = compute_pool.run('budget', PRIORITY_BOT, timeout=0.6, budget_arg='budget_ms', budget_ms=1000)
+        assert MIN_BUDGET_MS <= budget < 300
+
+        compute_pool.submit('sleep', seconds=0.3)
+        late = compute_pool.submit('budget', PRIORITY_BOT, timeout=0.1, budget_arg='budget_ms', budget_ms=1000)
+        assert late.result(timeout=30) == MIN_BUDGET_MS
+        assert compute_pool.stats()['late'] >= 1
@@ -0,0 +1,113 @@
+"""
+pytest tests for the engine microbenchmarks and their replay corpus.
+"""
+
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from games.benchmarks import build_corpus, compare_results, load_corpus, save_corpus
+from games.models import Game, GameType
+from games.game_services import GoGameService, GomokuGameService
+
+
+@pytest.mark.django_db
+class TestEngineBenchmarks:
+    """Test cases for the benchmark corpus and the benchmark_engine command."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, tmp_path):
+        """Keep outputs in a temporary directory."""
+        self.tmp_path = tmp_path
+
+    def run(self, *args, **options):
+        out = StringIO()
+        call_command('benchmark_engine', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_corpus_is_deterministic(self):
+        """Test the same seed generates the same games and a different seed does not."""
+        first = [game.to_dict() for game in build_corpus([9], games_per_size=2, seed=7)]
+        second = [game.to_dict() for game in build_corpus([9], games_per_size=2, seed=7)]
+        other = [game.to_dict() for game in build_corpus([9], games_per_size=2, seed=8)]
+
+        assert first == second
+        assert first != other
+        assert {game['game_type'] for game in first} == {GameType.GOMOKU, GameType.GO}
+
+    def test_corpus_games_are_legal(self):
+        """Test generated Go games have no suicides and Gomoku games end on a win or a full half board."""
+        go_service = GoGameService()
+        for game in build_corpus([9, 13], games_per_size=1, seed=3):
+            for index, (row, col, color) in enumerate(game.moves):
+                assert game.boards[index][row][col] is None
+                if game.game_type == GameType.GO:
+                    assert not go_service.check_suicide_rule(game.boards[index], row, col, color)
+            if game.game_type == GameType.GOMOKU and len(game.moves) < 9 * 9 // 2:
+                row, col, color = game.moves[-1]
+                counts = [
+                    GomokuGameService.count_stones_in_direction(game.final_board, game.board_size, row, col, d, color)[0]
+                    + GomokuGameService.count_stones_in_direction(
+                        game.final_board, game.board_size, row, col, (-d[0], -d[1]), color)[0]
+                    for d in ((0, 1), (1, 0), (1, 1), (1, -1))
+                ]
+                assert max(counts) + 1 >= 5
+
+    def test_corpus_round_trips_through_json(self):
+        """Test a saved corpus loads back with the same moves and boards."""
+        corpus = build_corpus([9], games_per_size=1, seed=1)
+        path = self.tmp_path / 'corpus.json'
+        save_corpus(corpus, path)
+
+        loaded = load_corpus(path)
+        assert [g.to_dict() for g in loaded] == [g.to_dict() for g in corpus]
+        assert [g.final_board for g in loaded] == [g.final_board for g in corpus]
+
+    def test_command_writes_json_results(self):
+        """Test every operation is reported with ops/sec and allocations, and no games are left behind."""
+        output = self.tmp_path / 'results.json'
+        text = self.run('--sizes', '9', '--games', '1', '--repeat', '1', '--output', str(output))
+
+        report = json.loads(output.read_text())
+        operations = {result['operation'] for result in report['results']}
+        assert operations == {
+            'check_win', 'count_stones_in_direction', 'get_valid_moves', 'check_captures',
+            'check_suicide_rule', 'is_ko_violation', 'reconstruct_board_state_at_move', 'playout'
+        }
+        for result in report['results']:
+            assert result['board_size'] == 9
+            assert result['calls'] > 0
+            assert result['ops_per_sec'] > 0
+            assert result['peak_bytes_per_call'] >= 0
+        assert report['meta']['games'] == 2
+        assert 'check_captures' in text
+        assert not Game.objects.exists()
+
+    def test_command_reuses_corpus_and_compares(self):
+        """Test a corpus file is written once, replayed, and results are compared with a baseline."""
+        corpus = self.tmp_path / 'corpus.json'
+        baseline = self.tmp_path / 'baseline.json'
+        self.run('--sizes', '9', '--games', '1', '--repeat', '1', '--no-memory',
+                 '--corpus', str(corpus), '--output', str(baseline))
+        assert corpus.exists()
+
+        text = self.run('--sizes', '9', '--repeat', '1', '--no-memory', '--operations', 'check_win',
+                        '--corpus', str(corpus), '--compare', str(baseline))
+
+        assert 'Wrote corpus' not in text
+        assert 'Change against baseline' in text
+        assert 'check_win' in text.split('Change against baseline')[1]
+
+    def test_compare_results(self):
+        """Test the change is reported in percent for benchmarks present in both runs."""
+        before = [{'game_type': 'GO', 'operation': 'check_captures', 'board_size': 9, 'ops_per_sec': 100.0}]
+        after = [
+            {'game_type': 'GO', 'operation': 'check_captures', 'board_size': 9, 'ops_per_sec': 150.0},
+            {'game_type': 'GO', 'operation': 'check_captures', 'board_size': 19, 'ops_per_sec': 50.0},
+        ]
+
+        rows = compare_results(before, after)
+        assert len(rows) == 1
+        assert rows[0]['change_pct'] == 50.0
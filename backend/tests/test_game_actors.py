@@ -0,0 +1,165 @@
+"""
+pytest tests for the per-game actor runtime.
+"""
+
+import asyncio
+import threading
+
+import pytest
+from django.db import connection
+
+from core.exceptions import GameError, PlayerError
+from games.active_games import active_game_store
+from games.actors import MoveCommand, actor_runtime, submit_move, submit_pass
+from games.board_cache import board_cache
+from games.concurrency import commit_stats
+from games.models import Game, GameMove, GameStatus, Player
+from tests.factories import UserFactory, GoRuleSetFactory, RuleSetFactory, GameFactory
+from tests.test_board_cache import SHARED_CACHES
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGameActors:
+    """Test cases for sequential, batched move processing through game actors."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings):
+        """Set up an active Gomoku game and a fresh runtime."""
+        settings.GAME_MOVE_ACTORS = True
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=RuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+        active_game_store.clear()
+        commit_stats.reset()
+        yield
+        actor_runtime.shutdown()
+
+    def submit_together(self, commands):
+        """Enqueue several commands before the actor gets to run."""
+        async def enqueue_all():
+            return await asyncio.gather(
+                *(actor_runtime._enqueue(str(self.game.pk), c) for c in commands),
+                return_exceptions=True
+            )
+        return asyncio.run_coroutine_threadsafe(enqueue_all(), actor_runtime.loop).result(10)
+
+    def test_move_is_applied_and_persisted(self):
+        """Test a move through the actor is committed and returned with a game snapshot."""
+        move = submit_move(self.game, self.black_player.id, 7, 7)
+
+        assert move.pk is not None
+        assert move.game.board_state['board'][7][7] == Player.BLACK
+        game = Game.objects.get(pk=self.game.pk)
+        assert game.move_count == 1
+        assert game.current_player == Player.WHITE
+
+    def test_queued_moves_are_group_committed(self):
+        """Test moves queued together are written in one batch, in order."""
+        results = self.submit_together([
+            MoveCommand('move', self.black_player.id, 7, 7),
+            MoveCommand('move', self.white_player.id, 8, 8),
+            MoveCommand('move', self.black_player.id, 7, 8),
+        ])
+
+        assert [move.move_number for move in results] == [1, 2, 3]
+        assert actor_runtime.stats()['batches'] == 1
+        assert actor_runtime.stats()['max_batch'] == 3
+        assert commit_stats.snapshot()['commits'] == 1
+        assert GameMove.objects.filter(game=self.game).count() == 3
+
+    def test_invalid_command_does_not_fail_batch(self):
+        """Test a rejected command in a batch leaves the others committed."""
+        results = self.submit_together([
+            MoveCommand('move', self.black_player.id, 7, 7),
+            MoveCommand('move', self.black_player.id, 8, 8),  # Not black's turn
+            MoveCommand('move', self.white_player.id, 8, 8),
+        ])
+
+        assert isinstance(results[0], GameMove)
+        assert isinstance(results[1], PlayerError)
+        assert results[2].move_number == 2
+        assert Game.objects.get(pk=self.game.pk).move_count == 2
+
+    def test_uncommitted_positions_are_not_shared(self, monkeypatch, settings):
+        """Test positions of a batch that failed to commit are not left in either cache tier."""
+        settings.CACHES = SHARED_CACHES
+        board_cache.shared.clear()
+
+        def fail_commit(game, moves):
+            raise RuntimeError("database went away")
+
+        monkeypatch.setattr('games.actors.persist_moves', fail_commit)
+        results = self.submit_together([
+            MoveCommand('move', self.black_player.id, 7, 7),
+            MoveCommand('move', self.white_player.id, 8, 8),
+        ])
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # The position after the first move was only ever in memory
+        assert board_cache.shared.get(board_cache.make_key(self.game.pk, 1)) is None
+        self.game.move_count = 1
+        assert board_cache.get_local(self.game, 1) is None
+
+        monkeypatch.undo()
+        move = submit_move(self.game, self.black_player.id, 7, 7)
+        assert move.move_number == 1
+        assert board_cache.shared.get(board_cache.make_key(self.game.pk, 0)) is not None
+
+    def test_racing_threads_are_serialized(self):
+        """Test racing submissions never conflict because one actor owns the game."""
+        barrier = threading.Barrier(6)
+        outcomes = []
+
+        def worker(col):
+            barrier.wait()
+            try:
+                outcomes.append(submit_move(self.game, self.black_player.id, 0, col))
+            except GameError as e:
+                outcomes.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(col,)) for col in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(isinstance(o, GameMove) for o in outcomes) == 1
+        assert commit_stats.snapshot()['conflicts'] == 0
+        assert GameMove.objects.filter(game=self.game).count() == 1
+
+    def test_external_write_is_replayed(self):
+        """Test the actor reloads and replays when the row changed behind its back."""
+        submit_move(self.game, self.black_player.id, 7, 7)
+
+        # A write outside the actor (e.g. another process) bumps the version
+        game = Game.objects.get(pk=self.game.pk)
+        game.save()
+
+        move = submit_move(self.game, self.white_player.id, 8, 8)
+        assert move.move_number == 2
+        assert commit_stats.snapshot()['conflicts'] == 1
+
+    def test_pass_through_actor(self):
+        """Test Go passes are processed by the actor."""
+        go_game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=GoRuleSetFactory(board_size=9),
+            status=GameStatus.ACTIVE
+        )
+        go_game.initialize_board()
+        go_game.save()
+
+        submit_pass(go_game, self.black_player.id)
+        submit_pass(go_game, self.white_player.id)
+
+        assert Game.objects.get(pk=go_game.pk).status == GameStatus.FINISHED
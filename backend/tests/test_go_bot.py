@@ -0,0 +1,237 @@
+"""
+pytest tests for the Go board, the Monte Carlo tree search and the Go bot opponent.
+"""
+
+import random
+
+import pytest
+from django.test import override_settings
+
+from games import go_ai
+from games.bots import bot_scheduler
+from games.go_ai import BLACK, PASS, WHITE, GoBoard, GoSearchResult, capture_move, choose_move, playout
+from games.models import GameMove, GameStatus
+from tests.factories import GameFactory, GoRuleSetFactory, UserFactory
+
+
+def empty_board(size=9):
+    return [[None] * size for _ in range(size)]
+
+
+def place(board, stones, color):
+    for row, col in stones:
+        board[row][col] = color
+    return board
+
+
+class TestGoBoard:
+    """Test cases for captures and move legality on the array board."""
+
+    def test_surrounded_stones_are_captured(self):
+        """Test a chain without liberties is removed and its points become empty."""
+        board = place(empty_board(), [(4, 4), (4, 5)], 'WHITE')
+        place(board, [(3, 4), (3, 5), (5, 4), (5, 5), (4, 3)], 'BLACK')
+        position = GoBoard.from_rows(board, 'BLACK')
+        white = position.point(4, 4)
+
+        assert position.atari_point(white) == position.point(4, 6)
+        position.play(position.point(4, 6))
+
+        assert position.cells[white] == position.cells[position.point(4, 5)] == 0
+        assert white in position.empties
+        assert position.atari_point(position.point(4, 3)) == PASS
+
+    def test_suicide_is_illegal_unless_it_captures(self):
+        """Test filling a point's last liberty is only allowed when it takes stones."""
+        board = place(empty_board(), [(0, 1), (1, 0)], 'WHITE')
+        position = GoBoard.from_rows(board, 'BLACK')
+        assert not position.is_legal(position.point(0, 0), BLACK)
+
+        place(board, [(0, 2), (1, 1), (2, 0)], 'BLACK')
+        position = GoBoard.from_rows(board, 'BLACK')
+        assert position.is_legal(position.point(0, 0), BLACK)
+
+    def test_ko_cannot_be_retaken_at_once(self):
+        """Test the single stone just captured cannot be recaptured on the next move."""
+        board = place(empty_board(), [(3, 4), (4, 3), (5, 4)], 'BLACK')
+        place(board, [(3, 5), (5, 5), (4, 6), (4, 4)], 'WHITE')
+        position = GoBoard.from_rows(board, 'BLACK')
+
+        position.play(position.point(4, 5))
+        taken = position.point(4, 4)
+        assert position.ko == taken
+        assert not position.is_legal(taken, WHITE)
+
+        position.play(position.point(8, 8))
+        position.play(position.point(0, 0))
+        assert position.is_legal(taken, WHITE)
+
+    def test_own_eyes_are_not_candidate_moves(self):
+        """Test a point surrounded by one colour is left out of sensible moves."""
+        board = place(empty_board(), [(0, 1), (1, 0), (1, 1)], 'BLACK')
+        position = GoBoard.from_rows(board, 'BLACK')
+        eye = position.point(0, 0)
+
+        assert position.is_eye(eye, BLACK)
+        assert eye not in position.moves()
+        assert eye in position.moves(include_eyes=True)
+
+    def test_area_score_counts_stones_and_surrounded_points(self):
+        """Test territory belongs to the colour that alone surrounds it, less komi."""
+        board = place(empty_board(5), [(row, 2) for row in range(5)], 'BLACK')
+        position = GoBoard.from_rows(board, 'WHITE')
+
+        assert position.score(6.5) == 25 - 6.5
+
+
+class TestGoSearch:
+    """Test cases for playouts and the Monte Carlo tree search."""
+
+    def test_playout_ends_with_a_winner(self):
+        """Test a random playout from the empty board finishes and is scored."""
+        position = GoBoard(9)
+
+        winner = playout(position, 6.5, random.Random(1))
+
+        assert winner in (BLACK, WHITE)
+        assert position.passes >= 2 or not position.moves()
+
+    def test_capture_policy_takes_a_chain_in_atari(self):
+        """Test the playout policy answers a move that left a chain in atari by capturing it."""
+        board = place(empty_board(), [(4, 4), (4, 5), (4, 6)], 'WHITE')
+        place(board, [(3, 4), (3, 5), (3, 6), (5, 4), (5, 5), (5, 6), (4, 7)], 'BLACK')
+        position = GoBoard.from_rows(board, 'BLACK', last_move=(4, 6))
+
+        assert capture_move(position) == position.point(4, 3)
+
+    def test_playout_budget_stops_the_search(self):
+        """Test a playout limit ends the search before the time budget."""
+        result = choose_move(empty_board(), 9, 'BLACK', time_budget_ms=60_000, playouts=50, seed=2)
+
+        assert result.playouts == 50
+        assert result.elapsed_ms < 30_000
+        assert not result.is_pass
+        assert len(result.alternatives) == go_ai.ALTERNATIVES
+        assert result.to_dict()['playouts_per_sec'] > 0
+
+    def test_ko_position_from_the_board_state_is_respected(self):
+        """Test the stored ko point is not played back while the ko is live."""
+        board = place(empty_board(), [(3, 4), (4, 3), (5, 4), (4, 5)], 'BLACK')
+        place(board, [(3, 5), (5, 5), (4, 6)], 'WHITE')
+
+        result = choose_move(board, 9, 'WHITE', ko_position=[4, 4],
+                             last_move={'row': 4, 'col': 5, 'player': 'BLACK'}, playouts=200, seed=3)
+
+        assert (result.row, result.col) != (4, 4)
+        assert (4, 4) not in result.alternatives
+
+    def test_tree_is_reused_two_moves_later(self):
+        """Test the subtree under the bot's move and the reply becomes the next root."""
+        board = empty_board(5)
+        first = choose_move(board, 5, 'BLACK', komi=0.5, playouts=2000, game_id='reuse', seed=4)
+        tree = go_ai._trees[('reuse', 'BLACK')]
+        played = next(child for child in tree.root.children
+                      if tree.board.coordinates(child.move) == (first.row, first.col))
+        reply = max(played.children, key=lambda child: child.visits)
+        reply_visits = reply.visits
+
+        place(board, [(first.row, first.col)], 'BLACK')
+        reply_row, reply_col = tree.board.coordinates(reply.move)
+        place(board, [(reply_row, reply_col)], 'WHITE')
+        second = choose_move(board, 5, 'BLACK', komi=0.5, playouts=100, game_id='reuse', seed=5,
+                             last_move={'row': reply_row, 'col': reply_col, 'player': 'WHITE'})
+
+        assert second.reused_playouts == reply_visits > 0
+        assert go_ai._trees[('reuse', 'BLACK')].root is reply
+        assert reply.visits == reply_visits + 100
+
+    def test_passes_to_end_a_won_game(self):
+        """Test a bot ahead on the board answers a pass with a pass."""
+        board = place(empty_board(5), [(row, 2) for row in range(5)], 'BLACK')
+
+        result = choose_move(board, 5, 'BLACK', consecutive_passes=1, last_move={'pass': True, 'player': 'WHITE'},
+                             playouts=300, seed=6)
+
+        assert result.is_pass
+        assert result.win_rate == 1.0
+
+        # Behind on the board, the bot plays on instead
+        board = place(empty_board(5), [(row, 2) for row in range(5)], 'WHITE')
+        result = choose_move(board, 5, 'BLACK', consecutive_passes=1, last_move={'pass': True, 'player': 'WHITE'},
+                             playouts=100, seed=7)
+        assert not result.is_pass
+
+
+@pytest.mark.django_db
+class TestGoBotOpponent:
+    """Test cases for a Go bot replying to committed moves."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Create a human, a bot and a 9x9 ruleset."""
+        self.human = UserFactory()
+        self.bot = UserFactory(is_bot=True)
+        self.ruleset = GoRuleSetFactory(board_size=9)
+        yield
+        bot_scheduler.shutdown()
+
+    def test_bot_replies_to_a_move(self, django_capture_on_commit_callbacks):
+        """Test the bot's stone is committed once the human's move commits."""
+        game = GameFactory(black_player=self.human, white_player=self.bot, ruleset=self.ruleset)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            game.get_service().make_move(game, self.human.id, 4, 4)
+
+        game.refresh_from_db()
+        assert game.move_count == 2
+        assert game.current_player == 'BLACK'
+        reply = GameMove.objects.get(game=game, move_number=2)
+        assert reply.player_id == self.bot.id
+        assert reply.row >= 0 and game.board_state['board'][reply.row][reply.col] == 'WHITE'
+        assert bot_scheduler.pending() == 0
+
+    def test_snapshot_carries_the_go_state(self):
+        """Test the engine gets komi, ko, passes and the game id along with the board."""
+        game = GameFactory(black_player=self.human, white_player=self.bot, ruleset=self.ruleset)
+        game.board_state['consecutive_passes'] = 1
+        game.board_state['last_move'] = {'pass': True, 'player': 'BLACK'}
+
+        with override_settings(BOT_PLAYOUTS=123):
+            snapshot = bot_scheduler.snapshot(game)
+
+        assert snapshot['komi'] == 6.5
+        assert snapshot['consecutive_passes'] == 1
+        assert snapshot['last_move'] == {'pass': True, 'player': 'BLACK'}
+        assert snapshot['ko_position'] is None
+        assert snapshot['playouts'] == 123
+        assert snapshot['game_id'] == str(game.pk)
+
+    def test_rejected_move_falls_back_to_a_pass(self):
+        """Test an illegal result is skipped and a Go bot passes when nothing else is left."""
+        game = GameFactory(black_player=self.bot, white_player=self.human, ruleset=self.ruleset)
+        game.get_service().make_move(game, self.bot.id, 4, 4)
+        game.get_service().make_move(game, self.human.id, 2, 2)
+        game.refresh_from_db()
+        result = GoSearchResult(2, 2, 0.5, playouts=1, reused_playouts=0, tree_nodes=1, elapsed_ms=1.0,
+                                alternatives=[(4, 4)])
+
+        bot_scheduler.apply((str(game.pk), game.move_count), self.bot.id, result)
+
+        game.refresh_from_db()
+        assert game.move_count == 3
+        assert game.board_state['consecutive_passes'] == 1
+        last = GameMove.objects.get(game=game, move_number=3)
+        assert (last.row, last.col) == (-1, -1)
+
+    def test_bots_play_each_other_to_the_end(self, django_capture_on_commit_callbacks):
+        """Test two Go bots keep playing until both pass."""
+        other_bot = UserFactory(is_bot=True)
+        small = GoRuleSetFactory(board_size=5, komi=0.5)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            game = GameFactory(black_player=self.bot, white_player=other_bot, ruleset=small)
+
+        game.refresh_from_db()
+        assert game.status == GameStatus.FINISHED
+        assert game.move_count == GameMove.objects.filter(game=game).count() > 2
+        assert bot_scheduler.pending() == 0
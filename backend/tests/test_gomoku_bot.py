@@ -0,0 +1,236 @@
+"""
+pytest tests for the Gomoku search engine and the bot opponent that plays it.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+
+from games.bots import bot_scheduler
+from games.compute import PRIORITY_BOT, compute_pool
+from games.gomoku_ai import (
+    FOUR, FIVE, NONE, OPEN_FOUR, OPEN_THREE, GomokuSearch, Position, TranspositionTable, choose_move, line_shape,
+)
+from games.models import GameMove, GameStatus
+from tests.factories import GameFactory, GomokuRuleSetFactory, UserFactory
+
+SIZE = 15
+
+
+def empty_board(size=SIZE):
+    return [[None] * size for _ in range(size)]
+
+
+def place(board, stones, color):
+    for row, col in stones:
+        board[row][col] = color
+    return board
+
+
+class TestGomokuSearch:
+    """Test cases for line shapes and the alpha-beta search."""
+
+    def test_line_shapes_use_gap_and_potential_counts(self):
+        """Test split fours, open threes and dead lines are told apart."""
+        board = place(empty_board(), [(7, 3), (7, 4), (7, 6)], 'BLACK')
+        # Filling the gap of XX_X makes an open four; extending it makes a split four
+        assert line_shape(board, SIZE, 7, 5, (0, 1), 'BLACK', False) == OPEN_FOUR
+        assert line_shape(board, SIZE, 7, 7, (0, 1), 'BLACK', False) == FOUR
+
+        board = place(empty_board(), [(7, 5), (7, 6)], 'BLACK')
+        assert line_shape(board, SIZE, 7, 7, (0, 1), 'BLACK', False) == OPEN_THREE
+
+        # Hemmed in by white stones, a line with no room for five is worthless
+        board = place(empty_board(), [(7, 5), (7, 6)], 'BLACK')
+        place(board, [(7, 4), (7, 8)], 'WHITE')
+        assert line_shape(board, SIZE, 7, 7, (0, 1), 'BLACK', False) == NONE
+
+    def test_overlines_follow_the_ruleset(self):
+        """Test six in a row is only a five when overlines are allowed."""
+        board = place(empty_board(), [(7, 2), (7, 3), (7, 4), (7, 5), (7, 7)], 'BLACK')
+
+        assert line_shape(board, SIZE, 7, 6, (0, 1), 'BLACK', False) == NONE
+        assert line_shape(board, SIZE, 7, 6, (0, 1), 'BLACK', True) == FIVE
+
+    def test_plays_the_winning_move(self):
+        """Test an open four is completed instead of anything else."""
+        board = place(empty_board(), [(7, 5), (7, 6), (7, 7), (7, 8)], 'WHITE')
+        place(board, [(6, 6), (8, 8), (5, 5)], 'BLACK')
+
+        result = choose_move(board, SIZE, 'WHITE', time_budget_ms=200)
+
+        assert (result.row, result.col) in {(7, 4), (7, 9)}
+        assert result.reason == 'win'
+
+    def test_blocks_a_four(self):
+        """Test the only point stopping the opponent's five is played."""
+        board = place(empty_board(), [(3, 3), (4, 4), (5, 5), (6, 6)], 'BLACK')
+        place(board, [(2, 2), (7, 8), (8, 8)], 'WHITE')
+
+        result = choose_move(board, SIZE, 'WHITE', time_budget_ms=200)
+
+        assert (result.row, result.col) == (7, 7)
+        assert result.reason == 'block'
+
+    def test_stops_an_open_three(self):
+        """Test an open three is blocked before it becomes an open four."""
+        board = place(empty_board(), [(7, 6), (7, 7), (7, 8)], 'BLACK')
+        place(board, [(8, 7), (6, 9)], 'WHITE')
+        place(board, [(9, 9)], 'BLACK')
+
+        result = choose_move(board, SIZE, 'WHITE', time_budget_ms=300)
+
+        assert (result.row, result.col) in {(7, 5), (7, 9), (7, 4), (7, 10)}
+        assert result.depth >= 2
+
+    def test_opens_in_the_centre(self):
+        """Test the first move of a game is the centre point."""
+        result = choose_move(empty_board(), SIZE, 'BLACK')
+
+        assert (result.row, result.col) == (7, 7)
+        assert result.reason == 'opening'
+
+    def test_place_and_undo_restore_the_position(self):
+        """Test the incremental hash, shapes and neighbourhood are restored exactly."""
+        board = place(empty_board(), [(7, 7), (7, 8)], 'BLACK')
+        place(board, [(8, 8)], 'WHITE')
+        table = TranspositionTable(SIZE)
+        position = Position(board, SIZE, False, table)
+        before = (position.hash, [list(s) for s in position.shapes], list(position.nearby), position.candidates())
+
+        position.place(6 * SIZE + 6, 1)
+        position.place(7 * SIZE + 9, 0)
+        assert position.hash != before[0]
+        position.undo()
+        position.undo()
+
+        after = (position.hash, [list(s) for s in position.shapes], list(position.nearby), position.candidates())
+        assert after == before
+        assert position.hash == table.hash_board(board)
+
+    def test_transposition_table_is_reused_between_searches(self):
+        """Test a second search of the same position hits the table and agrees on the move."""
+        board = place(empty_board(), [(7, 7), (6, 8), (8, 6)], 'BLACK')
+        place(board, [(6, 6), (8, 8)], 'WHITE')
+        table = TranspositionTable(SIZE)
+
+        first = GomokuSearch(board, SIZE, 'WHITE', time_budget_ms=10_000, max_depth=3, table=table).choose_move()
+        second = GomokuSearch(board, SIZE, 'WHITE', time_budget_ms=10_000, max_depth=3, table=table).choose_move()
+
+        assert first.depth == second.depth == 3
+        assert (first.row, first.col) == (second.row, second.col)
+        assert second.tt_hits > first.tt_hits
+        assert second.nodes < first.nodes
+
+    def test_search_stays_within_the_time_budget(self):
+        """Test the deepest finished iteration is returned once the budget is spent."""
+        board = place(empty_board(), [(7, 7), (6, 8), (8, 6), (5, 5)], 'BLACK')
+        place(board, [(6, 6), (8, 8), (7, 9), (9, 7)], 'WHITE')
+
+        result = GomokuSearch(board, SIZE, 'BLACK', time_budget_ms=100, max_depth=30,
+                              table=TranspositionTable(SIZE)).choose_move()
+
+        assert 1 <= result.depth < 30
+        assert result.elapsed_ms < 400
+        assert board[result.row][result.col] is None
+
+    def test_search_runs_in_a_spawned_worker_process(self):
+        """Test a board snapshot can be searched in a compute worker process, as bot moves are."""
+        board = place(empty_board(9), [(4, 1), (4, 2), (4, 3), (4, 4)], 'BLACK')
+        snapshot = {'board': board, 'size': 9, 'color': 'BLACK', 'time_budget_ms': 100}
+
+        with override_settings(COMPUTE_WORKERS=1):
+            try:
+                result = compute_pool.run('bot_move', PRIORITY_BOT, timeout=60, game='spawned',
+                                          budget_arg='time_budget_ms', engine='games.gomoku_ai.choose_move',
+                                          **snapshot)
+            finally:
+                compute_pool.shutdown()
+
+        assert (result.row, result.col) in {(4, 0), (4, 5)}
+
+
+@pytest.mark.django_db
+class TestBotOpponent:
+    """Test cases for bots replying to committed moves."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Create a human and a bot."""
+        self.human = UserFactory()
+        self.bot = UserFactory(is_bot=True)
+        self.ruleset = GomokuRuleSetFactory(board_size=15)
+        yield
+        bot_scheduler.shutdown()
+
+    def test_bot_replies_to_a_move(self, django_capture_on_commit_callbacks):
+        """Test the bot's move is committed once the human's move commits."""
+        game = GameFactory(black_player=self.human, white_player=self.bot, ruleset=self.ruleset)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            game.get_service().make_move(game, self.human.id, 7, 7)
+
+        game.refresh_from_db()
+        assert game.move_count == 2
+        assert game.current_player == 'BLACK'
+        reply = GameMove.objects.get(game=game, move_number=2)
+        assert reply.player_id == self.bot.id
+        assert max(abs(reply.row - 7), abs(reply.col - 7)) <= 2
+        assert bot_scheduler.pending() == 0
+
+    def test_bot_opens_a_game_it_plays_black_in(self, django_capture_on_commit_callbacks):
+        """Test a new game whose first move is the bot's is answered on creation."""
+        with django_capture_on_commit_callbacks(execute=True):
+            game = GameFactory(black_player=self.bot, white_player=self.human, ruleset=self.ruleset)
+
+        game.refresh_from_db()
+        assert game.move_count == 1
+        assert game.board_state['board'][7][7] == 'BLACK'
+
+    def test_bots_play_each_other_to_the_end(self, django_capture_on_commit_callbacks):
+        """Test bot-against-bot turns are queued, not recursed, until the game ends."""
+        other_bot = UserFactory(is_bot=True)
+        small = GomokuRuleSetFactory(board_size=9)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            game = GameFactory(black_player=self.bot, white_player=other_bot, ruleset=small)
+
+        game.refresh_from_db()
+        # Gomoku has no draw rule, so a full board leaves the game active
+        assert game.status == GameStatus.FINISHED or game.move_count == 81
+        assert game.move_count == GameMove.objects.filter(game=game).count() > 9
+        assert bot_scheduler.pending() == 0
+
+    def test_human_games_are_left_alone(self, django_capture_on_commit_callbacks):
+        """Test no move is played for a human opponent."""
+        other = UserFactory()
+        game = GameFactory(black_player=self.human, white_player=other, ruleset=self.ruleset)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            game.get_service().make_move(game, self.human.id, 7, 7)
+
+        game.refresh_from_db()
+        assert game.move_count == 1
+
+    def test_createbot_command(self):
+        """Test createbot makes a bot that cannot log in, and refuses duplicates."""
+        from users.models import User
+
+        out = StringIO()
+        call_command('createbot', 'Gomoku-Bot', '--display-name', 'Gomoku Bot', stdout=out)
+
+        bot = User.objects.get(username='gomoku-bot')
+        assert bot.is_bot
+        assert bot.display_name == 'Gomoku Bot'
+        assert not bot.has_usable_password()
+        assert 'created' in out.getvalue()
+
+        with pytest.raises(CommandError):
+            call_command('createbot', 'gomoku-bot', stdout=StringIO())
+
+        call_command('createbot', self.human.username, stdout=StringIO())
+        self.human.refresh_from_db()
+        assert self.human.is_bot
@@ -0,0 +1,249 @@
+"""
+pytest tests for the Gomoku threat-space solver and forced-win game analysis.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.exceptions import GameStateError
+from games import gomoku_solver
+from games.analysis import analysis_scheduler, analyze_game, analyze_position
+from games.models import GameAnalysis, GameMove, GameStatus
+from tests.factories import GameFactory, GoRuleSetFactory, GomokuRuleSetFactory, UserFactory
+
+
+# Black to move has two crossing lines that are one stone short of open threes
+DOUBLE_THREE = {'BLACK': [(5, 5), (5, 6), (6, 7), (7, 7)], 'WHITE': [(0, 0), (14, 14), (0, 14), (14, 0)]}
+
+# A game where Black builds an open three that White ignores
+OPEN_THREE_GAME = [
+    (7, 7, 'BLACK'), (0, 0, 'WHITE'), (7, 8, 'BLACK'), (0, 2, 'WHITE'), (7, 9, 'BLACK'), (0, 4, 'WHITE'),
+    (7, 10, 'BLACK'), (7, 11, 'WHITE'), (7, 6, 'BLACK'), (1, 1, 'WHITE'), (7, 5, 'BLACK'),
+]
+
+
+def board_with(stones, size=15):
+    board = [[None] * size for _ in range(size)]
+    for color, points in stones.items():
+        for row, col in points:
+            board[row][col] = color
+    return board
+
+
+def finished_game(moves, **kwargs):
+    """A finished Gomoku game with ``(row, col, color)`` moves stored as GameMove rows."""
+    game = GameFactory(**kwargs)
+    for number, (row, col, color) in enumerate(moves, start=1):
+        GameMove.objects.create(
+            game=game, move_number=number, row=row, col=col, player_color=color,
+            player=game.black_player if color == 'BLACK' else game.white_player,
+        )
+    game.status = GameStatus.FINISHED
+    game.finished_at = timezone.now()
+    game.move_count = len(moves)
+    game.save()
+    return game
+
+
+class TestThreatSolver:
+    """Test cases for VCF and VCT search on fixed positions."""
+
+    def test_double_four_is_a_vcf(self):
+        """Test a move making two fours at once wins by continuous fours."""
+        board = board_with({'BLACK': [(3, 3), (3, 4), (3, 5), (4, 6), (5, 6), (6, 6)],
+                            'WHITE': [(3, 2), (7, 6)]})
+
+        result = gomoku_solver.solve(board, 15, 'BLACK')
+
+        assert result.is_win
+        assert result.kind == gomoku_solver.VCF
+        assert result.sequence[0] == (3, 6, 'BLACK')
+        assert result.sequence[-1][2] == 'BLACK'
+        assert len(result.sequence) % 2 == 1
+        assert board[3][6] is None
+
+    def test_double_three_needs_threes(self):
+        """Test a three-three fork is found by VCT but not by continuous fours alone."""
+        board = board_with(DOUBLE_THREE)
+
+        assert gomoku_solver.solve(board, 15, 'BLACK', kinds=(gomoku_solver.VCF,)).status == gomoku_solver.NO_WIN
+
+        result = gomoku_solver.solve(board, 15, 'BLACK')
+        assert result.is_win
+        assert result.kind == gomoku_solver.VCT
+        assert result.sequence[0] == (5, 7, 'BLACK')
+
+    def test_opponent_four_must_be_blocked_first(self):
+        """Test the forced block of the opponent's four hands them the tempo."""
+        stones = {color: list(points) for color, points in DOUBLE_THREE.items()}
+        stones['WHITE'] = [(2, 2), (2, 3), (2, 4), (2, 5)]
+        stones['BLACK'].append((2, 1))
+
+        result = gomoku_solver.solve(board_with(stones), 15, 'BLACK')
+
+        assert result.status == gomoku_solver.NO_WIN
+
+    def test_own_five_comes_before_blocking(self):
+        """Test completing a five wins even when the opponent also has a four."""
+        board = board_with({'BLACK': [(7, 3), (7, 4), (7, 5), (7, 6)], 'WHITE': [(2, 2), (2, 3), (2, 4), (2, 5)]})
+
+        result = gomoku_solver.solve(board, 15, 'BLACK')
+
+        assert result.is_win
+        assert len(result.sequence) == 1
+        assert result.sequence[0][:2] in ((7, 2), (7, 7))
+
+    def test_spent_budget_is_unknown(self):
+        """Test running out of nodes reports an unknown result rather than no win."""
+        result = gomoku_solver.solve(board_with(DOUBLE_THREE), 15, 'BLACK', max_nodes=1)
+
+        assert result.status == gomoku_solver.UNKNOWN
+        assert result.sequence == []
+        assert result.to_dict()['status'] == 'unknown'
+
+    def test_first_forced_win_in_a_game(self):
+        """Test the scan stops at the first position where the side to move wins."""
+        scan = gomoku_solver.find_first_forced_win(OPEN_THREE_GAME, 15)
+
+        # Black's open three stands after White's sixth move
+        assert scan.move_number == 6
+        assert scan.result.color == 'BLACK'
+        assert scan.result.kind == gomoku_solver.VCF
+        assert scan.positions == 6
+        assert scan.to_dict()['result']['sequence'][0][2] == 'BLACK'
+
+    def test_scan_can_be_continued_slice_by_slice(self):
+        """Test an unfinished scan picks up where it stopped and finds the same win."""
+        scan = gomoku_solver.find_first_forced_win(OPEN_THREE_GAME, 15, slice_ms=0)
+        assert not scan.complete
+        assert scan.positions == scan.scanned == 1
+
+        slices = 1
+        while not scan.complete:
+            scan = gomoku_solver.find_first_forced_win(OPEN_THREE_GAME, 15, scan=scan, slice_ms=0)
+            slices += 1
+
+        assert slices == 6
+        assert scan.move_number == 6
+        assert scan.positions == 6
+
+    def test_quiet_game_has_no_forced_win(self):
+        """Test a scan over scattered stones finds nothing and stops at the last move."""
+        moves = [(0, 0, 'BLACK'), (14, 14, 'WHITE'), (0, 14, 'BLACK'), (14, 0, 'WHITE')]
+
+        scan = gomoku_solver.find_first_forced_win(moves, 15)
+
+        assert scan.move_number is None
+        assert scan.result is None
+        assert scan.positions == 4
+
+
+@pytest.mark.django_db
+class TestForcedWinAnalysis:
+    """Test cases for storing and serving forced-win analysis of games."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Create two players and a 15x15 ruleset."""
+        self.black = UserFactory()
+        self.white = UserFactory()
+        self.ruleset = GomokuRuleSetFactory(board_size=15)
+
+    def game(self, moves=OPEN_THREE_GAME):
+        return finished_game(moves, black_player=self.black, white_player=self.white, ruleset=self.ruleset)
+
+    def test_analyze_game_stores_the_first_forced_win(self):
+        """Test the analysis records where the win appeared and what the search cost."""
+        game = self.game()
+
+        analysis = analyze_game(game)
+
+        assert GameAnalysis.objects.get(game=game) == analysis
+        assert analysis.forced_win_move == 6
+        assert analysis.forced_win_player == 'BLACK'
+        assert analysis.forced_win_kind == gomoku_solver.VCF
+        assert analysis.forced_win_sequence[0][2] == 'BLACK'
+        assert analysis.positions_searched == 6
+        assert analysis.nodes > 0
+
+    def test_only_finished_gomoku_games_are_analysed(self):
+        """Test active games and Go games are rejected."""
+        active = GameFactory(black_player=self.black, white_player=self.white, ruleset=self.ruleset)
+        go_game = GameFactory(black_player=self.black, white_player=self.white, ruleset=GoRuleSetFactory())
+
+        with pytest.raises(GameStateError):
+            analyze_game(active)
+        with pytest.raises(GameStateError):
+            analyze_position(go_game)
+
+    def test_finished_games_are_analysed_in_the_background(self, django_capture_on_commit_callbacks):
+        """Test a game that finishes is scanned in slices and its analysis stored."""
+        game = GameFactory(black_player=self.black, white_player=self.white, ruleset=self.ruleset)
+        service = game.get_service()
+        players = {'BLACK': self.black.id, 'WHITE': self.white.id}
+        # Black's ninth move makes five
+        moves = OPEN_THREE_GAME[:9]
+
+        with override_settings(ANALYSIS_ON_FINISH=True, COMPUTE_SLICE_MS=0), \
+                django_capture_on_commit_callbacks(execute=True):
+            for row, col, color in moves:
+                service.make_move(game, players[color], row, col)
+
+        game.refresh_from_db()
+        assert game.status == GameStatus.FINISHED
+        analysis = GameAnalysis.objects.get(game=game)
+        assert analysis.forced_win_move == 6
+        assert analysis_scheduler.pending() == 0
+
+    def test_command_skips_analysed_games(self):
+        """Test the command analyses new finished games and leaves analysed ones alone."""
+        first = self.game()
+        analyze_game(first)
+        second = self.game()
+        GameFactory(black_player=self.black, white_player=self.white, ruleset=self.ruleset)
+
+        out = StringIO()
+        call_command('analyze_forced_wins', stdout=out)
+
+        assert f'{second.pk}: BLACK VCF after move 6' in out.getvalue()
+        assert str(first.pk) not in out.getvalue()
+        assert 'Analysed 1 games' in out.getvalue()
+        assert GameAnalysis.objects.count() == 2
+
+        out = StringIO()
+        call_command('analyze_forced_wins', '--reanalyze', stdout=out)
+        assert 'Analysed 2 games' in out.getvalue()
+
+    def test_analysis_endpoint(self, client):
+        """Test a player gets the position analysis and the stored game analysis."""
+        game = self.game()
+        analyze_game(game)
+        client.force_login(self.white)
+
+        response = client.get(reverse('web:game_analysis', args=[game.id]), {'move': 6})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['move_number'] == 6
+        assert data['position']['status'] == 'win'
+        assert data['position']['color'] == 'BLACK'
+        assert data['game_analysis']['forced_win_move'] == 6
+
+    def test_analysis_endpoint_rejects_other_users_and_active_games(self, client):
+        """Test non-players get 403 and unfinished or Go games get 400."""
+        game = self.game()
+        client.force_login(UserFactory())
+        assert client.get(reverse('web:game_analysis', args=[game.id])).status_code == 403
+
+        client.force_login(self.black)
+        active = GameFactory(black_player=self.black, white_player=self.white, ruleset=self.ruleset)
+        assert client.get(reverse('web:game_analysis', args=[active.id])).status_code == 400
+
+        go_game = finished_game([], black_player=self.black, white_player=self.white, ruleset=GoRuleSetFactory())
+        assert client.get(reverse('web:game_analysis', args=[go_game.id])).status_code == 400
+        assert client.get(reverse('web:game_analysis', args=[game.id]), {'move': 'x'}).status_code == 400
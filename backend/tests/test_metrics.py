@@ -0,0 +1,126 @@
+"""
+pytest tests for in-process latency metrics and the /metrics endpoint.
+"""
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from core.metrics import (
+    CHANNEL_SEND, NOTIFICATION_UPDATE, REQUEST_DB_QUERIES, REQUEST_LATENCY, TEMPLATE_RENDER,
+    Histogram, registry
+)
+from games.models import GameStatus
+from tests.factories import UserFactory, RuleSetFactory, GameFactory
+from web.consumers import WebSocketMessageSender
+from web.services import WebSocketNotificationService
+
+
+class TestHistogram:
+    """Test cases for histogram bookkeeping and exposition."""
+
+    def test_exposition_format(self):
+        """Test buckets are cumulative and sum/count are exposed per label set."""
+        histogram = Histogram('test_seconds', 'Test latency.', ('view',), buckets=(0.1, 1))
+        histogram.observe(0.05, view='A')
+        histogram.observe(0.5, view='A')
+        histogram.observe(5, view='A')
+
+        lines = histogram.expose()
+        assert lines[:2] == ['# HELP test_seconds Test latency.', '# TYPE test_seconds histogram']
+        assert 'test_seconds_bucket{view="A",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{view="A",le="1"} 2' in lines
+        assert 'test_seconds_bucket{view="A",le="+Inf"} 3' in lines
+        assert 'test_seconds_sum{view="A"} 5.55' in lines
+        assert 'test_seconds_count{view="A"} 3' in lines
+
+    def test_quantiles_interpolate_within_buckets(self):
+        """Test p50/p99 estimates follow Prometheus' histogram_quantile."""
+        histogram = Histogram('test_seconds', 'Test latency.', buckets=(0.01, 0.1, 1))
+        for _ in range(90):
+            histogram.observe(0.005)
+        for _ in range(10):
+            histogram.observe(0.5)
+
+        assert histogram.quantile(0.5) == pytest.approx(0.01 * 50 / 90)
+        assert histogram.quantile(0.99) == pytest.approx(0.1 + 0.9 * 9 / 10)
+        assert Histogram('empty', 'Empty.').quantile(0.5) is None
+
+    def test_labels_are_checked(self):
+        """Test observing with the wrong labels fails loudly."""
+        histogram = Histogram('test_seconds', 'Test latency.', ('view',))
+        with pytest.raises(ValueError):
+            histogram.observe(1, event='x')
+
+    def test_disabled_metrics_record_nothing(self, settings):
+        """Test METRICS_ENABLED=False turns observations into no-ops."""
+        settings.METRICS_ENABLED = False
+        histogram = Histogram('test_seconds', 'Test latency.')
+        histogram.observe(1)
+
+        assert histogram.count() == 0
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    """Test cases for the instrumented request, template and notification paths."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up a logged-in player with an active game."""
+        registry.reset()
+        self.user = UserFactory()
+        self.opponent = UserFactory()
+        self.game = GameFactory(
+            black_player=self.user,
+            white_player=self.opponent,
+            ruleset=RuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_request_latency_and_queries_by_view(self):
+        """Test a request is recorded under its view with its query count."""
+        response = self.client.get(reverse('web:dashboard'))
+        assert response.status_code == 200
+
+        assert REQUEST_LATENCY.count(view='DashboardView', method='GET', status='2xx') == 1
+        assert REQUEST_DB_QUERIES.count(view='DashboardView') == 1
+        assert REQUEST_DB_QUERIES.quantile(1.0, view='DashboardView') > 0
+
+    def test_template_render_time(self):
+        """Test top-level template renders are timed by template name."""
+        self.client.get(reverse('web:dashboard'))
+
+        assert TEMPLATE_RENDER.count(template='web/dashboard.html') == 1
+
+    def test_notification_updates_and_channel_sends(self):
+        """Test notification update types and channel sends are timed."""
+        WebSocketNotificationService.notify_game_event('game_resigned', self.game, self.user, None)
+
+        assert NOTIFICATION_UPDATE.count(event='game_resigned', update_type='games_panel') == 2
+        assert NOTIFICATION_UPDATE.count(event='game_resigned', update_type='game_panel') == 2
+
+        WebSocketMessageSender.send_to_user_sync(self.user.id, 'friends_update', '<div></div>')
+        assert CHANNEL_SEND.count(event_type='friends_update') >= 1
+
+    def test_metrics_endpoint(self):
+        """Test /metrics serves the text format to an allowed scraper."""
+        self.client.get(reverse('web:dashboard'))
+        response = Client().get('/metrics')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert 'gomoku_http_request_duration_seconds_bucket{view="DashboardView"' in response.content.decode()
+
+    def test_metrics_endpoint_is_restricted(self, settings):
+        """Test other addresses need a staff account."""
+        settings.METRICS_ALLOWED_IPS = []
+        assert Client().get('/metrics').status_code == 403
+
+        staff = Client()
+        staff.force_login(UserFactory(is_staff=True))
+        assert staff.get('/metrics').status_code == 200
@@ -0,0 +1,204 @@
+"""
+pytest tests for optimistic-concurrency move commits.
+"""
+
+import threading
+
+import pytest
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test import override_settings
+
+from core.exceptions import GameConflictError, GameError
+from games.active_games import active_game_store
+from games.admin import GameAdmin
+from games.concurrency import commit_game_state, commit_stats, run_optimistic
+from games.game_services import GomokuGameService
+from games.models import Game, GameMove, GameStatus, Player
+from tests.factories import UserFactory, RuleSetFactory, GameFactory
+
+
+def create_active_game():
+    game = GameFactory(
+        black_player=UserFactory(),
+        white_player=UserFactory(),
+        ruleset=RuleSetFactory(board_size=15),
+        status=GameStatus.ACTIVE
+    )
+    game.initialize_board()
+    game.save()
+    return game
+
+
+@pytest.mark.django_db
+class TestOptimisticCommit:
+    """Test cases for the compare-and-swap commit path."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up an active game."""
+        self.game = create_active_game()
+        self.service = GomokuGameService()
+        active_game_store.clear()
+
+    def test_save_bumps_version(self):
+        """Test plain saves advance the version."""
+        version = self.game.version
+        self.game.save()
+        self.game.refresh_from_db()
+
+        assert self.game.version == version + 1
+
+    def test_commit_bumps_version(self):
+        """Test a successful compare-and-swap advances the version."""
+        version = self.game.version
+        self.game.current_player = Player.WHITE
+        commit_game_state(self.game)
+
+        stored = Game.objects.get(pk=self.game.pk)
+        assert stored.version == version + 1 == self.game.version
+        assert stored.current_player == Player.WHITE
+
+    def test_stale_commit_conflicts(self):
+        """Test committing from a stale copy raises a conflict and writes nothing."""
+        stale = Game.objects.get(pk=self.game.pk)
+        self.game.save()
+
+        stale.current_player = Player.WHITE
+        with pytest.raises(GameConflictError) as exc_info:
+            commit_game_state(stale)
+
+        assert exc_info.value.code == 'GAME_CONFLICT'
+        assert Game.objects.get(pk=self.game.pk).current_player == Player.BLACK
+
+    @override_settings(GAME_COMMIT_MAX_ATTEMPTS=3)
+    def test_retries_are_bounded(self):
+        """Test an operation that always conflicts gives up after the configured attempts."""
+        attempts = []
+
+        def always_conflicts(game_id):
+            attempts.append(game_id)
+            raise GameConflictError("conflict")
+
+        with pytest.raises(GameConflictError) as exc_info:
+            run_optimistic(self.game.pk, always_conflicts)
+
+        assert len(attempts) == 3
+        assert exc_info.value.details['attempts'] == 3
+
+    def test_conflicting_move_is_retried(self, monkeypatch):
+        """Test a move whose first commit loses a race succeeds on retry."""
+        raced = []
+
+        def commit_after_concurrent_write(game, *args, **kwargs):
+            if not raced:
+                raced.append(True)
+                Game.objects.get(pk=game.pk).save()
+            return commit_game_state(game, *args, **kwargs)
+
+        monkeypatch.setattr('games.concurrency.commit_game_state', commit_after_concurrent_write)
+        move = self.service.make_move(self.game, self.game.black_player_id, 7, 7)
+
+        assert move.move_number == 1
+        assert GameMove.objects.filter(game=self.game).count() == 1
+
+    def test_resignation_keeps_a_concurrently_committed_move(self):
+        """Test resigning from a stale copy does not overwrite a move committed meanwhile."""
+        stale = Game.objects.get(pk=self.game.pk)
+        self.service.make_move(self.game, self.game.black_player_id, 7, 7)
+
+        self.service.resign_game(stale, stale.white_player_id)
+
+        stored = Game.objects.get(pk=self.game.pk)
+        assert stored.status == GameStatus.FINISHED
+        assert stored.winner_id == stored.black_player_id
+        assert stored.move_count == 1
+        assert stored.board_state['board'][7][7] == Player.BLACK
+        assert (stale.status, stale.version) == (stored.status, stored.version)
+
+    def test_admin_abandon_bumps_version(self):
+        """Test abandoning from the admin makes in-flight commits of the game conflict."""
+        loaded = Game.objects.get(pk=self.game.pk)
+        game_admin = GameAdmin(Game, site)
+        game_admin.message_user = lambda *args, **kwargs: None
+        game_admin.abandon_games(None, Game.objects.filter(pk=self.game.pk))
+
+        loaded.current_player = Player.WHITE
+        with pytest.raises(GameConflictError):
+            commit_game_state(loaded)
+        assert Game.objects.get(pk=self.game.pk).status == GameStatus.ABANDONED
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentMoves:
+    """Stress test racing moves submitted from many threads."""
+
+    THREADS = 8
+    ROUNDS = 6
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up an active game."""
+        self.game = create_active_game()
+        self.service = GomokuGameService()
+        active_game_store.clear()
+        commit_stats.reset()
+
+    def race(self, submit):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        lock = threading.Lock()
+
+        def worker(index):
+            barrier.wait()
+            try:
+                outcome = submit(index)
+            except GameError as e:
+                outcome = e
+            finally:
+                connection.close()
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_racing_moves_commit_exactly_once_per_turn(self):
+        """Test that racing submissions for the same turn produce one move each round."""
+        for round_number in range(self.ROUNDS):
+            game = Game.objects.get(pk=self.game.pk)
+            player_id = game.get_current_player_user().id
+
+            results = self.race(
+                lambda i, game=game, player_id=player_id, round_number=round_number:
+                    self.service.make_move(game, player_id, round_number, i)
+            )
+
+            successes = [r for r in results if isinstance(r, GameMove)]
+            assert len(successes) == 1
+            assert all(isinstance(r, GameError) for r in results if r not in successes)
+
+        game = Game.objects.get(pk=self.game.pk)
+        move_numbers = list(game.moves.values_list('move_number', flat=True))
+        assert move_numbers == list(range(1, self.ROUNDS + 1))
+        assert game.move_count == self.ROUNDS
+
+        stones = sum(cell is not None for row in game.board_state['board'] for cell in row)
+        assert stones == self.ROUNDS
+        assert game.current_player == (Player.BLACK if self.ROUNDS % 2 == 0 else Player.WHITE)
+
+    def test_racing_duplicate_submissions(self):
+        """Test the same move submitted concurrently is applied once."""
+        game = Game.objects.get(pk=self.game.pk)
+
+        results = self.race(
+            lambda i: self.service.make_move(game, game.black_player_id, 7, 7)
+        )
+
+        assert sum(isinstance(r, GameMove) for r in results) == 1
+        assert GameMove.objects.filter(game=game).count() == 1
+        assert commit_stats.snapshot()['commits'] == 1
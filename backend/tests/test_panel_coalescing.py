@@ -0,0 +1,124 @@
+"""
+pytest tests for per-user coalescing of panel notifications.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+
+from games.models import GameStatus
+from tests.factories import UserFactory, RuleSetFactory, GameFactory
+from web.consumers import WebSocketMessageSender
+from web.services import PanelUpdateCoalescer, WebSocketNotificationService, panel_coalescer, render_counter
+
+
+class TestPanelUpdateCoalescer:
+    """Test cases for the debounce window itself."""
+
+    def test_zero_window_sends_immediately(self):
+        """Test updates are sent inline when coalescing is disabled."""
+        coalescer = PanelUpdateCoalescer(window_ms=0)
+        sent = []
+
+        assert coalescer.submit(1, 'games_panel', lambda: sent.append('a') or True) is True
+        assert sent == ['a']
+        assert coalescer.stats() == {'submitted': 1, 'sent': 1, 'coalesced': 0, 'pending': 0}
+
+    def test_burst_sends_latest_only(self):
+        """Test a burst for one target inside the window sends only the last update."""
+        coalescer = PanelUpdateCoalescer(window_ms=50)
+        sent = []
+        done = threading.Event()
+
+        for i in range(5):
+            coalescer.submit(1, 'games_panel', lambda i=i: sent.append(i) or done.set())
+
+        assert done.wait(2)
+        assert sent == [4]
+        assert coalescer.stats()['coalesced'] == 4
+
+    def test_targets_are_coalesced_separately(self):
+        """Test different users and panels each get their own update."""
+        coalescer = PanelUpdateCoalescer(window_ms=10_000)
+        sent = []
+
+        coalescer.submit(1, 'games_panel', lambda: sent.append((1, 'games')))
+        coalescer.submit(1, 'friends_panel', lambda: sent.append((1, 'friends')))
+        coalescer.submit(2, 'games_panel', lambda: sent.append((2, 'games')))
+        coalescer.submit(1, 'games_panel', lambda: sent.append((1, 'games latest')))
+        assert sent == []
+
+        coalescer.flush()
+        assert sorted(sent) == [(1, 'friends'), (1, 'games latest'), (2, 'games')]
+        assert coalescer.stats()['pending'] == 0
+
+
+    @pytest.mark.asyncio
+    async def test_deferred_send_reaches_consumers_on_the_event_loop(self):
+        """Test an update deferred from a sync_to_async thread is delivered when the window closes."""
+        coalescer = PanelUpdateCoalescer(window_ms=75)
+        channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add('user_1', channel)
+
+        def send():
+            return WebSocketMessageSender.send_to_user_sync(1, 'dashboard_update', 'games panel')
+
+        def notify():
+            return coalescer.submit(1, 'games_panel', send)
+
+        start = time.monotonic()
+        await sync_to_async(notify, thread_sensitive=False)()
+        message = await asyncio.wait_for(channel_layer.receive(channel), timeout=2)
+        latency = time.monotonic() - start
+
+        assert message['content'] == 'games panel'
+        assert 0.07 <= latency < 0.5
+        assert coalescer.stats()['pending'] == 0
+        await channel_layer.group_discard('user_1', channel)
+
+
+@pytest.mark.django_db
+class TestNotificationCoalescing:
+    """Test cases for panel coalescing in the notification service."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up a game and a long window that is flushed by hand."""
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=RuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+        panel_coalescer.reset()
+        panel_coalescer._window_ms = 10_000
+        render_counter.reset()
+        yield
+        panel_coalescer._window_ms = None
+        panel_coalescer.reset()
+
+    def test_event_burst_renders_games_panel_once_per_user(self):
+        """Test repeated game events render each player's games panel once."""
+        with patch('web.services.WebSocketMessageSender.send_to_user_sync') as send:
+            for _ in range(3):
+                WebSocketNotificationService.notify_game_event(
+                    'game_resigned', self.game, self.black_player, None
+                )
+            assert render_counter.snapshot()['game_resigned'].get('web/partials/games_panel.html') is None
+
+            panel_coalescer.flush()
+
+        panel_sends = [c.args[0] for c in send.call_args_list if c.args[1] == 'dashboard_update']
+        assert sorted(panel_sends) == sorted([self.black_player.id, self.white_player.id])
+        assert render_counter.snapshot()['game_resigned']['web/partials/games_panel.html'] == 2
+        assert render_counter.snapshot()['game_resigned']['web/partials/dashboard_game_panel.html'] == 6
@@ -0,0 +1,97 @@
+"""
+pytest tests for the versioned panel fragment cache.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import caches
+from django.test import Client
+from django.urls import reverse
+
+from games.game_services import GomokuGameService
+from games.models import GameStatus
+from tests.factories import UserFactory, RuleSetFactory, GameFactory
+from web.fragments import panel_fragments
+from web.services import WebSocketNotificationService
+from web.versions import CHALLENGES, FRIENDS_PANEL, GAMES_PANEL, panel_versions
+
+
+@pytest.mark.django_db
+class TestPanelFragmentCache:
+    """Test cases for panel HTML reuse across renders and call sites."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings):
+        """Use a real cache for fragments and set up an active game."""
+        settings.CACHES = dict(settings.CACHES, default={
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'test-panel-fragments',
+        })
+        caches['default'].clear()
+        panel_fragments.reset_stats()
+
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=RuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+        yield
+        caches['default'].clear()
+
+    def test_unchanged_panel_is_served_from_cache(self):
+        """Test rendering an unchanged panel twice renders it once."""
+        first = panel_fragments.render(GAMES_PANEL, self.black_player)
+        second = panel_fragments.render(GAMES_PANEL, self.black_player)
+
+        assert first == second
+        assert panel_fragments.stats()[GAMES_PANEL] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    def test_move_changes_games_panel_key(self):
+        """Test a committed move is picked up through the games' updated_at."""
+        before = panel_fragments.render(GAMES_PANEL, self.white_player)
+        assert 'your-turn' not in before
+
+        GomokuGameService().make_move(self.game, self.black_player.id, 7, 7)
+        after = panel_fragments.render(GAMES_PANEL, self.white_player)
+
+        assert 'your-turn' in after
+        assert panel_fragments.stats()[GAMES_PANEL]['misses'] == 2
+
+    def test_challenge_version_changes_friends_panel_key(self):
+        """Test the friends panel is re-rendered after a challenge version bump."""
+        panel_fragments.render(FRIENDS_PANEL, self.black_player)
+        panel_versions.bump(self.black_player.id, CHALLENGES)
+        panel_fragments.render(FRIENDS_PANEL, self.black_player)
+
+        assert panel_fragments.stats()[FRIENDS_PANEL]['misses'] == 2
+
+    def test_selected_game_is_cached_separately(self):
+        """Test the dashboard's highlighted variant does not leak into plain renders."""
+        selected = panel_fragments.render(GAMES_PANEL, self.black_player, selected_game=self.game)
+        plain = panel_fragments.render(GAMES_PANEL, self.black_player)
+
+        assert 'hover-bg-light selected-game' in selected
+        assert 'hover-bg-light selected-game' not in plain
+
+    def test_http_and_websocket_share_html(self):
+        """Test the pull endpoint and the WebSocket push reuse one render."""
+        client = Client()
+        client.force_login(self.black_player)
+        response = client.get(reverse('web:games_panel'))
+
+        with patch('web.services.WebSocketMessageSender.send_to_user_sync') as send:
+            WebSocketNotificationService._send_games_panel_update(self.black_player, None, '', {})
+
+        assert send.call_args.args[2] == response.content.decode().replace('\n\n', ' ').strip()
+        assert panel_fragments.stats()[GAMES_PANEL] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    def test_fragments_carry_no_csrf_token(self):
+        """Test cached HTML is independent of the request's CSRF token."""
+        html = panel_fragments.render(FRIENDS_PANEL, self.black_player)
+        assert 'csrfmiddlewaretoken' not in html
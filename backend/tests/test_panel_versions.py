@@ -0,0 +1,193 @@
+"""
+pytest tests for data version counters, conditional GETs and invalidation-only push mode.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from games.models import GameStatus
+from games.game_services import GomokuGameService
+from tests.factories import UserFactory, RuleSetFactory, GameFactory, ChallengeFactory, GomokuRuleSetFactory
+from web.services import WebSocketNotificationService, render_counter
+from web.versions import CHALLENGES, FRIENDSHIPS, GAMES, GAMES_PANEL, RULESETS, panel_versions
+
+
+@pytest.mark.django_db
+class TestPanelVersions:
+    """Test cases for the per-user version counters."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up two players and an active game."""
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=RuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+
+    def test_bump_advances_version(self):
+        """Test bumping increases the version and reads are stable."""
+        version = panel_versions.get(self.black_player.id, GAMES)
+
+        assert panel_versions.get(self.black_player.id, GAMES) == version
+        assert panel_versions.bump(self.black_player.id, GAMES) == version + 1
+        assert panel_versions.get(self.black_player.id, GAMES) == version + 1
+
+    def test_lost_counter_is_reseeded_forward(self):
+        """Test a counter lost from the cache never goes back to an old version."""
+        version = panel_versions.bump(self.black_player.id, GAMES)
+        panel_versions.cache.delete(panel_versions.make_key(self.black_player.id, GAMES))
+
+        assert panel_versions.get(self.black_player.id, GAMES) > version
+
+    def test_move_bumps_both_games_panels(self, django_capture_on_commit_callbacks):
+        """Test a committed move bumps the games panel of both players."""
+        black_version = panel_versions.get(self.black_player.id, GAMES)
+        white_version = panel_versions.get(self.white_player.id, GAMES)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            GomokuGameService().make_move(self.game, self.black_player.id, 7, 7)
+
+        assert panel_versions.get(self.black_player.id, GAMES) > black_version
+        assert panel_versions.get(self.white_player.id, GAMES) > white_version
+
+    def test_challenge_bumps_friends_panels(self, django_capture_on_commit_callbacks):
+        """Test creating a challenge bumps the friends panel of both users."""
+        version = panel_versions.get(self.white_player.id, CHALLENGES)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ChallengeFactory(challenger=self.black_player, challenged=self.white_player)
+
+        assert panel_versions.get(self.white_player.id, CHALLENGES) > version
+
+    def test_ruleset_change_bumps_global_version(self, django_capture_on_commit_callbacks):
+        """Test saving a ruleset bumps the global rulesets version."""
+        version = panel_versions.get(None, RULESETS)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            GomokuRuleSetFactory()
+
+        assert panel_versions.get(None, RULESETS) > version
+
+    def test_panel_version_combines_scopes(self):
+        """Test the friends panel version moves with friendships and challenges."""
+        version = panel_versions.get_panel(self.black_player.id, 'friends_panel')
+        panel_versions.bump(self.black_player.id, FRIENDSHIPS)
+        panel_versions.bump(self.black_player.id, CHALLENGES)
+
+        assert panel_versions.get_panel(self.black_player.id, 'friends_panel') == version + 2
+
+    def test_no_bump_before_commit(self, django_capture_on_commit_callbacks):
+        """Test versions only move once the change is committed."""
+        version = panel_versions.get(self.black_player.id, GAMES)
+
+        with django_capture_on_commit_callbacks(execute=False):
+            self.game.save()
+
+        assert panel_versions.get(self.black_player.id, GAMES) == version
+
+
+@pytest.mark.django_db
+class TestConditionalViews:
+    """Test cases for ETag-based conditional GETs."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up a logged-in user."""
+        self.user = UserFactory()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @pytest.mark.parametrize('url_name,scope', [
+        ('web:games_panel', GAMES),
+        ('web:friends_panel', FRIENDSHIPS),
+        ('web:friends_panel', CHALLENGES),
+        ('web:games_modal', GAMES),
+        ('web:friends_modal', FRIENDSHIPS),
+        ('web:pending_requests', FRIENDSHIPS),
+        ('web:blocked_users', FRIENDSHIPS),
+    ])
+    def test_unchanged_view_is_not_modified(self, url_name, scope):
+        """Test revalidating unchanged content returns 304, and 200 after a bump."""
+        response = self.client.get(reverse(url_name))
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert 'no-cache' in response['Cache-Control']
+
+        response = self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == b''
+
+        panel_versions.bump(self.user.id, scope)
+        response = self.client.get(reverse(url_name), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_not_modified_runs_no_queries(self, django_assert_max_num_queries):
+        """Test a 304 is answered before the view queries anything beyond the session."""
+        etag = self.client.get(reverse('web:games_modal'))['ETag']
+
+        # Session and user lookups only
+        with django_assert_max_num_queries(2):
+            response = self.client.get(reverse('web:games_modal'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_rulesets_etag_is_shared(self):
+        """Test the ruleset list version is global rather than per user."""
+        etag = self.client.get(reverse('web:rulesets_list'))['ETag']
+
+        other = Client()
+        other.force_login(UserFactory())
+        response = other.get(reverse('web:rulesets_list'), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        panel_versions.bump(None, RULESETS)
+        assert other.get(reverse('web:rulesets_list'), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_panels_require_login(self):
+        """Test anonymous requests are redirected to the login page."""
+        response = Client().get(reverse('web:games_panel'))
+        assert response.status_code == 302
+
+
+@pytest.mark.django_db
+class TestInvalidatePushMode:
+    """Test cases for invalidation-only notifications."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings):
+        """Enable invalidation-only push mode."""
+        settings.NOTIFICATION_PUSH_MODE = 'invalidate'
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=RuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        render_counter.reset()
+
+    def test_panels_are_invalidated_not_rendered(self):
+        """Test panel updates push the version instead of rendered HTML."""
+        with patch('web.services.WebSocketMessageSender.send_to_user_sync') as send:
+            WebSocketNotificationService.notify_game_event(
+                'game_resigned', self.game, self.black_player, None
+            )
+
+        invalidations = [c for c in send.call_args_list if c.args[1] == 'panel_invalidate']
+        assert {c.args[0] for c in invalidations} == {self.black_player.id, self.white_player.id}
+        assert invalidations[0].kwargs['metadata'] == {
+            'invalidate': GAMES_PANEL,
+            'version': panel_versions.get_panel(invalidations[0].args[0], GAMES_PANEL)
+        }
+        assert 'web/partials/games_panel.html' not in render_counter.snapshot()['game_resigned']
+        assert not any(c.args[1] == 'dashboard_update' for c in send.call_args_list)
@@ -0,0 +1,121 @@
+"""
+pytest tests for on-demand profiling of requests and WebSocket messages.
+"""
+
+import json
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from core.profiling import list_profiles, make_profile_token, profile_consumer_message, valid_profile_token
+from tests.factories import UserFactory
+
+
+class EchoConsumer:
+    """Stand-in consumer exposing a decorated receive."""
+
+    def __init__(self, user):
+        self.user = user
+        self.received = []
+
+    @profile_consumer_message
+    async def receive(self, text_data):
+        self.received.append(json.loads(text_data))
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    """Test cases for profiling triggers, saved captures and the profiles command."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings, tmp_path):
+        """Enable profiling into a temporary directory."""
+        settings.PROFILING_ENABLED = True
+        settings.PROFILE_SAMPLE_RATE = 0
+        settings.PROFILE_DIR = str(tmp_path)
+        self.profile_dir = tmp_path
+        self.user = UserFactory()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_tokens_are_signed(self):
+        """Test only tokens made with the secret key are accepted."""
+        assert valid_profile_token(make_profile_token())
+        assert not valid_profile_token('profile:forged:token')
+        assert not valid_profile_token(None)
+
+    def test_signed_header_profiles_request(self):
+        """Test a request with a valid token is profiled and saved with a summary."""
+        response = self.client.get(reverse('web:dashboard'), HTTP_X_PROFILE_TOKEN=make_profile_token())
+
+        profile_id = response['X-Profile-Id']
+        assert (self.profile_dir / f'{profile_id}.pstats').exists()
+        summary = (self.profile_dir / f'{profile_id}.txt').read_text()
+        assert summary.startswith('GET /')
+        assert 'cumulative' in summary
+
+    def test_requests_are_not_profiled_by_default(self, settings):
+        """Test nothing is captured without a trigger, or when profiling is disabled."""
+        assert 'X-Profile-Id' not in self.client.get(reverse('web:dashboard'))
+
+        settings.PROFILING_ENABLED = False
+        response = self.client.get(reverse('web:dashboard'), HTTP_X_PROFILE_TOKEN=make_profile_token())
+        assert 'X-Profile-Id' not in response
+        assert list_profiles() == []
+
+    def test_query_parameter_is_staff_only(self):
+        """Test ?profile=1 only profiles staff requests."""
+        assert 'X-Profile-Id' not in self.client.get(reverse('web:dashboard') + '?profile=1')
+
+        staff = Client()
+        staff.force_login(UserFactory(is_staff=True))
+        assert 'X-Profile-Id' in staff.get(reverse('web:dashboard') + '?profile=1')
+
+    def test_sampled_requests_are_profiled(self, settings):
+        """Test PROFILE_SAMPLE_RATE selects requests without a trigger."""
+        settings.PROFILE_SAMPLE_RATE = 1.0
+
+        assert 'X-Profile-Id' in self.client.get(reverse('web:dashboard'))
+
+    def test_consumer_messages_with_token_are_profiled(self):
+        """Test the consumer decorator profiles messages carrying a token and still handles them."""
+        consumer = EchoConsumer(SimpleNamespace(is_staff=False))
+
+        async_to_sync(consumer.receive)(json.dumps({'type': 'ping'}))
+        assert list_profiles() == []
+
+        async_to_sync(consumer.receive)(json.dumps({'type': 'ping', 'profile': True}))
+        assert list_profiles() == []
+
+        async_to_sync(consumer.receive)(json.dumps({'type': 'ping', 'profile': make_profile_token()}))
+        assert len(list_profiles()) == 1
+        assert 'ws-EchoConsumer-ping' in list_profiles()[0].name
+        assert len(consumer.received) == 3
+
+    def test_profiles_command(self):
+        """Test listing, showing and diffing saved profiles."""
+        token = make_profile_token()
+        first = self.client.get(reverse('web:dashboard'), HTTP_X_PROFILE_TOKEN=token)['X-Profile-Id']
+        second = self.client.get(reverse('web:dashboard'), HTTP_X_PROFILE_TOKEN=token)['X-Profile-Id']
+
+        out = StringIO()
+        call_command('profiles', 'list', stdout=out)
+        assert first in out.getvalue() and second in out.getvalue()
+
+        out = StringIO()
+        call_command('profiles', 'show', first, '--limit', '5', stdout=out)
+        assert 'function calls' in out.getvalue()
+
+        out = StringIO()
+        call_command('profiles', 'diff', first, second, '--limit', '5', stdout=out)
+        assert 'cumulative Δ ms' in out.getvalue()
+        assert len(out.getvalue().splitlines()) == 6
+
+        out = StringIO()
+        call_command('profiles', 'token', stdout=out)
+        assert valid_profile_token(out.getvalue().strip())
@@ -0,0 +1,149 @@
+"""
+pytest tests for SQL query budgets and N+1 detection.
+"""
+
+import logging
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from core.queries import QueryBudgetExceeded, fingerprint, query_budget as budget
+from games.models import Game, GameStatus
+from tests.factories import UserFactory, RuleSetFactory, GameFactory
+
+
+class TestFingerprint:
+    """Test cases for SQL normalization."""
+
+    def test_values_are_normalized(self):
+        """Test queries differing only in values share a fingerprint."""
+        assert fingerprint("SELECT * FROM users WHERE id = 1 AND name = 'a''b'") == \
+            fingerprint("SELECT * FROM users WHERE id = 42 AND name = 'c'")
+        assert fingerprint('SELECT * FROM games WHERE id IN (%s, %s, %s)') == \
+            'SELECT * FROM games WHERE id IN (...)'
+        assert fingerprint('SELECT  *\n FROM games WHERE id = %s') == 'SELECT * FROM games WHERE id = ?'
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    """Test cases for budget enforcement in views, handlers and tests."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up a player with several active games."""
+        self.user = UserFactory()
+        ruleset = RuleSetFactory(board_size=15)
+        for _ in range(6):
+            game = GameFactory(
+                black_player=self.user,
+                white_player=UserFactory(),
+                ruleset=ruleset,
+                status=GameStatus.ACTIVE
+            )
+            game.initialize_board()
+            game.save()
+        self.game = game
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_n_plus_one_is_detected(self):
+        """Test a per-row foreign key lookup exceeds the duplicate budget."""
+        with pytest.raises(QueryBudgetExceeded, match='6x'):
+            with budget(max_duplicates=2, strict=True):
+                [game.white_player.username for game in Game.objects.all()]
+
+        with budget(max_duplicates=2, strict=True) as recorded:
+            [game.white_player.username for game in Game.objects.select_related('white_player')]
+        assert recorded.count == 1
+
+    def test_over_budget_is_logged_when_not_strict(self, caplog):
+        """Test a non-strict budget logs the view, count and database time."""
+        with caplog.at_level(logging.WARNING, logger='core.queries'):
+            with budget('report', max_queries=1, strict=False):
+                list(Game.objects.all())
+                list(Game.objects.all())
+
+        assert 'Query budget exceeded in report' in caplog.text
+        assert '2 queries (budget 1)' in caplog.text
+
+    def test_decorator_labels_and_isolates_calls(self, settings):
+        """Test the decorator uses the function name and records each call separately."""
+        settings.QUERY_BUDGETS_STRICT = True
+        settings.QUERY_BUDGETS_ENABLED = True
+
+        @budget()
+        def load_games():
+            return list(Game.objects.all())
+
+        label = load_games.__qualname__
+        assert label.endswith('<locals>.load_games')
+        settings.QUERY_BUDGETS = {label: 1}
+        load_games()
+        load_games()  # Would exceed the budget if calls shared a recorder
+
+        settings.QUERY_BUDGETS = {label: 0}
+        with pytest.raises(QueryBudgetExceeded, match='load_games'):
+            load_games()
+
+    def test_middleware_enforces_view_budgets(self, settings, caplog):
+        """Test views over their configured budget are reported by view name."""
+        settings.QUERY_BUDGETS_ENABLED = True
+        settings.QUERY_BUDGETS = {'DashboardView': 1}
+
+        with caplog.at_level(logging.WARNING, logger='core.queries'):
+            assert self.client.get(reverse('web:dashboard')).status_code == 200
+        assert 'Query budget exceeded in DashboardView' in caplog.text
+
+        settings.QUERY_BUDGETS_STRICT = True
+        with pytest.raises(QueryBudgetExceeded):
+            self.client.get(reverse('web:dashboard'))
+
+    @pytest.mark.parametrize('url_name, view', [('web:games_panel', 'GamesPanelView'),
+                                                ('web:friends_panel', 'FriendsPanelView')])
+    def test_panel_views_use_the_panel_budget(self, settings, caplog, url_name, view):
+        """Test routed panel subclasses are held to the budget configured for PanelView."""
+        settings.QUERY_BUDGETS_ENABLED = True
+        settings.QUERY_BUDGETS = {'PanelView': 1}
+
+        with caplog.at_level(logging.WARNING, logger='core.queries'):
+            assert self.client.get(reverse(url_name)).status_code == 200
+        assert f'Query budget exceeded in {view}' in caplog.text
+        assert '(budget 1)' in caplog.text
+
+    def test_middleware_is_off_unless_enabled(self, settings, caplog):
+        """Test budgets are not enforced when QUERY_BUDGETS_ENABLED is off."""
+        settings.QUERY_BUDGETS_ENABLED = False
+        settings.QUERY_BUDGETS = {'DashboardView': 1}
+
+        with caplog.at_level(logging.WARNING, logger='core.queries'):
+            self.client.get(reverse('web:dashboard'))
+        assert 'Query budget exceeded' not in caplog.text
+
+    def test_dashboard_budget(self, query_budget):
+        """Test the dashboard's query count does not grow with the number of games."""
+        with query_budget(max_queries=30, max_duplicates=3):
+            self.client.get(reverse('web:dashboard'))
+
+    @pytest.mark.parametrize('url_name', ['web:games_panel', 'web:friends_panel', 'web:games_modal'])
+    def test_panel_budgets(self, query_budget, url_name):
+        """Test panels and modals run a fixed, small number of queries."""
+        with query_budget(max_queries=10, max_duplicates=2):
+            self.client.get(reverse(url_name))
+
+    def test_move_budget(self, query_budget):
+        """Test a move, including both players' notifications and move history, stays within budget."""
+        service = self.game.get_service()
+        # Ten moves each, spaced so nobody wins, for a move history to render
+        for row in (0, 4):
+            for col in range(0, 10, 2):
+                service.make_move(self.game, self.game.black_player_id, row, col)
+                service.make_move(self.game, self.game.white_player_id, row + 2, col)
+
+        with query_budget(max_queries=40):
+            response = self.client.post(
+                reverse('web:game_move', kwargs={'game_id': self.game.id}),
+                {'row': 7, 'col': 7},
+                HTTP_HX_REQUEST='true'
+            )
+        assert response.status_code == 204
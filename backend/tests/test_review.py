@@ -0,0 +1,127 @@
+"""
+pytest tests for post-game review annotations and the analyze_games command.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from games.models import MoveAnnotation
+from games.review import FIELDS, annotate_go, annotate_gomoku
+from tests.factories import GameFactory, GoRuleSetFactory, GomokuRuleSetFactory, UserFactory
+from tests.test_gomoku_solver import OPEN_THREE_GAME, finished_game
+
+# Black makes an open four that White ignores, then does not play the five
+IGNORED_FOUR_GAME = [
+    (7, 7, 'BLACK'), (0, 0, 'WHITE'), (7, 8, 'BLACK'), (0, 2, 'WHITE'), (7, 9, 'BLACK'), (0, 4, 'WHITE'),
+    (7, 10, 'BLACK'), (0, 6, 'WHITE'), (1, 1, 'BLACK'),
+]
+
+# White plays into atari, passes, and Black captures
+CAPTURE_GAME = [(0, 0, 'WHITE'), (0, 1, 'BLACK'), (-1, -1, 'WHITE'), (1, 0, 'BLACK')]
+
+
+def numbered(moves):
+    return [(number, row, col, color) for number, (row, col, color) in enumerate(moves, start=1)]
+
+
+def by_field(annotation):
+    return dict(zip(FIELDS, annotation))
+
+
+class TestMoveAnnotations:
+    """Test cases for replaying games into per-move metrics."""
+
+    def test_gomoku_threats_made_and_missed(self):
+        """Test threats are named by the line a move made and ignored fives are flagged."""
+        annotations = [by_field(values) for values in annotate_gomoku(numbered(IGNORED_FOUR_GAME), 15)]
+
+        assert [a['move_number'] for a in annotations] == list(range(1, 10))
+        assert annotations[4]['threat'] == 'open_three'
+        assert annotations[4]['threats_created'] == 1
+        assert annotations[6]['threat'] == 'open_four'
+        # White lets the open four stand, Black then plays elsewhere
+        assert annotations[7]['missed_block']
+        assert annotations[8]['missed_win']
+        assert not any(a['missed_win'] or a['missed_block'] for a in annotations[:7])
+
+    def test_blocking_a_four_is_not_a_miss(self):
+        """Test a move on the opponent's five point is not flagged."""
+        annotations = [by_field(values) for values in annotate_gomoku(numbered(OPEN_THREE_GAME), 15)]
+
+        assert annotations[7]['col'] == 11
+        assert not annotations[7]['missed_block']
+        assert annotations[8]['threat'] == 'five'
+
+    def test_go_captures_liberties_and_ataris(self):
+        """Test a capture is counted with the liberties left and a pass has none."""
+        annotations = [by_field(values) for values in annotate_go(numbered(CAPTURE_GAME), 9)]
+
+        assert annotations[0]['liberties'] == 2
+        assert annotations[1]['ataris'] == 1
+        assert annotations[2]['row'] == -1
+        assert annotations[2]['liberties'] is None
+        assert annotations[3]['captures'] == 1
+        assert annotations[3]['liberties'] == 3
+
+
+@pytest.mark.django_db
+class TestAnalyzeGamesCommand:
+    """Test cases for the batch review command."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Create two players, a finished Gomoku game and a finished Go game."""
+        self.black = UserFactory()
+        self.white = UserFactory()
+        self.players = {'black_player': self.black, 'white_player': self.white}
+        self.gomoku = finished_game(IGNORED_FOUR_GAME, ruleset=GomokuRuleSetFactory(board_size=15), **self.players)
+        self.go = finished_game(CAPTURE_GAME, ruleset=GoRuleSetFactory(board_size=9), **self.players)
+        GameFactory(**self.players)
+
+    def review(self, *args):
+        out = StringIO()
+        call_command('analyze_games', '--workers', '0', '--batch-size', '1', *args, stdout=out)
+        return out.getvalue()
+
+    def test_finished_games_are_annotated(self):
+        """Test every move of the finished games is stored and summarized per game type."""
+        output = self.review()
+
+        assert 'Reviewed 2 games' in output
+        assert 'GOMOKU: 1 games, length mean 9.0' in output
+        assert '1 missed wins, 1 missed blocks' in output
+        assert 'GO: 1 games' in output and '1 captures, 1 ataris, 1 passes' in output
+        assert MoveAnnotation.objects.filter(game=self.gomoku).count() == 9
+        capture = MoveAnnotation.objects.get(game=self.go, move_number=4)
+        assert (capture.captures, capture.liberties) == (1, 3)
+
+    def test_checkpoint_resumes_after_the_last_game(self, tmp_path):
+        """Test a second run only reviews games finished since and a restart reviews all again."""
+        checkpoint = str(tmp_path / 'review.json')
+        assert 'Reviewed 2 games' in self.review('--checkpoint', checkpoint)
+
+        output = self.review('--checkpoint', checkpoint)
+        assert 'Continuing after game' in output
+        assert 'Reviewed 0 games' in output
+
+        finished_game(OPEN_THREE_GAME[:9], ruleset=self.gomoku.ruleset, **self.players)
+        assert 'Reviewed 1 games' in self.review('--checkpoint', checkpoint)
+
+        assert 'Reviewed 3 games' in self.review('--checkpoint', checkpoint, '--restart')
+        assert MoveAnnotation.objects.count() == 9 + 4 + 9
+
+    def test_game_type_and_limit(self):
+        """Test the run can be narrowed to one game type and a number of games."""
+        assert 'Reviewed 1 games' in self.review('--game-type', 'GO')
+        assert MoveAnnotation.objects.exclude(game=self.go).count() == 0
+        assert 'Reviewed 1 games' in self.review('--limit', '1')
+
+    def test_replays_run_in_worker_processes(self):
+        """Test a run with a worker process annotates every finished game."""
+        out = StringIO()
+        call_command('analyze_games', '--workers', '1', stdout=out)
+
+        assert 'Reviewed 2 games' in out.getvalue()
+        assert MoveAnnotation.objects.count() == 13
@@ -0,0 +1,98 @@
+"""
+pytest tests for the scale data seeder and the seed_scale_data command.
+"""
+
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from games.models import Challenge, Game, GameMove, GameStatus
+from games.seeding import ScaleSeeder
+from web.models import Friendship, FriendshipStatus
+
+User = get_user_model()
+
+END = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+@pytest.mark.django_db
+class TestScaleSeeder:
+    """Test cases for bulk synthetic data generation."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Seed a small data set."""
+        self.counts = ScaleSeeder(users=300, games=150, challenges=50, seed=5, batch_size=100, end=END).run()
+
+    def snapshot(self):
+        games = list(Game.objects.order_by('created_at', 'id').values_list(
+            'id', 'black_player__username', 'white_player__username', 'status', 'move_count', 'created_at'))
+        moves = list(GameMove.objects.order_by('game_id', 'move_number').values_list('row', 'col')[:500])
+        return games, moves
+
+    def test_rows_are_created_in_batches(self):
+        """Test every model gets the requested rows, with moves matching each game's move count."""
+        assert User.objects.filter(username__startswith='seed-').count() == 300
+        assert Game.objects.count() == self.counts['Game'] == 150
+        assert Challenge.objects.count() == 50
+        assert Friendship.objects.count() == self.counts['Friendship'] > 0
+        assert GameMove.objects.count() == sum(Game.objects.values_list('move_count', flat=True))
+
+    def test_same_seed_gives_same_data(self):
+        """Test a second run with the same seed and end date reproduces the data."""
+        first = self.snapshot()
+        User.objects.filter(username__startswith='seed-').delete()
+
+        ScaleSeeder(users=300, games=150, challenges=50, seed=5, batch_size=100, end=END).run()
+        assert self.snapshot() == first
+
+    def test_distributions_have_long_tails(self):
+        """Test friend counts and game histories are heavily skewed rather than uniform."""
+        degrees = Counter()
+        for requester, addressee in Friendship.objects.values_list('requester_id', 'addressee_id'):
+            degrees[requester] += 1
+            degrees[addressee] += 1
+        mean_degree = sum(degrees.values()) / 300
+        assert max(degrees.values()) > 4 * mean_degree
+
+        games = Counter()
+        for black, white in Game.objects.values_list('black_player_id', 'white_player_id'):
+            games[black] += 1
+            games[white] += 1
+        assert max(games.values()) > 5 * (300 / 300)
+
+    def test_seeded_games_are_consistent(self):
+        """Test finished games have a winner's statistics and timestamps within the period."""
+        game = Game.objects.filter(status=GameStatus.FINISHED, winner__isnull=False).first()
+        board = game.board_state['board']
+        assert sum(cell is not None for row in board for cell in row) == game.move_count
+        assert game.moves.order_by('-move_number').first().created_at == game.finished_at
+        assert all(g.created_at <= END for g in Game.objects.all()[:50])
+
+        winner = game.winner
+        assert winner.games_won == Game.objects.filter(winner=winner).count()
+        assert Friendship.objects.filter(status=FriendshipStatus.ACCEPTED).exists()
+
+
+@pytest.mark.django_db
+class TestSeedScaleDataCommand:
+    """Test cases for the seed_scale_data command."""
+
+    def test_seed_and_delete(self):
+        """Test the command seeds under a prefix, refuses to reseed it, and deletes it."""
+        out = StringIO()
+        call_command('seed_scale_data', users=20, games=30, challenges=5, prefix='bench-', end='2026-01-01', stdout=out)
+
+        assert 'Seeded' in out.getvalue()
+        assert User.objects.filter(username__startswith='bench-').count() == 20
+        with pytest.raises(CommandError):
+            call_command('seed_scale_data', users=20, prefix='bench-', stdout=StringIO())
+
+        call_command('seed_scale_data', prefix='bench-', delete=True, stdout=StringIO())
+        assert not User.objects.filter(username__startswith='bench-').exists()
+        assert not Game.objects.exists()
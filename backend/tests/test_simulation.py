@@ -0,0 +1,103 @@
+"""
+pytest tests for the self-play load generator and the simulate_games command.
+"""
+
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from games.models import Game, GameMove, GameStatus, GameType
+from games.simulation import MoveChooser, create_games, create_users, run_simulation
+from tests.factories import GameFactory
+
+
+@pytest.mark.django_db
+class TestSimulation:
+    """Test cases for playing synthetic games through the service layer."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Create a few synthetic users."""
+        self.users = create_users(4, 'sim-test-')
+
+    def test_create_users_and_games(self):
+        """Test synthetic users and active games with initialized boards are created."""
+        game_ids = create_games(self.users, 4, [GameType.GOMOKU, GameType.GO],
+                                {GameType.GOMOKU: 9, GameType.GO: 9}, seed=1)
+
+        assert [u.username for u in self.users] == ['sim-test-0', 'sim-test-1', 'sim-test-2', 'sim-test-3']
+        games = Game.objects.filter(pk__in=game_ids)
+        assert games.count() == 4
+        assert {game.ruleset.game_type for game in games} == {GameType.GOMOKU, GameType.GO}
+        for game in games:
+            assert game.status == GameStatus.ACTIVE
+            assert game.black_player_id != game.white_player_id
+            assert len(game.board_state['board']) == 9
+
+    def test_games_are_played_to_the_end(self):
+        """Test every game finishes and each recorded move is a stored GameMove."""
+        game_ids = create_games(self.users, 2, [GameType.GOMOKU, GameType.GO],
+                                {GameType.GOMOKU: 9, GameType.GO: 9}, seed=2)
+
+        report = run_simulation(game_ids, workers=1, strategy='random', max_moves=30, seed=2)
+
+        assert report['games_finished'] == 2
+        assert not Game.objects.filter(pk__in=game_ids, status=GameStatus.ACTIVE).exists()
+        assert report['moves'] == GameMove.objects.filter(game_id__in=game_ids).count()
+        assert report['moves_per_sec'] > 0
+        assert report['latency_ms']['p50'] <= report['latency_ms']['p99'] <= report['latency_ms']['max']
+        assert report['queries_per_move'] > 0
+        assert report['lock_waits']['conflicts'] == 0
+        assert report['errors'] == {}
+
+    def test_heuristic_gomoku_plays_the_winning_move(self):
+        """Test the heuristic completes its own four in a row."""
+        game = GameFactory()
+        board = game.board_state['board']
+        for col in range(4):
+            board[7][col + 3] = 'BLACK'
+            board[9][col + 3] = 'WHITE'
+        game.current_player = 'BLACK'
+
+        assert MoveChooser('heuristic', seed=0).choose(game) in [(7, 2), (7, 7)]
+
+    def test_command_report(self, tmp_path):
+        """Test the command prints and writes a report, and can remove its data afterwards."""
+        output = tmp_path / 'sim.json'
+        before = Game.objects.count()
+
+        out = StringIO()
+        call_command('simulate_games', users=2, games=2, workers=1, game_type='mixed', gomoku_size=9,
+                     max_moves=20, seed=3, cleanup=True, output=str(output), stdout=out)
+
+        report = json.loads(output.read_text())
+        assert report['games'] == 2
+        assert report['games_finished'] == 2
+        assert report['game_types'] == ['GOMOKU', 'GO']
+        assert 'moves/sec' in out.getvalue()
+        assert Game.objects.count() == before
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentSimulation:
+    """Test cases for running the simulation on several threads."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Create users and games visible to other connections."""
+        users = create_users(4, 'sim-thread-')
+        self.game_ids = create_games(users, 4, [GameType.GOMOKU, GameType.GO],
+                                     {GameType.GOMOKU: 9, GameType.GO: 9}, seed=4)
+
+    def test_threads_play_all_games(self):
+        """Test games split over threads all finish with their moves stored."""
+        report = run_simulation(self.game_ids, workers=2, mode='threads', max_moves=20, seed=4)
+
+        assert report['mode'] == 'threads'
+        assert report['workers'] == 2
+        assert report['games_finished'] == 4
+        assert report['moves'] == GameMove.objects.filter(game_id__in=self.game_ids).count()
+        assert report['lock_waits']['max_ms'] >= 0
+        assert report['errors'] == {}
@@ -0,0 +1,127 @@
+"""
+pytest tests for the slow query log, its EXPLAIN plans, staff page and command.
+"""
+
+import json
+import threading
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from core.slow_queries import slow_query_log, summarize_slow_queries
+from games.models import Game
+from tests.factories import UserFactory, GameFactory
+
+
+@pytest.mark.django_db
+class TestSlowQueries:
+    """Test cases for capturing and reporting slow queries."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings, tmp_path):
+        """Log every query to a temporary file."""
+        GameFactory()
+        settings.SLOW_QUERY_ENABLED = True
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        settings.SLOW_QUERY_EXPLAIN = True
+        settings.SLOW_QUERY_FILE = str(tmp_path / 'slow.jsonl')
+        self.log_file = tmp_path / 'slow.jsonl'
+        slow_query_log.reset()
+
+    def entries(self):
+        return [json.loads(line) for line in self.log_file.read_text().splitlines()]
+
+    def load_games(self, status):
+        return list(Game.objects.filter(status=status))
+
+    def test_slow_query_is_logged_with_call_site(self):
+        """Test a query over the threshold is logged with its fingerprint and caller."""
+        self.load_games('ACTIVE')
+
+        entry = [e for e in self.entries() if 'FROM "games"' in e['sql']][-1]
+        assert entry['vendor'] == 'sqlite'
+        assert '?' in entry['fingerprint']
+        assert entry['call_site'].startswith('tests/test_slow_queries.py:')
+        assert entry['call_site'].endswith('in load_games')
+
+    def test_fast_queries_are_not_logged(self, settings):
+        """Test queries under the threshold are ignored."""
+        settings.SLOW_QUERY_THRESHOLD_MS = 10_000
+        self.load_games('ACTIVE')
+
+        assert not self.log_file.exists()
+
+    def test_each_fingerprint_is_explained_once(self):
+        """Test the first occurrence of a query shape records its plan, later ones do not."""
+        self.load_games('ACTIVE')
+        self.load_games('FINISHED')
+
+        games = [e for e in self.entries() if e['sql'].startswith('SELECT') and 'FROM "games"' in e['sql']]
+        assert len(games) == 2
+        assert games[0]['plan'] and any('games' in line for line in games[0]['plan'])
+        assert 'plan' not in games[1]
+        assert not any(e['sql'].startswith('EXPLAIN') for e in self.entries())
+
+    def test_summary_groups_by_fingerprint(self):
+        """Test the summary merges repeated query shapes and keeps their plan."""
+        self.load_games('ACTIVE')
+        self.load_games('FINISHED')
+
+        group = next(g for g in summarize_slow_queries(self.log_file) if 'FROM "games"' in g['fingerprint'])
+        assert group['count'] == 2
+        assert group['plan']
+        assert group['max_ms'] >= group['p50_ms']
+        assert group['call_sites'][0][1] == 2
+
+    def test_staff_page(self):
+        """Test the report is shown to staff only."""
+        self.load_games('ACTIVE')
+
+        client = Client()
+        client.force_login(UserFactory())
+        assert client.get(reverse('slow_queries')).status_code == 302
+
+        client.force_login(UserFactory(is_staff=True))
+        response = client.get(reverse('slow_queries') + '?sort=max')
+        assert response.status_code == 200
+        assert b'FROM &quot;games&quot;' in response.content
+
+    def test_command_reports_and_clears(self):
+        """Test the command prints query shapes with plans and can clear the log."""
+        self.load_games('ACTIVE')
+
+        out = StringIO()
+        call_command('slow_queries', file=str(self.log_file), plans=True, clear=True, stdout=out)
+        output = out.getvalue()
+
+        assert 'query shapes in' in output
+        assert 'tests/test_slow_queries.py' in output
+        assert not self.log_file.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_hook_survives_requests_opening_connections(settings):
+    """Test connections opened inside the middleware's wrappers keep exactly the slow query hook."""
+    settings.METRICS_ENABLED = True
+    settings.QUERY_BUDGETS_ENABLED = True
+    client = Client()
+    client.force_login(UserFactory(is_staff=True))
+    wrappers = []
+
+    def requests():
+        # A fresh thread opens its connection inside the middleware, and the
+        # test client keeps it open, so close it as CONN_MAX_AGE = 0 would
+        for _ in range(2):
+            assert client.get(reverse('slow_queries')).status_code == 200
+            connection.close()
+            wrappers.append(list(connection.execute_wrappers))
+
+    thread = threading.Thread(target=requests)
+    thread.start()
+    thread.join()
+
+    assert wrappers == [[slow_query_log], [slow_query_log]]
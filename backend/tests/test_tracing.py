@@ -0,0 +1,171 @@
+"""
+pytest tests for end-to-end move tracing and the analyze_traces command.
+"""
+
+import json
+from io import StringIO
+from unittest.mock import AsyncMock
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from core.tracing import load_traces, record_delivery, span, start_trace, trace_metadata
+from games.models import GameStatus
+from tests.factories import UserFactory, RuleSetFactory, GameFactory
+from web.consumers import UserWebSocketConsumer
+
+
+class TestTracing:
+    """Test cases for trace sampling, spans and delivery records."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings, tmp_path):
+        """Trace everything into a temporary file."""
+        settings.TRACE_SAMPLE_RATE = 1.0
+        settings.TRACE_FILE = str(tmp_path / 'traces.jsonl')
+        self.trace_file = tmp_path / 'traces.jsonl'
+
+    def test_spans_nest_and_trace_is_written(self):
+        """Test nested spans record their parent and the trace lands in the file."""
+        with start_trace('move', game_id='g1') as trace:
+            with span('make_move'):
+                with span('db.commit'):
+                    pass
+            with span('notify'):
+                pass
+
+        records = load_traces(self.trace_file)
+        assert len(records) == 1
+        record = records[0]
+        assert record['trace_id'] == trace.trace_id
+        assert record['attributes'] == {'game_id': 'g1'}
+        assert [(s['name'], s['parent']) for s in record['spans']] == [
+            ('db.commit', 'make_move'), ('make_move', None), ('notify', None)
+        ]
+
+    def test_unsampled_traces_record_nothing(self, settings):
+        """Test spans are no-ops when the trace was not sampled."""
+        settings.TRACE_SAMPLE_RATE = 0
+        with start_trace('move') as trace:
+            with span('make_move'):
+                assert trace_metadata({'a': 1}) == {'a': 1}
+
+        assert trace is None
+        assert not self.trace_file.exists()
+
+    def test_nested_start_trace_joins_the_active_trace(self):
+        """Test a trace started inside another one records into the outer trace."""
+        with start_trace('move') as outer:
+            with start_trace('move') as inner:
+                assert inner is outer
+
+        assert len(load_traces(self.trace_file)) == 1
+
+    def test_failed_trace_records_the_error(self):
+        """Test an exception escaping the trace is recorded and re-raised."""
+        with pytest.raises(ValueError):
+            with start_trace('move'):
+                raise ValueError('boom')
+
+        assert load_traces(self.trace_file)[0]['error'] == 'ValueError'
+
+    def test_deliveries_join_their_trace(self):
+        """Test delivery records carry the trace ID and are attached on load."""
+        with start_trace('move') as trace:
+            metadata = trace_metadata({'target': 'board'})
+
+        assert metadata['target'] == 'board'
+        assert metadata['trace_id'] == trace.trace_id
+        record_delivery(metadata, 'game_move', 7, write_ms=0.0)
+        record_delivery({'target': 'board'}, 'game_move', 7, write_ms=0.5)
+
+        deliveries = load_traces(self.trace_file)[0]['deliveries']
+        assert len(deliveries) == 1
+        assert deliveries[0]['user_id'] == 7
+        assert deliveries[0]['queue_ms'] >= 0
+
+
+@pytest.mark.django_db
+class TestMoveTracing:
+    """Test cases for tracing a move from the HTTP request to the opponent's socket."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings, tmp_path):
+        """Set up an active game and trace every move."""
+        settings.TRACE_SAMPLE_RATE = 1.0
+        settings.TRACE_FILE = str(tmp_path / 'traces.jsonl')
+        self.trace_file = tmp_path / 'traces.jsonl'
+        self.black_player = UserFactory()
+        self.white_player = UserFactory()
+        self.game = GameFactory(
+            black_player=self.black_player,
+            white_player=self.white_player,
+            ruleset=RuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+        self.client = Client()
+        self.client.force_login(self.black_player)
+
+    def test_http_move_is_traced_to_delivery(self):
+        """Test every stage of an htmx move is recorded and the opponent's messages carry the trace ID."""
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f'user_{self.white_player.id}', channel)
+
+        response = self.client.post(
+            reverse('web:game_move', kwargs={'game_id': self.game.id}),
+            {'row': 7, 'col': 7},
+            HTTP_HX_REQUEST='true'
+        )
+        assert response.status_code == 204
+
+        trace = load_traces(self.trace_file)[0]
+        assert trace['name'] == 'move'
+        assert trace['attributes']['transport'] == 'http'
+        names = {s['name'] for s in trace['spans']}
+        assert {'load_game', 'make_move', 'db.commit', 'notify', 'update.game_board', 'render', 'channel_send'} <= names
+        parents = {s['name']: s['parent'] for s in trace['spans']}
+        assert parents['db.commit'] == 'make_move'
+
+        message = async_to_sync(layer.receive)(channel)
+        assert message['metadata']['trace_id'] == trace['trace_id']
+
+        # The opponent's consumer records the delivery when it writes the message
+        consumer = UserWebSocketConsumer()
+        consumer.user_id = self.white_player.id
+        consumer.send = AsyncMock()
+        async_to_sync(getattr(consumer, message['type']))(message)
+
+        trace = load_traces(self.trace_file)[0]
+        assert trace['deliveries'][0]['user_id'] == self.white_player.id
+        sent = json.loads(consumer.send.call_args.kwargs['text_data'])
+        assert sent['metadata']['trace_id'] == trace['trace_id']
+
+    def test_analyze_traces_summarizes_stages(self):
+        """Test the analyzer reports per-stage percentiles and the slowest traces."""
+        self.client.post(
+            reverse('web:game_move', kwargs={'game_id': self.game.id}),
+            {'row': 7, 'col': 7},
+            HTTP_HX_REQUEST='true'
+        )
+
+        out = StringIO()
+        call_command('analyze_traces', file=str(self.trace_file), slowest=1, stdout=out)
+        output = out.getvalue()
+
+        assert '1 traces from' in output
+        assert 'db.commit' in output
+        assert 'Slowest 1 traces' in output
+
+    def test_analyze_traces_without_file(self, tmp_path):
+        """Test a missing trace file is reported as a command error."""
+        from django.core.management.base import CommandError
+
+        with pytest.raises(CommandError):
+            call_command('analyze_traces', file=str(tmp_path / 'missing.jsonl'), stdout=StringIO())
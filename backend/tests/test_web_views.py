@@ -5,6 +5,8 @@ Migrated from web/test_views.py to pytest format for better test management.
 Following TDD methodology with comprehensive web interface coverage.
 """
 
+import json
+
 import pytest
 from django.test import Client
 from django.urls import reverse
@@ -252,6 +254,64 @@ class TestGameViews:
             {'row': 7, 'col': 7}
         )
         assert response.status_code == 403
+    
+    def test_htmx_move_renders_board_once_per_player(self):
+        """Test an htmx move is acknowledged with 204 and each board is rendered once, over the WebSocket."""
+        from web.services import render_counter
+        
+        self.game.initialize_board()
+        self.game.save()
+        render_counter.reset()
+        
+        response = self.client.post(
+            reverse('web:game_move', kwargs={'game_id': self.game.id}),
+            {'row': 7, 'col': 7},
+            HTTP_HX_REQUEST='true'
+        )
+        
+        assert response.status_code == 204
+        assert json.loads(response['HX-Trigger'])['moveAccepted']['move_number'] == 1
+        
+        renders = render_counter.snapshot()['game_move_made']
+        assert renders['web/partials/single_move_update.html'] == 2  # Mover and opponent
+        assert 'web/partials/game_board.html' not in renders
+    
+    def test_ajax_move_returns_delta(self):
+        """Test AJAX moves get a small JSON delta instead of the whole board."""
+        self.game.initialize_board()
+        self.game.save()
+        
+        response = self.client.post(
+            reverse('web:game_move', kwargs={'game_id': self.game.id}),
+            {'row': 7, 'col': 7},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        
+        data = response.json()
+        assert data['success'] is True
+        assert data['move'] == {
+            'move_number': 1, 'row': 7, 'col': 7, 'player': self.user.username,
+            'current_player': 'WHITE', 'status': GameStatus.ACTIVE
+        }
+        assert 'board_state' not in data
+    
+    def test_ajax_resign_returns_game_summary(self):
+        """Test AJAX resignations get the finished game's summary as JSON."""
+        self.game.initialize_board()
+        self.game.save()
+        
+        response = self.client.post(
+            reverse('web:game_resign', kwargs={'game_id': self.game.id}),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data['success'] is True
+        assert data['game'] == {
+            'id': str(self.game.id), 'status': GameStatus.FINISHED,
+            'current_player': self.game.current_player, 'move_count': 0
+        }
 
 
 @pytest.mark.django_db
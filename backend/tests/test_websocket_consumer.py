@@ -503,4 +503,110 @@ class TestWebSocketIntegration:
             assert True
             
         except Exception:
-            pytest.skip("WebSocket multiple tabs handling not implemented")
\ No newline at end of file
+            pytest.skip("WebSocket multiple tabs handling not implemented")
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+class TestWebSocketGameCommands:
+    """pytest tests for make_move, pass and resign commands sent over the WebSocket."""
+    
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Set up an active Gomoku game between two users."""
+        self.user1 = UserFactory()
+        self.user2 = UserFactory()
+        self.outsider = UserFactory()
+        self.game = GameFactory(
+            black_player=self.user1,
+            white_player=self.user2,
+            ruleset=GomokuRuleSetFactory(board_size=15),
+            status=GameStatus.ACTIVE
+        )
+        self.game.initialize_board()
+        self.game.save()
+    
+    async def connect(self, user):
+        from web.routing import websocket_urlpatterns
+        
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/user/{user.id}/")
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        assert connected
+        assert (await communicator.receive_json_from())['type'] == 'connection_status'
+        return communicator
+    
+    async def send_command(self, communicator, **command):
+        await communicator.send_json_to(command)
+        while True:
+            message = await communicator.receive_json_from(timeout=5)
+            if message['type'] == 'move_result':
+                return message
+    
+    async def test_make_move_is_acknowledged(self):
+        """Test a move over the socket is applied and acknowledged with its request ID."""
+        communicator = await self.connect(self.user1)
+        
+        result = await self.send_command(
+            communicator, type='make_move', request_id='req-1',
+            game_id=str(self.game.id), row=7, col=7
+        )
+        await communicator.disconnect()
+        
+        assert result['request_id'] == 'req-1'
+        assert result['success'] is True
+        assert result['move_count'] == 1
+        assert result['current_player'] == Player.WHITE
+        
+        game = await sync_to_async(Game.objects.get)(pk=self.game.pk)
+        assert game.board_state['board'][7][7] == Player.BLACK
+    
+    async def test_invalid_move_returns_error(self):
+        """Test a move out of turn is rejected with the service error code."""
+        communicator = await self.connect(self.user2)
+        
+        result = await self.send_command(
+            communicator, type='make_move', request_id='req-2',
+            game_id=str(self.game.id), row=7, col=7
+        )
+        await communicator.disconnect()
+        
+        assert result['success'] is False
+        assert result['code'] == 'PLAYER_ERROR'
+    
+    async def test_non_player_cannot_move(self):
+        """Test users outside the game cannot send commands for it."""
+        communicator = await self.connect(self.outsider)
+        
+        result = await self.send_command(
+            communicator, type='make_move', request_id='req-3',
+            game_id=str(self.game.id), row=7, col=7
+        )
+        await communicator.disconnect()
+        
+        assert result['success'] is False
+        assert result['code'] == 'PLAYER_ERROR'
+    
+    async def test_malformed_command(self):
+        """Test commands without coordinates are rejected."""
+        communicator = await self.connect(self.user1)
+        
+        result = await self.send_command(
+            communicator, type='make_move', request_id='req-4', game_id=str(self.game.id)
+        )
+        await communicator.disconnect()
+        
+        assert result == {'type': 'move_result', 'request_id': 'req-4', 'success': False,
+                          'error': 'Invalid game command', 'code': 'INVALID_COMMAND'}
+    
+    async def test_resign(self):
+        """Test resigning over the socket finishes the game for the opponent."""
+        communicator = await self.connect(self.user1)
+        
+        result = await self.send_command(
+            communicator, type='resign', request_id='req-5', game_id=str(self.game.id)
+        )
+        await communicator.disconnect()
+        
+        assert result['success'] is True
+        assert result['status'] == GameStatus.FINISHED
+        assert result['winner_id'] == self.user2.id
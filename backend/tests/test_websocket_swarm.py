@@ -0,0 +1,87 @@
+"""
+pytest tests for the WebSocket client swarm and the websocket_swarm command.
+"""
+
+import json
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from games.models import Game, GameMove
+from web.swarm import Swarm, channel_layers_config
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestWebSocketSwarm:
+    """Test cases for driving many WebSocket clients through the views."""
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self, settings):
+        """Use the in-memory channel layer."""
+        settings.CHANNEL_LAYERS = channel_layers_config('memory')
+
+    def test_swarm_measures_fan_out(self):
+        """Test challenges, accepts and moves are delivered to both players and timed."""
+        swarm = Swarm(connections=6, active_pairs=2, moves=3, board_size=9, settle_ms=20, seed=1)
+        swarm.setup()
+
+        report = async_to_sync(swarm.run)()
+
+        assert report['connections']['opened'] == 6
+        assert report['connections']['connect_ms']['p50'] is not None
+        for name, count in (('challenge', 2), ('accept', 2), ('move', 6)):
+            stats = report['actions'][name]
+            assert stats['count'] == count
+            assert stats['errors'] == 0
+            assert stats['messages'] >= count
+            assert stats['first_delivery_ms']['p50'] <= stats['delivery_ms']['max']
+        assert GameMove.objects.filter(game__black_player__in=swarm.users).count() == 6
+        assert report['throughput']['messages_per_sec'] > 0
+
+    def test_idle_connections_receive_nothing_but_the_greeting(self):
+        """Test users outside the playing pairs only get their connection status."""
+        swarm = Swarm(connections=4, active_pairs=1, moves=1, board_size=9, settle_ms=20, seed=2)
+        swarm.setup()
+
+        async def run():
+            report = await swarm.run()
+            return report, {user_id: [t for _, t in client.messages] for user_id, client in swarm.swarm_clients.items()}
+
+        report, received = async_to_sync(run)()
+
+        idle = [user.id for user in swarm.users[2:]]
+        assert all(received[user_id] == ['connection_status'] for user_id in idle)
+        assert report['throughput']['messages_received'] > report['throughput']['messages']
+
+    def test_command_writes_report_and_cleans_up(self, tmp_path):
+        """Test the command writes a JSON report and deletes its users and games."""
+        output = tmp_path / 'swarm.json'
+        users_before = User.objects.count()
+
+        out = StringIO()
+        call_command('websocket_swarm', connections=4, pairs=1, moves=2, board_size=9, settle_ms=20,
+                     output=str(output), stdout=out)
+
+        report = json.loads(output.read_text())
+        assert report['config']['layer'] == 'memory'
+        assert report['actions']['move']['count'] == 2
+        assert 'first delivery ms' in out.getvalue()
+        assert User.objects.count() == users_before
+        assert not Game.objects.exists()
+
+    def test_redis_layer_requires_channels_redis(self):
+        """Test the shared layer is refused without its optional dependency."""
+        try:
+            import channels_redis  # noqa: F401
+            pytest.skip('channels_redis is installed')
+        except ImportError:
+            pass
+
+        with pytest.raises(CommandError):
+            call_command('websocket_swarm', layer='redis', stdout=StringIO())
@@ -16,7 +16,7 @@ class UserAdmin(BaseUserAdmin):
         'games_won', 'win_rate', 'is_active', 'date_joined'
     ]
     
-    list_filter = ['is_active', 'is_staff', 'is_superuser', 'date_joined']
+    list_filter = ['is_active', 'is_bot', 'is_staff', 'is_superuser', 'date_joined']
     
     search_fields = ['username', 'email', 'display_name']
     
@@ -27,7 +27,7 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('games_played', 'games_won', 'win_rate')
         }),
         ('Profile', {
-            'fields': ('display_name',)
+            'fields': ('display_name', 'is_bot')
         }),
     )
     
@@ -0,0 +1,50 @@
+"""
+Management command to create a computer opponent.
+
+Bots are users with ``is_bot`` set and no usable password; their moves are
+played by ``games.bots``. Running the command for an existing user turns
+that user into a bot.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Create a computer opponent (bot user)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'username',
+            help='Username of the bot',
+        )
+        parser.add_argument(
+            '--display-name',
+            default='',
+            help='Name shown in the UI (default: the username)',
+        )
+
+    def handle(self, *args, **options):
+        UserModel = get_user_model()
+        username = options['username'].lower().strip()
+        try:
+            UserModel._meta.get_field('username').run_validators(username)
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        user, created = UserModel.objects.get_or_create(
+            username=username,
+            defaults={'display_name': options['display_name'], 'is_bot': True},
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+            self.stdout.write(self.style.SUCCESS(f'Bot "{username}" created successfully.'))
+            return
+
+        if user.is_bot:
+            raise CommandError(f'Bot "{username}" already exists.')
+        user.is_bot = True
+        user.save(update_fields=['is_bot'])
+        self.stdout.write(self.style.SUCCESS(f'User "{username}" is now a bot.'))
@@ -85,6 +85,11 @@ class User(AbstractUser):
         help_text="Total number of games won"
     )
     
+    is_bot = models.BooleanField(
+        default=False,
+        help_text="Computer opponent whose moves are played by games.bots"
+    )
+    
     # Soft deletion is handled by is_active field from AbstractUser
     # created_at is handled by date_joined from AbstractUser
     # updated_at can be added if needed
@@ -4,3 +4,33 @@ from django.apps import AppConfig
 class WebConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'web'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from games.concurrency import game_committed
+        from games.models import Challenge, Game, GomokuRuleSet, GoRuleSet
+        from .models import Friendship
+        from .versions import (
+            bump_challenge_versions, bump_friendship_versions, bump_game_versions, bump_ruleset_version
+        )
+
+        # Moves are committed with a queryset update, which sends no post_save
+        game_committed.connect(bump_game_versions,
+                               dispatch_uid='web.versions.bump_committed_game')
+        post_save.connect(bump_game_versions, sender=Game,
+                          dispatch_uid='web.versions.bump_saved_game')
+        post_delete.connect(bump_game_versions, sender=Game,
+                            dispatch_uid='web.versions.bump_deleted_game')
+        post_save.connect(bump_friendship_versions, sender=Friendship,
+                          dispatch_uid='web.versions.bump_saved_friendship')
+        post_delete.connect(bump_friendship_versions, sender=Friendship,
+                            dispatch_uid='web.versions.bump_deleted_friendship')
+        post_save.connect(bump_challenge_versions, sender=Challenge,
+                          dispatch_uid='web.versions.bump_saved_challenge')
+        post_delete.connect(bump_challenge_versions, sender=Challenge,
+                            dispatch_uid='web.versions.bump_deleted_challenge')
+        for ruleset_model in (GomokuRuleSet, GoRuleSet):
+            post_save.connect(bump_ruleset_version, sender=ruleset_model,
+                              dispatch_uid=f'web.versions.bump_saved_{ruleset_model.__name__}')
+            post_delete.connect(bump_ruleset_version, sender=ruleset_model,
+                                dispatch_uid=f'web.versions.bump_deleted_{ruleset_model.__name__}')
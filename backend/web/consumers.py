@@ -9,10 +9,17 @@ Phase 5.8.2: GREEN Phase - Implement consumer to make tests pass
 
 import json
 import logging
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+
+from core.metrics import CHANNEL_SEND, CONSUMER_MESSAGE
+from core.profiling import profile_consumer_message
+from core.queries import query_budget
+from core.tracing import record_delivery, span, start_trace, trace_metadata
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -112,14 +119,15 @@ class UserWebSocketConsumer(AsyncWebsocketConsumer):
         else:
             logger.info(f"WebSocket disconnected: unauthenticated connection with code {close_code}")
     
+    @profile_consumer_message
     async def receive(self, text_data):
         """
         Handle incoming WebSocket messages from client.
         
-        Supports bidirectional communication for future features like:
+        Supports bidirectional communication for:
+        - Game commands (make_move, pass, resign), acknowledged with move_result
         - Move acknowledgments
-        - Typing indicators
-        - Real-time chat
+        - Presence updates
         """
         try:
             data = json.loads(text_data)
@@ -128,15 +136,18 @@ class UserWebSocketConsumer(AsyncWebsocketConsumer):
             logger.debug(f"WebSocket received message from user {self.user_id}: {message_type}")
             
             # Route message based on type
-            if message_type == 'ping':
-                await self.handle_ping(data)
-            elif message_type == 'move_acknowledgment':
-                await self.handle_move_acknowledgment(data)
-            elif message_type == 'presence_update':
-                await self.handle_presence_update(data)
-            else:
-                logger.warning(f"Unknown WebSocket message type: {message_type} from user {self.user_id}")
-                await self.send_error(f"Unknown message type: {message_type}")
+            with CONSUMER_MESSAGE.time(message_type=self.metric_label(message_type)):
+                if message_type == 'ping':
+                    await self.handle_ping(data)
+                elif message_type == 'move_acknowledgment':
+                    await self.handle_move_acknowledgment(data)
+                elif message_type == 'presence_update':
+                    await self.handle_presence_update(data)
+                elif message_type in self.GAME_COMMANDS:
+                    await self.handle_game_command(message_type, data)
+                else:
+                    logger.warning(f"Unknown WebSocket message type: {message_type} from user {self.user_id}")
+                    await self.send_error(f"Unknown message type: {message_type}")
                 
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON in WebSocket message from user {self.user_id}: {e}")
@@ -145,6 +156,12 @@ class UserWebSocketConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error processing WebSocket message from user {self.user_id}: {e}")
             await self.send_error("Message processing error")
     
+    def metric_label(self, message_type):
+        """Metric label for an incoming message type; unknown types share one label."""
+        if message_type in ('ping', 'move_acknowledgment', 'presence_update') or message_type in self.GAME_COMMANDS:
+            return message_type
+        return 'unknown'
+    
     async def handle_ping(self, data):
         """Handle ping messages for connection keepalive."""
         await self.send_message({
@@ -162,6 +179,139 @@ class UserWebSocketConsumer(AsyncWebsocketConsumer):
         # Future implementation for online/offline status
         pass
     
+    GAME_COMMANDS = ('make_move', 'pass', 'resign')
+    
+    async def handle_game_command(self, command, data):
+        """
+        Handle a make_move, pass or resign command sent over the socket.
+        
+        The command is applied through the game services (or the game's actor
+        when GAME_MOVE_ACTORS is enabled) and answered with a compact
+        move_result message carrying the client's request_id. Board and panel
+        updates still arrive through the usual notification messages.
+        """
+        with start_trace('move', transport='ws', command=command, game_id=str(data.get('game_id')), user_id=self.user.id):
+            await self.run_game_command(command, data)
+    
+    async def run_game_command(self, command, data):
+        """Apply a game command, acknowledge it and notify both players."""
+        request_id = data.get('request_id')
+        try:
+            game_id = data['game_id']
+            if command == 'make_move':
+                row, col = int(data['row']), int(data['col'])
+            else:
+                row = col = -1
+        except (KeyError, TypeError, ValueError):
+            await self.send_move_result(request_id, success=False, error='Invalid game command', code='INVALID_COMMAND')
+            return
+        
+        from core.exceptions import GameError
+        from games.actors import actors_enabled, submit_move_async, submit_pass_async
+        from games.models import Game
+        
+        try:
+            with span('make_move'):
+                if command == 'make_move' and actors_enabled():
+                    await self.check_game_player(game_id)
+                    game = (await submit_move_async(game_id, self.user.id, row, col)).game
+                elif command == 'pass' and actors_enabled():
+                    await self.check_game_player(game_id)
+                    game = (await submit_pass_async(game_id, self.user.id)).game
+                else:
+                    game = await self.apply_game_command(command, game_id, row, col)
+        except GameError as e:
+            await self.send_move_result(request_id, success=False, error=e.message, code=e.code)
+            return
+        except (Game.DoesNotExist, ValueError, ValidationError):
+            await self.send_move_result(request_id, success=False, error='Game not found', code='GAME_NOT_FOUND')
+            return
+        
+        await self.send_move_result(
+            request_id,
+            success=True,
+            game_id=str(game.id),
+            move_count=game.move_count,
+            current_player=game.current_player,
+            status=game.status,
+            winner_id=game.winner_id
+        )
+        with span('notify'):
+            await self.notify_game_command(command, game)
+    
+    @database_sync_to_async
+    @query_budget('ws.check_game_player')
+    def check_game_player(self, game_id):
+        """Make sure the connected user plays in the game before queueing a command."""
+        from core.exceptions import PlayerError
+        from games.active_games import active_game_store
+        
+        game = active_game_store.load_game(game_id)
+        if self.user.id not in (game.black_player_id, game.white_player_id):
+            raise PlayerError('You are not a player in this game')
+    
+    @database_sync_to_async
+    @query_budget('ws.apply_game_command')
+    def apply_game_command(self, command, game_id, row, col):
+        """Apply a game command through the game services and return the updated game."""
+        from core.exceptions import InvalidMoveError, PlayerError
+        from games.active_games import active_game_store
+        
+        game = active_game_store.load_game(game_id)
+        if self.user.id not in (game.black_player_id, game.white_player_id):
+            raise PlayerError('You are not a player in this game')
+        
+        service = game.get_service()
+        if command == 'make_move':
+            return service.make_move(game, self.user.id, row, col).game
+        if command == 'pass':
+            if not game.ruleset.is_go:
+                raise InvalidMoveError('Pass moves are only allowed in Go games')
+            return service.pass_turn(game, self.user.id).game
+        
+        service.resign_game(game, self.user.id)
+        return game
+    
+    @database_sync_to_async
+    @query_budget('ws.notify_game_command')
+    def notify_game_command(self, command, game):
+        """Record game events and push the usual board and panel updates to both players."""
+        from games.models import GameEvent
+        from .services import WebSocketNotificationService
+        
+        if command == 'resign':
+            event_type, metadata = 'game_resigned', {'resigned_by': self.user.id}
+            event_data = {'game_id': str(game.id), 'resigned_player_id': self.user.id, 'winner_id': game.winner_id}
+        elif command == 'pass':
+            event_type, metadata = 'game_move_made', {'pass_move': True, 'move_number': game.move_count}
+            event_data = {'game_id': str(game.id), 'player_id': self.user.id, 'move_number': game.move_count}
+        else:
+            event_type, metadata, event_data = 'game_move_made', {}, None
+        
+        if event_data is not None:
+            for player in [game.black_player, game.white_player]:
+                GameEvent.objects.create(user=player, event_type=command, event_data=event_data)
+        
+        try:
+            WebSocketNotificationService.notify_game_event(
+                event_type=event_type,
+                game=game,
+                triggering_user=self.user,
+                request=None,
+                metadata=metadata
+            )
+        except Exception as e:
+            logger.error(f"WebSocket notification failed for {command} in game {game.id}: {e}")
+    
+    async def send_move_result(self, request_id, success, **result):
+        """Acknowledge a game command with a compact result message."""
+        await self.send_message({
+            'type': 'move_result',
+            'request_id': request_id,
+            'success': success,
+            **result
+        })
+    
     # Channel group message handlers (called when messages are sent to the group)
     
     async def targeted_move_update_message(self, event):
@@ -224,6 +374,20 @@ class UserWebSocketConsumer(AsyncWebsocketConsumer):
             metadata=event.get('metadata', {})
         )
     
+    async def panel_invalidate_message(self, event):
+        """
+        Handle panel invalidation messages sent to this user's channel group.
+        
+        Forwards only the panel name and its new version; the client refetches
+        the panel itself if it is visible.
+        """
+        metadata = event.get('metadata', {})
+        await self.send_message({
+            'type': 'panel_invalidate',
+            'invalidate': metadata.get('invalidate'),
+            'version': metadata.get('version'),
+        })
+    
     async def game_turn_update_message(self, event):
         """
         Handle game turn display update messages sent to this user's channel group.
@@ -277,7 +441,9 @@ class UserWebSocketConsumer(AsyncWebsocketConsumer):
         if metadata:
             message['metadata'] = metadata
         
+        write_start = time.perf_counter()
         await self.send(text_data=json.dumps(message))
+        record_delivery(metadata, event_type, self.user_id, (time.perf_counter() - write_start) * 1000)
         logger.debug(f"Sent {event_type} message to user {self.user_id}")
     
     async def send_message(self, data):
@@ -337,6 +503,7 @@ class WebSocketMessageSender:
         
         user_channel_group = f'user_{user_id}'
         message_type = f'{event_type}_message'
+        metadata = trace_metadata(metadata)
         
         message = {
             'type': message_type,
@@ -347,7 +514,8 @@ class WebSocketMessageSender:
             message['metadata'] = metadata
         
         try:
-            await channel_layer.group_send(user_channel_group, message)
+            with CHANNEL_SEND.time(event_type=event_type), span('channel_send', event_type=event_type, user_id=user_id):
+                await channel_layer.group_send(user_channel_group, message)
             logger.info(f"WebSocket message sent: {event_type} to user {user_id}")
             return True
         except Exception as e:
@@ -362,30 +530,20 @@ class WebSocketMessageSender:
         Used when calling from synchronous contexts like Django views.
         """
         import asyncio
+        from asgiref.sync import async_to_sync
         
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If we're already in an async context, create a new task
-                task = asyncio.create_task(
-                    WebSocketMessageSender.send_to_user(user_id, event_type, content, metadata)
-                )
-                return task
-            else:
-                # If we're in a sync context, run the async function
-                return loop.run_until_complete(
-                    WebSocketMessageSender.send_to_user(user_id, event_type, content, metadata)
-                )
+            asyncio.get_running_loop()
         except RuntimeError:
-            # No event loop running, create a new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            # Plain sync context (views, or a database_sync_to_async worker
+            # thread): async_to_sync reuses the outer event loop when there is one
             try:
-                return loop.run_until_complete(
-                    WebSocketMessageSender.send_to_user(user_id, event_type, content, metadata)
-                )
-            finally:
-                loop.close()
-        except Exception as e:
-            logger.error(f"Error in sync WebSocket send to user {user_id}: {e}")
-            return False
\ No newline at end of file
+                return async_to_sync(WebSocketMessageSender.send_to_user)(user_id, event_type, content, metadata)
+            except Exception as e:
+                logger.error(f"Error in sync WebSocket send to user {user_id}: {e}")
+                return False
+        
+        # Already inside an event loop: schedule the send as a task
+        return asyncio.create_task(
+            WebSocketMessageSender.send_to_user(user_id, event_type, content, metadata)
+        )
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+Versioned fragment cache for the dashboard side panels.
+
+``games_panel.html`` and ``friends_panel.html`` are rendered by the dashboard,
+the panel endpoints, the challenge views and the WebSocket notification
+service. Every caller goes through ``panel_fragments.render``, which caches
+the HTML under a key built from the data the panel shows:
+
+* games panel: the count and latest ``updated_at`` of the user's games (one
+  aggregate query; every move commit, finish and resignation moves
+  ``updated_at``)
+* friends panel: the user's friendship and challenge versions (``web.versions``)
+
+Keys change whenever the data does, so entries are never invalidated
+explicitly; they simply stop being read and expire. Panels are rendered
+without a request, so they carry no CSRF token (the page's JavaScript adds it
+to htmx requests) and the same HTML serves HTTP responses and WebSocket
+pushes.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import Count, Max, Q
+from django.utils.safestring import SafeString, mark_safe
+
+from games.models import Game, GameStatus
+from .versions import CHALLENGES, FRIENDSHIPS, FRIENDS_PANEL, GAMES_PANEL, panel_versions
+
+User = get_user_model()
+
+
+def user_games_query(user: User) -> Q:
+    return Q(black_player=user) | Q(white_player=user)
+
+
+def games_panel_context(user: User, selected_game: Optional[Game] = None) -> Dict[str, Any]:
+    """Template context for ``web/partials/games_panel.html``."""
+    # Get updated active games and recent finished games
+    active_games = Game.objects.select_related(
+        'black_player', 'white_player'
+    ).prefetch_related('ruleset').filter(user_games_query(user), status=GameStatus.ACTIVE).order_by('-created_at')
+
+    recent_finished_games = Game.objects.select_related(
+        'black_player', 'white_player', 'winner'
+    ).prefetch_related('ruleset').filter(
+        user_games_query(user),
+        status=GameStatus.FINISHED
+    ).order_by('-finished_at')[:5]
+
+    return {
+        'user': user,
+        'active_games': active_games,
+        'recent_finished_games': recent_finished_games,
+        'selected_game': selected_game
+    }
+
+
+def friends_panel_context(user: User) -> Dict[str, Any]:
+    """Template context for ``web/partials/friends_panel.html``."""
+    from web.models import Friendship
+    from games.models import Challenge, ChallengeStatus
+
+    # Get pending challenges
+    pending_sent_challenges = Challenge.objects.select_related(
+        'challenger', 'challenged'
+    ).prefetch_related('ruleset').filter(
+        challenger=user,
+        status=ChallengeStatus.PENDING
+    )
+
+    pending_received_challenges = Challenge.objects.select_related(
+        'challenger', 'challenged'
+    ).prefetch_related('ruleset').filter(
+        challenged=user,
+        status=ChallengeStatus.PENDING
+    )
+
+    return {
+        'user': user,
+        'friends': Friendship.objects.get_friends(user),
+        'pending_sent_challenges': pending_sent_challenges,
+        'pending_received_challenges': pending_received_challenges,
+    }
+
+
+class PanelFragmentCache:
+    """Panel HTML cached by data version, with per-panel hit counters."""
+
+    KEY_PREFIX = 'panel-fragment'
+    TEMPLATES = {
+        GAMES_PANEL: 'web/partials/games_panel.html',
+        FRIENDS_PANEL: 'web/partials/friends_panel.html',
+    }
+
+    def __init__(self, cache_alias: Optional[str] = None, timeout: Optional[int] = None):
+        self._cache_alias = cache_alias
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def cache(self):
+        alias = self._cache_alias or getattr(settings, 'PANEL_FRAGMENT_CACHE_ALIAS', 'default')
+        if alias not in settings.CACHES:
+            alias = 'default'
+        return caches[alias]
+
+    @property
+    def timeout(self) -> int:
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, 'PANEL_FRAGMENT_CACHE_TIMEOUT', 300)
+
+    def version_key(self, panel: str, user: User) -> str:
+        """Describe the version of the data a panel renders for a user."""
+        if panel == GAMES_PANEL:
+            games = Game.objects.filter(user_games_query(user)).aggregate(
+                count=Count('id'), last_updated=Max('updated_at')
+            )
+            last_updated = games['last_updated'].timestamp() if games['last_updated'] else 0
+            return f"{games['count']}.{last_updated}"
+        versions = panel_versions.get_many(user.id, (FRIENDSHIPS, CHALLENGES))
+        return f'{versions[FRIENDSHIPS]}.{versions[CHALLENGES]}'
+
+    def make_key(self, panel: str, user: User, selected_game: Optional[Game] = None) -> str:
+        selected = selected_game.pk if selected_game is not None else '-'
+        return f'{self.KEY_PREFIX}:{panel}:{user.pk}:{selected}:{self.version_key(panel, user)}'
+
+    def render(self, panel: str, user: User, selected_game: Optional[Game] = None) -> SafeString:
+        """
+        Return a panel's HTML for a user, rendering it only if its data changed.
+
+        Args:
+            panel: ``GAMES_PANEL`` or ``FRIENDS_PANEL``
+            user: User the panel belongs to
+            selected_game: Game highlighted in the games panel, if any
+
+        Returns:
+            The panel HTML, safe to insert into a template
+        """
+        from .services import render_notification
+
+        cache = self.cache
+        key = self.make_key(panel, user, selected_game)
+        html = cache.get(key)
+        if html is not None:
+            self._record(panel, 'hits')
+            return mark_safe(html)
+
+        self._record(panel, 'misses')
+        if panel == GAMES_PANEL:
+            context = games_panel_context(user, selected_game)
+        else:
+            context = friends_panel_context(user)
+        html = render_notification(self.TEMPLATES[panel], context).strip()
+        cache.set(key, str(html), self.timeout)
+        return mark_safe(html)
+
+    def _record(self, panel: str, outcome: str) -> None:
+        with self._lock:
+            self._stats[panel][outcome] += 1
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {panel: {'hits': 0, 'misses': 0} for panel in self.TEMPLATES}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return {panel: {'hits', 'misses', 'hit_rate'}}."""
+        with self._lock:
+            stats = {}
+            for panel, counts in self._stats.items():
+                total = counts['hits'] + counts['misses']
+                stats[panel] = dict(counts, hit_rate=counts['hits'] / total if total else 0.0)
+            return stats
+
+
+panel_fragments = PanelFragmentCache()
@@ -0,0 +1,164 @@
+"""
+Management command benchmarking real-time fan-out with a WebSocket swarm.
+
+Opens ``--connections`` in-process WebSocket connections, has ``--pairs`` of
+the users challenge each other, accept and play ``--moves`` moves through the
+views, and reports connection cost, delivery latency and throughput (see
+``web.swarm``)::
+
+    manage.py websocket_swarm --connections 5000 --pairs 200 --output swarm.json
+    manage.py websocket_swarm --layer redis --redis-url redis://localhost:6379/0
+
+Synthetic users and their games are deleted afterwards unless ``--keep``.
+"""
+
+import importlib.util
+import json
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from web.swarm import Swarm, channel_layers_config
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark WebSocket fan-out with many in-process client connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=200,
+            help='WebSocket connections to open, one user each (default: 200)',
+        )
+        parser.add_argument(
+            '--pairs',
+            type=int,
+            default=20,
+            help='Pairs of connected users that challenge each other and play (default: 20)',
+        )
+        parser.add_argument(
+            '--moves',
+            type=int,
+            default=10,
+            help='Moves played in each game (default: 10)',
+        )
+        parser.add_argument(
+            '--board-size',
+            type=int,
+            choices=[9, 13, 15, 19, 25],
+            default=15,
+            help='Gomoku board size (default: 15)',
+        )
+        parser.add_argument(
+            '--layer',
+            choices=['memory', 'redis', 'settings'],
+            default='memory',
+            help='Channel layer: in-process memory, a shared Redis layer, or CHANNEL_LAYERS (default: memory)',
+        )
+        parser.add_argument(
+            '--redis-url',
+            default='redis://localhost:6379/0',
+            help='Redis server for --layer redis',
+        )
+        parser.add_argument(
+            '--settle-ms',
+            type=float,
+            help='Quiet time after which an action is considered fully delivered '
+                 '(default: panel coalescing window + 50)',
+        )
+        parser.add_argument(
+            '--connect-concurrency',
+            type=int,
+            default=100,
+            help='Connections opened at the same time (default: 100)',
+        )
+        parser.add_argument(
+            '--tracemalloc',
+            action='store_true',
+            help='Also trace Python allocations while connecting (slower)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed for move choice',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the synthetic users and games',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the report as JSON to this file',
+        )
+
+    def handle(self, *args, **options):
+        if options['layer'] == 'redis' and importlib.util.find_spec('channels_redis') is None:
+            raise CommandError('--layer redis needs the channels_redis package')
+
+        swarm = Swarm(
+            connections=options['connections'],
+            active_pairs=options['pairs'],
+            moves=options['moves'],
+            board_size=options['board_size'],
+            settle_ms=options['settle_ms'],
+            connect_concurrency=options['connect_concurrency'],
+            trace_memory=options['tracemalloc'],
+            seed=options['seed'],
+        )
+
+        with override_settings(CHANNEL_LAYERS=channel_layers_config(options['layer'], options['redis_url'])):
+            swarm.setup()
+            self.stdout.write(
+                f"Opening {swarm.connections} connections, {swarm.active_pairs} playing pairs "
+                f"on the {options['layer']} channel layer..."
+            )
+            try:
+                report = async_to_sync(swarm.run)()
+            finally:
+                if not options['keep']:
+                    # Games, challenges and friendships go with their users
+                    User.objects.filter(pk__in=[user.pk for user in swarm.users]).delete()
+
+        report['config']['layer'] = options['layer']
+        self.write_report(report)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Wrote report to {options['output']}"))
+
+    def write_report(self, report):
+        def ms(values):
+            return '  '.join(f"{name} {'-' if value is None else f'{value:.1f}'}" for name, value in values.items())
+
+        connections = report['connections']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{connections['opened']}/{connections['requested']} connections in {connections['elapsed_s']:.2f}s "
+            f"({connections['per_sec'] or 0:,.0f}/s)"
+        ))
+        self.stdout.write(f"  connect ms          {ms(connections['connect_ms'])}")
+        per_connection = connections['rss_bytes_per_connection']
+        self.stdout.write(f"  RSS per connection  {'-' if per_connection is None else f'{per_connection / 1024:,.1f} KiB'}")
+        if connections['traced_bytes_per_connection'] is not None:
+            self.stdout.write(f"  traced per conn.    {connections['traced_bytes_per_connection'] / 1024:,.1f} KiB")
+
+        for name, stats in report['actions'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {stats['count']} actions, {stats['errors']} errors, {stats['messages']} messages"
+            ))
+            self.stdout.write(f"  view ms             {ms(stats['view_ms'])}")
+            self.stdout.write(f"  first delivery ms   {ms(stats['first_delivery_ms'])}")
+            self.stdout.write(f"  all deliveries ms   {ms(stats['delivery_ms'])}")
+
+        throughput = report['throughput']
+        self.stdout.write(self.style.MIGRATE_HEADING('Throughput'))
+        self.stdout.write(
+            f"  {throughput['actions_per_sec'] or 0:,.1f} actions/s, {throughput['messages_per_sec'] or 0:,.1f} "
+            f"messages/s over {throughput['elapsed_s']:.2f}s"
+        )
@@ -5,19 +5,241 @@ This module provides a unified service for sending WebSocket notifications
 for all game-related events, replacing scattered update logic across views.
 """
 
+import asyncio
+import contextvars
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+from asgiref.sync import SyncToAsync
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import connection
 from django.template.loader import render_to_string
 from django.middleware.csrf import get_token
-from django.db.models import Q
 from django.contrib.auth import get_user_model
 
-from games.models import Game, GameStatus
+from core.metrics import NOTIFICATION_UPDATE
+from core.tracing import span
+from games.models import Game
 from .consumers import WebSocketMessageSender
+from .fragments import panel_fragments
+from .versions import FRIENDS_PANEL, GAMES_PANEL, panel_versions
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Event currently being notified, used to attribute template renders
+_current_event: ContextVar[Optional[str]] = ContextVar('notification_event', default=None)
+
+
+class RenderCounter:
+    """Counts notification template renders per event type."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def record(self, event_type: str, template_name: str) -> None:
+        with self._lock:
+            templates = self._counts.setdefault(event_type, {})
+            templates[template_name] = templates.get(template_name, 0) + 1
+    
+    def reset(self) -> None:
+        self._counts: Dict[str, Dict[str, int]] = {}
+    
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Return {event_type: {template_name: renders}}."""
+        with self._lock:
+            return {event: dict(templates) for event, templates in self._counts.items()}
+    
+    def total(self, event_type: str) -> int:
+        """Return the number of renders recorded for an event type."""
+        with self._lock:
+            return sum(self._counts.get(event_type, {}).values())
+
+
+render_counter = RenderCounter()
+
+
+def render_notification(template_name: str, context: Dict[str, Any], request=None) -> str:
+    """Render a notification template, counting it against the current event."""
+    render_counter.record(_current_event.get() or 'direct', template_name)
+    with span('render', template=template_name):
+        return render_to_string(template_name, context, request=request)
+
+
+def push_mode() -> str:
+    """How panel changes are pushed: 'render' (full HTML) or 'invalidate' (version only)."""
+    return getattr(settings, 'NOTIFICATION_PUSH_MODE', 'render')
+
+
+def _event_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The ASGI event loop of the calling code, if it has one."""
+    # Sync code called through sync_to_async / database_sync_to_async
+    loop = getattr(SyncToAsync.threadlocal, 'main_event_loop', None)
+    if loop is None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+    if loop.is_closed() or not loop.is_running():
+        return None
+    return loop
+
+
+class LoopTimer:
+    """
+    ``threading.Timer`` look-alike that fires on an event loop.
+    
+    The function runs in a ``database_sync_to_async`` thread started from the
+    loop, so channel layer sends it makes with ``async_to_sync`` go back to
+    that loop and wake its consumers (an in-memory channel layer is bound to
+    the loop its consumers wait on).
+    """
+    
+    # Running flushes, referenced so they are not garbage collected
+    _tasks: Set[asyncio.Task] = set()
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float, function: Callable, args=()):
+        self.loop = loop
+        self.interval = interval
+        self.function = function
+        self.args = args
+        self._cancelled = False
+    
+    def start(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.call_later, self.interval, self._fire)
+    
+    def cancel(self) -> None:
+        self._cancelled = True
+    
+    def _fire(self) -> None:
+        if self._cancelled:
+            return
+        task = self.loop.create_task(database_sync_to_async(self.function, thread_sensitive=False)(*self.args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class PanelUpdateCoalescer:
+    """
+    Per-user debounce stage for panel updates.
+    
+    Panel renders are whole-list snapshots (all of a user's games, friends and
+    challenges), so only the latest one matters. The first update for a
+    (user, panel) pair opens a window of ``NOTIFICATION_PANEL_COALESCE_MS``;
+    updates arriving inside it replace the pending one, and a single render is
+    sent when the window closes. A window of 0 sends immediately.
+    
+    Under ASGI the window is timed on the event loop the update came from
+    (``LoopTimer``); code without one (management commands, WSGI) uses a
+    timer thread.
+    """
+    
+    def __init__(self, window_ms: Optional[float] = None):
+        self._window_ms = window_ms
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, str], Tuple[contextvars.Context, Callable[[], bool]]] = {}
+        self._timers: Dict[Tuple[int, str], Any] = {}
+        self._stats = {'submitted': 0, 'sent': 0, 'coalesced': 0}
+    
+    @property
+    def window(self) -> float:
+        """Coalescing window in seconds."""
+        window_ms = self._window_ms
+        if window_ms is None:
+            window_ms = getattr(settings, 'NOTIFICATION_PANEL_COALESCE_MS', 0)
+        return max(0, window_ms) / 1000
+    
+    def submit(self, user_id: int, update_type: str, send: Callable[[], bool]) -> bool:
+        """
+        Schedule a panel update, replacing any pending one for the same target.
+        
+        Args:
+            user_id: ID of the user receiving the update
+            update_type: Panel being updated ('friends_panel', 'games_panel')
+            send: Callable that renders and sends the panel
+            
+        Returns:
+            bool: Result of ``send`` when sent immediately, True when deferred
+        """
+        with self._lock:
+            self._stats['submitted'] += 1
+        
+        window = self.window
+        if not window:
+            self._record_sent()
+            return send()
+        
+        key = (user_id, update_type)
+        with self._lock:
+            if key in self._pending:
+                self._stats['coalesced'] += 1
+            # Keep the submitter's context so renders are attributed to its event
+            self._pending[key] = (contextvars.copy_context(), send)
+            if key not in self._timers:
+                loop = _event_loop()
+                if loop is not None:
+                    timer = LoopTimer(loop, window, self._send, args=(key,))
+                else:
+                    timer = threading.Timer(window, self._flush_key, args=(key,))
+                    timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+        return True
+    
+    def flush(self) -> None:
+        """Send every pending update now."""
+        with self._lock:
+            keys = list(self._timers)
+            for key in keys:
+                self._timers[key].cancel()
+        for key in keys:
+            self._send(key)
+    
+    def _flush_key(self, key: Tuple[int, str]) -> None:
+        try:
+            self._send(key)
+        finally:
+            # Timer threads open their own database connection
+            connection.close()
+    
+    def _send(self, key: Tuple[int, str]) -> None:
+        with self._lock:
+            self._timers.pop(key, None)
+            pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        
+        context, send = pending
+        self._record_sent()
+        try:
+            context.run(send)
+        except Exception as e:
+            logger.error(f"Failed to send coalesced {key[1]} update to user {key[0]}: {e}")
+    
+    def _record_sent(self) -> None:
+        with self._lock:
+            self._stats['sent'] += 1
+    
+    def reset(self) -> None:
+        """Drop pending updates and zero the counters."""
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            self._pending.clear()
+            self._stats = {'submitted': 0, 'sent': 0, 'coalesced': 0}
+    
+    def stats(self) -> Dict[str, int]:
+        """Return submitted/sent/coalesced counters and the number of pending updates."""
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+
+panel_coalescer = PanelUpdateCoalescer()
+
 
 class WebSocketNotificationService:
     """
@@ -27,6 +249,9 @@ class WebSocketNotificationService:
     ensuring both players receive appropriate notifications for all game events.
     """
     
+    # Whole-panel updates that are debounced per user (see PanelUpdateCoalescer)
+    COALESCED_UPDATES = ('friends_panel', 'games_panel')
+    
     # Event type definitions - what gets updated for each event
     EVENT_DEFINITIONS = {
         'challenge_sent': {
@@ -83,7 +308,8 @@ class WebSocketNotificationService:
             event_type: The type of event (see EVENT_DEFINITIONS)
             game: The game instance involved in the event
             triggering_user: The user who triggered the event
-            request: Django request object (for CSRF tokens and rendering)
+            request: Django request object (for CSRF tokens and rendering), or None
+                when the event did not come from an HTTP request (WebSocket commands)
             **context: Additional context for the event (e.g., challenge info)
             
         Returns:
@@ -96,9 +322,10 @@ class WebSocketNotificationService:
         event_def = cls.EVENT_DEFINITIONS[event_type]
         logger.info(f"📤 Sending WebSocket notifications for '{event_type}': {event_def['description']}")
         
+        event_token = _current_event.set(event_type)
         try:
             # Generate fresh CSRF token for WebSocket updates
-            csrf_token = get_token(request)
+            csrf_token = get_token(request) if request is not None else ''
             
             # Determine which users need updates
             users_to_notify = cls._get_users_for_event(event_type, game, triggering_user, context)
@@ -117,6 +344,8 @@ class WebSocketNotificationService:
         except Exception as e:
             logger.error(f"❌ Failed to send WebSocket notifications for {event_type}: {e}")
             return False
+        finally:
+            _current_event.reset(event_token)
     
     @classmethod
     def _get_users_for_event(cls, event_type: str, game: Game, triggering_user: User, 
@@ -174,68 +403,65 @@ class WebSocketNotificationService:
             bool: True if update was sent successfully
         """
         try:
-            if update_type == 'friends_panel':
-                return cls._send_friends_panel_update(user, request, csrf_token, context)
-            
-            elif update_type == 'games_panel':
-                return cls._send_games_panel_update(user, request, csrf_token, context)
-            
-            elif update_type == 'game_panel':
-                return cls._send_game_panel_update(user, game, request, csrf_token, context)
-            
-            elif update_type == 'game_board':
-                return cls._send_game_board_update(user, game, request, csrf_token, context)
-            
-            elif update_type == 'turn_display':
-                return cls._send_turn_display_update(user, game, request, csrf_token, context)
-            
-            elif update_type == 'move_history':
-                return cls._send_move_history_update(user, game, request, csrf_token, context)
-            
-            else:
-                logger.warning(f"Unknown update type: {update_type}")
-                return False
-                
+            with NOTIFICATION_UPDATE.time(event=_current_event.get() or 'direct', update_type=update_type), \
+                    span(f'update.{update_type}', user_id=user.id):
+                return cls._dispatch_update(update_type, user, game, request, csrf_token, context)
         except Exception as e:
             logger.error("Failed to send %s update to %s: %s", update_type, user.username, str(e))
             return False
     
     @classmethod
-    def _send_friends_panel_update(cls, user: User, request, csrf_token: str, context: Dict) -> bool:
-        """Send friends panel update to user."""
-        from web.models import Friendship, FriendshipStatus
-        from games.models import Challenge, ChallengeStatus
-        from django.test import RequestFactory
-        from django.contrib.sessions.middleware import SessionMiddleware
-        from django.middleware.csrf import get_token
+    def _dispatch_update(cls, update_type: str, user: User, game: Game, request,
+                         csrf_token: str, context: Dict) -> bool:
+        """Route an update to its sender."""
+        if update_type in cls.COALESCED_UPDATES:
+            if push_mode() == 'invalidate':
+                return cls._send_panel_invalidation(user, update_type)
+            return panel_coalescer.submit(
+                user.id, update_type,
+                lambda: cls._send_panel_update(update_type, user, request, csrf_token, context)
+            )
         
-        # Get friends
-        friends = Friendship.objects.get_friends(user)
+        if update_type == 'game_panel':
+            return cls._send_game_panel_update(user, game, request, csrf_token, context)
         
-        # Get pending challenges
-        pending_sent_challenges = Challenge.objects.select_related(
-            'challenger', 'challenged'
-        ).prefetch_related('ruleset').filter(
-            challenger=user,
-            status=ChallengeStatus.PENDING
-        )
+        elif update_type == 'game_board':
+            return cls._send_game_board_update(user, game, request, csrf_token, context)
         
-        pending_received_challenges = Challenge.objects.select_related(
-            'challenger', 'challenged'
-        ).prefetch_related('ruleset').filter(
-            challenged=user, 
-            status=ChallengeStatus.PENDING
-        )
+        elif update_type == 'turn_display':
+            return cls._send_turn_display_update(user, game, request, csrf_token, context)
         
-        # Don't include CSRF tokens in WebSocket-delivered HTML
-        # Let the client-side JavaScript handle CSRF tokens from the page context
-        friends_html = render_to_string('web/partials/friends_panel.html', {
-            'user': user,
-            'friends': friends,
-            'pending_sent_challenges': pending_sent_challenges,
-            'pending_received_challenges': pending_received_challenges,
-            # No csrf_token - handled by JavaScript
-        }, request=request).strip()
+        elif update_type == 'move_history':
+            return cls._send_move_history_update(user, game, request, csrf_token, context)
+        
+        else:
+            logger.warning(f"Unknown update type: {update_type}")
+            return False
+    
+    @classmethod
+    def _send_panel_update(cls, update_type: str, user: User, request, csrf_token: str, context: Dict) -> bool:
+        """Render and send a coalesced panel update."""
+        if update_type == 'friends_panel':
+            return cls._send_friends_panel_update(user, request, csrf_token, context)
+        return cls._send_games_panel_update(user, request, csrf_token, context)
+    
+    @classmethod
+    def _send_panel_invalidation(cls, user: User, update_type: str) -> bool:
+        """Tell the user a panel changed; the client refetches it if visible."""
+        WebSocketMessageSender.send_to_user_sync(
+            user.id,
+            'panel_invalidate',
+            '',
+            metadata={'invalidate': update_type, 'version': panel_versions.get_panel(user.id, update_type)}
+        )
+        return True
+    
+    @classmethod
+    def _send_friends_panel_update(cls, user: User, request, csrf_token: str, context: Dict) -> bool:
+        """Send friends panel update to user."""
+        # Rendered without CSRF tokens (the page's JavaScript adds them), so the
+        # fragment is shared with the HTTP views
+        friends_html = panel_fragments.render(FRIENDS_PANEL, user)
         
         WebSocketMessageSender.send_to_user_sync(
             user.id,
@@ -248,27 +474,7 @@ class WebSocketNotificationService:
     @classmethod
     def _send_games_panel_update(cls, user: User, request, csrf_token: str, context: Dict) -> bool:
         """Send games panel (dashboard left sidebar) update to user."""
-        user_games_query = Q(black_player=user) | Q(white_player=user)
-        
-        # Get updated active games and recent finished games
-        active_games = Game.objects.select_related(
-            'black_player', 'white_player'
-        ).prefetch_related('ruleset').filter(user_games_query, status=GameStatus.ACTIVE).order_by('-created_at')
-        
-        recent_finished_games = Game.objects.select_related(
-            'black_player', 'white_player', 'winner'
-        ).prefetch_related('ruleset').filter(
-            user_games_query, 
-            status=GameStatus.FINISHED
-        ).order_by('-finished_at')[:5]
-        
-        # Render updated games panel
-        panel_html = render_to_string('web/partials/games_panel.html', {
-            'user': user,
-            'active_games': active_games,
-            'recent_finished_games': recent_finished_games,
-            'selected_game': None  # Don't force game selection
-        }, request=request).strip()
+        panel_html = panel_fragments.render(GAMES_PANEL, user)
         
         # Send dashboard panel update
         panel_html_clean = panel_html.replace('\n\n', ' ').replace('\r\n\r\n', ' ').strip()
@@ -285,10 +491,11 @@ class WebSocketNotificationService:
         """Send game panel (center dashboard panel) update to user."""
         game_context = {
             'selected_game': game,
+            'recent_moves': cls._recent_moves(game),  # For the included move history
             'user': user,
             'csrf_token': csrf_token
         }
-        game_panel_html = render_to_string('web/partials/dashboard_game_panel.html', game_context, request=request)
+        game_panel_html = render_notification('web/partials/dashboard_game_panel.html', game_context, request=request)
         
         WebSocketMessageSender.send_to_user_sync(
             user.id,
@@ -302,7 +509,7 @@ class WebSocketNotificationService:
     def _send_game_board_update(cls, user: User, game: Game, request, csrf_token: str, context: Dict) -> bool:
         """Send optimized move update to user (targeted intersection only)."""
         # Get the most recent move for targeted updates
-        latest_move = game.moves.order_by('-move_number').first()
+        latest_move = game.moves.select_related('player').order_by('-move_number').first()
         
         # For Go games, detect capture moves and use full board update
         use_targeted_update = context.get('use_targeted_update', True)
@@ -314,7 +521,7 @@ class WebSocketNotificationService:
         
         if latest_move and use_targeted_update:
             # Send minimal targeted update (~1KB instead of 85KB)
-            move_html = render_to_string('web/partials/single_move_update.html', {
+            move_html = render_notification('web/partials/single_move_update.html', {
                 'move': latest_move,
                 'game': game
             }, request=request).strip()
@@ -333,7 +540,7 @@ class WebSocketNotificationService:
             )
         else:
             # Fallback to full board update if needed
-            board_html = render_to_string('web/partials/game_board.html', {
+            board_html = render_notification('web/partials/game_board.html', {
                 'game': game,
                 'selected_game': game,
                 'user': user,
@@ -352,12 +559,9 @@ class WebSocketNotificationService:
     @classmethod
     def _send_move_history_update(cls, user: User, game: Game, request, csrf_token: str, context: Dict) -> bool:
         """Send optimized move history update to user (recent moves only)."""
-        # Only show last 20 moves to prevent exponential payload growth
-        recent_moves = game.moves.select_related('player').order_by('-move_number')[:20]
-        
-        history_html = render_to_string('web/partials/move_history.html', {
+        history_html = render_notification('web/partials/move_history.html', {
             'game': game,
-            'recent_moves': list(reversed(recent_moves))  # Show in chronological order
+            'recent_moves': cls._recent_moves(game)
         }, request=request).strip()
         
         WebSocketMessageSender.send_to_user_sync(
@@ -368,6 +572,13 @@ class WebSocketNotificationService:
         )
         return True
     
+    @classmethod
+    def _recent_moves(cls, game: Game) -> List:
+        """Last 20 moves in chronological order, with their players, for the move history."""
+        # Only show last 20 moves to prevent exponential payload growth
+        recent_moves = game.moves.select_related('player').order_by('-move_number')[:20]
+        return list(reversed(recent_moves))
+    
     @classmethod
     def _move_involved_captures(cls, game: Game, move) -> bool:
         """
@@ -423,7 +634,7 @@ class WebSocketNotificationService:
     @classmethod
     def _send_turn_display_update(cls, user: User, game: Game, request, csrf_token: str, context: Dict) -> bool:
         """Send turn display update to user."""
-        turn_html = render_to_string('web/partials/game_turn_display.html', {
+        turn_html = render_notification('web/partials/game_turn_display.html', {
             'game': game,
             'user': user,
         }, request=request).strip()
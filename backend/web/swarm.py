@@ -0,0 +1,329 @@
+"""
+In-process WebSocket client swarm for fan-out benchmarking.
+
+Opens many ``UserWebSocketConsumer`` connections with channels'
+``WebsocketCommunicator`` (one synthetic user each), then has some of the
+users challenge each other, accept and play moves through the real views
+with Django's test ``Client``. Every message a connection receives is
+timestamped on arrival, so each action yields:
+
+* the view time (request in, response out),
+* the delivery latency of each message it caused, from the start of the
+  request to the message reaching the client, per recipient,
+* the number of messages fanned out.
+
+Views run through ``sync_to_async`` on the event loop's sync thread, the same
+way an ASGI server runs them, so the numbers describe one ASGI process. Memory
+per connection is the process RSS growth while connecting (plus traced Python
+allocations with ``tracemalloc``).
+
+``manage.py websocket_swarm`` is the command-line entry point.
+"""
+
+import asyncio
+import json
+import random
+import resource
+import time
+import tracemalloc
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from games.models import Challenge, ChallengeStatus, Game, GameStatus, GameType
+from games.simulation import create_users, get_ruleset, percentile
+from .models import Friendship, FriendshipStatus
+from .routing import websocket_urlpatterns
+
+
+def channel_layers_config(layer: str, redis_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    ``CHANNEL_LAYERS`` for a swarm run.
+
+    Args:
+        layer: 'memory' (in-process), 'redis' (shared, needs channels_redis) or
+            'settings' (whatever the project is configured with)
+        redis_url: Redis server for the 'redis' layer
+
+    Returns:
+        A ``CHANNEL_LAYERS`` setting
+    """
+    if layer == 'memory':
+        return {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    if layer == 'redis':
+        return {'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [redis_url or 'redis://localhost:6379/0']},
+        }}
+    return settings.CHANNEL_LAYERS
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is not available)."""
+    statm = Path('/proc/self/statm')
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * resource.getpagesize()
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def distribution(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    def rounded(value):
+        return None if value is None else round(value, 3)
+
+    return {
+        'p50': rounded(percentile(values, 0.50)),
+        'p95': rounded(percentile(values, 0.95)),
+        'p99': rounded(percentile(values, 0.99)),
+        'max': rounded(max(values)) if values else None,
+    }
+
+
+class SwarmClient:
+    """One WebSocket connection, recording the arrival time and type of every message."""
+
+    def __init__(self, user, application):
+        self.user = user
+        self.communicator = WebsocketCommunicator(application, f'/ws/user/{user.id}/')
+        self.communicator.scope['user'] = user
+        self.messages: List[tuple] = []
+        self._arrived = asyncio.Event()
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self, timeout: float = 10) -> bool:
+        connected, _ = await self.communicator.connect(timeout)
+        if connected:
+            self._reader = asyncio.create_task(self._read())
+        return connected
+
+    async def _read(self) -> None:
+        while True:
+            message = await self.communicator.receive_output(timeout=None)
+            if message['type'] != 'websocket.send':
+                return
+            try:
+                event_type = json.loads(message.get('text') or '{}').get('type', 'unknown')
+            except ValueError:
+                event_type = 'invalid'
+            self.messages.append((time.perf_counter(), event_type))
+            self._arrived.set()
+
+    async def wait_quiet(self, settle: float, limit: float) -> None:
+        """Return once no message has arrived for ``settle`` seconds (or after ``limit``)."""
+        deadline = time.perf_counter() + limit
+        while time.perf_counter() < deadline:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), settle)
+            except asyncio.TimeoutError:
+                return
+
+    async def disconnect(self) -> None:
+        if self._reader:
+            self._reader.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._reader
+        with suppress(Exception):
+            await self.communicator.disconnect()
+
+
+class ActionStats:
+    """Timings of one kind of action (challenge, accept, move)."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.view_ms: List[float] = []
+        self.first_delivery_ms: List[float] = []
+        self.delivery_ms: List[float] = []
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'messages': len(self.delivery_ms),
+            'view_ms': distribution(self.view_ms),
+            'first_delivery_ms': distribution(self.first_delivery_ms),
+            'delivery_ms': distribution(self.delivery_ms),
+        }
+
+
+class Swarm:
+    """
+    A swarm of connected users, some of them playing each other.
+
+    Call ``setup`` (sync, creates users, friendships and logged-in clients),
+    then ``run`` (async) on an event loop whose sync thread may use the database.
+    """
+
+    def __init__(self, connections: int = 100, active_pairs: int = 10, moves: int = 10,
+                 board_size: int = 15, settle_ms: Optional[float] = None, connect_concurrency: int = 100,
+                 trace_memory: bool = False, seed: Optional[int] = None):
+        self.connections = max(2, connections)
+        self.active_pairs = min(active_pairs, self.connections // 2)
+        self.moves = moves
+        self.board_size = board_size
+        window = getattr(settings, 'NOTIFICATION_PANEL_COALESCE_MS', 0)
+        # Long enough for coalesced panel updates to arrive
+        self.settle = (settle_ms if settle_ms is not None else window + 50) / 1000
+        self.connect_concurrency = connect_concurrency
+        self.trace_memory = trace_memory
+        self.rng = random.Random(seed)
+        self.actions = {name: ActionStats() for name in ('challenge', 'accept', 'move')}
+        self.users = []
+        self.clients: Dict[int, Client] = {}
+        self.ruleset = None
+
+    def setup(self) -> None:
+        """Create the synthetic users; playing pairs are made friends and logged in."""
+        prefix = f'swarm-{self.rng.getrandbits(32):08x}-'
+        self.users = create_users(self.connections, prefix)
+        self.ruleset = get_ruleset(GameType.GOMOKU, self.board_size)
+        pairs = self.pairs()
+        Friendship.objects.bulk_create([
+            Friendship(requester=challenger, addressee=challenged, status=FriendshipStatus.ACCEPTED)
+            for challenger, challenged in pairs
+        ])
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'testserver')
+        for user in (user for pair in pairs for user in pair):
+            client = Client(HTTP_HOST=host)
+            client.force_login(user)
+            self.clients[user.id] = client
+
+    def pairs(self) -> List[tuple]:
+        return [(self.users[2 * n], self.users[2 * n + 1]) for n in range(self.active_pairs)]
+
+    async def run(self) -> Dict[str, Any]:
+        """Connect everyone, play the pairs concurrently, disconnect, and return the report."""
+        application = URLRouter(websocket_urlpatterns)
+        self.swarm_clients = {user.id: SwarmClient(user, application) for user in self.users}
+
+        connect = await self.connect_all()
+        start = time.perf_counter()
+        await asyncio.gather(*(self.play_pair(challenger, challenged) for challenger, challenged in self.pairs()))
+        elapsed = time.perf_counter() - start
+
+        received = sum(len(client.messages) for client in self.swarm_clients.values())
+        await asyncio.gather(*(client.disconnect() for client in self.swarm_clients.values()))
+
+        actions = sum(stats.count for stats in self.actions.values())
+        delivered = sum(len(stats.delivery_ms) for stats in self.actions.values())
+        return {
+            'connections': connect,
+            'actions': {name: stats.summary() for name, stats in self.actions.items()},
+            'throughput': {
+                'elapsed_s': round(elapsed, 3),
+                'actions': actions,
+                'actions_per_sec': round(actions / elapsed, 1) if elapsed > 0 else None,
+                'messages': delivered,
+                'messages_per_sec': round(delivered / elapsed, 1) if elapsed > 0 else None,
+                'messages_received': received,
+            },
+            'config': {
+                'active_pairs': self.active_pairs,
+                'moves_per_game': self.moves,
+                'board_size': self.board_size,
+                'settle_ms': round(self.settle * 1000, 1),
+            },
+        }
+
+    async def connect_all(self) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(self.connect_concurrency)
+        times: List[float] = []
+
+        async def connect(client):
+            async with semaphore:
+                started = time.perf_counter()
+                connected = await client.connect()
+                if connected:
+                    times.append((time.perf_counter() - started) * 1000)
+                return connected
+
+        if self.trace_memory:
+            tracemalloc.start()
+        rss_before = rss_bytes()
+        traced_before = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        start = time.perf_counter()
+        results = await asyncio.gather(*(connect(client) for client in self.swarm_clients.values()))
+        elapsed = time.perf_counter() - start
+        # Let the connection_status greetings arrive before measuring
+        await asyncio.sleep(self.settle)
+        rss_growth = rss_bytes() - rss_before
+        traced = None
+        if self.trace_memory:
+            traced = tracemalloc.get_traced_memory()[0] - traced_before
+            tracemalloc.stop()
+
+        opened = sum(results)
+        return {
+            'requested': len(results),
+            'opened': opened,
+            'failed': len(results) - opened,
+            'elapsed_s': round(elapsed, 3),
+            'per_sec': round(opened / elapsed, 1) if elapsed > 0 else None,
+            'connect_ms': distribution(times),
+            'rss_bytes_per_connection': round(rss_growth / opened) if opened else None,
+            'traced_bytes_per_connection': round(traced / opened) if traced is not None and opened else None,
+        }
+
+    async def action(self, name: str, actor, recipients: Sequence, path: str, data: Dict[str, Any]):
+        """POST as ``actor`` and time the messages it causes at each recipient."""
+        stats = self.actions[name]
+        clients = [self.swarm_clients[user.id] for user in recipients]
+        marks = [len(client.messages) for client in clients]
+
+        start = time.perf_counter()
+        response = await sync_to_async(self.clients[actor.id].post)(
+            path, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        stats.view_ms.append((time.perf_counter() - start) * 1000)
+        stats.count += 1
+        if response.status_code >= 400:
+            stats.errors += 1
+
+        await asyncio.gather(*(client.wait_quiet(self.settle, limit=10) for client in clients))
+        for client, mark in zip(clients, marks):
+            arrivals = [(arrived - start) * 1000 for arrived, _ in client.messages[mark:]]
+            if arrivals:
+                stats.first_delivery_ms.append(arrivals[0])
+                stats.delivery_ms.extend(arrivals)
+        return response
+
+    async def play_pair(self, challenger, challenged) -> None:
+        pair = [challenger, challenged]
+        await self.action('challenge', challenger, pair, reverse('web:challenge_friend'), {
+            'username': challenged.username,
+            'ruleset_id': f'gomoku_{self.ruleset.id}',
+        })
+        challenge = await sync_to_async(
+            Challenge.objects.filter(challenger=challenger, challenged=challenged, status=ChallengeStatus.PENDING).first
+        )()
+        if challenge is None:
+            return
+        await self.action('accept', challenged, pair, reverse('web:respond_challenge', args=[challenge.id]), {
+            'action': 'accept',
+        })
+        game = await sync_to_async(
+            Game.objects.filter(black_player__in=pair, white_player__in=pair).order_by('-created_at').first
+        )()
+        if game is None:
+            return
+
+        players = [game.black_player_id, game.white_player_id]
+        by_id = {user.id: user for user in pair}
+        free = [(row, col) for row in range(self.board_size) for col in range(self.board_size)]
+        self.rng.shuffle(free)
+        for number in range(self.moves):
+            if not free:
+                break
+            row, col = free.pop()
+            response = await self.action('move', by_id[players[number % 2]], pair,
+                                         reverse('web:game_move', args=[game.id]), {'row': row, 'col': col})
+            if response.status_code >= 400 or response.json().get('move', {}).get('status') != GameStatus.ACTIVE:
+                break
@@ -16,6 +16,8 @@ urlpatterns = [
     
     # Dashboard and profile
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+    path('dashboard/panels/games/', views.GamesPanelView.as_view(), name='games_panel'),
+    path('dashboard/panels/friends/', views.FriendsPanelView.as_view(), name='friends_panel'),
     
     # Games
     path('games/modal/', views.GamesModalView.as_view(), name='games_modal'),
@@ -23,6 +25,7 @@ urlpatterns = [
     path('games/<uuid:game_id>/move/', views.GameMoveView.as_view(), name='game_move'),
     path('games/<uuid:game_id>/pass/', views.GamePassView.as_view(), name='game_pass'),
     path('games/<uuid:game_id>/resign/', views.GameResignView.as_view(), name='game_resign'),
+    path('games/<uuid:game_id>/analysis/', views.GameAnalysisView.as_view(), name='game_analysis'),
     
     # Friends - Modal View
     path('friends/modal/', views.FriendsModalView.as_view(), name='friends_modal'),
@@ -0,0 +1,188 @@
+"""
+Per-user data version counters for conditional responses.
+
+Every change to a user's games, friendships or challenges bumps the counter
+for that (user, scope) pair; ruleset changes bump a global counter. Views
+build their ETags from the counters of the scopes they render
+(``conditional_on_versions``), so revalidating an unchanged fragment costs one
+cache read and a 304, before any query runs.
+
+The dashboard side panels are built from these scopes (``PANELS``). Their
+combined version is what invalidation-only pushes carry
+(``{"invalidate": "games_panel", "version": N}``).
+
+Counters live in a shared cache alias so that every worker sees the same
+versions. A missing counter is seeded from the clock rather than from zero, so
+a counter lost to eviction or a cache restart never repeats a version a client
+may still hold.
+"""
+
+import time
+from typing import Dict, Iterable, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+# Data scopes
+GAMES = 'games'
+FRIENDSHIPS = 'friendships'
+CHALLENGES = 'challenges'
+RULESETS = 'rulesets'  # Global, not per user
+
+# Dashboard panels and the scopes they render
+GAMES_PANEL = 'games_panel'
+FRIENDS_PANEL = 'friends_panel'
+PANELS = {
+    GAMES_PANEL: (GAMES,),
+    FRIENDS_PANEL: (FRIENDSHIPS, CHALLENGES),
+}
+
+
+class PanelVersions:
+    """Monotonic version counters per (user, scope), or per scope when global."""
+
+    KEY_PREFIX = 'data-version'
+
+    def __init__(self, cache_alias: str = None):
+        self._cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        alias = self._cache_alias or getattr(settings, 'PANEL_VERSION_CACHE_ALIAS', 'default')
+        if alias not in settings.CACHES:
+            alias = 'default'
+        return caches[alias]
+
+    def make_key(self, user_id: Optional[int], scope: str) -> str:
+        owner = 'global' if user_id is None else user_id
+        return f'{self.KEY_PREFIX}:{scope}:{owner}'
+
+    @staticmethod
+    def _seed() -> int:
+        return int(time.time() * 1000)
+
+    def get(self, user_id: Optional[int], scope: str) -> int:
+        """
+        Return the current version of one scope.
+
+        Args:
+            user_id: ID of the user owning the data, or None for a global scope
+            scope: Data scope (``GAMES``, ``FRIENDSHIPS``, ...)
+
+        Returns:
+            The current version, seeding the counter if it does not exist
+        """
+        return self.get_many(user_id, (scope,))[scope]
+
+    def get_many(self, user_id: Optional[int], scopes: Sequence[str]) -> Dict[str, int]:
+        """Return {scope: version} for several scopes with one cache round trip."""
+        cache = self.cache
+        keys = {self.make_key(user_id, scope): scope for scope in scopes}
+        found = cache.get_many(list(keys))
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            seed = self._seed()
+            for key in missing:
+                cache.add(key, seed, timeout=None)
+            found.update(cache.get_many(missing))
+
+        return {scope: int(found.get(key) or 0) for key, scope in keys.items()}
+
+    def get_panel(self, user_id: int, panel: str) -> int:
+        """
+        Return the combined version of a dashboard panel.
+
+        Each scope only ever grows, so the sum of the panel's scope versions
+        grows whenever any of them is bumped.
+        """
+        return sum(self.get_many(user_id, PANELS[panel]).values())
+
+    def bump(self, user_id: Optional[int], scope: str) -> int:
+        """
+        Advance a version after a change.
+
+        Args:
+            user_id: ID of the user owning the data, or None for a global scope
+            scope: Data scope (``GAMES``, ``FRIENDSHIPS``, ...)
+
+        Returns:
+            The new version
+        """
+        cache = self.cache
+        key = self.make_key(user_id, scope)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Missing (never read, or evicted): start from a fresh seed
+            if cache.add(key, self._seed(), timeout=None):
+                return self.get(user_id, scope)
+            return cache.incr(key)
+
+    def bump_many(self, user_ids: Iterable[int], scope: str) -> Dict[int, int]:
+        """Bump the same scope for several users; returns {user_id: version}."""
+        return {user_id: self.bump(user_id, scope) for user_id in set(user_ids)}
+
+
+panel_versions = PanelVersions()
+
+
+def conditional_on_versions(*scopes: str, per_user: bool = True):
+    """
+    Decorator making a GET view conditional on data versions.
+
+    The ETag is built from the versions of ``scopes`` (the requesting user's,
+    unless ``per_user`` is False), so a request whose ``If-None-Match`` still
+    matches is answered 304 without calling the view. Responses are marked
+    ``private, no-cache`` so browsers always revalidate.
+
+    Args:
+        *scopes: Data scopes the view renders
+        per_user: Whether the scopes are per user or global
+    """
+    def etag_func(request, *args, **kwargs):
+        if per_user and not request.user.is_authenticated:
+            return None
+        user_id = request.user.id if per_user else None
+        versions = panel_versions.get_many(user_id, scopes)
+        return '-'.join([str(user_id)] + [f'{scope}.{versions[scope]}' for scope in scopes])
+
+    def decorator(view_func):
+        return cache_control(private=True, no_cache=True)(condition(etag_func=etag_func)(view_func))
+    return decorator
+
+
+def bump_after_commit(user_ids: Iterable[Optional[int]], scope: str) -> None:
+    """
+    Bump a scope for several users once the current transaction commits.
+
+    Bumping before the commit would let a concurrent request render the old
+    data under the new version, and that response would then be revalidated
+    as current.
+    """
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        transaction.on_commit(lambda: panel_versions.bump_many(user_ids, scope))
+
+
+def bump_game_versions(sender, instance, **kwargs) -> None:
+    """Signal receiver: a game changed for both of its players."""
+    bump_after_commit((instance.black_player_id, instance.white_player_id), GAMES)
+
+
+def bump_friendship_versions(sender, instance, **kwargs) -> None:
+    """Signal receiver: a friendship changed for both users."""
+    bump_after_commit((instance.requester_id, instance.addressee_id), FRIENDSHIPS)
+
+
+def bump_challenge_versions(sender, instance, **kwargs) -> None:
+    """Signal receiver: a challenge changed for both users."""
+    bump_after_commit((instance.challenger_id, instance.challenged_id), CHALLENGES)
+
+
+def bump_ruleset_version(sender, **kwargs) -> None:
+    """Signal receiver: the ruleset list changed for everybody."""
+    transaction.on_commit(lambda: panel_versions.bump(None, RULESETS))
@@ -1,3 +1,5 @@
+import json
+from functools import partial
 from typing import Optional, Union, Dict, Any
 from django.shortcuts import render, redirect
 from django.views.generic import TemplateView, RedirectView
@@ -8,12 +10,19 @@ from django.urls import reverse_lazy, reverse
 from django.views import View
 from django.db.models import Q
 from django.http import JsonResponse, HttpResponse
+from django.core.exceptions import ValidationError
+from django.utils.decorators import method_decorator
 
+from games.active_games import active_game_store
+from games.actors import submit_move, submit_pass
 from games.models import Game, Challenge, GameStatus, ChallengeStatus, GomokuRuleSet, GoRuleSet
 from games.game_services import GameServiceFactory
-from core.exceptions import InvalidMoveError, GameStateError, PlayerError
+from core.exceptions import InvalidMoveError, GameStateError, PlayerError, GameConflictError
+from core.tracing import span, start_trace
 from users.models import User
 from .models import Friendship, FriendshipStatus
+from .fragments import panel_fragments
+from .versions import conditional_on_versions, CHALLENGES, FRIENDSHIPS, FRIENDS_PANEL, GAMES, GAMES_PANEL, RULESETS
 
 # SSE functionality removed - project migrated to WebSocket
 # Real-time updates now handled by web/consumers.py WebSocket consumer
@@ -104,14 +113,10 @@ class DashboardView(LoginRequiredMixin, UserGamesMixin, TemplateView):
         if game_id_param:
             # Try to select specific game from URL parameter
             try:
-                selected_game = Game.objects.select_related(
-                    'black_player', 'white_player', 'winner'
-                ).prefetch_related('ruleset').filter(
-                    id=game_id_param
-                ).filter(
-                    Q(black_player=user) | Q(white_player=user)  # User must be a player
-                ).first()
-            except (Game.DoesNotExist, ValueError):
+                selected_game = active_game_store.load_game(game_id_param)
+                if user.id not in (selected_game.black_player_id, selected_game.white_player_id):
+                    selected_game = None  # User must be a player
+            except (Game.DoesNotExist, ValueError, ValidationError):
                 # Invalid game ID or user not authorized - fall back to default
                 pass
         
@@ -142,6 +147,10 @@ class DashboardView(LoginRequiredMixin, UserGamesMixin, TemplateView):
         )
         
         context.update({
+            # Side panels come from the shared fragment cache; templates call
+            # these, so htmx partial responses never render them
+            'games_panel_html': partial(panel_fragments.render, GAMES_PANEL, user, selected_game=selected_game),
+            'friends_panel_html': partial(panel_fragments.render, FRIENDS_PANEL, user),
             'games_played': games_played,
             'games_won': games_won,
             'active_games': active_games,
@@ -168,6 +177,34 @@ class DashboardView(LoginRequiredMixin, UserGamesMixin, TemplateView):
 
 
 
+class PanelView(LoginRequiredMixin, View):
+    """
+    Pull endpoint for a dashboard side panel.
+    
+    Clients in invalidation-only push mode refetch panels from here when they
+    are told a new version exists. Responses carry an ETag built from the
+    versions of the data the panel renders, so a revalidation of an unchanged
+    panel is a 304 without a render.
+    """
+    login_url = 'web:login'
+    panel = None
+    
+    def get(self, request):
+        return HttpResponse(panel_fragments.render(self.panel, request.user))
+
+
+@method_decorator(conditional_on_versions(GAMES), name='get')
+class GamesPanelView(PanelView):
+    """Games panel (dashboard left sidebar)."""
+    panel = GAMES_PANEL
+
+
+@method_decorator(conditional_on_versions(FRIENDSHIPS, CHALLENGES), name='get')
+class FriendsPanelView(PanelView):
+    """Friends panel (dashboard right sidebar)."""
+    panel = FRIENDS_PANEL
+
+
 class GameDetailRedirectView(LoginRequiredMixin, RedirectView):
     """Redirect game detail requests to dashboard with game parameter."""
     login_url = 'web:login'
@@ -191,15 +228,18 @@ class GameMoveView(LoginRequiredMixin, View):
         return request.headers.get('HX-Request') == 'true'
     
     def post(self, request, game_id):
+        with start_trace('move', transport='http', game_id=str(game_id), user_id=request.user.id):
+            return self.process_move(request, game_id)
+    
+    def process_move(self, request, game_id):
         try:
             # Get row and col from request
             row = int(request.POST.get('row', -1))
             col = int(request.POST.get('col', -1))
             
-            # Optimize query
-            game = Game.objects.select_related(
-                'black_player', 'white_player'
-            ).prefetch_related('ruleset').get(id=game_id)
+            # Served from the active game store while the game is hot
+            with span('load_game'):
+                game = active_game_store.load_game(game_id)
             
             # Only allow players to make moves
             if request.user not in [game.black_player, game.white_player]:
@@ -215,11 +255,11 @@ class GameMoveView(LoginRequiredMixin, View):
             
             # Make the move using game-specific service
             try:
-                service = game.get_service()
-                move = service.make_move(game, request.user.id, row, col)
+                with span('make_move'):
+                    move = submit_move(game, request.user.id, row, col)
                 
-                # Refresh game from database to get updated state
-                game.refresh_from_db()
+                # The service works on a locked copy; use its updated state
+                game = move.game
                 
                 # Send real-time notifications to both players
                 logger.info(f"🎮 MOVE: Processing move by {request.user.username} in game {game.id}")
@@ -228,12 +268,13 @@ class GameMoveView(LoginRequiredMixin, View):
                 try:
                     from .services import WebSocketNotificationService
                     
-                    success = WebSocketNotificationService.notify_game_event(
-                        event_type='game_move_made',
-                        game=game,
-                        triggering_user=request.user,
-                        request=request
-                    )
+                    with span('notify'):
+                        success = WebSocketNotificationService.notify_game_event(
+                            event_type='game_move_made',
+                            game=game,
+                            triggering_user=request.user,
+                            request=request
+                        )
                     
                     if not success:
                         logger.warning(f"Some WebSocket notifications failed for move in game {game.id}")
@@ -242,29 +283,25 @@ class GameMoveView(LoginRequiredMixin, View):
                     logger.error(f"WebSocket notification failed for move: {e}")
                     # Don't let WebSocket errors break the move response
                 
-                # Return HTML fragment for HTMX requests
+                # The board update for both players (mover included) arrives
+                # over the WebSocket, so the response is only an acknowledgement
+                move_delta = {
+                    'move_number': move.move_number,
+                    'row': row,
+                    'col': col,
+                    'player': request.user.username,
+                    'current_player': game.current_player,
+                    'status': game.status
+                }
+                
                 if self.is_htmx_request(request):
-                    from django.middleware.csrf import get_token
-                    return render(request, 'web/partials/game_board.html', {
-                        'game': game,
-                        'selected_game': game,  # For template compatibility
-                        'user': request.user,
-                        'csrf_token': get_token(request)
-                    })
+                    response = HttpResponse(status=204)
+                    response['HX-Trigger'] = json.dumps({'moveAccepted': move_delta})
+                    return response
                 
-                # Return JSON response for AJAX requests
+                # Return JSON delta for AJAX requests
                 elif request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
-                        'success': True,
-                        'board_state': game.board_state,
-                        'current_player': game.current_player,
-                        'status': game.status,
-                        'move': {
-                            'row': row,
-                            'col': col,
-                            'player': move.player.username if hasattr(move, 'player') else request.user.username
-                        }
-                    })
+                    return JsonResponse({'success': True, 'move': move_delta})
                 
                 # For non-AJAX requests, redirect to game detail
                 return redirect('web:game_detail', game_id=game_id)
@@ -289,6 +326,16 @@ class GameMoveView(LoginRequiredMixin, View):
                 return render(request, 'web/error.html', {
                     'error': str(e)
                 }, status=400)
+            except GameConflictError as e:
+                if self.is_htmx_request(request):
+                    return render(request, 'web/partials/error_message.html', {
+                        'error': str(e)
+                    }, status=409)
+                elif request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'error': str(e), 'code': e.code}, status=409)
+                return render(request, 'web/error.html', {
+                    'error': str(e)
+                }, status=409)
             
         except Game.DoesNotExist:
             if self.is_htmx_request(request):
@@ -450,6 +497,7 @@ class RespondFriendRequestView(LoginRequiredMixin, View):
 
 
 
+@method_decorator(conditional_on_versions(FRIENDSHIPS), name='get')
 class PendingRequestsView(LoginRequiredMixin, View):
     """Get user's pending friend requests as HTML for modal."""
     login_url = 'web:login'
@@ -484,6 +532,7 @@ class SearchUsersView(LoginRequiredMixin, View):
 
 
 
+@method_decorator(conditional_on_versions(FRIENDSHIPS), name='get')
 class FriendsModalView(LoginRequiredMixin, TemplateView):
     """Modal content for friends management."""
     template_name = 'web/partials/friends_modal_content.html'
@@ -504,6 +553,7 @@ class FriendsModalView(LoginRequiredMixin, TemplateView):
         return context
 
 
+@method_decorator(conditional_on_versions(GAMES), name='get')
 class GamesModalView(LoginRequiredMixin, TemplateView):
     """Modal content for games management and viewing."""
     template_name = 'web/partials/games_modal_content.html'
@@ -544,33 +594,6 @@ class ChallengeFriendView(FriendAPIViewMixin, LoginRequiredMixin, View):
         """Get user's friends list."""
         return Friendship.objects.get_friends(user)
     
-    def _get_updated_friends_context(self, user):
-        """Get updated context for friends panel."""
-        # Get friends
-        friends = Friendship.objects.get_friends(user)
-        
-        # Get pending challenges
-        pending_sent_challenges = Challenge.objects.select_related(
-            'challenger', 'challenged'
-        ).prefetch_related('ruleset').filter(
-            challenger=user,
-            status=ChallengeStatus.PENDING
-        )
-        
-        pending_received_challenges = Challenge.objects.select_related(
-            'challenger', 'challenged'
-        ).prefetch_related('ruleset').filter(
-            challenged=user, 
-            status=ChallengeStatus.PENDING
-        )
-        
-        return {
-            'friends': friends,
-            'pending_sent_challenges': pending_sent_challenges,
-            'pending_received_challenges': pending_received_challenges,
-            'user': user,
-        }
-    
     def handle_error_response(self, request, message, status=400):
         """Handle error response for both HTMX and JSON requests."""
         if request.headers.get('HX-Request'):
@@ -748,33 +771,6 @@ class RespondChallengeView(FriendAPIViewMixin, LoginRequiredMixin, View):
     """Respond to a game challenge (accept/reject)."""
     login_url = 'web:login'
     
-    def _get_updated_friends_context(self, user):
-        """Get updated context for friends panel."""
-        # Get friends
-        friends = Friendship.objects.get_friends(user)
-        
-        # Get pending challenges
-        pending_sent_challenges = Challenge.objects.select_related(
-            'challenger', 'challenged'
-        ).prefetch_related('ruleset').filter(
-            challenger=user,
-            status=ChallengeStatus.PENDING
-        )
-        
-        pending_received_challenges = Challenge.objects.select_related(
-            'challenger', 'challenged'
-        ).prefetch_related('ruleset').filter(
-            challenged=user, 
-            status=ChallengeStatus.PENDING
-        )
-        
-        return {
-            'friends': friends,
-            'pending_sent_challenges': pending_sent_challenges,
-            'pending_received_challenges': pending_received_challenges,
-            'user': user,
-        }
-    
     def post(self, request, challenge_id):
         # DEBUG: Log all request details
         from loguru import logger
@@ -881,8 +877,7 @@ class RespondChallengeView(FriendAPIViewMixin, LoginRequiredMixin, View):
                 # For HTMX requests, return updated friends panel and redirect to game
                 if request.headers.get('HX-Request'):
                     # First update the friends panel to remove the challenge
-                    context = self._get_updated_friends_context(request.user)
-                    response = render(request, 'web/partials/friends_panel.html', context)
+                    response = HttpResponse(panel_fragments.render(FRIENDS_PANEL, request.user))
                     # Then redirect to the new game
                     response['HX-Redirect'] = f'/games/{game.id}/'
                     return response
@@ -927,8 +922,7 @@ class RespondChallengeView(FriendAPIViewMixin, LoginRequiredMixin, View):
             
             # For HTMX requests, return updated friends panel
             if request.headers.get('HX-Request'):
-                context = self._get_updated_friends_context(request.user)
-                return render(request, 'web/partials/friends_panel.html', context)
+                return HttpResponse(panel_fragments.render(FRIENDS_PANEL, request.user))
             
             return self.json_response({
                 'success': True,
@@ -962,8 +956,7 @@ class RespondChallengeView(FriendAPIViewMixin, LoginRequiredMixin, View):
             
             # For HTMX requests, return updated friends panel
             if request.headers.get('HX-Request'):
-                context = self._get_updated_friends_context(request.user)
-                return render(request, 'web/partials/friends_panel.html', context)
+                return HttpResponse(panel_fragments.render(FRIENDS_PANEL, request.user))
             
             return self.json_response({
                 'success': True,
@@ -971,6 +964,7 @@ class RespondChallengeView(FriendAPIViewMixin, LoginRequiredMixin, View):
             })
 
 
+@method_decorator(conditional_on_versions(RULESETS, per_user=False), name='get')
 class RulesetsListView(FriendAPIViewMixin, LoginRequiredMixin, View):
     """Get available rulesets for challenge creation."""
     login_url = 'web:login'
@@ -1003,11 +997,10 @@ class GamePassView(FriendAPIViewMixin, LoginRequiredMixin, View):
             from games.models import Game
             from games.game_services import GameServiceFactory
             from games.models import GameEvent
-            from games.serializers import GameSerializer
             
             # Get the game
             try:
-                game = Game.objects.get(id=game_id)
+                game = active_game_store.load_game(game_id)
             except Game.DoesNotExist:
                 if request.headers.get('HX-Request'):
                     return render(request, 'web/partials/error_message.html', {
@@ -1042,8 +1035,8 @@ class GamePassView(FriendAPIViewMixin, LoginRequiredMixin, View):
             
             # Make the pass move using game-specific service
             try:
-                service = game.get_service()
-                move = service.pass_turn(game, user.id)
+                move = submit_pass(game, user.id)
+                game = move.game
                 
                 # Create game event
                 for player in [game.black_player, game.white_player]:
@@ -1086,13 +1079,24 @@ class GamePassView(FriendAPIViewMixin, LoginRequiredMixin, View):
                 return self.json_response({
                     'success': True,
                     'message': 'Pass move made successfully',
-                    'game': GameSerializer(game).data,
+                    'game': {
+                        'id': str(game.id),
+                        'status': game.status,
+                        'current_player': game.current_player,
+                        'move_count': game.move_count,
+                    },
                     'move': {
                         'move_number': move.move_number,
                         'is_pass': True
                     }
                 })
                 
+            except GameConflictError as e:
+                if request.headers.get('HX-Request'):
+                    return render(request, 'web/partials/error_message.html', {
+                        'error': str(e)
+                    }, status=409)
+                return self.json_error(str(e), 409)
             except Exception as e:
                 if request.headers.get('HX-Request'):
                     return render(request, 'web/partials/error_message.html', {
@@ -1118,11 +1122,10 @@ class GameResignView(FriendAPIViewMixin, LoginRequiredMixin, View):
             from games.models import Game
             from games.game_services import GameServiceFactory
             from games.models import GameEvent
-            from games.serializers import GameSerializer
             
             # Get the game
             try:
-                game = Game.objects.get(id=game_id)
+                game = active_game_store.load_game(game_id)
             except Game.DoesNotExist:
                 if request.headers.get('HX-Request'):
                     return render(request, 'web/partials/error_message.html', {
@@ -1185,7 +1188,12 @@ class GameResignView(FriendAPIViewMixin, LoginRequiredMixin, View):
                 return self.json_response({
                     'success': True,
                     'message': 'Game resigned successfully',
-                    'game': GameSerializer(game).data
+                    'game': {
+                        'id': str(game.id),
+                        'status': game.status,
+                        'current_player': game.current_player,
+                        'move_count': game.move_count,
+                    }
                 })
                 
             except Exception as e:
@@ -1203,6 +1211,69 @@ class GameResignView(FriendAPIViewMixin, LoginRequiredMixin, View):
             return self.json_error(f'An error occurred: {str(e)}', 500)
 
 
+class GameAnalysisView(FriendAPIViewMixin, LoginRequiredMixin, View):
+    """Forced-win analysis of a finished Gomoku game, for its players."""
+    login_url = 'web:login'
+    
+    def get(self, request, game_id):
+        """
+        Solve the position after ``?move=N`` (default: the final position).
+        
+        The stored analysis of the whole game (see ``manage.py
+        analyze_forced_wins``) is included when there is one.
+        """
+        from games.analysis import analyze_position
+        from games.compute import ComputeError
+        from games.models import GameAnalysis
+        
+        try:
+            game = Game.objects.get(pk=game_id)
+        except Game.DoesNotExist:
+            return self.json_error('Game not found', 404)
+        
+        if request.user.id not in [game.black_player_id, game.white_player_id]:
+            return self.json_error('You are not a player in this game', 403)
+        # Solving a live game would play it for you
+        if game.status != GameStatus.FINISHED:
+            return self.json_error('Analysis is available once the game is finished', 400)
+        
+        move_number = request.GET.get('move')
+        if move_number is not None:
+            try:
+                move_number = int(move_number)
+            except ValueError:
+                return self.json_error('move must be a number', 400)
+            if not 0 <= move_number <= game.move_count:
+                return self.json_error(f'move must be between 0 and {game.move_count}', 400)
+        
+        try:
+            result = analyze_position(game, move_number)
+        except GameStateError as e:
+            return self.json_error(e.message, 400)
+        except ComputeError:
+            return self.json_error('The analysis server is busy, try again shortly', 503)
+        
+        try:
+            stored = game.analysis
+        except GameAnalysis.DoesNotExist:
+            stored = None
+        
+        return self.json_response({
+            'game_id': str(game.id),
+            'move_number': game.move_count if move_number is None else move_number,
+            'position': result.to_dict(),
+            'game_analysis': {
+                'forced_win_move': stored.forced_win_move,
+                'forced_win_player': stored.forced_win_player or None,
+                'forced_win_kind': stored.forced_win_kind or None,
+                'forced_win_sequence': stored.forced_win_sequence,
+                'unknown_positions': stored.unknown_positions,
+                'analyzed_at': stored.analyzed_at.isoformat(),
+            } if stored else None,
+        })
+
+
+@method_decorator(conditional_on_versions(FRIENDSHIPS), name='get')
 class BlockedUsersView(LoginRequiredMixin, View):
     """Get user's blocked users list as HTML for modal."""
     login_url = 'web:login'